@@ -0,0 +1,169 @@
+# api_client.py
+"""
+HTTP client for the dashboard's calls to API Gateway.
+
+One ApiClient per base URL and process (dashboard_data.api_client caches it),
+so every rerun and session reuses the same keep-alive pool instead of paying
+a TLS handshake per click. Adds:
+  - retries with exponential backoff + jitter (Retry-After honoured) on 429/5xx;
+    POSTs are only retried on 429/503, where the request was not processed
+  - gzip: responses are always accepted compressed; request bodies above
+    GZIP_MIN_BYTES are compressed when API_GZIP_REQUESTS=1 (needs compression
+    enabled on the API, see MinimumCompressionSize in template.yaml)
+  - per-endpoint latency histograms (stats()) for the debug sidebar
+
+Every call returns the decoded JSON body, or {"error": "..."} like the
+helpers it replaces, so callers never see an exception.
+"""
+import collections, gzip, json, os, random, re, threading, time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+RETRIES = int(os.getenv("API_RETRIES") or 3)
+BACKOFF = float(os.getenv("API_BACKOFF") or 0.5)          # seconds, doubled per attempt
+MAX_BACKOFF = 8.0
+GZIP_REQUESTS = os.getenv("API_GZIP_REQUESTS") == "1"
+GZIP_MIN_BYTES = 4096
+
+RETRY_STATUS = {429, 500, 502, 503, 504}
+POST_RETRY_STATUS = {429, 503}
+BUCKETS_MS = (50, 100, 250, 500, 1000, 2500, 5000, 10000)   # upper bounds; the last bucket is open-ended
+SAMPLES = 200
+
+_ID = re.compile(r"^[0-9a-fA-F-]{16,}$")
+
+def _template(path: str) -> str:
+    """/workflow/3f2a...e9 -> /workflow/{id}, so per-run paths share one histogram."""
+    return "/".join("{id}" if _ID.match(seg) else seg for seg in path.split("?", 1)[0].split("/"))
+
+class ApiClient:
+    def __init__(self, base_url: str, pool_size: int = 16, retries: int = RETRIES, backoff: float = BACKOFF):
+        self.base_url = base_url.rstrip("/")
+        self.retries = retries
+        self.backoff = backoff
+        self.session = requests.Session()
+        self.session.headers.update({"Accept": "application/json", "Accept-Encoding": "gzip, deflate"})
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, Any]] = {}
+
+    # ---- requests ----
+    def get(self, path: str, params: Optional[dict] = None, timeout: float = 30) -> dict:
+        params = {k: v for k, v in (params or {}).items() if v not in (None, "")}
+        return self.request("GET", path, params=params, timeout=timeout)
+
+    def post(self, path: str, payload: dict, timeout: float = 30) -> dict:
+        return self.request("POST", path, payload=payload, timeout=timeout)
+
+    def post_many(self, path: str, payloads: list, max_workers: int = 8,
+                  timeout: float = 30) -> Iterator[Tuple[int, dict]]:
+        """
+        POST each payload with at most `max_workers` in flight over the shared pool.
+        Yields (index, response) as each one finishes, so callers can update progress live.
+        """
+        if not payloads:
+            return
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(payloads)))) as pool:
+            futures = {pool.submit(self.post, path, p, timeout): i for i, p in enumerate(payloads)}
+            for f in as_completed(futures):
+                yield futures[f], f.result()
+
+    def request(self, method: str, path: str, params: Optional[dict] = None,
+                payload: Any = None, timeout: float = 30) -> dict:
+        kwargs: Dict[str, Any] = {"params": params, "timeout": timeout}
+        if payload is not None:
+            data = json.dumps(payload).encode("utf-8")
+            headers = {"Content-Type": "application/json"}
+            if GZIP_REQUESTS and len(data) >= GZIP_MIN_BYTES:
+                data = gzip.compress(data, compresslevel=5)
+                headers["Content-Encoding"] = "gzip"
+            kwargs.update(data=data, headers=headers)
+        retry_on = RETRY_STATUS if method == "GET" else POST_RETRY_STATUS
+        endpoint = f"{method} {_template(path)}"
+
+        attempt = 0
+        while True:
+            t0 = time.perf_counter()
+            try:
+                r = self.session.request(method, self.base_url + path, **kwargs)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                # a GET can always be resent; a POST only if it never reached the server
+                resend = method == "GET" or isinstance(e, requests.exceptions.ConnectTimeout)
+                self._record(endpoint, time.perf_counter() - t0, None, attempt)
+                if resend and attempt < self.retries:
+                    attempt += 1
+                    time.sleep(self._delay(attempt, None))
+                    continue
+                return {"error": str(e)}
+            except requests.exceptions.RequestException as e:
+                self._record(endpoint, time.perf_counter() - t0, None, attempt)
+                return {"error": str(e)}
+            self._record(endpoint, time.perf_counter() - t0, r.status_code, attempt)
+            if r.status_code in retry_on and attempt < self.retries:
+                attempt += 1
+                time.sleep(self._delay(attempt, r.headers.get("Retry-After")))
+                continue
+            return self._decode(r)
+
+    def _delay(self, attempt: int, retry_after: Optional[str]) -> float:
+        if retry_after:
+            try:
+                return min(MAX_BACKOFF, float(retry_after))
+            except ValueError:
+                pass
+        return min(MAX_BACKOFF, self.backoff * 2 ** (attempt - 1)) * random.uniform(0.5, 1.0)
+
+    @staticmethod
+    def _decode(r: requests.Response) -> dict:
+        try:
+            r.raise_for_status()
+        except requests.exceptions.HTTPError as e:
+            try:
+                detail = r.json().get("error")
+            except ValueError:
+                detail = None
+            return {"error": f"{e}" + (f": {detail}" if detail else ""), "status": r.status_code}
+        try:
+            return r.json()
+        except ValueError:
+            return {"error": f"non-JSON response from {r.url}", "status": r.status_code}
+
+    # ---- latency stats ----
+    def _record(self, endpoint: str, seconds: float, status: Optional[int], attempt: int) -> None:
+        ms = seconds * 1000
+        with self._lock:
+            s = self._stats.setdefault(endpoint, {
+                "calls": 0, "errors": 0, "retries": 0,
+                "buckets": [0] * (len(BUCKETS_MS) + 1),
+                "samples": collections.deque(maxlen=SAMPLES),
+            })
+            s["calls"] += 1
+            s["retries"] += 1 if attempt else 0
+            s["errors"] += 1 if status is None or status >= 400 else 0
+            s["buckets"][next((i for i, b in enumerate(BUCKETS_MS) if ms <= b), len(BUCKETS_MS))] += 1
+            s["samples"].append(ms)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """{endpoint: {calls, errors, retries, p50_ms, p95_ms, max_ms, histogram: {"<=50ms": n, ...}}}"""
+        out = {}
+        with self._lock:
+            items = [(k, dict(v, samples=sorted(v["samples"]), buckets=list(v["buckets"]))) for k, v in self._stats.items()]
+        for endpoint, s in sorted(items):
+            samples = s["samples"]
+            pct = lambda p: round(samples[min(len(samples) - 1, int(p * len(samples)))], 1) if samples else None
+            labels = [f"<={b}ms" for b in BUCKETS_MS] + [f">{BUCKETS_MS[-1]}ms"]
+            out[endpoint] = {
+                "calls": s["calls"], "errors": s["errors"], "retries": s["retries"],
+                "p50_ms": pct(0.50), "p95_ms": pct(0.95), "max_ms": round(samples[-1], 1) if samples else None,
+                "histogram": dict(zip(labels, s["buckets"])),
+            }
+        return out
+
+    def reset_stats(self) -> None:
+        with self._lock:
+            self._stats.clear()
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Cold-start benchmark for the Lambda handlers in template.yaml.
+
+Each run is a fresh interpreter (what a new Lambda container pays), timing:
+  import - importing the handler module
+  init   - building every AWS client the handler (or a module it imports)
+           creates through clients.py, i.e. its first-invocation setup
+No AWS calls are made; creating a client needs no credentials or network.
+
+    python bench_cold_start.py                      # every handler, 5 runs each
+    python bench_cold_start.py --runs 20 --handler search_shopify_retailers
+    python bench_cold_start.py --json > cold_start.json
+
+The "heaviest" column lists the slowest top-level imports of one run
+(python -X importtime), which is where to look when a handler regresses.
+"""
+
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+LAMBDA_DIR = os.path.join(ROOT, "lambda_functions")
+
+PROBE = r"""
+import importlib, json, sys, time
+sys.path.insert(0, {lambda_dir!r})
+t0 = time.perf_counter()
+importlib.import_module({module!r})
+t1 = time.perf_counter()
+import clients
+for svc in {services!r}:
+    clients.table("bench-cold-start") if svc == "dynamodb (table)" else clients.client(svc)
+t2 = time.perf_counter()
+print(json.dumps({{"import_ms": (t1 - t0) * 1000, "init_ms": (t2 - t1) * 1000}}))
+"""
+
+def handlers(template: str) -> list[str]:
+    with open(template, encoding="utf-8") as f:
+        return sorted(set(re.findall(r"Handler:\s*([\w]+)\.lambda_handler", f.read())))
+
+def _local_imports(module: str, seen: set[str]) -> set[str]:
+    """`module` plus every lambda_functions module it imports, transitively (module level or deferred)."""
+    path = os.path.join(LAMBDA_DIR, module + ".py")
+    if module in seen or not os.path.exists(path):
+        return seen
+    seen.add(module)
+    with open(path, encoding="utf-8") as f:
+        src = f.read()
+    for dep in re.findall(r"^\s*(?:from\s+(\w+)\s+import|import\s+(\w+))", src, re.M):
+        _local_imports(dep[0] or dep[1], seen)
+    return seen
+
+def services(module: str) -> list[str]:
+    found = set()
+    for m in _local_imports(module, set()) - {"clients", "profiling"}:     # profiling's S3 upload is opt-in
+        with open(os.path.join(LAMBDA_DIR, m + ".py"), encoding="utf-8") as f:
+            src = f.read()
+        found.update(re.findall(r"\bclient\(\s*\"([\w-]+)\"", src))
+        if "clients.table(" in src:
+            found.add("dynamodb (table)")
+    return sorted(found)
+
+def probe(module: str, svcs: list[str], importtime: bool = False) -> tuple[dict, str]:
+    env = {**os.environ, "AWS_REGION": os.environ.get("AWS_REGION") or "us-east-1",
+           "PYTHONDONTWRITEBYTECODE": "1"}
+    cmd = [sys.executable] + (["-X", "importtime"] if importtime else []) + \
+          ["-c", PROBE.format(lambda_dir=LAMBDA_DIR, module=module, services=svcs)]
+    out = subprocess.run(cmd, capture_output=True, text=True, env=env, cwd=ROOT)
+    if out.returncode != 0:
+        raise RuntimeError(out.stderr.strip().splitlines()[-1] if out.stderr.strip() else "probe failed")
+    return json.loads(out.stdout.strip().splitlines()[-1]), out.stderr
+
+def heaviest(importtime_log: str, n: int = 3) -> list[tuple[str, float]]:
+    """Top-level packages by cumulative import time (ms) from a -X importtime log."""
+    top = {}
+    for line in importtime_log.splitlines():
+        m = re.match(r"import time:\s+\d+\s+\|\s+(\d+)\s+\|( *)([\w.]+)", line)
+        if m and len(m.group(2)) == 1:            # depth 0: imported directly by the probe / handler chain
+            name = m.group(3).split(".")[0]
+            top[name] = max(top.get(name, 0.0), int(m.group(1)) / 1000)
+    skip = {"clients", "json", "importlib", "time", "sys", "encodings", "site", "_frozen_importlib_external"}
+    return sorted(((k, v) for k, v in top.items() if k not in skip and v >= 1), key=lambda kv: -kv[1])[:n]
+
+def pct(values: list[float], p: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(p * (len(values) - 1))))]
+
+def bench(module: str, runs: int) -> dict:
+    svcs = services(module)
+    samples = [probe(module, svcs)[0] for _ in range(runs)]
+    _, log = probe(module, svcs, importtime=True)
+    total = [s["import_ms"] + s["init_ms"] for s in samples]
+    return {
+        "handler": module,
+        "services": svcs,
+        "import_ms_p50": statistics.median(s["import_ms"] for s in samples),
+        "init_ms_p50": statistics.median(s["init_ms"] for s in samples),
+        "total_ms_p50": statistics.median(total),
+        "total_ms_p99": pct(total, 0.99),
+        "heaviest": heaviest(log),
+    }
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--template", default=os.path.join(ROOT, "template.yaml"))
+    ap.add_argument("--handler", action="append", help="module name; repeatable (default: all in the template)")
+    ap.add_argument("--runs", type=int, default=5)
+    ap.add_argument("--json", action="store_true", help="print results as JSON")
+    args = ap.parse_args()
+
+    results = []
+    for module in args.handler or handlers(args.template):
+        try:
+            results.append(bench(module, max(1, args.runs)))
+        except RuntimeError as e:
+            results.append({"handler": module, "error": str(e)})
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{'handler':<28} {'import':>8} {'init':>8} {'p50':>8} {'p99':>8}  services / heaviest imports")
+    for r in results:
+        if "error" in r:
+            print(f"{r['handler']:<28} error: {r['error']}")
+            continue
+        heavy = ", ".join(f"{k} {v:.0f}ms" for k, v in r["heaviest"])
+        print(f"{r['handler']:<28} {r['import_ms_p50']:>6.0f}ms {r['init_ms_p50']:>6.0f}ms "
+              f"{r['total_ms_p50']:>6.0f}ms {r['total_ms_p99']:>6.0f}ms  {','.join(r['services']) or '-'} / {heavy or '-'}")
+
+if __name__ == "__main__":
+    main()
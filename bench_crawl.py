@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Crawler benchmark over a recorded page archive (no internet needed for replay).
+
+    # build an offline archive from saved pages, mapped onto the URLs the crawlers search
+    python bench_crawl.py seed --pages fixtures/pages --archive bench_crawl.jsonl.gz
+    # same, plus Shopify's JSON endpoints, to compare bytes with the fast path
+    python bench_crawl.py seed --json --archive bench_crawl_json.jsonl.gz
+
+    # record a live crawl once, then replay it as often as you like
+    python bench_crawl.py record --archive crawl.jsonl.gz --crawler generator --query fitness
+    python bench_crawl.py replay --archive crawl.jsonl.gz --crawler lambda --latency-ms 80
+
+Reports stores/sec, requests, bytes fetched and wall/CPU time per stage
+(search, fetch, parse). Polite pacing sleeps are disabled during replay.
+"""
+
+import argparse
+import glob
+import json
+import os
+import sys
+import threading
+import time
+sys.path.append('lambda_functions')
+sys.path.append('src')
+
+import search_shopify_retailers as lambda_crawler
+import shopify_json
+from lead_generator import LeadGenerator
+from page_archive import PageArchive, record, replay
+
+CONTACT_PAGE = "<html><title>Contact</title><body>Email us at hello@{host}</body></html>"
+
+class StageClock:
+    """Wall and CPU seconds per stage, accumulated per thread-safe call."""
+
+    def __init__(self):
+        self.wall: dict[str, float] = {}
+        self.cpu: dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def wrap(self, stage: str, fn):
+        def timed(*args, **kwargs):
+            w, c = time.perf_counter(), time.thread_time()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                with self._lock:
+                    self.wall[stage] = self.wall.get(stage, 0.0) + time.perf_counter() - w
+                    self.cpu[stage] = self.cpu.get(stage, 0.0) + time.thread_time() - c
+        return timed
+
+def json_payload(kind: str, host: str) -> dict:
+    """Small stand-ins for a store's /meta.json, /products.json and /collections.json."""
+    name = host.split(".")[0].replace("-", " ").title()
+    if kind == "meta":
+        return {"name": name, "description": f"{name} online store", "currency": "USD",
+                "myshopify_domain": f"{host.split('.')[0]}.myshopify.com"}
+    if kind == "products":
+        return {"products": [{"product_type": t} for t in ("Shoes", "Apparel", "Accessories")]}
+    return {"collections": [{"title": t} for t in ("New Arrivals", "Sale")]}
+
+def seed_urls(query: str, limit: int) -> list[str]:
+    """Every homepage either crawler would visit for this query."""
+    urls = [r["url"] for r in lambda_crawler.search_google(query, limit * 3)]
+    urls += LeadGenerator(request_delay=0)._fallback_search(query, limit * 2)
+    return list(dict.fromkeys(urls))
+
+def cmd_seed(args):
+    pages = sorted(glob.glob(os.path.join(args.pages, "*.html")))
+    if not pages:
+        sys.exit(f"no .html pages under {args.pages}")
+    archive = PageArchive(args.archive)
+    for i, url in enumerate(seed_urls(args.query, args.limit)):
+        with open(pages[i % len(pages)], encoding="utf-8") as f:
+            archive.add(url, f.read())
+        host = url.split("//", 1)[-1].strip("/")
+        for path in ("/pages/contact", "/pages/contact-us", "/pages/about", "/pages/about-us"):
+            archive.add(url.rstrip("/") + path, CONTACT_PAGE.format(host=host))
+        if args.json:
+            for kind, endpoint in shopify_json.endpoints(url).items():
+                if kind != "contact":
+                    archive.add(endpoint, json.dumps(json_payload(kind, host)))
+    print(f"seeded {len(archive.entries)} responses -> {archive.save()}")
+
+def run_crawl(crawler: str, query: str, limit: int, session_setup,
+              pacing: bool) -> tuple[int, StageClock, dict, float, float]:
+    clock = StageClock()
+    if crawler == "lambda":
+        session = lambda_crawler._session()
+        adapter = session_setup(session)
+        if not pacing:
+            lambda_crawler.POLITE_DELAY = 0
+        lambda_crawler.search_google = clock.wrap("search", lambda_crawler.search_google)
+        lambda_crawler.extract_stores = clock.wrap("extract", lambda_crawler.extract_stores)
+        run = lambda: lambda_crawler.find_shopify_stores(query, limit)
+    else:
+        gen = LeadGenerator(request_delay=1.0 if pacing else 0)
+        adapter = session_setup(gen.session)
+        gen._search_shopify_stores = clock.wrap("search", gen._search_shopify_stores)
+        gen._extract_homepages = clock.wrap("extract", gen._extract_homepages)
+        gen._fetch_pages = clock.wrap("extract", gen._fetch_pages)
+        run = lambda: gen.find_shopify_leads(query, limit)
+
+    wall, cpu = time.perf_counter(), time.process_time()
+    stores = run()
+    return len(stores), clock, adapter.stats, time.perf_counter() - wall, time.process_time() - cpu
+
+def report(crawler, n, clock, stats, wall, cpu):
+    fetch_wall, fetch_cpu = stats["fetch_wall"], stats["fetch_cpu"]
+    stages = {
+        "search": (clock.wall.get("search", 0.0), clock.cpu.get("search", 0.0)),
+        "fetch": (fetch_wall, fetch_cpu),
+        # extract includes its own page fetches; what's left is parsing/extraction.
+        # Concurrent fetches sum their wall time, so this is a floor, not an estimate.
+        "parse": (max(0.0, clock.wall.get("extract", 0.0) - fetch_wall),
+                  max(0.0, clock.cpu.get("extract", 0.0) - fetch_cpu)),
+    }
+    print(f"crawler={crawler} stores={n} wall={wall:.3f}s cpu={cpu:.3f}s "
+          f"stores/sec={n / wall if wall else 0:.2f}")
+    print(f"requests={stats['requests']} misses={stats['misses']} bytes={stats['bytes']} "
+          f"({stats['bytes'] / 1024:.1f} KiB)")
+    print(f"{'stage':<8}{'wall ms':>10}{'cpu ms':>10}")
+    for stage, (w, c) in stages.items():
+        print(f"{stage:<8}{w * 1000:>10.1f}{c * 1000:>10.1f}")
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("mode", choices=["seed", "record", "replay"])
+    ap.add_argument("--archive", default="bench_crawl.jsonl.gz")
+    ap.add_argument("--pages", default=os.path.join("fixtures", "pages"), help="seed: saved .html pages")
+    ap.add_argument("--json", action="store_true", help="seed: also add Shopify JSON endpoints")
+    ap.add_argument("--crawler", choices=["lambda", "generator"], default="lambda")
+    ap.add_argument("--query", default="fitness equipment")
+    ap.add_argument("--limit", type=int, default=5)
+    ap.add_argument("--latency-ms", type=float, default=0.0, help="replay: simulated latency per request")
+    ap.add_argument("--jitter-ms", type=float, default=0.0)
+    ap.add_argument("--recorded-latency", action="store_true", help="replay: use each page's recorded time")
+    args = ap.parse_args()
+
+    if args.mode == "seed":
+        return cmd_seed(args)
+
+    if args.mode == "record":
+        archive = PageArchive.load(args.archive) if os.path.exists(args.archive) else PageArchive(args.archive)
+        setup = lambda session: record(session, archive)
+    else:
+        archive = PageArchive.load(args.archive)
+        setup = lambda session: replay(session, archive, latency=args.latency_ms / 1000.0,
+                                       jitter=args.jitter_ms / 1000.0, use_recorded=args.recorded_latency)
+
+    report(args.crawler, *run_crawl(args.crawler, args.query, args.limit, setup, pacing=args.mode == "record"))
+    if args.mode == "record":
+        print(f"saved {len(archive.entries)} responses -> {archive.save()}")
+
+if __name__ == "__main__":
+    main()
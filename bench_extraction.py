@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark: legacy per-call pattern strings / first-hit keyword loop vs the
+precompiled rules in lambda_functions/extraction_rules.py, over a saved page corpus.
+
+    python bench_extraction.py                       # fixtures/pages/*.html
+    python bench_extraction.py --corpus some/dir --repeat 500
+"""
+
+import argparse
+import glob
+import os
+import re
+import sys
+import time
+sys.path.append('lambda_functions')
+
+from bs4 import BeautifulSoup
+
+from extraction_rules import (
+    ADDRESS_RE, CITY_STATE_ZIP_RE, EMAIL_RE, INDUSTRY_INDEX, PHONE_PATTERNS, classify_industry,
+)
+
+LEGACY_INDUSTRY_KEYWORDS = {
+    'fashion': ['clothing', 'fashion', 'apparel', 'dress', 'shirt', 'pants'],
+    'beauty': ['beauty', 'cosmetics', 'skincare', 'makeup', 'fragrance'],
+    'fitness': ['fitness', 'gym', 'workout', 'exercise', 'sports'],
+    'electronics': ['electronics', 'gadgets', 'tech', 'computer', 'phone'],
+    'home': ['home', 'furniture', 'decor', 'kitchen', 'bedroom'],
+    'food': ['food', 'snacks', 'organic', 'nutrition', 'supplements']
+}
+
+# ---------- Legacy implementations (as they were in src/lead_generator.py) ----------
+
+def legacy_industry(text):
+    text = text.lower()
+    for industry, keywords in LEGACY_INDUSTRY_KEYWORDS.items():
+        if any(keyword in text for keyword in keywords):
+            return industry.title()
+    return 'E-commerce'
+
+def legacy_weighted_industry(text):
+    """What hit counts would cost with the old structure: one scan per keyword."""
+    text = text.lower()
+    counts = {industry: sum(len(re.findall(r'\b' + keyword, text)) for keyword in keywords)
+              for industry, keywords in LEGACY_INDUSTRY_KEYWORDS.items()}
+    best = max(counts, key=counts.get)
+    return best.title() if counts[best] else 'E-commerce'
+
+def legacy_contacts(text):
+    emails = re.findall(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b', text)
+    phone = None
+    for pattern in [r'\+?1?[-.\s]?\(?([0-9]{3})\)?[-.\s]?([0-9]{3})[-.\s]?([0-9]{4})',
+                    r'\+?([0-9]{1,3})[-.\s]?([0-9]{3,4})[-.\s]?([0-9]{3,4})[-.\s]?([0-9]{3,4})']:
+        matches = re.findall(pattern, text)
+        if matches:
+            phone = ''.join(matches[0])
+            break
+    addresses = re.findall(r'\b\d+\s+[A-Za-z\s]+(?:Street|St|Avenue|Ave|Road|Rd|Boulevard|Blvd|Drive|Dr|Lane|Ln|Way|Court|Ct|Place|Pl)\b',
+                           text, re.IGNORECASE)
+    location = addresses[0] if addresses else (re.findall(r'\b[A-Za-z\s]+,\s*[A-Z]{2}\s*\d{5}\b', text) or [None])[0]
+    return emails[:1], phone, location
+
+# ---------- Precompiled implementations ----------
+
+def compiled_industry(text):
+    return classify_industry(text)
+
+def compiled_contacts(text):
+    m = EMAIL_RE.search(text)
+    phone = None
+    for pattern in PHONE_PATTERNS:
+        pm = pattern.search(text)
+        if pm:
+            phone = ''.join(pm.groups())
+            break
+    am = ADDRESS_RE.search(text) or CITY_STATE_ZIP_RE.search(text)
+    return ([m.group(0)] if m else []), phone, (am.group(0) if am else None)
+
+def _time(fn, texts, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for t in texts:
+            fn(t)
+    return (time.perf_counter() - start) / (repeat * len(texts)) * 1e6
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--corpus", default=os.path.join("fixtures", "pages"), help="directory of saved .html pages")
+    ap.add_argument("--repeat", type=int, default=200)
+    args = ap.parse_args()
+
+    paths = sorted(glob.glob(os.path.join(args.corpus, "*.html")))
+    if not paths:
+        sys.exit(f"no .html pages under {args.corpus}")
+    texts = []
+    for p in paths:
+        with open(p, encoding="utf-8", errors="replace") as f:
+            texts.append(BeautifulSoup(f.read(), "html.parser").get_text())
+
+    print(f"corpus: {len(texts)} pages, {sum(map(len, texts))} chars of text, repeat={args.repeat}\n")
+    print(f"{'stage':<12}{'legacy µs/page':>16}{'compiled µs/page':>18}{'speedup':>9}")
+    for stage, legacy, compiled in (("industry*", legacy_industry, compiled_industry),
+                                     ("weighted", legacy_weighted_industry, compiled_industry),
+                                     ("contacts", legacy_contacts, compiled_contacts)):
+        a = _time(legacy, texts, args.repeat)
+        b = _time(compiled, texts, args.repeat)
+        print(f"{stage:<12}{a:>16.1f}{b:>18.1f}{a / b:>8.2f}x")
+    print("* legacy stops at the first keyword hit, so it does less work and answers a different question")
+
+    print("\nindustry per page (legacy first-hit -> weighted):")
+    for p, t in zip(paths, texts):
+        counts = dict(INDUSTRY_INDEX.counts(t).most_common())
+        print(f"  {os.path.basename(p):<20} {legacy_industry(t):<12} -> {compiled_industry(t):<12} {counts}")
+
+if __name__ == "__main__":
+    main()
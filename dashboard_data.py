@@ -0,0 +1,110 @@
+# dashboard_data.py
+"""
+Cached data access for the Streamlit dashboard.
+
+Clients are process-wide (st.cache_resource); API calls go through one
+keep-alive ApiClient per URL (api_client.py). Reads are TTL-cached
+(st.cache_data), so widget interactions and reruns reuse the last result
+instead of going back to DynamoDB or the API each time. Call invalidate()
+after a write so the next rerun sees it.
+"""
+import os, sys
+
+import streamlit as st
+
+from api_client import ApiClient
+
+# list/filter/sort/paginate helpers are shared with the Lambdas
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'lambda_functions'))
+from lead_query import campaigns, flatten, query  # noqa: E402
+from campaign_stats import ALL, count_statuses, funnel  # noqa: E402
+
+LEADS_TABLE = os.getenv("LEADS_TABLE_NAME") or "LeadsTable"
+LIST_TTL = int(os.getenv("DASHBOARD_LIST_TTL") or 60)
+LEAD_TTL = int(os.getenv("DASHBOARD_LEAD_TTL") or 30)
+STATS_TTL = int(os.getenv("DASHBOARD_STATS_TTL") or 15)
+BULK_WORKERS = int(os.getenv("DASHBOARD_BULK_WORKERS") or 8)
+
+@st.cache_resource
+def leads_table(region: str, table_name: str = LEADS_TABLE):
+    import boto3
+    return boto3.resource("dynamodb", region_name=region).Table(table_name)
+
+@st.cache_resource
+def api_client(api_url: str) -> ApiClient:
+    """One keep-alive client per API URL, shared by every rerun and session; pool sized for post_many."""
+    return ApiClient(api_url, pool_size=max(10, BULK_WORKERS * 2))
+
+def post(api_url: str, path: str, payload: dict, timeout: float = 30) -> dict:
+    return api_client(api_url).post(path, payload, timeout=timeout)
+
+def get(api_url: str, path: str, params: dict | None = None, timeout: float = 30) -> dict:
+    return api_client(api_url).get(path, params, timeout=timeout)
+
+def post_many(api_url: str, path: str, payloads: list, max_workers: int = BULK_WORKERS, timeout: float = 30):
+    """POST each payload with bounded concurrency; yields (index, response) as each one finishes."""
+    return api_client(api_url).post_many(path, payloads, max_workers=max_workers, timeout=timeout)
+
+@st.cache_data(ttl=LIST_TTL, show_spinner="Loading leads…")
+def lead_rows(region: str, table_name: str = LEADS_TABLE) -> list:
+    """Every lead flattened to (lead, campaign) rows: one paged scan per TTL, shared by all sessions."""
+    table = leads_table(region, table_name)
+    payloads, kwargs = [], {"ProjectionExpression": "#d", "ExpressionAttributeNames": {"#d": "data"}}
+    while True:
+        res = table.scan(**kwargs)
+        payloads.extend(item["data"] for item in res.get("Items", []) if item.get("data") is not None)
+        if "LastEvaluatedKey" not in res:
+            return flatten(payloads)
+        kwargs["ExclusiveStartKey"] = res["LastEvaluatedKey"]
+
+@st.cache_data(ttl=LEAD_TTL, show_spinner=False)
+def get_lead(region: str, email: str, table_name: str = LEADS_TABLE) -> dict | None:
+    item = leads_table(region, table_name).get_item(Key={"pk": f"LEAD#{email.strip().lower()}"}).get("Item")
+    return item.get("data") if item else None
+
+@st.cache_data(ttl=LEAD_TTL, show_spinner="Loading leads…")
+def api_lead_page(api_url: str, **params) -> dict:
+    """One page from GET /leads/list; params are passed through as the query string."""
+    return get(api_url, "/leads/list", params)
+
+def fetch_changes(api_url: str, cursor: str | None, lookback: int = 3600, max_pages: int = 5) -> dict:
+    """
+    New events from GET /leads/changes after `cursor` (not cached: the cursor is the cache).
+    The first call (no cursor) starts `lookback` seconds back. Returns {"events", "cursor"} or {"error"}.
+    """
+    events, params = [], {"limit": 100}
+    if cursor:
+        params["cursor"] = cursor
+    else:
+        params["lookback"] = lookback
+    for _ in range(max_pages):
+        res = get(api_url, "/leads/changes", params, timeout=10)
+        if res.get("error") or "cursor" not in res:
+            return {"error": res.get("error") or "malformed /leads/changes response"}
+        events.extend(res.get("events") or [])
+        params = {"limit": 100, "cursor": res["cursor"]}
+        if not res.get("more"):
+            break
+    return {"events": events, "cursor": params["cursor"]}
+
+@st.cache_data(ttl=STATS_TTL, show_spinner=False)
+def api_stats(api_url: str, campaign: str = "", days: int = 30) -> dict:
+    """GET /leads/stats: precomputed counters, cheap whatever the table size."""
+    return get(api_url, "/leads/stats", {"campaign": campaign or ALL, "days": days}, timeout=10)
+
+def local_stats(region: str, campaign: str = "") -> dict:
+    """Same shape as api_stats, counted over the cached scan (no daily series without the counters)."""
+    totals = count_statuses((r["campaign"], r["status"]) for r in lead_rows(region) if r["campaign"])
+    return {"ok": True, "campaign": campaign or ALL, "campaigns": totals,
+            "funnel": funnel(totals.get(campaign or ALL) or {}), "daily": []}
+
+def local_lead_page(region: str, **params) -> dict:
+    """Same shape as api_lead_page, filtered in-process over the cached scan."""
+    rows = lead_rows(region)
+    return {"ok": True, **query(rows, **params), "campaigns": campaigns(rows)}
+
+def invalidate() -> None:
+    lead_rows.clear()
+    get_lead.clear()
+    api_lead_page.clear()
+    api_stats.clear()
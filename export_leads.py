@@ -0,0 +1,32 @@
+# export_leads.py
+"""
+Dump the whole lead base, one row per (lead, campaign), without holding it in memory.
+
+    python export_leads.py --out leads.parquet --segments 8          # LeadsTable (LEADS_TABLE_NAME)
+    python export_leads.py --out leads.csv
+    python export_leads.py --source json --out - --format ndjson     # local JSON store to stdout
+
+Parquet needs pyarrow. Columns: see lead_query.ROW_FIELDS.
+"""
+import argparse, sys, time
+sys.path.append('lambda_functions')
+
+import lead_export
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--source", choices=("dynamo", "json"), default="dynamo")
+    ap.add_argument("--out", required=True, help='output path, or "-" for stdout (csv/ndjson)')
+    ap.add_argument("--format", choices=lead_export.FORMATS, help="default: from the --out suffix")
+    ap.add_argument("--segments", type=int, default=4, help="parallel Scan segments (dynamo)")
+    ap.add_argument("--path", help="JSON store path (json; default LEADS_STORE_PATH or ./_leads_store.json)")
+    args = ap.parse_args()
+
+    lead_export.format_for(args.out, args.format)            # fail before scanning anything
+    rows = lead_export.dynamo_rows(args.segments) if args.source == "dynamo" else lead_export.json_store_rows(args.path)
+    started = time.monotonic()
+    n = lead_export.export(rows, args.out, args.format)
+    print(f"{n} rows in {time.monotonic() - started:.1f}s -> {args.out}", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
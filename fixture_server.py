@@ -0,0 +1,111 @@
+"""
+Local HTTP fixture server for offline tests.
+Each FixtureSite listens on its own 127.0.0.1 port, so several sites give several
+distinct origins (the enrichment pipeline dedups by scheme://host:port). Code
+that dedups by host alone needs a `host` per site: any 127.x.y.z is loopback.
+"""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Tuple, Union
+from urllib.parse import parse_qs, urlparse
+
+Route = Union[str, bytes, Tuple[int, Union[str, bytes]]]
+
+class FixtureSite:
+    """
+    Serve a dict of {path: body} or {path: (status, body)}; unknown paths return 404.
+    `routes` may also be a function of the request path returning a route or None.
+    `delay` (seconds) is slept before every response to simulate network latency.
+    `host` picks the loopback address to listen on (e.g. "127.0.0.2").
+
+        with FixtureSite({"/": "<title>Shop</title>"}) as site:
+            requests.get(site.url)
+    """
+
+    def __init__(self, routes: Union[Dict[str, Route], Callable[[str], Route]], delay: float = 0.0, content_type: str = "text/html; charset=utf-8",
+                 host: str = "127.0.0.1"):
+        self.routes = routes
+        self.host = host
+        self.delay = delay
+        self.content_type = content_type
+        self.hits: Dict[str, int] = {}
+        self._server = None
+        self._thread = None
+
+    def _handler(self):
+        site = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive, like a real origin
+
+            def do_GET(self):
+                site.hits[self.path] = site.hits.get(self.path, 0) + 1
+                if site.delay:
+                    time.sleep(site.delay)
+                route = site.routes(self.path) if callable(site.routes) else site.routes.get(self.path)
+                status, body = (404, b"not found") if route is None else \
+                    route if isinstance(route, tuple) else (200, route)
+                if isinstance(body, str):
+                    body = body.encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", site.content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "FixtureSite":
+        self._server = ThreadingHTTPServer((self.host, 0), self._handler())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def cse_stand_in(results: Dict[str, List[str]], api_key: str = "test-key") -> Callable[[str], Route]:
+    """
+    Routes for a stand-in of the Custom Search JSON API at /customsearch/v1:
+    {query: [link, ...]} answered 10 per page via start/num, 400 past result 100
+    and 403 for any other key, like the real one.
+
+        with FixtureSite(cse_stand_in({"shoes": links}), content_type="application/json") as api:
+            GoogleCSE("test-key", "cx", endpoint=api.url + "/customsearch/v1")
+    """
+    def route(path: str) -> Route:
+        u = urlparse(path)
+        if u.path != "/customsearch/v1":
+            return None
+        args = {k: v[0] for k, v in parse_qs(u.query).items()}
+        if args.get("key") != api_key:
+            return 403, json.dumps({"error": {"code": 403, "message": "API key not valid"}})
+        start, num = int(args.get("start", 1)), int(args.get("num", 10))
+        if start > 91 or num > 10:
+            return 400, json.dumps({"error": {"code": 400, "message": "Invalid value"}})
+        links = results.get(args.get("q", ""), [])
+        items = [{"link": l, "title": l.split("//")[-1]} for l in links[start - 1:start - 1 + num]]
+        return json.dumps({"searchInformation": {"totalResults": str(len(links))}, **({"items": items} if items else {})})
+    return route
@@ -0,0 +1,39 @@
+# import_leads.py
+"""
+Bulk-load a lead list (CSV or NDJSON, optionally gzipped) into LeadsTable (LEADS_TABLE_NAME).
+
+    python import_leads.py purchased.csv.gz --campaign spring-2026
+    python import_leads.py leads.ndjson --campaign spring-2026 --update-existing --batch 1000 --workers 8
+
+Progress is checkpointed to <file>.checkpoint.json after every batch. Rerun the
+same command to resume after an interruption, or pass --restart to start over.
+Needs email and company columns; campaign/status/note/website are optional per row.
+"""
+import argparse, json, os, sys
+sys.path.append('lambda_functions')
+
+import lead_import
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("path")
+    ap.add_argument("--campaign", default="", help="campaign for rows without their own")
+    ap.add_argument("--status", default="NEW", help="status for rows without their own")
+    ap.add_argument("--format", choices=("csv", "ndjson"), help="default: from the file suffix")
+    ap.add_argument("--update-existing", action="store_true", help="add the campaign to leads already stored")
+    ap.add_argument("--batch", type=int, default=lead_import.BATCH)
+    ap.add_argument("--workers", type=int, default=lead_import.WORKERS)
+    ap.add_argument("--checkpoint", help="default: <path>.checkpoint.json")
+    ap.add_argument("--restart", action="store_true", help="ignore and replace an existing checkpoint")
+    args = ap.parse_args()
+
+    checkpoint = args.checkpoint or f"{args.path}.checkpoint.json"
+    if args.restart and os.path.exists(checkpoint):
+        os.remove(checkpoint)
+    res = lead_import.import_file(args.path, campaign_id=args.campaign, status=args.status, fmt=args.format,
+                                  update_existing=args.update_existing, checkpoint=checkpoint,
+                                  batch_size=args.batch, workers=args.workers)
+    print(json.dumps(res, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Invoke any Lambda handler in-process with a sample event and print where the
+time went (profiling.py stages, AWS calls and bytes).
+
+    python invoke_local.py store_lead_data --body '{"email": "a@x.example", "company_name": "Acme", "campaign_id": "demo"}'
+    python invoke_local.py lead_stats --query campaign=demo --query days=7
+    python invoke_local.py workflow_orchestrator --event event.json --dump cprofile
+    python invoke_local.py lead_enrich.sweep_handler --event '{}' --repeat 3
+
+--event is a JSON file or inline JSON used as-is; --body/--query build an API
+Gateway proxy event. Uses the same env as the Lambdas (EMAIL_DRY_RUN defaults
+to on); without LEADS_TABLE_NAME the lead store is whatever your AWS
+credentials reach, so point it at a dev table. --dump writes a cProfile
+(.prof, open with snakeviz or pstats) or pyinstrument (.html) file per run.
+"""
+import argparse, importlib, json, os, sys, time, uuid
+sys.path.append('lambda_functions')
+
+class LocalContext:
+    """The parts of the Lambda context object the handlers use."""
+
+    def __init__(self, name: str, timeout: float):
+        self.function_name = name
+        self.aws_request_id = f"local-{uuid.uuid4().hex[:12]}"
+        self._deadline = time.monotonic() + timeout
+
+    def get_remaining_time_in_millis(self) -> int:
+        return max(0, int((self._deadline - time.monotonic()) * 1000))
+
+def build_event(args) -> dict:
+    if args.event:
+        raw = args.event
+        if os.path.exists(raw):
+            with open(raw, encoding="utf-8") as f:
+                raw = f.read()
+        return json.loads(raw)
+    event = {"httpMethod": "POST" if args.body else "GET"}
+    if args.body:
+        event["body"] = args.body
+    if args.query:
+        event["queryStringParameters"] = dict(q.split("=", 1) for q in args.query)
+    return event
+
+def print_report(report: dict) -> None:
+    print(f"\nwall {report['wallMs']:.0f}ms  cpu {report['cpuMs']:.0f}ms  outside stages {report['otherMs']:.0f}ms")
+    if report["stages"]:
+        print(f"  {'stage':<28} {'n':>5} {'wall':>9} {'cpu':>9}")
+        for op, s in report["stages"].items():
+            print(f"  {op:<28} {s['n']:>5} {s['ms']:>7.0f}ms {s['cpuMs']:>7.0f}ms")
+    if report["aws"]:
+        print(f"  {'aws call':<28} {'n':>5} {'sent':>9} {'received':>9}")
+        for op, c in report["aws"].items():
+            print(f"  {op:<28} {c['calls']:>5} {c['bytesOut']:>8}B {c['bytesIn']:>8}B")
+    if report.get("dump"):
+        print(f"  profile: {report['dump']}")
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("handler", help="module or module.function (default function: lambda_handler)")
+    ap.add_argument("--event", help="event JSON file or inline JSON")
+    ap.add_argument("--body", help="API request body (JSON string)")
+    ap.add_argument("--query", action="append", help="query string key=value; repeatable")
+    ap.add_argument("--dump", choices=["cprofile", "pyinstrument"], help="also write a profile per run")
+    ap.add_argument("--out", default="profiles", help="directory (or s3://bucket/prefix) for --dump files")
+    ap.add_argument("--timeout", type=float, default=25.0, help="simulated Lambda timeout, seconds")
+    ap.add_argument("--repeat", type=int, default=1, help="invoke N times (first run = cold)")
+    args = ap.parse_args()
+
+    os.environ["PROFILE"] = "1"
+    os.environ.setdefault("EMAIL_DRY_RUN", "1")
+    if args.dump:
+        os.environ["PROFILE_DUMP"] = args.dump
+        os.environ["PROFILE_OUTPUT"] = args.out
+
+    module_name, _, fn_name = args.handler.partition(".")
+    t0 = time.perf_counter()
+    handler = getattr(importlib.import_module(module_name), fn_name or "lambda_handler")
+    print(f"import {module_name}: {(time.perf_counter() - t0) * 1000:.0f}ms")
+
+    import profiling
+    event = build_event(args)
+    for i in range(max(1, args.repeat)):
+        try:
+            out = handler(json.loads(json.dumps(event)), LocalContext(module_name, args.timeout))
+        except Exception as e:                         # event handlers re-raise
+            out = {"error": repr(e)}
+        status = out.get("statusCode", "-") if isinstance(out, dict) else "-"
+        body = out.get("body", out) if isinstance(out, dict) else out
+        text = body if isinstance(body, str) else json.dumps(body, default=str)
+        print(f"\n[run {i + 1}] status {status}: {text[:300]}{'...' if len(text) > 300 else ''}")
+        report = profiling.last_report()
+        if report:
+            print_report(report)
+        else:
+            print("  (no profile: handler is not wrapped by runtime.api_handler / event_handler)")
+
+if __name__ == "__main__":
+    main()
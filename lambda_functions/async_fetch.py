@@ -0,0 +1,143 @@
+# lambda_functions/async_fetch.py
+"""
+Asyncio fetch layer shared by both crawlers.
+
+One long-lived event loop runs on a daemon thread and owns one aiohttp
+ClientSession. That gives a single connection pool, keep-alive and DNS cache
+across calls and across warm Lambda invocations. Synchronous callers use
+fetch_all(urls), which multiplexes every request over that loop.
+
+Falls back to a thread pool over a pooled requests.Session when aiohttp isn't
+installed, or when the caller's session has a page_archive adapter mounted.
+Recording and replay live at the requests layer.
+"""
+import asyncio, os, threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+try:
+    import aiohttp
+except Exception:
+    aiohttp = None
+
+from http_client import USER_AGENT, pooled_session
+
+CONCURRENCY = int(os.environ.get("FETCH_CONCURRENCY") or 64)           # open connections overall
+PER_HOST = int(os.environ.get("FETCH_PER_HOST") or 4)                  # politeness cap per store
+TIMEOUT = float(os.environ.get("FETCH_TIMEOUT") or 10.0)               # per request, seconds
+DNS_TTL = int(os.environ.get("FETCH_DNS_TTL") or 300)
+KEEPALIVE = float(os.environ.get("FETCH_KEEPALIVE") or 30.0)
+MAX_BYTES = int(os.environ.get("FETCH_MAX_BYTES") or 2 * 1024 * 1024)
+READ_CHUNK = 64 * 1024
+
+@dataclass
+class FetchResult:
+    url: str
+    status: int = 0              # 0 = network error / timeout
+    content: bytes = b""
+    encoding: str | None = None
+    error: str | None = None
+
+    @property
+    def ok(self) -> bool:
+        return self.status == 200
+
+    @property
+    def text(self) -> str:
+        return self.content.decode(self.encoding or "utf-8", errors="replace")
+
+class AsyncFetcher:
+    """Pooled aiohttp client. Create and use it inside one event loop."""
+
+    def __init__(self, concurrency: int = CONCURRENCY, per_host: int = PER_HOST, timeout: float = TIMEOUT,
+                 dns_ttl: int = DNS_TTL, keepalive: float = KEEPALIVE, max_bytes: int = MAX_BYTES):
+        self.concurrency, self.per_host, self.timeout = concurrency, per_host, timeout
+        self.dns_ttl, self.keepalive, self.max_bytes = dns_ttl, keepalive, max_bytes
+        self._session = None
+
+    async def _client(self):
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self.concurrency, limit_per_host=self.per_host,
+                                             ttl_dns_cache=self.dns_ttl, keepalive_timeout=self.keepalive)
+            self._session = aiohttp.ClientSession(connector=connector, headers={"User-Agent": USER_AGENT})
+        return self._session
+
+    async def fetch(self, url: str, timeout: float | None = None) -> FetchResult:
+        client = await self._client()
+        try:
+            async with client.get(url, timeout=aiohttp.ClientTimeout(total=timeout or self.timeout),
+                                   allow_redirects=True) as resp:
+                return FetchResult(url, resp.status, await self._read(resp), resp.charset)
+        except Exception as e:
+            return FetchResult(url, error=f"{type(e).__name__}: {e}")
+
+    async def _read(self, resp) -> bytes:
+        """The body up to max_bytes. content.read(n) stops at what's buffered, so read chunks until EOF or the cap."""
+        chunks, size = [], 0
+        async for chunk in resp.content.iter_chunked(READ_CHUNK):
+            chunks.append(chunk[:self.max_bytes - size])
+            size += len(chunks[-1])
+            if size >= self.max_bytes:
+                break
+        return b"".join(chunks)
+
+    async def fetch_many(self, urls, timeout: float | None = None) -> dict[str, FetchResult]:
+        urls = list(dict.fromkeys(u for u in urls if u))
+        results = await asyncio.gather(*(self.fetch(u, timeout) for u in urls))
+        return dict(zip(urls, results))
+
+    async def close(self) -> None:
+        if self._session is not None:
+            await self._session.close()
+
+class _LoopThread:
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, name="async-fetch", daemon=True)
+        self.thread.start()
+        self.fetcher = AsyncFetcher()
+
+    def run(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result()
+
+_LOOP: _LoopThread | None = None
+_LOOP_LOCK = threading.Lock()
+
+def _loop() -> _LoopThread:
+    global _LOOP
+    with _LOOP_LOCK:
+        if _LOOP is None:
+            _LOOP = _LoopThread()
+        return _LOOP
+
+def _uses_archive(session) -> bool:
+    return session is not None and getattr(session.get_adapter("https://"), "archive", None) is not None
+
+def _fetch_threaded(urls, timeout: float, session) -> dict[str, FetchResult]:
+    session = session or pooled_session(CONCURRENCY)
+
+    def one(url):
+        try:
+            r = session.get(url, timeout=timeout)
+            return FetchResult(url, r.status_code, r.content, r.encoding)
+        except Exception as e:
+            return FetchResult(url, error=f"{type(e).__name__}: {e}")
+
+    urls = list(dict.fromkeys(u for u in urls if u))
+    if not urls:
+        return {}
+    with ThreadPoolExecutor(max_workers=min(CONCURRENCY, len(urls))) as pool:
+        return dict(zip(urls, pool.map(one, urls)))
+
+def fetch_all(urls, timeout: float | None = None, session=None) -> dict[str, FetchResult]:
+    """
+    Fetch many URLs concurrently; returns {url: FetchResult} (failures have status 0).
+    `session` is the caller's requests.Session, used only on the threaded fallback path.
+    """
+    urls = list(urls)
+    if not urls:
+        return {}
+    if aiohttp is None or _uses_archive(session):
+        return _fetch_threaded(urls, timeout or TIMEOUT, session)
+    lt = _loop()
+    return lt.run(lt.fetcher.fetch_many(urls, timeout))
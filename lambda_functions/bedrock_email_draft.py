@@ -1,62 +1,75 @@
 # lambda_functions/bedrock_email_draft.py
 import os, json
-import boto3
 
-def _resp(code=200, body=None):
-    return {
-        "statusCode": code,
-        "headers": {"Content-Type": "application/json", "Access-Control-Allow-Origin": "*"},
-        "body": json.dumps(body if body is not None else {"ok": True})
-    }
+from clients import client
+from log import span
+from runtime import Field, Schema, api_handler, body, loads, resp
 
-def lambda_handler(event, context):
-    try:
-        body = json.loads(event.get("body", "{}"))
-        company = body.get("companyName", "the company")
-        desc = body.get("description", "")
-        website = body.get("website", "")
-        recipient_email = body.get("recipientEmail", "")
-        sender_name = body.get("senderName", "Raghav")
-        sender_company = body.get("senderCompany", "AI Sales Solutions")
-        sender_email = body.get("senderEmail", "raghav.dewangan2004@gmail.com")
-
-        # Extract recipient name from email (first part before @)
-        recipient_name = recipient_email.split("@")[0].replace(".", " ").title() if recipient_email else "there"
-
-        bedrock = boto3.client("bedrock-runtime", region_name=os.environ.get("BEDROCK_REGION", "us-east-1"))
-        model_id = os.environ.get("BEDROCK_MODEL_ID", "amazon.nova-pro-v1:0")
-
-        # Enhanced prompt with real names and details
-        prompt = (
-            f"Write a personalized B2B sales email from {sender_name} at {sender_company} to {recipient_name} at {company}. "
-            f"Company website: {website}. Company info: {desc}. "
-            f"Requirements: "
-            f"1. Address {recipient_name} by name (not 'Hi there' or placeholders) "
-            f"2. Reference something specific about {company} or their website "
-            f"3. Sign with {sender_name}'s real details "
-            f"4. Include a clear, specific call-to-action "
-            f"5. Keep it under 150 words "
-            f"6. Professional but friendly tone "
-            f"7. No placeholder text like [Your Name] or [Recipient Name] "
-            f"Sender details: {sender_name}, {sender_company}, {sender_email}"
-        )
+SCHEMA = Schema(
+    Field("companyName", default="the company"),
+    Field("description", default=""),
+    Field("website", default=""),
+    Field("recipientEmail", default=""),
+    Field("senderName", default="Raghav"),
+    Field("senderCompany", default="AI Sales Solutions"),
+    Field("senderEmail", default="raghav.dewangan2004@gmail.com"),
+)
+
+def _bedrock():
+    return client("bedrock-runtime", os.environ.get("BEDROCK_REGION", "us-east-1"))
+
+def draft_email(company: str = "the company", desc: str = "", website: str = "", recipient_email: str = "",
+                sender_name: str = "Raghav", sender_company: str = "AI Sales Solutions",
+                sender_email: str = "raghav.dewangan2004@gmail.com") -> tuple[str, str]:
+    """Generate one outreach email with Bedrock. Returns (model_id, draft text)."""
+    # Extract recipient name from email (first part before @)
+    recipient_name = recipient_email.split("@")[0].replace(".", " ").title() if recipient_email else "there"
 
-        payload = {
-            "messages": [
-                {"role": "user", "content": [{"text": prompt}]}
-            ],
-            "inferenceConfig": {"maxTokens": 500, "temperature": 0.5, "topP": 0.9}
-        }
+    model_id = os.environ.get("BEDROCK_MODEL_ID", "amazon.nova-pro-v1:0")
 
-        resp = bedrock.invoke_model(
+    # Enhanced prompt with real names and details
+    prompt = (
+        f"Write a personalized B2B sales email from {sender_name} at {sender_company} to {recipient_name} at {company}. "
+        f"Company website: {website}. Company info: {desc}. "
+        f"Requirements: "
+        f"1. Address {recipient_name} by name (not 'Hi there' or placeholders) "
+        f"2. Reference something specific about {company} or their website "
+        f"3. Sign with {sender_name}'s real details "
+        f"4. Include a clear, specific call-to-action "
+        f"5. Keep it under 150 words "
+        f"6. Professional but friendly tone "
+        f"7. No placeholder text like [Your Name] or [Recipient Name] "
+        f"Sender details: {sender_name}, {sender_company}, {sender_email}"
+    )
+
+    payload = {
+        "messages": [
+            {"role": "user", "content": [{"text": prompt}]}
+        ],
+        "inferenceConfig": {"maxTokens": 500, "temperature": 0.5, "topP": 0.9}
+    }
+
+    with span("bedrock.invoke", model=model_id):
+        res = _bedrock().invoke_model(
             modelId=model_id,
             body=json.dumps(payload),
             contentType="application/json",
             accept="application/json"
         )
-        data = json.loads(resp["body"].read())
-        draft = data.get("output", {}).get("message", {}).get("content", [{}])[0].get("text", "")
+        data = loads(res["body"].read())
+    draft = data.get("output", {}).get("message", {}).get("content", [{}])[0].get("text", "")
+    return model_id, draft
 
-        return _resp(200, {"ok": True, "model": model_id, "draft": draft})
-    except Exception as e:
-        return _resp(500, {"error": str(e)})
+@api_handler("bedrock_email_draft")
+def lambda_handler(event, context):
+    req = SCHEMA.validate(body(event))
+    model_id, draft = draft_email(
+        company=req["companyName"],
+        desc=req["description"],
+        website=req["website"],
+        recipient_email=req["recipientEmail"],
+        sender_name=req["senderName"],
+        sender_company=req["senderCompany"],
+        sender_email=req["senderEmail"],
+    )
+    return resp(200, {"ok": True, "model": model_id, "draft": draft})
@@ -0,0 +1,177 @@
+# lambda_functions/campaign_stats.py
+"""
+Precomputed lead counts per campaign and per day, so the dashboard never scans
+LeadsTable to draw a funnel.
+
+lead_stream_consumer feeds every LeadsTable change through status_deltas();
+the deltas of a whole stream batch are summed in memory (accumulate) and
+written with one atomic ADD per touched counter item (apply).
+
+Layout in LeadIndexTable:
+  pk "STATS#TOTALS",       sk "<campaign>"   -> current leads per status ({"WARM": 3, ...})
+  pk "STATS#DAY#<campaign>", sk "<YYYY-MM-DD>" -> leads that entered each status that UTC day
+Campaign "*" aggregates all campaigns. Reads are one Query each, whatever the
+number of leads.
+
+Stream delivery is at-least-once, so a replayed batch can count twice.
+rebuild() recomputes the totals from a full scan (also the initial backfill
+for leads written before the stream existed); daily history is not rebuilt.
+"""
+import collections, threading, time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from constants import STATUSES
+from lead_index import table
+
+ALL = "*"
+DAILY_RETENTION_DAYS = 400
+MAX_DAYS = 90
+
+# (pk, sk) -> item; stands in for the table locally
+_MEM: Dict[Tuple[str, str], Dict[str, Any]] = {}
+_MEM_LOCK = threading.Lock()
+
+def _day(ts_ms: int) -> str:
+    return datetime.fromtimestamp(ts_ms / 1000, tz=timezone.utc).strftime("%Y-%m-%d")
+
+def status_deltas(old: Optional[Dict[str, Any]], new: Optional[Dict[str, Any]]) -> List[Tuple[str, Optional[str], Optional[str]]]:
+    """(campaign, previous status, new status) for each campaign whose status changed (pure).
+    None on either side means the campaign (or the whole lead) was added / removed."""
+    old_c = (old or {}).get("campaigns") or {}
+    new_c = (new or {}).get("campaigns") or {}
+    out = []
+    for cid in sorted(set(old_c) | set(new_c)):
+        prev = (old_c.get(cid) or {}).get("status") or None
+        cur = (new_c.get(cid) or {}).get("status") or None
+        if prev != cur:
+            out.append((cid, prev, cur))
+    return out
+
+def accumulate(deltas: Iterable[Tuple[str, Optional[str], Optional[str]]], ts_ms: int,
+               into: Optional[Dict[Tuple[str, str], collections.Counter]] = None) -> Dict[Tuple[str, str], collections.Counter]:
+    """Add deltas to `into` ({(pk, sk): Counter}) so a batch of changes becomes one write per counter."""
+    into = {} if into is None else into
+    day = _day(ts_ms)
+    for cid, prev, cur in deltas:
+        for c in (cid, ALL):
+            totals = into.setdefault(("STATS#TOTALS", c), collections.Counter())
+            if prev:
+                totals[prev] -= 1
+            if cur:
+                totals[cur] += 1
+                into.setdefault((f"STATS#DAY#{c}", day), collections.Counter())[cur] += 1
+    return into
+
+def apply(counters: Dict[Tuple[str, str], collections.Counter]) -> int:
+    """Write accumulated counters: one UpdateItem (atomic ADD) per item. Returns the number of items touched."""
+    tbl = table()
+    now = int(time.time())
+    written = 0
+    for (pk, sk), counts in counters.items():
+        counts = {s: n for s, n in counts.items() if n}
+        if not counts:
+            continue
+        written += 1
+        if tbl is None:
+            with _MEM_LOCK:
+                item = _MEM.setdefault((pk, sk), {})
+                for s, n in counts.items():
+                    item[s] = item.get(s, 0) + n
+                item["updatedAt"] = now
+            continue
+        names = {f"#s{i}": s for i, s in enumerate(counts)}
+        values = {f":n{i}": n for i, n in enumerate(counts.values())}
+        sets = "updatedAt = :now"
+        values[":now"] = now
+        if pk.startswith("STATS#DAY#"):
+            sets += ", expiresAt = if_not_exists(expiresAt, :exp)"
+            values[":exp"] = int(datetime.strptime(sk, "%Y-%m-%d").replace(tzinfo=timezone.utc).timestamp()
+                                 + DAILY_RETENTION_DAYS * 86400)
+        tbl.update_item(
+            Key={"pk": pk, "sk": sk},
+            UpdateExpression="ADD " + ", ".join(f"{k} :n{i}" for i, k in enumerate(names)) + " SET " + sets,
+            ExpressionAttributeNames=names,
+            ExpressionAttributeValues=values,
+        )
+    return written
+
+def count_statuses(pairs: Iterable[Tuple[str, Optional[str]]]) -> Dict[str, Dict[str, int]]:
+    """{campaign: {status: n}} (plus ALL) from (campaign, status) pairs, e.g. a scan (pure)."""
+    out: Dict[str, collections.Counter] = {}
+    for cid, status in pairs:
+        if cid and status:
+            out.setdefault(cid, collections.Counter())[status] += 1
+            out.setdefault(ALL, collections.Counter())[status] += 1
+    return {cid: dict(c) for cid, c in out.items()}
+
+def _counts(item: Dict[str, Any]) -> Dict[str, int]:
+    return {k: int(v) for k, v in item.items() if k in STATUSES and int(v)}
+
+def _query(tbl, **kwargs) -> List[Dict[str, Any]]:
+    items = []
+    while True:
+        res = tbl.query(**kwargs)
+        items.extend(res.get("Items", []))
+        if "LastEvaluatedKey" not in res:
+            return items
+        kwargs["ExclusiveStartKey"] = res["LastEvaluatedKey"]
+
+def totals() -> Dict[str, Dict[str, int]]:
+    """Current {campaign: {status: n}} for every campaign (and ALL) in one Query."""
+    tbl = table()
+    if tbl is None:
+        with _MEM_LOCK:
+            return {sk: _counts(item) for (pk, sk), item in sorted(_MEM.items()) if pk == "STATS#TOTALS"}
+    items = _query(tbl, KeyConditionExpression="pk = :p", ExpressionAttributeValues={":p": "STATS#TOTALS"})
+    return {i["sk"]: _counts(i) for i in items}
+
+def daily(campaign: str = ALL, days: int = 30, now_ms: Optional[int] = None) -> List[Dict[str, Any]]:
+    """[{"day": "YYYY-MM-DD", <status>: n, ...}] for the last `days` days that had changes, oldest first."""
+    now_ms = int(now_ms if now_ms is not None else time.time() * 1000)
+    days = max(1, min(MAX_DAYS, int(days)))
+    start = (datetime.fromtimestamp(now_ms / 1000, tz=timezone.utc) - timedelta(days=days - 1)).strftime("%Y-%m-%d")
+    pk = f"STATS#DAY#{campaign or ALL}"
+    tbl = table()
+    if tbl is None:
+        with _MEM_LOCK:
+            items = [{"sk": sk, **item} for (p, sk), item in sorted(_MEM.items()) if p == pk and sk >= start]
+    else:
+        items = _query(tbl, KeyConditionExpression="pk = :p AND sk >= :d",
+                       ExpressionAttributeValues={":p": pk, ":d": start})
+    return [{"day": i["sk"], **_counts(i)} for i in items]
+
+def funnel(counts: Dict[str, int]) -> List[Dict[str, Any]]:
+    """Funnel stages from one campaign's status counts (pure)."""
+    total = sum(counts.values())
+    contacted = total - counts.get("NEW", 0)
+    replied = sum(counts.get(s, 0) for s in ("NEUTRAL", "WARM", "COLD", "UNSUBSCRIBE"))
+    return [
+        {"stage": "Leads", "count": total},
+        {"stage": "Contacted", "count": contacted},
+        {"stage": "Delivered", "count": contacted - counts.get("BOUNCED", 0)},
+        {"stage": "Replied", "count": replied},
+        {"stage": "Warm", "count": counts.get("WARM", 0)},
+    ]
+
+def rebuild(leads: Iterable[Dict[str, Any]]) -> Dict[str, Dict[str, int]]:
+    """Overwrite the totals with counts from `leads` (e.g. scan_leads()); campaigns no longer present are zeroed."""
+    fresh = count_statuses((cid, (c or {}).get("status"))
+                           for lead in leads for cid, c in ((lead or {}).get("campaigns") or {}).items())
+    tbl = table()
+    now = int(time.time())
+    if tbl is None:
+        with _MEM_LOCK:
+            for key in [k for k in _MEM if k[0] == "STATS#TOTALS"]:
+                del _MEM[key]
+            for cid, counts in fresh.items():
+                _MEM[("STATS#TOTALS", cid)] = {**counts, "updatedAt": now}
+        return fresh
+    stale = {i["sk"] for i in _query(tbl, KeyConditionExpression="pk = :p", ProjectionExpression="sk",
+                                     ExpressionAttributeValues={":p": "STATS#TOTALS"})} - set(fresh)
+    with tbl.batch_writer(overwrite_by_pkeys=["pk", "sk"]) as batch:
+        for cid in stale:
+            batch.delete_item(Key={"pk": "STATS#TOTALS", "sk": cid})
+        for cid, counts in fresh.items():
+            batch.put_item(Item={"pk": "STATS#TOTALS", "sk": cid, **counts, "updatedAt": now})
+    return fresh
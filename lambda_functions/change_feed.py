@@ -0,0 +1,141 @@
+# lambda_functions/change_feed.py
+"""
+Incremental feed of lead status changes.
+
+LeadsTable streams (NEW_AND_OLD_IMAGES) into lead_stream_consumer, which diffs
+each lead's campaigns and appends one event per status change or new reply
+here. Readers poll changes_since(cursor). Nothing changed means one empty
+Query against today's partition.
+
+Layout in LeadIndexTable: pk "CHANGES#<YYYY-MM-DD>" (UTC day of the change),
+sk "<epoch ms, 13 digits>#<stream sequence>". The cursor is the last sk read, so it
+sorts in time order and names its own day partition. Events expire after
+RETENTION_DAYS. Without the table, a bounded in-process buffer stands in.
+"""
+import collections, os, threading, time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional
+
+from lead_index import expires_at, table
+
+RETENTION_DAYS = int(os.environ.get("CHANGE_FEED_RETENTION_DAYS") or 7)
+MAX_LIMIT = 500
+REPLY_PREVIEW = 280
+
+_MEM: "collections.OrderedDict[str, Dict[str, Any]]" = collections.OrderedDict()   # sk -> event
+_MEM_MAX = 10000
+_MEM_LOCK = threading.Lock()
+_SEQ = 0
+
+def _day(ts_ms: int) -> str:
+    return datetime.fromtimestamp(ts_ms / 1000, tz=timezone.utc).strftime("%Y-%m-%d")
+
+def _sort_key(ts_ms: int, seq: str) -> str:
+    return f"{ts_ms:013d}#{seq}"
+
+def _event_key(ts_ms: int, seq, i: int) -> str:
+    # stream sequence numbers are decimal strings of varying length; pad so they sort numerically
+    return _sort_key(ts_ms, f"{seq:0>24}.{i:03d}")
+
+def diff_lead(old: Optional[Dict[str, Any]], new: Optional[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Events for campaigns whose status changed or that got a new reply (pure)."""
+    old_c = (old or {}).get("campaigns") or {}
+    new_c = (new or {}).get("campaigns") or {}
+    email = (new or old or {}).get("email") or ""
+    events = []
+    for cid, c in new_c.items():
+        prev = old_c.get(cid) or {}
+        status, prev_status = c.get("status"), prev.get("status")
+        reply = c.get("lastReply") or ""
+        if status == prev_status and (not reply or reply == (prev.get("lastReply") or "")):
+            continue
+        events.append({
+            "email": email,
+            "company": (new or {}).get("company") or "",
+            "campaignId": cid,
+            "status": status,
+            "prevStatus": prev_status,
+            "lastReply": reply[:REPLY_PREVIEW] if reply != (prev.get("lastReply") or "") else "",
+        })
+    return events
+
+def record_changes(events: Iterable[Dict[str, Any]], ts_ms: Optional[int] = None, seq: Optional[str] = None) -> int:
+    """
+    Append events. `seq` (e.g. the stream record's SequenceNumber) makes the sort key
+    unique and replay-safe: a retried stream batch overwrites, it doesn't duplicate.
+    """
+    global _SEQ
+    ts_ms = int(ts_ms if ts_ms is not None else time.time() * 1000)
+    events = list(events)
+    if not events:
+        return 0
+    tbl = table()
+    if tbl is None:
+        with _MEM_LOCK:
+            for i, e in enumerate(events):
+                _SEQ += 1
+                sk = _event_key(ts_ms, seq or _SEQ, i)
+                _MEM[sk] = {**e, "ts": ts_ms // 1000, "id": sk}
+            while len(_MEM) > _MEM_MAX:
+                _MEM.popitem(last=False)
+        return len(events)
+    with tbl.batch_writer(overwrite_by_pkeys=["pk", "sk"]) as batch:
+        for i, e in enumerate(events):
+            sk = _event_key(ts_ms, seq or time.time_ns(), i)
+            batch.put_item(Item={"pk": f"CHANGES#{_day(ts_ms)}", "sk": sk, "expiresAt": expires_at(RETENTION_DAYS),
+                                 **e, "ts": ts_ms // 1000, "id": sk})
+    return len(events)
+
+def latest_cursor(now_ms: Optional[int] = None, lookback_seconds: int = 0) -> str:
+    """A cursor positioned `lookback_seconds` before now (0 = only future changes)."""
+    now_ms = int(now_ms if now_ms is not None else time.time() * 1000)
+    return _sort_key(now_ms - lookback_seconds * 1000, "")
+
+def changes_since(cursor: Optional[str] = None, limit: int = 100,
+                  now_ms: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Events strictly after `cursor`, oldest first, at most `limit`.
+    Returns {"events", "cursor", "more"}; pass the returned cursor back next time.
+    With no cursor the feed starts at "now" (nothing old is replayed).
+    """
+    now_ms = int(now_ms if now_ms is not None else time.time() * 1000)
+    cursor = cursor or latest_cursor(now_ms)
+    limit = max(1, min(MAX_LIMIT, int(limit)))
+    events: List[Dict[str, Any]] = []
+
+    tbl = table()
+    if tbl is None:
+        with _MEM_LOCK:
+            newer = [e for sk, e in sorted(_MEM.items()) if sk > cursor]
+        events = newer[:limit]
+        more = len(newer) > limit
+    else:
+        try:
+            day = datetime.strptime(_day(int(cursor.split("#", 1)[0])), "%Y-%m-%d").replace(tzinfo=timezone.utc)
+        except ValueError:
+            raise ValueError("invalid cursor")
+        oldest = datetime.fromtimestamp(now_ms / 1000, tz=timezone.utc) - timedelta(days=RETENTION_DAYS)
+        day = max(day, oldest.replace(hour=0, minute=0, second=0, microsecond=0))
+        today = _day(now_ms)
+        more = False
+        while True:
+            kwargs = {"KeyConditionExpression": "pk = :p AND sk > :c",
+                      "ExpressionAttributeValues": {":p": f"CHANGES#{day:%Y-%m-%d}", ":c": cursor},
+                      "Limit": limit - len(events) + 1}
+            while True:
+                res = tbl.query(**kwargs)
+                events.extend(_strip(i) for i in res.get("Items", []))
+                if len(events) > limit or "LastEvaluatedKey" not in res:
+                    break
+                kwargs["ExclusiveStartKey"] = res["LastEvaluatedKey"]
+            if len(events) > limit:
+                events, more = events[:limit], True
+                break
+            if f"{day:%Y-%m-%d}" >= today:
+                break
+            day += timedelta(days=1)
+
+    return {"events": events, "cursor": events[-1]["id"] if events else cursor, "more": more}
+
+def _strip(item: Dict[str, Any]) -> Dict[str, Any]:
+    return {k: v for k, v in item.items() if k not in ("pk", "sk", "expiresAt")}
@@ -0,0 +1,78 @@
+# lambda_functions/clients.py
+"""
+Process-wide AWS clients, created on first use.
+
+boto3 is only imported when a handler first needs AWS, and each client or
+table is built once per container and reused by later invocations. Handlers
+that never touch a service (validation errors, dry runs, in-memory stand-ins)
+skip that init cost entirely. The worker pools share the same instances.
+
+    from clients import client, table
+    client("ses").send_email(...)
+    table("LeadsTable").query(...)
+
+bench_cold_start.py (repo root) measures import + first-client time per handler.
+"""
+import importlib.util, os, threading
+
+POOL_SIZE = int(os.environ.get("AWS_POOL_SIZE") or 32)     # >= the widest worker pool using one client
+
+_CLIENTS: dict = {}
+_TABLES: dict = {}
+_HOOKS: list = []
+_lock = threading.Lock()
+
+def available() -> bool:
+    """True when boto3 is importable (checked without importing it)."""
+    return importlib.util.find_spec("boto3") is not None
+
+def region(default: str = "us-east-1") -> str:
+    return os.environ.get("AWS_REGION") or os.environ.get("AWS_DEFAULT_REGION") or default
+
+def _config():
+    from botocore.config import Config
+    return Config(retries={"mode": "standard", "max_attempts": 3}, tcp_keepalive=True,
+                  max_pool_connections=POOL_SIZE)
+
+def client(service: str, region_name: str | None = None):
+    """Cached low-level boto3 client for `service` (one per service and region)."""
+    key = (service, region_name)
+    c = _CLIENTS.get(key)
+    if c is None:
+        with _lock:
+            c = _CLIENTS.get(key)
+            if c is None:
+                import boto3
+                c = boto3.client(service, region_name=region_name or region(), config=_config())
+                for fn in _HOOKS:
+                    fn(c)
+                _CLIENTS[key] = c
+    return c
+
+def table(name: str):
+    """Cached DynamoDB resource Table (for callers that want batch_writer and friends)."""
+    t = _TABLES.get(name)
+    if t is None:
+        with _lock:
+            t = _TABLES.get(name)
+            if t is None:
+                import boto3
+                t = boto3.resource("dynamodb", region_name=region(), config=_config()).Table(name)
+                for fn in _HOOKS:
+                    fn(t.meta.client)
+                _TABLES[name] = t
+    return t
+
+def on_create(fn) -> None:
+    """Call fn(client) for every client built from now on, and for those already cached (profiling hooks)."""
+    with _lock:
+        _HOOKS.append(fn)
+        existing = list(_CLIENTS.values()) + [t.meta.client for t in _TABLES.values()]
+    for c in existing:
+        fn(c)
+
+def reset() -> None:
+    """Forget every cached client (tests)."""
+    with _lock:
+        _CLIENTS.clear()
+        _TABLES.clear()
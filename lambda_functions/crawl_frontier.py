@@ -0,0 +1,133 @@
+# lambda_functions/crawl_frontier.py
+"""
+What the crawlers already know about each store domain, kept across runs.
+
+Each crawl records the domain's outcome ("ok" with the extracted result, or
+"failed" when nothing usable came back) and the email it found. Stored leads are recorded as "lead", and
+lead_stream_consumer does this for every new lead. Before fetching, a crawler
+calls plan(), which splits its candidates into three groups:
+
+    fetch, served, skipped = plan(urls, source="search")
+
+  served   ok within FRONTIER_FRESH_DAYS, crawled by the same source: the stored result is reused
+  skipped  already a lead, or failed within FRONTIER_RETRY_HOURS
+  fetch    everything else
+
+So a repeated search costs one BatchGetItem per 100 candidates plus the fetches
+for domains nobody has seen. The email index lets a crawl drop a store whose
+address already belongs to another domain, e.g. a custom domain and its
+*.myshopify.com twin.
+
+Layout in LeadIndexTable (expiresAt FRONTIER_TTL_DAYS after the last write):
+  pk "CRAWL#<domain>",  sk "domain" -> {outcome, email, source, crawledAt, result}
+  pk "CRAWL#@<email>",  sk "email"  -> {domain}
+Locally two dicts stand in.
+"""
+import os, time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urlparse
+
+from lead_index import batch_get, expires_at, table
+from log import span
+
+FRESH_DAYS = float(os.environ.get("FRONTIER_FRESH_DAYS") or 14)
+RETRY_HOURS = float(os.environ.get("FRONTIER_RETRY_HOURS") or 24)
+TTL_DAYS = float(os.environ.get("FRONTIER_TTL_DAYS") or 90)
+
+_MEM: Dict[str, Dict[str, Any]] = {}         # domain -> entry, stands in for the table locally
+_EMAILS: Dict[str, str] = {}                 # email -> domain
+
+def domain_of(url: str) -> str:
+    """Host of `url` (or a bare host), lowercased and without "www."."""
+    url = (url or "").strip().lower()
+    host = urlparse(url if "//" in url else f"//{url}").netloc.split("@")[-1].split(":")[0]
+    return host[4:] if host.startswith("www.") else host
+
+@span("frontier.lookup")
+def lookup(domains: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+    """Stored entries for `domains`; unknown domains are absent."""
+    domains = list(dict.fromkeys(d for d in domains if d))
+    tbl = table()
+    if tbl is None:
+        return {d: dict(_MEM[d]) for d in domains if d in _MEM}
+    items = batch_get(tbl, [{"pk": f"CRAWL#{d}", "sk": "domain"} for d in domains])
+    return {i["pk"][len("CRAWL#"):]: i for i in items}
+
+def email_owners(emails: Iterable[str]) -> Dict[str, str]:
+    """{email: domain it was first found on} for the emails already seen."""
+    emails = list(dict.fromkeys((e or "").strip().lower() for e in emails if e))
+    tbl = table()
+    if tbl is None:
+        return {e: _EMAILS[e] for e in emails if e in _EMAILS}
+    items = batch_get(tbl, [{"pk": f"CRAWL#@{e}", "sk": "email"} for e in emails])
+    return {i["pk"][len("CRAWL#@"):]: i["domain"] for i in items}
+
+def plan(urls: List[str], source: str, now: Optional[float] = None) -> Tuple[List[str], List[Dict[str, Any]], List[str]]:
+    """Split candidate URLs into (to fetch, stored results to serve, skipped); order kept."""
+    now = now or time.time()
+    known = lookup(domain_of(u) for u in urls)
+    fetch, served, skipped = [], [], []
+    for url in urls:
+        e = known.get(domain_of(url))
+        age = now - int((e or {}).get("crawledAt") or 0)
+        if e is None:
+            fetch.append(url)
+        elif e.get("outcome") == "lead" or (e.get("outcome") == "failed" and age < RETRY_HOURS * 3600):
+            skipped.append(url)
+        elif e.get("outcome") == "ok" and e.get("source") == source and e.get("result") and age < FRESH_DAYS * 86400:
+            served.append(e["result"])
+        else:
+            fetch.append(url)
+    return fetch, served, skipped
+
+def record(source: str, results: Dict[str, Optional[Dict[str, Any]]], email_key: str = "email",
+           now: Optional[float] = None) -> int:
+    """
+    Record a crawl: `results` maps each fetched URL to its extracted result, or
+    None when the fetch or parse failed. Found emails are claimed for their
+    domain unless another domain holds them already.
+    """
+    now = int(now or time.time())
+    entries, emails = {}, {}
+    for url, result in results.items():
+        domain = domain_of(url)
+        if not domain:
+            continue
+        email = ((result or {}).get(email_key) or "").strip().lower()
+        entries[domain] = {"outcome": "ok" if result else "failed", "email": email, "source": source,
+                           "crawledAt": now, "result": result}
+        if email:
+            emails.setdefault(email, domain)
+    _write(entries, emails)
+    return len(entries)
+
+def from_lead(lead: Optional[Dict[str, Any]]) -> None:
+    """Mark a stored lead's store domain (website, else email domain) and email as known."""
+    email = ((lead or {}).get("email") or "").strip().lower()
+    if not email:
+        return
+    website = ((lead.get("profile") or {}).get("website") or lead.get("website") or "")
+    domain = domain_of(website) or domain_of(email.rpartition("@")[2])
+    _write({domain: {"outcome": "lead", "email": email, "source": "lead", "crawledAt": int(time.time())}},
+           {email: domain})
+
+def _write(entries: Dict[str, Dict[str, Any]], emails: Dict[str, str]) -> None:
+    tbl = table()
+    if tbl is None:
+        _MEM.update(entries)
+        for email, domain in emails.items():
+            _EMAILS.setdefault(email, domain)
+        return
+    owners = email_owners(emails)
+    ttl = expires_at(TTL_DAYS)
+    with tbl.batch_writer(overwrite_by_pkeys=["pk", "sk"]) as batch:
+        for domain, e in entries.items():
+            batch.put_item(Item={"pk": f"CRAWL#{domain}", "sk": "domain", **e, "expiresAt": ttl})
+        for email, domain in emails.items():
+            if owners.get(email, domain) == domain:
+                batch.put_item(Item={"pk": f"CRAWL#@{email}", "sk": "email", "domain": domain, "expiresAt": ttl})
+
+def reset() -> None:
+    """Forget the local stand-in (tests)."""
+    _MEM.clear()
+    _EMAILS.clear()
@@ -0,0 +1,275 @@
+# lambda_functions/crawl_jobs.py
+"""
+Distributed crawls for searches too big for one invocation.
+
+The coordinator (POST /search with "distributed": true) runs the searches,
+merges their candidates and puts the domains the crawl frontier says to fetch
+on a work queue, in chunks of CRAWL_CHUNK URLs. CrawlWorker invocations, fed
+by SQS, each extract one chunk with extract_stores (one concurrent fetch round
+per chunk) and add the stores to the job record. GET /search/jobs/{jobId}
+polls that record. Crawl size scales with how many workers SQS runs at once,
+not with the search function's timeout.
+
+Job record in LeadIndexTable, one partition per job:
+  pk "CRAWLJOB#<id>", sk "JOB"            -> {status, queries, perQuery, total, chunks, done, found, failed,
+                                              doneChunks, deadChunks, createdAt, updatedAt}
+  pk "CRAWLJOB#<id>", sk "STORE#<domain>" -> {store}
+Queue messages: {"jobId", "chunk", "urls": [...]} on CRAWL_QUEUE_URL.
+
+Each chunk is counted once: its id goes into the doneChunks string set in the
+same conditional update that adds its counts, so SQS redelivering a chunk
+that was already recorded changes nothing. A chunk that keeps failing ends
+up on the dead-letter queue. record_dead_chunk then puts it in deadChunks.
+When every chunk is done or dead, the job is SUCCEEDED. It is PARTIAL if
+some chunks died, and FAILED if all of them did.
+
+Without a queue URL, messages go to an in-process queue and job records to a
+dict. run_local() drains that queue with a pool of worker processes, which is
+how local_crawl.py and the tests run a distributed crawl. Locally there are
+no retries: a chunk that fails is dead at once.
+"""
+import json, os, queue, threading, time, uuid
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional
+
+import clients
+import crawl_frontier
+from lead_index import expires_at, table
+from log import jlog
+
+CHUNK = int(os.environ.get("CRAWL_CHUNK") or 10)
+MAX_RESULTS = 100                     # candidates per query (the CSE ceiling)
+JOB_TTL_DAYS = 7
+SQS_BATCH = 10                        # SendMessageBatch limit
+
+_JOBS: Dict[str, Dict[str, Any]] = {}  # stands in for the table locally
+_QUEUE: "queue.Queue[Dict[str, Any]]" = queue.Queue()
+_lock = threading.Lock()
+
+def _pk(job_id: str) -> str:
+    return f"CRAWLJOB#{job_id}"
+
+# ---------- Coordinator ----------
+
+def start_job(queries: List[str], limit: int, new_only: bool = False) -> Dict[str, Any]:
+    """Search, record the job with the stores the frontier already holds, and enqueue the rest."""
+    from search_shopify_retailers import search_candidates
+    limit = max(1, min(limit, MAX_RESULTS))
+    urls, per_query = search_candidates(queries, limit)
+    fetch, served, skipped = crawl_frontier.plan(list(urls.values()), source="search")
+    known = {} if new_only else {crawl_frontier.domain_of(s["website"]): s for s in served}
+
+    job_id = uuid.uuid4().hex
+    now = int(time.time())
+    chunks = [fetch[i:i + CHUNK] for i in range(0, len(fetch), CHUNK)]
+    job = {"jobId": job_id, "status": "RUNNING" if fetch else "SUCCEEDED", "queries": queries, "limit": limit,
+           "perQuery": per_query, "total": len(fetch), "chunks": len(chunks), "done": 0, "found": 0, "failed": 0,
+           "served": len(known), "skipped": len(skipped), "createdAt": now, "updatedAt": now}
+    tbl = table()
+    if tbl is None:
+        with _lock:
+            _JOBS[job_id] = {**job, "stores": dict(known), "doneChunks": set(), "deadChunks": set()}
+    else:
+        with tbl.batch_writer(overwrite_by_pkeys=["pk", "sk"]) as batch:
+            batch.put_item(Item={"pk": _pk(job_id), "sk": "JOB", "expiresAt": expires_at(JOB_TTL_DAYS), **job})
+            for domain, store in known.items():
+                batch.put_item(Item={"pk": _pk(job_id), "sk": f"STORE#{domain}", "store": store,
+                                     "expiresAt": expires_at(JOB_TTL_DAYS)})
+    enqueue([{"jobId": job_id, "chunk": str(n), "urls": urls} for n, urls in enumerate(chunks)])
+    jlog(op="crawl_job_start", ok=True, jobId=job_id, queries=len(queries), candidates=len(urls),
+         queued=len(fetch), served=len(known), skipped=len(skipped))
+    return {k: v for k, v in job.items() if k != "perQuery"}
+
+def enqueue(messages: List[Dict[str, Any]]) -> int:
+    url = os.environ.get("CRAWL_QUEUE_URL")
+    if not url or not clients.available():
+        for m in messages:
+            _QUEUE.put(m)
+        return len(messages)
+    sqs = clients.client("sqs")
+    for i in range(0, len(messages), SQS_BATCH):
+        entries = [{"Id": str(n), "MessageBody": json.dumps(m)} for n, m in enumerate(messages[i:i + SQS_BATCH])]
+        failed = sqs.send_message_batch(QueueUrl=url, Entries=entries).get("Failed") or []
+        if failed:
+            raise RuntimeError(f"{len(failed)} crawl messages not queued: {failed[0].get('Message')}")
+    return len(messages)
+
+# ---------- Workers ----------
+
+def crawl_chunk(urls: List[str]) -> List[Dict[str, Any]]:
+    """Extract one chunk of stores. Runs in a worker (Lambda or local process); touches no job state."""
+    from search_shopify_retailers import extract_stores
+    return extract_stores(urls)
+
+def _final_status(job: Dict[str, Any]) -> Optional[str]:
+    """SUCCEEDED / PARTIAL / FAILED once every chunk is done or dead; None while some are still out."""
+    done, dead = len(job.get("doneChunks") or ()), len(job.get("deadChunks") or ())
+    if done + dead < int(job["chunks"]):
+        return None
+    return "SUCCEEDED" if not dead else "PARTIAL" if done else "FAILED"
+
+def _finish(tbl, job_id: str, job: Dict[str, Any]) -> None:
+    status = _final_status(job)
+    if status is None:
+        return
+    try:
+        tbl.update_item(Key={"pk": _pk(job_id), "sk": "JOB"}, UpdateExpression="SET #s = :s",
+                        ConditionExpression="#s = :running", ExpressionAttributeNames={"#s": "status"},
+                        ExpressionAttributeValues={":s": status, ":running": "RUNNING"})
+    except tbl.meta.client.exceptions.ConditionalCheckFailedException:
+        pass                                      # the other last chunk got there first
+
+def record_chunk(job_id: str, chunk: str, urls: List[str], stores: List[Dict[str, Any]]) -> bool:
+    """
+    Add a crawled chunk to its job and to the frontier; the last chunk in marks
+    the job done. Returns False if the chunk was already recorded (a redelivery).
+    """
+    by_domain = {crawl_frontier.domain_of(s["website"]): s for s in stores}
+    crawl_frontier.record("search", {u: by_domain.get(crawl_frontier.domain_of(u)) for u in urls})
+    now = int(time.time())
+    tbl = table()
+    if tbl is None:
+        with _lock:
+            job = _JOBS[job_id]
+            if chunk in job["doneChunks"] or chunk in job["deadChunks"]:
+                return False
+            job["doneChunks"].add(chunk)
+            job["stores"].update(by_domain)
+            job["done"] += len(urls)
+            job["found"] += len(by_domain)
+            job["updatedAt"] = now
+            job["status"] = _final_status(job) or job["status"]
+        return True
+    with tbl.batch_writer(overwrite_by_pkeys=["pk", "sk"]) as batch:   # same items on a redelivery: harmless
+        for domain, store in by_domain.items():
+            batch.put_item(Item={"pk": _pk(job_id), "sk": f"STORE#{domain}", "store": store,
+                                 "expiresAt": expires_at(JOB_TTL_DAYS)})
+    try:
+        job = tbl.update_item(Key={"pk": _pk(job_id), "sk": "JOB"},
+                              UpdateExpression="ADD doneChunks :c, done :d, found :f SET updatedAt = :u",
+                              ConditionExpression="NOT contains(doneChunks, :id) AND NOT contains(deadChunks, :id)",
+                              ExpressionAttributeValues={":c": {chunk}, ":id": chunk, ":d": len(urls),
+                                                         ":f": len(by_domain), ":u": now},
+                              ReturnValues="ALL_NEW")["Attributes"]
+    except tbl.meta.client.exceptions.ConditionalCheckFailedException:
+        return False
+    _finish(tbl, job_id, job)
+    return True
+
+def record_dead_chunk(job_id: str, chunk: str, urls: List[str]) -> bool:
+    """Count a chunk that exhausted its retries as failed; returns False if it was already counted."""
+    now = int(time.time())
+    tbl = table()
+    if tbl is None:
+        with _lock:
+            job = _JOBS[job_id]
+            if chunk in job["doneChunks"] or chunk in job["deadChunks"]:
+                return False
+            job["deadChunks"].add(chunk)
+            job["failed"] += len(urls)
+            job["updatedAt"] = now
+            job["status"] = _final_status(job) or job["status"]
+        return True
+    try:
+        job = tbl.update_item(Key={"pk": _pk(job_id), "sk": "JOB"},
+                              UpdateExpression="ADD deadChunks :c, failed :n SET updatedAt = :u",
+                              ConditionExpression="NOT contains(doneChunks, :id) AND NOT contains(deadChunks, :id)",
+                              ExpressionAttributeValues={":c": {chunk}, ":id": chunk, ":n": len(urls), ":u": now},
+                              ReturnValues="ALL_NEW")["Attributes"]
+    except tbl.meta.client.exceptions.ConditionalCheckFailedException:
+        return False
+    _finish(tbl, job_id, job)
+    return True
+
+def process(message: Dict[str, Any]) -> int:
+    """One queue message: crawl its chunk and record it. Returns the stores found."""
+    stores = crawl_chunk(message["urls"])
+    record_chunk(message["jobId"], message["chunk"], message["urls"], stores)
+    return len(stores)
+
+def run_local(processes: int = 4) -> int:
+    """
+    Drain the in-process queue with `processes` worker processes (0 = inline).
+    Chunks are crawled in the workers and recorded here. A chunk whose crawl
+    fails is recorded as dead. Returns the messages handled.
+    """
+    handled = 0
+    while True:
+        messages = []
+        while True:
+            try:
+                messages.append(_QUEUE.get_nowait())
+            except queue.Empty:
+                break
+        if not messages:
+            return handled
+        if processes:
+            import multiprocessing
+            # spawn, not fork: the parent's fetch loop thread doesn't survive a fork
+            with ProcessPoolExecutor(max_workers=processes, mp_context=multiprocessing.get_context("spawn")) as pool:
+                futures = [(m, pool.submit(crawl_chunk, m["urls"])) for m in messages]
+                for m, future in futures:
+                    try:
+                        stores = future.result()
+                    except Exception as e:
+                        jlog(op="crawl_chunk", ok=False, jobId=m["jobId"], chunk=m["chunk"], err=str(e))
+                        record_dead_chunk(m["jobId"], m["chunk"], m["urls"])
+                        continue
+                    record_chunk(m["jobId"], m["chunk"], m["urls"], stores)
+        else:
+            for m in messages:
+                try:
+                    process(m)
+                except Exception as e:
+                    jlog(op="crawl_chunk", ok=False, jobId=m["jobId"], chunk=m["chunk"], err=str(e))
+                    record_dead_chunk(m["jobId"], m["chunk"], m["urls"])
+        handled += len(messages)
+
+# ---------- Polling ----------
+
+def get_job(job_id: str) -> Optional[Dict[str, Any]]:
+    """The job with {query: stores} in each query's ranking order (one store per email per query)."""
+    tbl = table()
+    if tbl is None:
+        with _lock:
+            job = _JOBS.get(job_id)
+            job = {k: v for k, v in job.items() if k not in ("doneChunks", "deadChunks")} if job else None
+            job = dict(job, stores=dict(job["stores"])) if job else None
+    else:
+        job, stores = None, {}
+        kwargs: Dict[str, Any] = {"KeyConditionExpression": "pk = :p", "ExpressionAttributeValues": {":p": _pk(job_id)}}
+        while True:
+            res = tbl.query(**kwargs)
+            for item in res.get("Items", []):
+                if item["sk"] == "JOB":
+                    job = {k: v for k, v in item.items() if k not in ("pk", "sk", "expiresAt", "doneChunks", "deadChunks")}
+                else:
+                    stores[item["sk"][len("STORE#"):]] = item["store"]
+            if "LastEvaluatedKey" not in res:
+                break
+            kwargs["ExclusiveStartKey"] = res["LastEvaluatedKey"]
+        if job is not None:
+            job["stores"] = stores
+    if job is None:
+        return None
+
+    stores, results = job.pop("stores"), {}
+    for query, domains in job.pop("perQuery").items():
+        picked, emails = [], set()
+        for domain in domains:
+            store = stores.get(domain)
+            email = ((store or {}).get("email") or "").lower()
+            if store is None or (email and email in emails):
+                continue
+            picked.append(store)
+            if email:
+                emails.add(email)
+        results[query] = picked
+    return {**job, "results": results}
+
+def reset() -> None:
+    """Forget local jobs and queued messages (tests)."""
+    with _lock:
+        _JOBS.clear()
+    while not _QUEUE.empty():
+        _QUEUE.get_nowait()
@@ -0,0 +1,41 @@
+import json
+
+import crawl_jobs
+from log import jlog
+from runtime import event_handler
+
+@event_handler("crawl_worker")
+def lambda_handler(event, context):
+    """
+    SQS entry point for distributed crawls: each record is one {"jobId", "chunk", "urls"}
+    chunk from crawl_jobs. Failed records are reported individually
+    (ReportBatchItemFailures), so SQS retries only those.
+    """
+    failures, found = [], 0
+    for rec in event.get("Records", []):
+        try:
+            found += crawl_jobs.process(json.loads(rec["body"]))
+        except Exception as e:
+            jlog(op="crawl_worker", ok=False, messageId=rec.get("messageId"), err=str(e))
+            failures.append({"itemIdentifier": rec.get("messageId")})
+    jlog(op="crawl_worker", ok=not failures, records=len(event.get("Records", [])), found=found,
+         failed=len(failures))
+    return {"batchItemFailures": failures}
+
+@event_handler("crawl_dead_letters")
+def dead_letter_handler(event, context):
+    """
+    Entry point for the crawl dead-letter queue. Chunks land there after
+    maxReceiveCount failed attempts, and each one is counted as failed on its job,
+    so the job ends PARTIAL or FAILED instead of staying RUNNING.
+    Bodies that aren't crawl chunks are logged and dropped.
+    """
+    dead = 0
+    for rec in event.get("Records", []):
+        try:
+            m = json.loads(rec["body"])
+            dead += crawl_jobs.record_dead_chunk(m["jobId"], m["chunk"], m["urls"])
+        except (ValueError, KeyError, TypeError) as e:
+            jlog(op="crawl_dead_letters", ok=False, messageId=rec.get("messageId"), err=str(e))
+    jlog(op="crawl_dead_letters", ok=True, records=len(event.get("Records", [])), dead=dead)
+    return {"dead": dead}
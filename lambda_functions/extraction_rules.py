@@ -0,0 +1,128 @@
+# lambda_functions/extraction_rules.py
+"""
+Extraction patterns shared by the Lambda crawler, lead_enrich, lead_import and
+src/lead_generator. Everything is compiled once at import; callers should use these
+objects rather than passing pattern strings to re.* per call.
+"""
+import re
+from collections import Counter
+from urllib.parse import urlparse
+
+# ---------- Contact details ----------
+
+EMAIL_RE = re.compile(r"\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}\b")
+EMAIL_SKIP = ("example.com", "test.com", "noreply")
+
+# Simple North American pattern (Lambda crawler returns the whole match)
+PHONE_RE = re.compile(r"(\+?1?[-.\s]?\(?\d{3}\)?[-.\s]?\d{3}[-.\s]?\d{4})")
+# LeadGenerator tries these in order and joins the groups of the first hit
+PHONE_PATTERNS = (
+    re.compile(r"\+?1?[-.\s]?\(?([0-9]{3})\)?[-.\s]?([0-9]{3})[-.\s]?([0-9]{4})"),
+    re.compile(r"\+?([0-9]{1,3})[-.\s]?([0-9]{3,4})[-.\s]?([0-9]{3,4})[-.\s]?([0-9]{3,4})"),
+)
+
+ADDRESS_RE = re.compile(
+    r"\b\d+\s+[A-Za-z\s]+(?:Street|St|Avenue|Ave|Road|Rd|Boulevard|Blvd|Drive|Dr|Lane|Ln|Way|Court|Ct|Place|Pl)\b",
+    re.IGNORECASE,
+)
+CITY_STATE_ZIP_RE = re.compile(r"\b[A-Za-z\s]+,\s*[A-Z]{2}\s*\d{5}\b")
+
+# ---------- Page structure ----------
+
+TAG_RE = re.compile(r"<[^>]+>")
+TITLE_RE = re.compile(r"<title>(.*?)</title>", re.I | re.S)
+META_DESC_RE = re.compile(r'<meta[^>]*name=["\']description["\'][^>]*content=["\'](.*?)["\']', re.I | re.S)
+TITLE_SUFFIX_RE = re.compile(r"\s*[-–|]\s*(Shop|Store|Online|Home).*$", re.IGNORECASE)
+
+CONTACT_HREF_RE = re.compile(r"contact", re.I)
+ABOUT_HREF_RE = re.compile(r"about", re.I)
+CONTACT_OR_ABOUT_HREF_RE = re.compile(r"(contact|about)", re.I)
+NAV_CLASS_RE = re.compile(r"nav|menu", re.I)
+
+SOCIAL_HREF_PATTERNS = {
+    "facebook": re.compile(r"facebook\.com/[^/\s]+", re.IGNORECASE),
+    "instagram": re.compile(r"instagram\.com/[^/\s]+", re.IGNORECASE),
+    "twitter": re.compile(r"twitter\.com/[^/\s]+", re.IGNORECASE),
+    "linkedin": re.compile(r"linkedin\.com/company/[^/\s]+", re.IGNORECASE),
+}
+SOCIAL_WORDS = ("instagram", "twitter", "facebook", "tiktok", "linkedin")
+
+# ---------- Websites ----------
+
+def normalize_website(url: str) -> str:
+    """A lead's website as scheme://host ("https://" added when missing); "" stays ""."""
+    if not url:
+        return ""
+    if not url.startswith("http"):
+        url = "https://" + url
+    u = urlparse(url)
+    return f"{u.scheme}://{u.netloc}"
+
+# ---------- Keyword classification ----------
+
+INDUSTRY_KEYWORDS = {
+    "fashion": ["clothing", "fashion", "apparel", "dress", "shirt", "pants"],
+    "beauty": ["beauty", "cosmetics", "skincare", "makeup", "fragrance"],
+    "fitness": ["fitness", "gym", "workout", "exercise", "sports"],
+    "electronics": ["electronics", "gadgets", "tech", "computer", "phone"],
+    "home": ["home", "furniture", "decor", "kitchen", "bedroom"],
+    "food": ["food", "snacks", "organic", "nutrition", "supplements"],
+}
+
+def _trie_pattern(words) -> str:
+    """
+    Alternation factored by shared prefix (e.g. s(?:hirt|kincare|nacks|...)), so the
+    regex engine walks each text position down one trie branch instead of trying
+    every keyword in turn.
+    """
+    trie: dict = {}
+    for w in words:
+        node = trie
+        for ch in w:
+            node = node.setdefault(ch, {})
+        node[""] = {}
+
+    def emit(node) -> str:
+        alts = [re.escape(ch) + emit(child) for ch, child in sorted(node.items()) if ch]
+        optional = "" in node
+        if not alts:
+            return ""
+        body = alts[0] if len(alts) == 1 else "(?:" + "|".join(alts) + ")"
+        if optional:
+            body = "(?:" + body + ")?"
+        return body
+
+    return emit(trie)
+
+class KeywordIndex:
+    """
+    Single-pass keyword matcher: one compiled pattern over all keywords, one scan of
+    the text, hit counts per label. Keywords match at word starts ("shirts" counts
+    for "shirt", "address" does not count for "dress").
+    """
+
+    def __init__(self, keywords_by_label: dict[str, list[str]]):
+        self.labels = list(keywords_by_label)
+        self._label_of: dict[str, str] = {}
+        for label, words in keywords_by_label.items():
+            for w in words:
+                self._label_of.setdefault(w.lower(), label)
+        # The trie alternation is greedy: with "gym" and "gymnastics" both listed, "gymnastics" wins.
+        # A lookbehind anchor scans measurably faster than \b in CPython's re.
+        self._re = re.compile(r"(?<![a-z0-9_])(?:" + _trie_pattern(self._label_of) + r")")
+
+    def counts(self, text: str) -> Counter:
+        return Counter(map(self._label_of.__getitem__, self._re.findall((text or "").lower())))
+
+    def classify(self, text: str, default: str | None = None) -> str | None:
+        """Label with the most hits; ties go to the label listed first."""
+        hits = self.counts(text)
+        if not hits:
+            return default
+        return max(self.labels, key=lambda l: (hits[l], -self.labels.index(l)))
+
+INDUSTRY_INDEX = KeywordIndex(INDUSTRY_KEYWORDS)
+
+def classify_industry(text: str, default: str = "E-commerce") -> str:
+    label = INDUSTRY_INDEX.classify(text)
+    return label.title() if label else default
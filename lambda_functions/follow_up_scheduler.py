@@ -0,0 +1,12 @@
+# lambda_functions/follow_up_scheduler.py
+import follow_ups
+from runtime import event_handler
+
+@event_handler("follow_up_scheduler")
+def lambda_handler(event, context):
+    """
+    EventBridge schedule entry point: one follow_ups.tick().
+    Direct invoke may pass {"limit": n} to cap the batch (default FOLLOWUP_BATCH).
+    """
+    limit = int((event or {}).get("limit") or follow_ups.BATCH)
+    return {"ok": True, **follow_ups.tick(limit=limit)}
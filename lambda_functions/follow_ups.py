@@ -0,0 +1,204 @@
+# lambda_functions/follow_ups.py
+"""
+Follow-ups for leads that went quiet.
+
+When a campaign that was really emailed enters SENT or NEUTRAL, or records a
+new send, lead_stream_consumer schedules a follow-up FOLLOWUP_DELAY_DAYS later.
+"Really emailed" means update_send_metadata stored an SES messageId and
+lastSentAt. The SENT status alone is no proof: store_lead_data defaults to it
+and the dashboard stores prospects with it. Dry-run sends don't count either. tick() (the FollowUpScheduler function,
+every 15 minutes) pops what is due, in batches of at most FOLLOWUP_BATCH, and
+hands each campaign's due leads to the workflow for drafting and sending. A
+tick costs the due items plus one Query per hour bucket since the last drained
+one. It never reads the whole lead store.
+
+Layout in LeadIndexTable:
+  pk "FOLLOWUP#<YYYY-MM-DDTHH>" (UTC hour due), sk "<due epoch ms, 13 digits>#<campaign>#<email>"
+      -> {email, campaignId, n}, where n is which follow-up it is (1 = first)
+  pk "FOLLOWUP#CURSOR", sk "cursor" -> {"bucket": oldest hour that may still hold entries}
+A heap stands in locally.
+
+Entries are not removed when a lead's status changes. Cancellation is lazy: a
+popped entry is checked against the stored lead and acted on only if the
+campaign is still SENT/NEUTRAL, has had exactly n-1 follow-ups, and the last of
+those was actually sent. That drops replies, unsubscribes, bounces, unsent
+follow-ups and duplicate schedules at pop time. Popping is
+a conditional delete, so overlapping ticks can't both claim an entry.
+"""
+import heapq, os, threading, time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from constants import FOLLOWUP_DELAY_DAYS
+from lead_index import expires_at, table
+from leads_store_dynamo import batch_get_leads, update_campaigns
+from log import jlog
+
+FOLLOW_UP_STATUSES = ("SENT", "NEUTRAL")
+DELAY_SECONDS = int(os.environ.get("FOLLOWUP_DELAY_SECONDS") or FOLLOWUP_DELAY_DAYS * 86400)
+MAX_FOLLOW_UPS = int(os.environ.get("FOLLOWUP_MAX") or 2)
+BATCH = int(os.environ.get("FOLLOWUP_BATCH") or 100)
+RETRY_SECONDS = 3600                 # a hand-off that failed is retried this much later
+LOOKBACK_HOURS = 48                  # where the first tick starts without a stored cursor
+SUBJECT = "Following up - {company}"
+
+_HEAP: List[Tuple[int, str, str, int]] = []       # (due ms, campaign, email, n)
+_MEM_LOCK = threading.Lock()
+
+def _bucket(ts_ms: int) -> str:
+    return datetime.fromtimestamp(ts_ms / 1000, tz=timezone.utc).strftime("%Y-%m-%dT%H")
+
+def _next_bucket(bucket: str) -> str:
+    t = datetime.strptime(bucket, "%Y-%m-%dT%H").replace(tzinfo=timezone.utc) + timedelta(hours=1)
+    return t.strftime("%Y-%m-%dT%H")
+
+def sent(c: Dict[str, Any]) -> bool:
+    """Whether a campaign node records a real send (SES message id and time, not a dry run)."""
+    message_id = str(c.get("messageId") or "")
+    return bool(message_id and c.get("lastSentAt")) and not message_id.startswith("dryrun-")
+
+def to_schedule(old: Optional[Dict[str, Any]], new: Optional[Dict[str, Any]], ts_ms: int) -> List[Dict[str, Any]]:
+    """Entries for really-emailed campaigns that just entered a follow-up status or sent again (pure)."""
+    old_c = (old or {}).get("campaigns") or {}
+    email = (new or {}).get("email") or ""
+    out = []
+    for cid, c in ((new or {}).get("campaigns") or {}).items():
+        status = c.get("status")
+        done = int(c.get("followUps") or 0)
+        prev = old_c.get(cid) or {}
+        changed = status != prev.get("status") or c.get("lastSentAt") != prev.get("lastSentAt")
+        if email and status in FOLLOW_UP_STATUSES and sent(c) and changed and done < MAX_FOLLOW_UPS:
+            out.append({"email": email, "campaignId": cid, "dueMs": ts_ms + DELAY_SECONDS * 1000, "n": done + 1})
+    return out
+
+def schedule(entries: List[Dict[str, Any]]) -> int:
+    """Add entries ({email, campaignId, dueMs, n}). Same lead, campaign and due time overwrite (replay-safe)."""
+    if not entries:
+        return 0
+    tbl = table()
+    if tbl is None:
+        with _MEM_LOCK:
+            for e in entries:
+                heapq.heappush(_HEAP, (int(e["dueMs"]), e["campaignId"], e["email"], int(e["n"])))
+        return len(entries)
+    with tbl.batch_writer(overwrite_by_pkeys=["pk", "sk"]) as batch:
+        for e in entries:
+            due = int(e["dueMs"])
+            batch.put_item(Item={
+                "pk": f"FOLLOWUP#{_bucket(due)}", "sk": f"{due:013d}#{e['campaignId']}#{e['email']}",
+                "email": e["email"], "campaignId": e["campaignId"], "n": int(e["n"]),
+                "expiresAt": expires_at(30, due / 1000),
+            })
+    return len(entries)
+
+def pop_due(now_ms: Optional[int] = None, limit: int = BATCH) -> List[Dict[str, Any]]:
+    """Claim and remove up to `limit` entries due at `now_ms`, oldest first."""
+    now_ms = int(now_ms if now_ms is not None else time.time() * 1000)
+    tbl = table()
+    out: List[Dict[str, Any]] = []
+    if tbl is None:
+        with _MEM_LOCK:
+            while _HEAP and _HEAP[0][0] <= now_ms and len(out) < limit:
+                due, cid, email, n = heapq.heappop(_HEAP)
+                out.append({"email": email, "campaignId": cid, "dueMs": due, "n": n})
+        return out
+
+    cur = tbl.get_item(Key={"pk": "FOLLOWUP#CURSOR", "sk": "cursor"}).get("Item") or {}
+    start = bucket = cur.get("bucket") or _bucket(now_ms - LOOKBACK_HOURS * 3600 * 1000)
+    last = _bucket(now_ms)
+    while bucket <= last and len(out) < limit:
+        res = tbl.query(KeyConditionExpression="pk = :p AND sk <= :s",
+                        ExpressionAttributeValues={":p": f"FOLLOWUP#{bucket}", ":s": f"{now_ms:013d}~"},
+                        Limit=limit - len(out))
+        for item in res.get("Items", []):
+            try:
+                tbl.delete_item(Key={"pk": item["pk"], "sk": item["sk"]}, ConditionExpression="attribute_exists(pk)")
+            except tbl.meta.client.exceptions.ConditionalCheckFailedException:
+                continue                                  # another tick claimed it
+            out.append({"email": item["email"], "campaignId": item["campaignId"],
+                        "dueMs": int(item["sk"].split("#", 1)[0]), "n": int(item["n"])})
+        if bucket == last or res.get("LastEvaluatedKey"):
+            break
+        bucket = _next_bucket(bucket)                     # a past hour, now drained
+    if bucket != start:
+        tbl.put_item(Item={"pk": "FOLLOWUP#CURSOR", "sk": "cursor", "bucket": bucket})
+    return out
+
+def _still_due(lead: Optional[Dict[str, Any]], entry: Dict[str, Any]) -> bool:
+    c = ((lead or {}).get("campaigns") or {}).get(entry["campaignId"]) or {}
+    if c.get("status") not in FOLLOW_UP_STATUSES or int(c.get("followUps") or 0) != entry["n"] - 1 or not sent(c):
+        return False
+    # the previous follow-up must have gone out too, not just been handed off
+    return int(c.get("lastSentAt") or 0) >= int(c.get("lastFollowUpAt") or 0)
+
+def _hand_off(campaign_id: str, leads: List[Dict[str, Any]], n_by_email: Dict[str, int]) -> str:
+    """Start one workflow run (draft + send) for a campaign's due leads. Returns the run id."""
+    from workflow_orchestrator import parse_params, start_run
+    params, _ = parse_params({
+        "leads": [{"email": l["email"], "company_name": l.get("company") or l["email"].split("@")[-1],
+                   "website": (l.get("profile") or {}).get("website") or ""} for l in leads],
+        "campaign_id": campaign_id,
+        "status": "SENT",
+        "note": ", ".join(sorted({f"follow-up {n}" for n in n_by_email.values()})),
+        "subject": SUBJECT,
+    })
+    return start_run(params)["runId"]
+
+def tick(now_ms: Optional[int] = None, limit: int = BATCH) -> Dict[str, Any]:
+    """
+    Pop due entries, drop the ones no longer due, and start one workflow run per
+    campaign. Each lead's campaign gets followUps = n and lastFollowUpAt before
+    its run starts, and the next follow-up is scheduled while n < FOLLOWUP_MAX.
+    Those two fields are set by a field-level update. It only applies if the
+    campaign status is still the one read: a lead that replied or unsubscribed
+    in between is skipped, and its new status is never overwritten. A failed
+    hand-off is rolled back and retried RETRY_SECONDS later.
+    """
+    now_ms = int(now_ms if now_ms is not None else time.time() * 1000)
+    due = pop_due(now_ms, limit)
+    if not due:
+        return {"due": 0, "dispatched": 0, "skipped": 0, "failed": 0, "runs": []}
+
+    stored = batch_get_leads({e["email"] for e in due})
+    by_campaign: Dict[str, Dict[str, Dict[str, Any]]] = {}
+    for e in due:
+        if _still_due(stored.get(e["email"]), e):
+            by_campaign.setdefault(e["campaignId"], {}).setdefault(e["email"], e)
+    picked = sum(len(v) for v in by_campaign.values())
+    totals = {"due": len(due), "dispatched": 0, "skipped": len(due) - picked, "failed": 0, "runs": []}
+
+    for cid, entries in by_campaign.items():
+        leads = [stored[email] for email in entries]
+        claimed = update_campaigns([
+            (l["email"], cid, {"followUps": entries[l["email"]]["n"], "lastFollowUpAt": now_ms // 1000},
+             {"status": l["campaigns"][cid]["status"]}) for l in leads])
+        totals["skipped"] += claimed.count(False)
+        leads = [l for l, ok in zip(leads, claimed) if ok]
+        entries = {l["email"]: entries[l["email"]] for l in leads}
+        if not leads:
+            continue
+        for lead in leads:
+            c = lead["campaigns"][cid]
+            c["followUps"], c["lastFollowUpAt"] = entries[lead["email"]]["n"], now_ms // 1000
+        try:
+            run_id = _hand_off(cid, leads, {e: x["n"] for e, x in entries.items()})
+        except Exception as ex:
+            jlog(op="follow_up_handoff", ok=False, campaignId=cid, leads=len(leads), err=str(ex))
+            update_campaigns([(l["email"], cid, {"followUps": entries[l["email"]]["n"] - 1},
+                               {"followUps": entries[l["email"]]["n"]}) for l in leads])
+            schedule([{**x, "dueMs": now_ms + RETRY_SECONDS * 1000} for x in entries.values()])
+            totals["failed"] += len(leads)
+            continue
+        schedule([{**x, "dueMs": now_ms + DELAY_SECONDS * 1000, "n": x["n"] + 1}
+                  for x in entries.values() if x["n"] < MAX_FOLLOW_UPS])
+        totals["dispatched"] += len(leads)
+        totals["runs"].append(run_id)
+
+    jlog(op="follow_up_tick", ok=not totals["failed"], **{k: v for k, v in totals.items() if k != "runs"},
+         runs=len(totals["runs"]))
+    return totals
+
+def pending(limit: int = 100) -> List[Dict[str, Any]]:
+    """Next scheduled entries, soonest first (local stand-in only)."""
+    with _MEM_LOCK:
+        return [{"email": e, "campaignId": c, "dueMs": d, "n": n} for d, c, e, n in heapq.nsmallest(limit, _HEAP)]
@@ -0,0 +1,36 @@
+# lambda_functions/http_client.py
+import os
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+
+USER_AGENT = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/126.0 Safari/537.36"
+)
+POOL_SIZE = int(os.environ.get("HTTP_POOL_SIZE") or 32)
+
+_SESSIONS: dict[int, requests.Session] = {}
+_lock = threading.Lock()
+
+def mount_pool(session: requests.Session, pool_size: int = POOL_SIZE) -> requests.Session:
+    """Replace the default 10-connection adapters with ones sized for concurrent use."""
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+def pooled_session(pool_size: int = POOL_SIZE) -> requests.Session:
+    """
+    One shared Session per pool size, reused across invocations of a warm container.
+    requests defaults to 10 connections per host; size the pool to the worker count
+    so concurrent fetches don't queue on (or discard) connections.
+    """
+    with _lock:
+        s = _SESSIONS.get(pool_size)
+        if s is None:
+            s = requests.Session()
+            s.headers.update({"User-Agent": USER_AGENT})
+            _SESSIONS[pool_size] = mount_pool(s, pool_size)
+        return s
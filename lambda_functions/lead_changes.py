@@ -0,0 +1,27 @@
+# lambda_functions/lead_changes.py
+from change_feed import changes_since, latest_cursor
+from log import jlog
+from runtime import BadRequest, api_handler, query, resp
+
+@api_handler("lead_changes")
+def lambda_handler(event, context):
+    """
+    GET /leads/changes query string:
+      - cursor (str) -> return only changes after it; omit on the first call
+      - lookback (seconds) -> first call only: start this far back instead of now
+      - limit (int, default 100, max 500)
+    Response: {"events": [...oldest first], "cursor": "...", "more": bool}
+    """
+    qs = query(event)
+    try:
+        limit = int(qs.get("limit") or 100)
+        cursor = qs.get("cursor") or latest_cursor(lookback_seconds=int(qs.get("lookback") or 0))
+    except ValueError:
+        raise BadRequest("limit and lookback must be integers")
+    try:
+        res = changes_since(cursor, limit=limit)
+    except ValueError as e:
+        raise BadRequest(str(e))
+    if res["events"]:
+        jlog(op="lead_changes", ok=True, events=len(res["events"]), more=res["more"])
+    return resp(200, {"ok": True, **res})
@@ -1,111 +1,300 @@
 # lambda_functions/lead_enrich.py
-import re, json
+import os, json, time, hashlib
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from decimal import Decimal
-from urllib.parse import urlparse
-
-from leads_store_dynamo import get_lead, upsert_lead
-from log import jlog
-from scoring import compute_campaign_score
-
-TAG_RE = re.compile(r"<[^>]+>")
-
-def _normalize_website(url: str) -> str:
-    if not url:
-        return ""
-    if not url.startswith("http"):
-        url = "https://" + url
-    u = urlparse(url)
-    return f"{u.scheme}://{u.netloc}"
-
-def _fake_fetch(url: str) -> str:
-    return """
-    <html><head>
-    <title>Allbirds® — Sustainable Shoes</title>
-    <meta name="description" content="Comfortable, sustainable shoes made from natural materials">
-    </head><body>Powered by Shopify. Follow us on Instagram and Twitter. Contact: support@brand.com</body></html>
+
+from leads_store_dynamo import batch_get_leads, scan_leads, touch_profiles, update_enrichment
+from extraction_rules import META_DESC_RE, SOCIAL_WORDS, TAG_RE, TITLE_RE, normalize_website
+from http_client import pooled_session
+from log import jlog, span
+from runtime import BadRequest, api_handler, body as request_body, deadline as lambda_deadline, event_handler, resp
+from scoring import compute_campaign_score, compute_lead_scores, campaign_penalties
+
+FETCH_TIMEOUT = float(os.environ.get("ENRICH_FETCH_TIMEOUT") or 6.0)
+MAX_WORKERS = int(os.environ.get("ENRICH_MAX_WORKERS") or 32)
+MAX_PAGE_BYTES = 512 * 1024   # homepage signals live in <head> and nav; don't download whole catalogs
+MAX_BATCH = 1000
+FRESH_SECONDS = int(os.environ.get("ENRICH_FRESH_SECONDS") or 24 * 3600)    # skip refetch inside this window
+SWEEP_CHUNK = 200
+
+@span("http.fetch")
+def fetch_page(url: str, timeout: float = FETCH_TIMEOUT, validators: dict | None = None) -> dict:
+    """
+    GET a homepage through the shared connection pool, conditionally when we hold
+    an ETag/Last-Modified from the previous fetch.
+    Returns {"status", "html", "etag", "lastModified"}; status 0 means the fetch failed.
+    """
+    headers = {}
+    if validators:
+        if validators.get("etag"):
+            headers["If-None-Match"] = validators["etag"]
+        if validators.get("lastModified"):
+            headers["If-Modified-Since"] = validators["lastModified"]
+    try:
+        with pooled_session(MAX_WORKERS).get(url, timeout=timeout, headers=headers, stream=True) as r:
+            page = {"status": r.status_code, "html": "",
+                    "etag": r.headers.get("ETag"), "lastModified": r.headers.get("Last-Modified")}
+            if r.status_code == 200:
+                body = r.raw.read(MAX_PAGE_BYTES, decode_content=True)
+                page["html"] = body.decode(r.encoding or "utf-8", errors="replace")
+            return page
+    except Exception as e:
+        jlog(op="enrich_fetch", ok=False, url=url, err=str(e))
+        return {"status": 0, "html": "", "etag": None, "lastModified": None}
+
+def fetch_pages(urls, max_workers: int = MAX_WORKERS, timeout: float = FETCH_TIMEOUT,
+                deadline: float | None = None, validators: dict | None = None) -> dict:
+    """
+    Fetch many pages concurrently. Returns {url: page} (see fetch_page).
+    `validators` maps url -> {"etag", "lastModified"} for conditional requests.
+    URLs not finished by `deadline` (time.monotonic()) are left out so the caller can defer them.
     """
+    urls = list(dict.fromkeys(u for u in urls if u))
+    if not urls:
+        return {}
+    validators = validators or {}
+    out = {}
+    pool = ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(urls))))
+    try:
+        pending = {pool.submit(fetch_page, u, timeout, validators.get(u)): u for u in urls}
+        while pending:
+            left = None if deadline is None else deadline - time.monotonic()
+            if left is not None and left <= 0:
+                break
+            done, _ = wait(pending, timeout=left, return_when=FIRST_COMPLETED)
+            for f in done:
+                out[pending.pop(f)] = f.result()
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+    return out
 
+@span("parse.html")
 def _extract_meta(html: str) -> dict:
-    title = re.search(r"<title>(.*?)</title>", html, re.I | re.S)
-    desc  = re.search(r'<meta[^>]*name=["\']description["\'][^>]*content=["\'](.*?)["\']', html, re.I | re.S)
+    title = TITLE_RE.search(html)
+    desc  = META_DESC_RE.search(html)
     body  = TAG_RE.sub(" ", html or "")
     body_l = body.lower()
     return {
         "title": title.group(1).strip() if title else "",
         "description": desc.group(1).strip() if desc else "",
         "shopify": "shopify" in body_l,
-        "has_social": any(x in body_l for x in ["instagram","twitter","facebook","tiktok","linkedin"]),
+        "has_social": any(x in body_l for x in SOCIAL_WORDS),
         "has_contact_email": "@" in body,
     }
 
-def _json_default(obj):
-    if isinstance(obj, Decimal):
-        return float(obj)
-    raise TypeError
+def fingerprint(meta: dict) -> str:
+    """Hash of the extracted signals, not raw HTML: theme nonces/timestamps don't count as change."""
+    return hashlib.sha256(json.dumps(meta, sort_keys=True).encode("utf-8")).hexdigest()[:32]
 
-def lambda_handler(event, context):
-    try:
-        raw = event.get("body") or "{}"
-        body = json.loads(raw) if isinstance(raw, str) else (raw or {})
-        email   = (body.get("email") or "").strip().lower()
-        company = (body.get("company_name") or body.get("company") or "").strip()
-        website = (body.get("website") or body.get("company_website") or "").strip()
+def is_fresh(lead: dict, site: str, now: int, fresh_seconds: int = FRESH_SECONDS) -> bool:
+    profile = lead.get("profile") or {}
+    fetched_at = int(profile.get("fetchedAt") or 0)
+    return profile.get("website") == site and bool(profile.get("contentHash")) and now - fetched_at < fresh_seconds
+
+def enrich_lead(lead: dict, site: str, html: str, page: dict | None = None, now: int | None = None) -> dict:
+    """Apply page signals and scores to a lead in place (no I/O)."""
+    meta = _extract_meta(html) if html else {}
+    page = page or {}
+
+    # profile/signals
+    profile = lead.get("profile", {})
+    profile.update({
+        "website": site,
+        "industry": profile.get("industry") or "E-commerce",
+        "shopify": bool(meta.get("shopify")),
+        "tech": sorted(list(set((profile.get("tech") or []) + (["Shopify"] if meta.get("shopify") else [])))),
+        "contentHash": fingerprint(meta),
+        "fetchedAt": int(now or time.time()),
+        "etag": page.get("etag"),
+        "lastModified": page.get("lastModified"),
+    })
+    lead["profile"] = profile
+
+    signals = lead.get("signals", {})
+    signals.update({
+        "has_contact_email": bool(meta.get("has_contact_email")),
+        "has_social": bool(meta.get("has_social")),
+        "sustainable": "sustainable" in (meta.get("title","")+meta.get("description","")).lower(),
+        "recent_blog": signals.get("recent_blog", False),
+        "newsletter": signals.get("newsletter", False),
+    })
+    lead["signals"] = signals
+
+    # scores: recomputed from base signals, stored in Decimal for DynamoDB
+    fit_f, intent_f = compute_lead_scores(profile, signals)
+    lead["fitScore"]    = Decimal(str(round(fit_f, 2)))
+    lead["intentScore"] = Decimal(str(round(intent_f, 2)))
+
+    # per-campaign blended score (store Decimal)
+    campaigns = lead.get("campaigns", {})
+    for cid, cdata in campaigns.items():
+        blended = compute_campaign_score(fit_f, intent_f, campaign_penalties(cdata.get("status")))
+        campaigns[cid]["score"] = Decimal(str(blended))
+    lead["campaigns"] = campaigns
+    return lead
+
+def _request_fields(item: dict) -> tuple[str, str, str]:
+    email   = (item.get("email") or "").strip().lower()
+    company = (item.get("company_name") or item.get("company") or item.get("companyName") or "").strip()
+    website = (item.get("website") or item.get("company_website") or "").strip()
+    return email, company, website
 
+def enrich_leads(items: list[dict], max_workers: int = MAX_WORKERS,
+                 deadline: float | None = None, force: bool = False,
+                 stored: dict | None = None, write: bool = True) -> dict:
+    """
+    Batch enrichment: one BatchGetItem pass (skipped when `stored` is passed in),
+    concurrent conditional fetches (each unique site once), then field-level
+    writes: profile/signals/scores of the leads whose page signals changed, and
+    only fetchedAt/validators of the unchanged ones (skipped when `write` is False;
+    leads in `stored` are updated in place, so the caller can write them itself).
+
+    Result buckets, by email:
+      leads     - re-scored and written
+      fresh     - fetched within FRESH_SECONDS, not fetched again (unless force)
+      unchanged - 304 or same content fingerprint; only fetchedAt/etag/lastModified written
+      deferred  - site not fetched before `deadline`
+      failed    - fetch failed (network error or a status other than 200/304);
+                  the stored profile, fetchedAt and scores are left as they were
+    """
+    requested = {}
+    errors = []
+    for item in items:
+        email, company, website = _request_fields(item)
         if not email:
-            return {"statusCode": 400, "body": json.dumps({"error": "email required"})}
+            errors.append({"item": item, "error": "email required"})
+            continue
+        requested[email] = (company, website)
 
-        lead = get_lead(email) or {"email": email}
-        if company:
+    if stored is None:
+        stored = batch_get_leads(requested.keys())
+    now = int(time.time())
+    leads, sites, validators, fresh, renamed = {}, {}, {}, [], set()
+    for email, (company, website) in requested.items():
+        lead = stored.get(email) or {"email": email}
+        if company and company != lead.get("company"):
             lead["company"] = company
+            renamed.add(email)
+        site = normalize_website(website or lead.get("profile", {}).get("website") or "")
+        leads[email] = lead
+        if not force and site and is_fresh(lead, site, now):
+            fresh.append(email)
+            continue
+        sites[email] = site
+        profile = lead.get("profile") or {}
+        if not force and site and profile.get("website") == site and profile.get("contentHash"):
+            validators[site] = {"etag": profile.get("etag"), "lastModified": profile.get("lastModified")}
 
-        site = _normalize_website(website or lead.get("profile", {}).get("website") or "")
-        html = _fake_fetch(site) if site else ""
-        meta = _extract_meta(html) if html else {}
-
-        # profile/signals
-        profile = lead.get("profile", {})
-        profile.update({
-            "website": site,
-            "industry": profile.get("industry") or "E-commerce",
-            "shopify": bool(meta.get("shopify")),
-            "tech": sorted(list(set((profile.get("tech") or []) + (["Shopify"] if meta.get("shopify") else [])))),
-        })
-        lead["profile"] = profile
-
-        signals = lead.get("signals", {})
-        signals.update({
-            "has_contact_email": bool(meta.get("has_contact_email")),
-            "has_social": bool(meta.get("has_social")),
-            "recent_blog": signals.get("recent_blog", False),
-            "newsletter": signals.get("newsletter", False),
-        })
-        lead["signals"] = signals
-
-        # scores: do math in float, store in Decimal for DynamoDB
-        fit_f = float(lead.get("fitScore", 0)) \
-                + (35 if profile["shopify"] else 0) \
-                + (10 if "sustainable" in (meta.get("title","")+meta.get("description","")).lower() else 0)
-        intent_f = float(lead.get("intentScore", 0)) \
-                   + (25 if signals["has_contact_email"] else 0) \
-                   + (15 if signals["has_social"] else 0)
-
-        lead["fitScore"]    = Decimal(str(min(100, round(fit_f, 2))))
-        lead["intentScore"] = Decimal(str(min(100, round(intent_f, 2))))
-
-        # per-campaign blended score (store Decimal)
-        campaigns = lead.get("campaigns", {})
-        for cid, cdata in campaigns.items():
-            penalties = 0
-            if cdata.get("status") == "UNSUBSCRIBE": penalties += 50
-            if cdata.get("status") == "COLD": penalties += 20
-            blended = compute_campaign_score(float(lead["fitScore"]), float(lead["intentScore"]), penalties)
-            campaigns[cid]["score"] = Decimal(str(blended))
-        lead["campaigns"] = campaigns
-
-        upsert_lead(lead)
-        jlog(op="lead_enrich", ok=True, email=email, fit=float(lead["fitScore"]), intent=float(lead["intentScore"]))
-        return {"statusCode": 200, "body": json.dumps({"ok": True, "lead": lead}, default=_json_default)}
+    pages = fetch_pages(sites.values(), max_workers=max_workers, deadline=deadline, validators=validators)
 
-    except Exception as e:
-        jlog(op="lead_enrich", ok=False, err=str(e))
-        return {"statusCode": 500, "body": json.dumps({"error": str(e)})}
+    enriched, unchanged, deferred, failed, refreshed = [], [], [], [], {}
+    for email, site in sites.items():
+        lead = leads[email]
+        if site and site not in pages:
+            deferred.append(email)
+            continue
+        page = pages.get(site) or {}
+        if site and page.get("status") not in (200, 304):
+            failed.append(email)                # an empty page would zero the stored scores
+            continue
+        html = page.get("html", "")
+        prev_hash = (lead.get("profile") or {}).get("contentHash")
+        if not force and (page.get("status") == 304 or (
+                prev_hash and page.get("status") == 200 and fingerprint(_extract_meta(html)) == prev_hash)):
+            unchanged.append(email)
+            profile = lead.setdefault("profile", {})
+            refreshed[email] = {"fetchedAt": now, "etag": page.get("etag") or profile.get("etag"),
+                                "lastModified": page.get("lastModified") or profile.get("lastModified")}
+            profile.update(refreshed[email])
+            continue
+        enriched.append(enrich_lead(lead, site, html, page, now))
+
+    # a new company name is still worth persisting when the page itself needed no work
+    written = {l["email"] for l in enriched}
+    touched = [leads[e] for e in renamed if e not in written and e not in deferred]
+    if write and (enriched or touched):
+        update_enrichment(enriched + [{"email": l["email"], "company": l["company"]} for l in touched])
+    if write and refreshed:
+        touch_profiles(refreshed)
+    jlog(op="lead_enrich_batch", ok=True, requested=len(items), enriched=len(enriched), fresh=len(fresh),
+         unchanged=len(unchanged), deferred=len(deferred), failed=len(failed),
+         fetched=sum(1 for p in pages.values() if p.get("status") == 200), errors=len(errors))
+    return {"leads": enriched, "fresh": fresh, "unchanged": unchanged, "deferred": deferred, "failed": failed,
+            "errors": errors}
+
+def sweep(deadline: float | None = None, min_age: int = FRESH_SECONDS) -> dict:
+    """
+    Nightly re-enrichment: walk the table, re-check only sites not fetched within
+    `min_age`, and write back only the ones whose content fingerprint changed.
+    """
+    now = int(time.time())
+    totals = {"scanned": 0, "checked": 0, "changed": 0, "unchanged": 0, "deferred": 0, "failed": 0}
+    chunk: dict = {}
+
+    def flush():
+        res = enrich_leads([{"email": e} for e in chunk], deadline=deadline, stored=dict(chunk))
+        totals["checked"] += len(chunk)
+        totals["changed"] += len(res["leads"])
+        totals["unchanged"] += len(res["unchanged"])
+        totals["deferred"] += len(res["deferred"])
+        totals["failed"] += len(res["failed"])
+        chunk.clear()
+
+    for lead in scan_leads():
+        totals["scanned"] += 1
+        profile = lead.get("profile") or {}
+        if not profile.get("website") or now - int(profile.get("fetchedAt") or 0) < min_age:
+            continue
+        if deadline is not None and time.monotonic() >= deadline:
+            break
+        chunk[lead["email"]] = lead
+        if len(chunk) >= SWEEP_CHUNK:
+            flush()
+    if chunk:
+        flush()
+    jlog(op="lead_enrich_sweep", ok=True, **totals)
+    return totals
+
+@api_handler("lead_enrich")
+def lambda_handler(event, context):
+    """
+    JSON body, either a single lead:
+      - email (str, required), company_name (str), website (str)
+    or a batch:
+      - leads (list of the above, up to MAX_BATCH)
+    Optional:
+      - force (bool) -> refetch and rescore even if fresh/unchanged
+    """
+    body = request_body(event)
+    # leave headroom under the Lambda timeout to write results back
+    deadline = lambda_deadline(context, 5.0)
+
+    if isinstance(body.get("leads"), list):
+        items = body["leads"]
+        if len(items) > MAX_BATCH:
+            raise BadRequest(f"at most {MAX_BATCH} leads per batch")
+        res = enrich_leads(items, deadline=deadline, force=bool(body.get("force")))
+        return resp(200, {"ok": True, "count": len(res["leads"]), **res})
+
+    email, _, _ = _request_fields(body)
+    if not email:
+        raise BadRequest("email required")
+
+    stored = batch_get_leads([email])
+    res = enrich_leads([body], deadline=deadline, force=bool(body.get("force")), stored=stored)
+    if res["deferred"]:
+        return resp(504, {"error": "website fetch timed out", "deferred": res["deferred"]})
+    if res["failed"]:
+        return resp(502, {"error": "website fetch failed", "failed": res["failed"]})
+    if not res["leads"]:
+        # fresh or unchanged: scores stand as stored
+        lead = stored.get(email) or {"email": email}
+        return resp(200, {"ok": True, "lead": lead, "skipped": True})
+    lead = res["leads"][0]
+    jlog(op="lead_enrich", ok=True, email=email, fit=float(lead["fitScore"]), intent=float(lead["intentScore"]))
+    return resp(200, {"ok": True, "lead": lead})
+
+@event_handler("lead_enrich_sweep")
+def sweep_handler(event, context):
+    """Scheduled (EventBridge) entry point for the nightly re-enrichment sweep."""
+    return {"ok": True, **sweep(deadline=lambda_deadline(context, 15.0))}
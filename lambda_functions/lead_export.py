@@ -0,0 +1,142 @@
+# lambda_functions/lead_export.py
+"""
+Streaming export of the whole lead base to CSV, NDJSON or Parquet. There is one
+row per (lead, campaign), as lead_query.iter_rows defines it.
+
+    export(dynamo_rows(segments=8), "leads.parquet")     # format from the suffix
+    export(json_store_rows(), "-", fmt="ndjson")         # "-" is stdout (csv/ndjson)
+
+Rows are written as they arrive, so memory stays flat however big the table
+is. CSV and NDJSON hold one row at a time. Parquet holds one row group
+(EXPORT_ROW_GROUP rows, default 50k) and needs pyarrow. The other formats
+need only the standard library.
+
+Sources:
+  dynamo_rows()       LeadsTable, read with parallel Scan segments (bounded read-ahead)
+  json_store_rows()   the local JSON store, one record per lead and campaign. That
+                      file is a single JSON document, so it is parsed whole; it
+                      only ever holds local test data.
+"""
+import csv, json, os, sys
+from typing import Any, Dict, Iterable, Iterator, Optional
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except Exception:
+    pyarrow = None
+
+from lead_query import ROW_FIELDS, iter_rows
+from log import jlog, span
+
+FORMATS = ("csv", "ndjson", "parquet")
+SUFFIXES = {".csv": "csv", ".ndjson": "ndjson", ".jsonl": "ndjson", ".parquet": "parquet"}
+ROW_GROUP = int(os.environ.get("EXPORT_ROW_GROUP") or 50_000)
+
+_NUMBERS = {"score": "float", "fitScore": "float", "intentScore": "float", "lastSentAt": "int", "updatedAt": "int"}
+
+# ---------- Sources ----------
+
+def dynamo_rows(segments: int = 4, page_size: int = 500) -> Iterator[Dict[str, Any]]:
+    from leads_store_dynamo import parallel_scan_leads
+    return iter_rows(parallel_scan_leads(segments, page_size))
+
+def json_store_rows(path: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+    """Rows from the local JSON store (LEADS_STORE_PATH, default ./_leads_store.json)."""
+    path = path or os.environ.get("LEADS_STORE_PATH") or "./_leads_store.json"
+    if not os.path.exists(path):
+        return
+    with open(path, "r", encoding="utf-8") as f:
+        records = json.load(f)
+    for rec in records.values():
+        sent = [h["ts"] for h in rec.get("history") or [] if h.get("status") == "SENT"]
+        yield {
+            "email": (rec.get("email") or "").lower(), "company": rec.get("companyName") or "",
+            "website": "", "industry": "", "campaign": rec.get("campaignId") or "",
+            "status": (rec.get("status") or "NEW").upper(), "score": 0.0, "fitScore": 0.0,
+            "intentScore": 0.0, "lastSentAt": int(max(sent, default=0)),
+            "updatedAt": int(rec.get("updatedAt") or 0), "lastReply": "",
+        }
+
+# ---------- Writers ----------
+
+class _CsvWriter:
+    def __init__(self, f):
+        self._w = csv.DictWriter(f, fieldnames=ROW_FIELDS, extrasaction="ignore")
+        self._w.writeheader()
+
+    def write(self, row: Dict[str, Any]) -> None:
+        self._w.writerow(row)
+
+    def close(self) -> None:
+        pass
+
+class _NdjsonWriter:
+    def __init__(self, f):
+        self._f = f
+
+    def write(self, row: Dict[str, Any]) -> None:
+        self._f.write(json.dumps({k: row.get(k) for k in ROW_FIELDS}, ensure_ascii=False, default=str) + "\n")
+
+    def close(self) -> None:
+        pass
+
+class _ParquetWriter:
+    """Buffers one row group of columns, then hands it to pyarrow."""
+
+    def __init__(self, path: str, row_group: int = ROW_GROUP):
+        types = {"float": pyarrow.float64(), "int": pyarrow.int64()}
+        self._schema = pyarrow.schema([(k, types.get(_NUMBERS.get(k), pyarrow.string())) for k in ROW_FIELDS])
+        self._w = pyarrow.parquet.ParquetWriter(path, self._schema)
+        self._row_group = row_group
+        self._cols: Dict[str, list] = {k: [] for k in ROW_FIELDS}
+        self._n = 0
+
+    def write(self, row: Dict[str, Any]) -> None:
+        for k in ROW_FIELDS:
+            self._cols[k].append(row.get(k))
+        self._n += 1
+        if self._n >= self._row_group:
+            self._flush()
+
+    def _flush(self) -> None:
+        if self._n:
+            self._w.write_table(pyarrow.table(self._cols, schema=self._schema))
+            self._cols = {k: [] for k in ROW_FIELDS}
+            self._n = 0
+
+    def close(self) -> None:
+        self._flush()
+        self._w.close()
+
+def format_for(out: str, fmt: Optional[str] = None) -> str:
+    fmt = (fmt or SUFFIXES.get(os.path.splitext(out)[1].lower()) or "").lower()
+    if fmt not in FORMATS:
+        raise ValueError(f"format must be one of {FORMATS} (or implied by a {'/'.join(SUFFIXES)} suffix)")
+    if fmt == "parquet" and pyarrow is None:
+        raise RuntimeError("Parquet export needs pyarrow (pip install pyarrow)")
+    if fmt == "parquet" and out == "-":
+        raise ValueError("Parquet can't be written to stdout")
+    return fmt
+
+@span("export.write")
+def export(rows: Iterable[Dict[str, Any]], out: str, fmt: Optional[str] = None, row_group: int = ROW_GROUP) -> int:
+    """Write `rows` to `out` (a path, or "-" for stdout) as they come; returns the rows written."""
+    fmt = format_for(out, fmt)
+    n = 0
+    if fmt == "parquet":
+        writer = _ParquetWriter(out, row_group)
+        f = None
+    else:
+        f = sys.stdout if out == "-" else open(out, "w", encoding="utf-8", newline="")
+        writer = _CsvWriter(f) if fmt == "csv" else _NdjsonWriter(f)
+    try:
+        for row in rows:
+            writer.write(row)
+            n += 1
+    finally:
+        writer.close()
+        if f is not None and f is not sys.stdout:
+            f.close()
+    jlog(op="lead_export", ok=True, format=fmt, rows=n)
+    return n
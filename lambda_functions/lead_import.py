@@ -0,0 +1,208 @@
+# lambda_functions/lead_import.py
+"""
+Streaming bulk import of lead lists (CSV or NDJSON, optionally .gz) into LeadsTable.
+
+    import_file("purchased.csv.gz", campaign_id="spring", checkpoint="purchased.ckpt.json")
+
+Each row goes through store_lead_data's rules:
+- the same Field/Schema validation;
+- the email lowercased and checked against EMAIL_RE;
+- normalize_status;
+- merge_lead for the campaign node.
+Websites are cut to scheme://host (extraction_rules.normalize_website, as lead_enrich
+does), and land in profile.website.
+Headers are matched case-insensitively, so "E-mail", "Company Name" and
+"companyName" all work.
+
+Rows are read lazily and handled BATCH at a time. Each batch costs
+batch_get_leads (which catches leads already stored) and put_leads. Up
+to WORKERS batches are in flight at once, so memory is bounded by
+WORKERS * BATCH rows. Emails seen earlier in the file are dropped, tracked as
+8-byte hashes (under 100 bytes each, so about 100 MB for 10M unique emails).
+Leads already stored are skipped. With update_existing, stored leads not yet in
+the row's campaign get that campaign node added by add_campaigns. That is a
+field-level update, so their other campaigns and anything written since the
+read are left alone.
+
+After each batch that completes in file order, the checkpoint file records the
+rows consumed and the running counts. A rerun with the same checkpoint resumes
+after the last complete batch. Rows before it are only parsed, not written again.
+"""
+import csv, gzip, hashlib, io, json, os, re, time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterator, Optional
+
+from constants import normalize_status
+from extraction_rules import EMAIL_RE, normalize_website
+from leads_store_dynamo import add_campaigns, batch_get_leads, put_leads
+from log import jlog, span
+from runtime import BadRequest, Field, Schema
+from store_lead_data import LEAD, merge_lead
+
+BATCH = int(os.environ.get("IMPORT_BATCH") or 500)
+WORKERS = int(os.environ.get("IMPORT_WORKERS") or 4)
+MAX_ERROR_SAMPLES = 20
+
+# store_lead_data.ITEM plus a website, with the header spellings lead lists use
+ROW = Schema(
+    Field("email", required=True, lower=True, aliases=("e_mail", "email_address")),
+    Field("company_name", aliases=("companyname", "company"), required=True),
+    Field("campaign_id", aliases=("campaignid", "campaign"), default=""),
+    Field("status"),
+    Field("note", default=""),
+    Field("website", aliases=("url", "domain", "site"), default=""),
+    missing=LEAD.missing,
+)
+
+_HEADER_RE = re.compile(r"[\s\-]+")
+
+def _header(name: str) -> str:
+    return _HEADER_RE.sub("_", (name or "").strip().lower())
+
+def format_for(path: str, fmt: Optional[str] = None) -> str:
+    base = path[:-3] if path.lower().endswith(".gz") else path
+    fmt = (fmt or {".csv": "csv", ".ndjson": "ndjson", ".jsonl": "ndjson"}.get(os.path.splitext(base)[1].lower()) or "")
+    if fmt not in ("csv", "ndjson"):
+        raise ValueError("format must be csv or ndjson (or implied by a .csv/.ndjson/.jsonl suffix)")
+    return fmt
+
+def read_rows(path: str, fmt: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+    """Raw rows with normalized header keys; an unparsable NDJSON line comes back as {}."""
+    fmt = format_for(path, fmt)
+    raw = gzip.open(path, "rb") if path.lower().endswith(".gz") else open(path, "rb")
+    with io.TextIOWrapper(raw, encoding="utf-8-sig", newline="" if fmt == "csv" else None) as f:
+        if fmt == "csv":
+            reader = csv.reader(f)
+            keys = [_header(h) for h in next(reader, [])]
+            for values in reader:
+                if any(values):
+                    yield dict(zip(keys, values))
+            return
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError:
+                row = None
+            yield {_header(k): v for k, v in row.items()} if isinstance(row, dict) else {}
+
+def _seen_key(email: str) -> int:
+    return int.from_bytes(hashlib.blake2b(email.encode(), digest_size=8).digest(), "big")
+
+@span("import.batch")
+def _write_batch(batch: Dict[str, Dict[str, Any]], update_existing: bool) -> Dict[str, int]:
+    """One BatchGetItem round, merge, one batched write of the new leads; returns counts."""
+    stored = batch_get_leads(batch.keys())
+    leads, additions, skipped = [], [], 0
+    for email, row in batch.items():
+        lead = stored.get(email)
+        if lead is not None and (not update_existing or row["campaign_id"] in (lead.get("campaigns") or {})):
+            skipped += 1                        # never reset a campaign the lead is already in
+            continue
+        existing = lead is not None
+        lead = merge_lead(stored, email, row["company_name"], row["campaign_id"], row["status"], row["note"])
+        profile = lead.setdefault("profile", {})
+        if row["website"] and not profile.get("website"):
+            profile["website"] = row["website"]
+        if existing:
+            additions.append((lead, row["campaign_id"]))
+        else:
+            leads.append(lead)
+    if leads:
+        put_leads(leads)
+    updated = add_campaigns(additions) if additions else 0
+    return {"imported": len(leads), "updated": updated, "existing": skipped + len(additions) - updated}
+
+def _load_checkpoint(path: Optional[str], source: str) -> Dict[str, Any]:
+    if path and os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            ckpt = json.load(f)
+        if ckpt.get("source") == os.path.abspath(source) and ckpt.get("size") == os.path.getsize(source):
+            return ckpt
+        raise ValueError(f"checkpoint {path} belongs to another file; delete it to start over")
+    return {}
+
+def _save_checkpoint(path: Optional[str], state: Dict[str, Any]) -> None:
+    if not path:
+        return
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(state, f)
+    os.replace(tmp, path)
+
+def _clean(raw: Dict[str, Any], campaign_id: str, status: str) -> Dict[str, Any]:
+    """A validated, normalized row; raises BadRequest."""
+    row = ROW.validate(raw)
+    if not EMAIL_RE.fullmatch(row["email"]):
+        raise BadRequest("invalid email")
+    row["campaign_id"] = row["campaign_id"] or campaign_id
+    if not row["campaign_id"]:
+        raise BadRequest(LEAD.missing)
+    row["status"] = normalize_status(row["status"] or status, "NEW")
+    row["website"] = normalize_website(str(row["website"]))
+    return row
+
+def import_file(path: str, campaign_id: str = "", status: str = "NEW", fmt: Optional[str] = None,
+                update_existing: bool = False, checkpoint: Optional[str] = None,
+                batch_size: int = BATCH, workers: int = WORKERS) -> Dict[str, Any]:
+    """
+    Import every row of `path`. campaign_id/status apply to rows without their own.
+    Returns counts: rows, imported, updated, existing, duplicates, invalid (+ error samples).
+    """
+    ckpt = _load_checkpoint(checkpoint, path)
+    saved = ckpt.get("counts") or {}
+    written = {k: saved.get(k, 0) for k in ("imported", "updated", "existing")}
+    read = {k: saved.get(k, 0) for k in ("duplicates", "invalid")}
+    errors = list(ckpt.get("errors") or [])
+    resume_at, started = int(ckpt.get("rows") or 0), time.monotonic()
+    if ckpt.get("done"):
+        return {"rows": resume_at, **written, **read, "errors": errors, "resumed": True}
+
+    def state(rows: int, reader: Dict[str, int], n_errors: int, done: bool) -> Dict[str, Any]:
+        return {"source": os.path.abspath(path), "size": os.path.getsize(path), "rows": rows,
+                "counts": {"rows": rows, **written, **reader}, "errors": errors[:n_errors], "done": done}
+
+    def land(future, rows: int, reader: Dict[str, int], n_errors: int) -> None:
+        for k, v in future.result().items():
+            written[k] += v
+        _save_checkpoint(checkpoint, state(rows, reader, n_errors, False))
+
+    seen: set = set()
+    inflight: deque = deque()        # (future, rows consumed, reader counts, errors) as of each batch
+    n, batch = 0, {}
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        for n, raw in enumerate(read_rows(path, fmt), 1):
+            try:
+                row = _clean(raw, campaign_id, status)
+            except BadRequest as e:
+                if n > resume_at:
+                    read["invalid"] += 1
+                    if len(errors) < MAX_ERROR_SAMPLES:
+                        errors.append({"row": n, "email": str(raw.get("email") or "").strip().lower(),
+                                       "error": str(e)})
+                continue
+            key = _seen_key(row["email"])
+            if n <= resume_at:                  # done before: only rebuild the in-file dedup
+                seen.add(key)
+                continue
+            if key in seen:
+                read["duplicates"] += 1
+                continue
+            seen.add(key)
+            batch[row["email"]] = row
+            if len(batch) >= batch_size:
+                inflight.append((pool.submit(_write_batch, batch, update_existing), n, dict(read), len(errors)))
+                batch = {}
+                while len(inflight) >= max(1, workers):  # oldest first, so the checkpoint only moves forward
+                    land(*inflight.popleft())
+        if batch:
+            inflight.append((pool.submit(_write_batch, batch, update_existing), n, dict(read), len(errors)))
+        while inflight:
+            land(*inflight.popleft())
+
+    _save_checkpoint(checkpoint, state(n, read, len(errors), True))
+    counts = {"rows": n, **written, **read}
+    jlog(op="lead_import", ok=True, resumedAt=resume_at, ms=round((time.monotonic() - started) * 1000), **counts)
+    return {**counts, "errors": errors, "resumed": resume_at > 0}
@@ -0,0 +1,39 @@
+# lambda_functions/lead_index.py
+"""
+Access to LeadIndexTable, the pk/sk side table for everything derived from or
+scheduled against leads: the change feed, counters and the like. Each feature
+owns a pk prefix (e.g. "CHANGES#<day>"). Items may carry an `expiresAt` epoch
+for DynamoDB TTL.
+
+table() returns None when LEAD_INDEX_TABLE_NAME is unset; callers then use
+their in-process stand-in (local runs, tests).
+"""
+import os, time
+
+import clients
+
+_TABLE = None
+
+def table():
+    global _TABLE
+    if _TABLE is not None:
+        return _TABLE
+    name = os.environ.get("LEAD_INDEX_TABLE_NAME")
+    if not name or not clients.available():
+        return None
+    _TABLE = clients.table(name)
+    return _TABLE
+
+def expires_at(days: float, now: float | None = None) -> int:
+    return int((now or time.time()) + days * 86400)
+
+def batch_get(tbl, keys: list[dict], chunk: int = 100) -> list[dict]:
+    """BatchGetItem over any number of keys (100 per call), retrying unprocessed keys."""
+    out = []
+    for i in range(0, len(keys), chunk):
+        request = {tbl.name: {"Keys": keys[i:i + chunk]}}
+        while request:
+            res = tbl.meta.client.batch_get_item(RequestItems=request)
+            out.extend(res.get("Responses", {}).get(tbl.name, []))
+            request = res.get("UnprocessedKeys") or None
+    return out
@@ -0,0 +1,111 @@
+# lambda_functions/lead_query.py
+"""
+Pure list-view helpers over lead payloads (no I/O): flatten leads into one row per
+(lead, campaign), then filter, sort and paginate. Shared by the dashboard and any
+handler that lists leads, so both agree on what a row looks like.
+"""
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+# Funnel order for sorting by status: hottest first
+STATUS_ORDER = ("WARM", "NEUTRAL", "SENT", "NEW", "COLD", "UNSUBSCRIBE", "BOUNCED")
+_STATUS_RANK = {s: i for i, s in enumerate(STATUS_ORDER)}
+
+SORT_KEYS = {
+    "score": lambda r: r["score"],
+    "fit": lambda r: r["fitScore"],
+    "intent": lambda r: r["intentScore"],
+    "status": lambda r: _STATUS_RANK.get(r["status"], len(STATUS_ORDER)),
+    "company": lambda r: r["company"].lower(),
+    "updated": lambda r: r["updatedAt"],
+    "sent": lambda r: r["lastSentAt"],
+}
+
+def _num(v) -> float:
+    try:
+        return float(v) if v is not None else 0.0
+    except (TypeError, ValueError):
+        return 0.0
+
+def _int(v) -> int:
+    return int(_num(v))
+
+# Row columns, in export order
+ROW_FIELDS = ("email", "company", "website", "industry", "campaign", "status", "score",
+              "fitScore", "intentScore", "lastSentAt", "updatedAt", "lastReply")
+
+def flatten(leads: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """One row per (lead, campaign); leads with no campaigns get a single NEW row."""
+    return list(iter_rows(leads))
+
+def iter_rows(leads: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+    """flatten() one lead at a time, for streaming exports."""
+    for lead in leads:
+        profile = lead.get("profile") or {}
+        base = {
+            "email": (lead.get("email") or "").lower(),
+            "company": lead.get("company") or "",
+            "website": profile.get("website") or "",
+            "industry": profile.get("industry") or "",
+            "fitScore": _num(lead.get("fitScore")),
+            "intentScore": _num(lead.get("intentScore")),
+        }
+        campaigns = lead.get("campaigns") or {}
+        if not campaigns:
+            yield {**base, "campaign": "", "status": "NEW", "score": 0.0,
+                   "lastSentAt": 0, "updatedAt": _int(profile.get("fetchedAt")), "lastReply": ""}
+            continue
+        for cid, c in campaigns.items():
+            yield {
+                **base,
+                "campaign": cid,
+                "status": (c.get("status") or "NEW").upper(),
+                "score": _num(c.get("score")),
+                "lastSentAt": _int(c.get("lastSentAt")),
+                "updatedAt": _int(c.get("updatedAt")),
+                "lastReply": c.get("lastReply") or "",
+            }
+
+def filter_rows(rows: List[Dict[str, Any]], campaign: Optional[str] = None,
+                statuses: Optional[Iterable[str]] = None, text: Optional[str] = None,
+                min_score: Optional[float] = None) -> List[Dict[str, Any]]:
+    """`text` matches email, company or website (case-insensitive substring)."""
+    wanted = {s.upper() for s in statuses} if statuses else None
+    needle = (text or "").strip().lower()
+    out = []
+    for r in rows:
+        if campaign and r["campaign"] != campaign:
+            continue
+        if wanted and r["status"] not in wanted:
+            continue
+        if min_score is not None and r["score"] < min_score:
+            continue
+        if needle and needle not in r["email"] and needle not in r["company"].lower() \
+                and needle not in r["website"].lower():
+            continue
+        out.append(r)
+    return out
+
+def sort_rows(rows: List[Dict[str, Any]], key: str = "score", descending: bool = True) -> List[Dict[str, Any]]:
+    """Stable sort; ties fall back to email so pages don't shuffle between reruns."""
+    if key not in SORT_KEYS:
+        raise ValueError(f"unknown sort key {key!r}; expected one of {sorted(SORT_KEYS)}")
+    rows = sorted(rows, key=lambda r: r["email"])
+    return sorted(rows, key=SORT_KEYS[key], reverse=descending)
+
+def paginate(rows: List[Dict[str, Any]], page: int = 1, page_size: int = 25) -> Dict[str, Any]:
+    """1-based `page`, clamped into range. Returns {"rows", "page", "pages", "total"}."""
+    page_size = max(1, int(page_size))
+    pages = max(1, -(-len(rows) // page_size))
+    page = min(max(1, int(page)), pages)
+    start = (page - 1) * page_size
+    return {"rows": rows[start:start + page_size], "page": page, "pages": pages, "total": len(rows)}
+
+def query(rows: List[Dict[str, Any]], campaign: Optional[str] = None, statuses: Optional[Iterable[str]] = None,
+          text: Optional[str] = None, min_score: Optional[float] = None, sort: str = "score",
+          descending: bool = True, page: int = 1, page_size: int = 25) -> Dict[str, Any]:
+    """filter -> sort -> paginate in one call."""
+    matched = filter_rows(rows, campaign, statuses, text, min_score)
+    return paginate(sort_rows(matched, sort, descending), page, page_size)
+
+def campaigns(rows: List[Dict[str, Any]]) -> List[str]:
+    return sorted({r["campaign"] for r in rows if r["campaign"]})
@@ -0,0 +1,36 @@
+# lambda_functions/lead_stats.py
+import campaign_stats
+from log import jlog
+from runtime import BadRequest, api_handler, query, resp
+
+@api_handler("lead_stats")
+def lambda_handler(event, context):
+    """
+    GET /leads/stats query string (all optional):
+      - campaign (str, default all campaigns) -> which campaign the funnel and daily series are for
+      - days (int, default 30, max campaign_stats.MAX_DAYS)
+    Response: {"campaigns": {campaign: {status: n}}, "funnel": [...], "daily": [...]}
+
+    Direct invoke {"action": "rebuild"} recomputes the totals from a full LeadsTable scan.
+    """
+    if event.get("action") == "rebuild":
+        from leads_store_dynamo import scan_leads
+        fresh = campaign_stats.rebuild(scan_leads())
+        jlog(op="lead_stats_rebuild", ok=True, campaigns=len(fresh))
+        return {"ok": True, "campaigns": fresh}
+
+    qs = query(event)
+    campaign = qs.get("campaign") or campaign_stats.ALL
+    try:
+        days = int(qs.get("days") or 30)
+    except ValueError:
+        raise BadRequest("days must be an integer")
+
+    totals = campaign_stats.totals()
+    return resp(200, {
+        "ok": True,
+        "campaign": campaign,
+        "campaigns": totals,
+        "funnel": campaign_stats.funnel(totals.get(campaign) or {}),
+        "daily": campaign_stats.daily(campaign, days),
+    })
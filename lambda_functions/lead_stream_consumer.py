@@ -0,0 +1,70 @@
+# lambda_functions/lead_stream_consumer.py
+"""
+DynamoDB Streams consumer for LeadsTable (NEW_AND_OLD_IMAGES).
+Diffs each lead's old and new payload and appends status changes / new replies
+to the change feed. Processing stops at the first record that fails, and that
+record is reported (ReportBatchItemFailures). Lambda then retries from it, so
+the records before it are not replayed, and the ones after it have not been
+touched yet.
+
+Status counters (campaign_stats) are summed over the records processed and
+written once at the end. If that write fails, the batch is retried from its
+first counted record.
+Campaigns entering SENT/NEUTRAL get a follow-up scheduled (follow_ups); leads
+that bounce or unsubscribe are added to the suppression list. New leads mark
+their store domain as known in the crawl frontier, so searches skip it.
+"""
+import time
+
+from boto3.dynamodb.types import TypeDeserializer
+
+import campaign_stats
+import crawl_frontier
+import follow_ups
+import suppression
+from change_feed import diff_lead, record_changes
+from log import jlog
+from runtime import event_handler
+
+_deser = TypeDeserializer()
+
+def _image(img: dict) -> dict:
+    return {k: _deser.deserialize(v) for k, v in (img or {}).items()}
+
+@event_handler("lead_stream_consumer")
+def lambda_handler(event, context):
+    recorded, failed = 0, None
+    counters, first_counted = {}, None
+    for rec in event.get("Records", []):
+        ddb = rec.get("dynamodb") or {}
+        try:
+            new, old = _image(ddb.get("NewImage")), _image(ddb.get("OldImage"))
+            if not str(new.get("pk") or old.get("pk") or "").startswith("LEAD#"):
+                continue
+            ts_ms = int(float(ddb.get("ApproximateCreationDateTime") or time.time()) * 1000)
+            events = diff_lead(old.get("data"), new.get("data"))
+            if events:
+                recorded += record_changes(events, ts_ms=ts_ms, seq=ddb.get("SequenceNumber"))
+            if new.get("data") and not old.get("data"):
+                crawl_frontier.from_lead(new["data"])
+            follow_ups.schedule(follow_ups.to_schedule(old.get("data"), new.get("data"), ts_ms))
+            blocked = suppression.from_lead_change(old.get("data"), new.get("data"))
+            if blocked:
+                suppression.add([new["data"]["email"]], blocked, source="lead_stream")
+            deltas = campaign_stats.status_deltas(old.get("data"), new.get("data"))
+            if deltas:
+                campaign_stats.accumulate(deltas, ts_ms, into=counters)
+                first_counted = first_counted or ddb.get("SequenceNumber")
+        except Exception as e:
+            jlog(op="lead_stream", ok=False, seq=ddb.get("SequenceNumber"), err=str(e))
+            failed = ddb.get("SequenceNumber")
+            break                       # later records would be replayed from here anyway
+    try:
+        counted = campaign_stats.apply(counters)
+    except Exception as e:
+        jlog(op="lead_stream_stats", ok=False, err=str(e))
+        counted = 0
+        failed = first_counted or failed
+    jlog(op="lead_stream", ok=failed is None, records=len(event.get("Records", [])), changes=recorded,
+         counters=counted, failed=int(failed is not None))
+    return {"batchItemFailures": [{"itemIdentifier": failed}] if failed is not None else []}
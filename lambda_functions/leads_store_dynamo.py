@@ -1,33 +1,340 @@
+"""
+LeadsTable access through the low-level DynamoDB client (clients.client), which
+is cheaper to build than a boto3 resource and skips its per-call wrapping.
+Items are marshalled with boto3's TypeSerializer/TypeDeserializer, so callers
+still get plain dicts with Decimal numbers, exactly as before.
+"""
 import os
 import time
-from typing import Any, Dict, Optional
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
 
-import boto3
 from botocore.exceptions import ClientError
 
-_TABLE = None
+from clients import client
+from log import span
 
-def _table():
-    global _TABLE
-    if _TABLE is not None:
-        return _TABLE
+BATCH_WRITE = 25          # BatchWriteItem limit
+UPDATE_WORKERS = 8        # concurrent UpdateItem calls for field-level writes
+ENRICHMENT_FIELDS = ("company", "profile", "signals", "fitScore", "intentScore")
+_CODEC = None
+
+def _codec():
+    global _CODEC
+    if _CODEC is None:
+        from boto3.dynamodb.types import TypeDeserializer, TypeSerializer
+        _CODEC = (TypeSerializer(), TypeDeserializer())
+    return _CODEC
+
+def _table_name() -> str:
     name = os.environ.get("LEADS_TABLE_NAME")
     if not name:
         raise RuntimeError("LEADS_TABLE_NAME env var not set")
-    _TABLE = boto3.resource("dynamodb").Table(name)
-    return _TABLE
+    return name
+
+def _ddb():
+    return client("dynamodb")
+
+def _key(email: str) -> Dict[str, Any]:
+    return {"pk": {"S": _pk(email)}}
+
+def _numbers(v: Any) -> Any:
+    """DynamoDB rejects float; scores and other computed numbers go in as Decimal."""
+    if isinstance(v, float):
+        return Decimal(str(v))
+    if isinstance(v, dict):
+        return {k: _numbers(x) for k, x in v.items()}
+    if isinstance(v, list):
+        return [_numbers(x) for x in v]
+    return v
+
+def _marshal(item: Dict[str, Any]) -> Dict[str, Any]:
+    ser = _codec()[0]
+    return {k: ser.serialize(_numbers(v)) for k, v in item.items()}
+
+def _unmarshal(attr: Optional[Dict[str, Any]]) -> Any:
+    return _codec()[1].deserialize(attr) if attr is not None else None
 
 def _pk(email: str) -> str:
     return f"LEAD#{email.lower()}"
 
+@span("store.get_lead")
 def get_lead(email: str) -> Optional[Dict[str, Any]]:
     try:
-        res = _table().get_item(Key={"pk": _pk(email)})
+        res = _ddb().get_item(TableName=_table_name(), Key=_key(email), ProjectionExpression="#d",
+                              ExpressionAttributeNames={"#d": "data"})
     except ClientError:
         return None
-    item = res.get("Item")
-    return item.get("data") if item else None
+    return _unmarshal((res.get("Item") or {}).get("data"))
+
+@span("store.batch_get_leads")
+def batch_get_leads(emails: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+    """Fetch many leads with BatchGetItem (100 keys per call). Returns {email: data}."""
+    name = _table_name()
+    keys = [_key(e) for e in dict.fromkeys((e or "").lower() for e in emails) if e]
+    out: Dict[str, Dict[str, Any]] = {}
+    for i in range(0, len(keys), 100):
+        request = {name: {"Keys": keys[i:i + 100], "ProjectionExpression": "email, #d",
+                          "ExpressionAttributeNames": {"#d": "data"}}}
+        while request:
+            res = _ddb().batch_get_item(RequestItems=request)
+            for item in res.get("Responses", {}).get(name, []):
+                if item.get("data") is not None:
+                    out[_unmarshal(item["email"])] = _unmarshal(item["data"])
+            request = res.get("UnprocessedKeys") or None
+    return out
+
+def scan_leads(page_size: int = 500, segment: Optional[int] = None,
+               total_segments: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+    """Yield every lead payload (or one parallel-scan segment's), one Scan page at a time."""
+    kwargs: Dict[str, Any] = {"TableName": _table_name(), "Limit": page_size,
+                              "ProjectionExpression": "#d", "ExpressionAttributeNames": {"#d": "data"}}
+    if total_segments:
+        kwargs.update(Segment=segment, TotalSegments=total_segments)
+    while True:
+        res = _ddb().scan(**kwargs)
+        for item in res.get("Items", []):
+            if item.get("data") is not None:
+                yield _unmarshal(item["data"])
+        if "LastEvaluatedKey" not in res:
+            return
+        kwargs["ExclusiveStartKey"] = res["LastEvaluatedKey"]
+
+def parallel_scan_leads(segments: int = 4, page_size: int = 500, ahead: int = 2) -> Iterator[Dict[str, Any]]:
+    """
+    scan_leads over `segments` parallel Scan segments, one thread each. Pages
+    are handed over through a queue of `ahead` pages per segment, so memory
+    stays bounded however big the table is; order across segments is arbitrary.
+    Closing the generator stops the scanners at their next page.
+    """
+    if segments <= 1:
+        yield from scan_leads(page_size)
+        return
+    import queue, threading
+    pages: "queue.Queue" = queue.Queue(maxsize=segments * ahead)
+    stop = threading.Event()
+    done = object()
+
+    def put(x) -> bool:
+        while not stop.is_set():
+            try:
+                pages.put(x, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def scanner(segment: int) -> None:
+        try:
+            page = []
+            for lead in scan_leads(page_size, segment, segments):
+                page.append(lead)
+                if len(page) >= page_size:
+                    if not put(page):
+                        return
+                    page = []
+            put(page)
+        except Exception as e:
+            put(e)
+        finally:
+            put(done)
+
+    threads = [threading.Thread(target=scanner, args=(i,), daemon=True) for i in range(segments)]
+    for t in threads:
+        t.start()
+    try:
+        running = segments
+        while running:
+            got = pages.get()
+            if got is done:
+                running -= 1
+            elif isinstance(got, Exception):
+                raise got
+            else:
+                yield from got
+    finally:
+        stop.set()
+
+@span("store.put_leads")
+def put_leads(leads: List[Dict[str, Any]]) -> int:
+    """
+    Batched write of already-merged lead payloads (e.g. read via batch_get_leads).
+    Unlike upsert_lead this does not re-read each item, so callers own the merge.
+    """
+    now = int(time.time())
+    # one write per key (BatchWriteItem rejects duplicates); the last payload wins
+    items = {}
+    for lead in leads:
+        email = (lead.get("email") or "").lower()
+        if email:
+            items[email] = {"PutRequest": {"Item": _marshal(
+                {"pk": _pk(email), "email": email, "data": lead, "updatedAt": now})}}
+    name, pending = _table_name(), list(items.values())
+    for i in range(0, len(pending), BATCH_WRITE):
+        request, attempt = {name: pending[i:i + BATCH_WRITE]}, 0
+        while request:
+            request = _ddb().batch_write_item(RequestItems=request).get("UnprocessedItems") or None
+            if request:
+                attempt += 1
+                time.sleep(min(2.0, 0.05 * 2 ** attempt))
+    return len(items)
+
+def _conditional_failed(e: ClientError) -> bool:
+    return e.response.get("Error", {}).get("Code") == "ConditionalCheckFailedException"
+
+def _set_data(email: str, fields: Dict[Tuple[str, ...], Any],
+              exists: Iterable[Tuple[str, ...]] = (), absent: Iterable[Tuple[str, ...]] = (),
+              equals: Optional[Dict[Tuple[str, ...], Any]] = None) -> bool:
+    """
+    SET the given paths inside 'data' (plus updatedAt) on a stored lead, leaving
+    the rest of the payload alone. The paths in `exists`/`absent` must (not) be
+    there already, and those in `equals` must hold those values. Returns False
+    if the lead isn't stored or a condition fails.
+    """
+    names, values, sets = {"#d": "data"}, {":u": int(time.time())}, ["updatedAt = :u"]
+
+    def path_expr(prefix: str, path: Tuple[str, ...]) -> str:
+        for j, part in enumerate(path):
+            names[f"#{prefix}_{j}"] = part
+        return "#d." + ".".join(f"#{prefix}_{j}" for j in range(len(path)))
+
+    for i, (path, value) in enumerate(fields.items()):
+        values[f":v{i}"] = value
+        sets.append(f"{path_expr(f'f{i}', path)} = :v{i}")
+    conditions = ["attribute_exists(pk)"]
+    conditions += [f"attribute_exists({path_expr(f'e{i}', p)})" for i, p in enumerate(exists)]
+    conditions += [f"attribute_not_exists({path_expr(f'a{i}', p)})" for i, p in enumerate(absent)]
+    for i, (path, value) in enumerate((equals or {}).items()):
+        values[f":q{i}"] = value
+        conditions.append(f"{path_expr(f'q{i}', path)} = :q{i}")
+    try:
+        _ddb().update_item(TableName=_table_name(), Key=_key(email), UpdateExpression="SET " + ", ".join(sets),
+                           ConditionExpression=" AND ".join(conditions), ExpressionAttributeNames=names,
+                           ExpressionAttributeValues=_marshal(values))
+    except ClientError as e:
+        if _conditional_failed(e):
+            return False
+        raise
+    return True
+
+def _set_new_key(email: str, parent: Tuple[str, ...], key: str, value: Any,
+                 also: Optional[Dict[Tuple[str, ...], Any]] = None) -> bool:
+    """SET data.<parent>.<key> (and `also`) unless the key is there already, creating the parent map if needed."""
+    also = also or {}
+    return (_set_data(email, {**also, (*parent, key): value}, exists=[parent], absent=[(*parent, key)])
+            or _set_data(email, {**also, parent: {key: value}}, absent=[parent]))
+
+def _put_new(lead: Dict[str, Any]) -> bool:
+    """Put a lead that isn't stored yet; False if someone else stored it first."""
+    email = lead["email"].lower()
+    try:
+        _ddb().put_item(TableName=_table_name(), ConditionExpression="attribute_not_exists(pk)",
+                        Item=_marshal({"pk": _pk(email), "email": email, "data": lead, "updatedAt": int(time.time())}))
+    except ClientError as e:
+        if _conditional_failed(e):
+            return False
+        raise
+    return True
+
+def _each(fn, items: List[Any]) -> int:
+    if not items:
+        return 0
+    with ThreadPoolExecutor(max_workers=min(UPDATE_WORKERS, len(items))) as pool:
+        return sum(1 for ok in pool.map(fn, items) if ok)
+
+@span("store.update_enrichment")
+def update_enrichment(leads: List[Dict[str, Any]]) -> int:
+    """
+    Write enrichment results without a read-modify-write of the whole payload.
+    Of each lead only the ENRICHMENT_FIELDS it carries and its campaigns'
+    scores are SET, so campaign statuses written since the lead was read are
+    kept. A lead not stored yet is put whole (conditionally); returns the leads written.
+    """
+    def one(lead: Dict[str, Any]) -> bool:
+        fields = {(f,): lead[f] for f in ENRICHMENT_FIELDS if f in lead}
+        for cid, c in (lead.get("campaigns") or {}).items():
+            if "score" in c:
+                fields[("campaigns", cid, "score")] = c["score"]
+        for _ in range(3):                  # stored in between: update instead, and the other way round
+            if _set_data(lead["email"], fields) or _put_new(lead):
+                return True
+        return False
+    return _each(one, [l for l in leads if l.get("email")])
+
+@span("store.add_campaigns")
+def add_campaigns(additions: List[Tuple[Dict[str, Any], str]]) -> int:
+    """
+    Add one campaign node to stored leads ((merged lead, campaign_id) pairs)
+    without rewriting the rest of the payload. company/aliases are SET with it,
+    and profile.website if the lead has none. A lead that joined the campaign
+    since it was read is left alone, so its status there is never reset.
+    Returns the leads that got the campaign.
+    """
+    def one(pair: Tuple[Dict[str, Any], str]) -> bool:
+        lead, cid = pair
+        also = {(f,): lead[f] for f in ("company", "aliases") if f in lead}
+        if not _set_new_key(lead["email"], ("campaigns",), cid, lead["campaigns"][cid], also):
+            return False
+        website = (lead.get("profile") or {}).get("website")
+        if website:
+            _set_new_key(lead["email"], ("profile",), "website", website)
+        return True
+    return _each(one, list(additions))
+
+@span("store.put_new_leads")
+def put_new_leads(leads: List[Dict[str, Any]]) -> List[bool]:
+    """
+    Put leads that weren't stored when read, each on the condition that it still
+    isn't. Returns, in order, whether each one was put; a False means someone
+    stored that lead in between and the caller should re-read and merge.
+    """
+    if not leads:
+        return []
+    with ThreadPoolExecutor(max_workers=min(UPDATE_WORKERS, len(leads))) as pool:
+        return list(pool.map(_put_new, leads))
+
+@span("store.set_campaigns")
+def set_campaigns(pairs: List[Tuple[Dict[str, Any], str]]) -> int:
+    """
+    Write one campaign node of stored leads ((merged lead, campaign_id) pairs)
+    field by field: its keys are SET over what is stored, so other keys on the
+    node (score, followUps) and the lead's other campaigns are kept. The node is
+    added if the lead isn't in the campaign; company/aliases are SET with it.
+    Returns the leads written.
+    """
+    def one(pair: Tuple[Dict[str, Any], str]) -> bool:
+        lead, cid = pair
+        also = {(f,): lead[f] for f in ("company", "aliases") if f in lead}
+        node = lead["campaigns"][cid]
+        return (_set_data(lead["email"], {**also, **{("campaigns", cid, k): v for k, v in node.items()}},
+                          exists=[("campaigns", cid)])
+                or _set_new_key(lead["email"], ("campaigns",), cid, node, also))
+    return _each(one, list(pairs))
+
+@span("store.update_campaigns")
+def update_campaigns(updates: List[Tuple[str, str, Dict[str, Any], Dict[str, Any]]]) -> List[bool]:
+    """
+    SET fields on campaign nodes without rewriting the lead. Each update is
+    (email, campaign_id, {field: value}, {field: value expected}); an update
+    whose expected values no longer hold (say the status moved on since the
+    read) is not applied. Returns, in order, whether each one was.
+    """
+    def one(u: Tuple[str, str, Dict[str, Any], Dict[str, Any]]) -> bool:
+        email, cid, fields, expect = u
+        return _set_data(email, {("campaigns", cid, k): v for k, v in fields.items()},
+                         equals={("campaigns", cid, k): v for k, v in expect.items()})
+    if not updates:
+        return []
+    with ThreadPoolExecutor(max_workers=min(UPDATE_WORKERS, len(updates))) as pool:
+        return list(pool.map(one, updates))
+
+@span("store.touch_profiles")
+def touch_profiles(profiles: Dict[str, Dict[str, Any]]) -> int:
+    """SET a few profile keys ({email: {key: value}}), e.g. fetchedAt/etag after an unchanged fetch."""
+    return _each(lambda kv: _set_data(kv[0], {("profile", k): v for k, v in kv[1].items()}), list(profiles.items()))
 
+@span("store.upsert_lead")
 def upsert_lead(lead: Dict[str, Any]) -> Dict[str, Any]:
     """Stores the lead dict under attribute 'data' to keep a simple item shape."""
     now = int(time.time())
@@ -71,9 +378,10 @@ def upsert_lead(lead: Dict[str, Any]) -> Dict[str, Any]:
         "data": lead,          # canonical payload lives under 'data'
         "updatedAt": now,
     }
-    _table().put_item(Item=item)
+    _ddb().put_item(TableName=_table_name(), Item=_marshal(item))
     return {"ok": True, "email": email, "updatedAt": now}
 
+@span("store.update_status")
 def update_status(email: str, campaign_id: str, status: Optional[str], reply_text: Optional[str]) -> Dict[str, Any]:
     """Read-modify-write against the 'data' payload for consistency."""
     email = (email or "").lower()
@@ -90,6 +398,7 @@ def update_status(email: str, campaign_id: str, status: Optional[str], reply_tex
     upsert_lead(lead)
     return {"ok": True, "lead": lead}
 
+@span("store.update_send_metadata")
 def update_send_metadata(email: str, campaign_id: str, message_id: str, sent_at: int):
     """
     Save SES MessageId + lastSentAt on the lead's campaign node within 'data'.
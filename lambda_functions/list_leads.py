@@ -0,0 +1,54 @@
+# lambda_functions/list_leads.py
+import os, time, threading
+
+from leads_store_dynamo import scan_leads
+from lead_query import campaigns, flatten, query, SORT_KEYS
+from log import jlog
+from runtime import BadRequest, api_handler, query as query_string, resp
+
+# A warm container reuses one table scan for this long across list requests
+CACHE_SECONDS = int(os.environ.get("LEADS_LIST_CACHE_SECONDS") or 30)
+# fresh=1 is open to any caller, so it still reuses a scan younger than this
+FRESH_MIN_SECONDS = int(os.environ.get("LEADS_LIST_FRESH_MIN_SECONDS") or 5)
+MAX_PAGE_SIZE = 200
+
+_ROWS = None
+_ROWS_AT = 0.0
+_lock = threading.Lock()
+
+def lead_rows(max_age: float = CACHE_SECONDS) -> list:
+    """Flattened rows for every lead, rescanned at most every `max_age` seconds."""
+    global _ROWS, _ROWS_AT
+    with _lock:
+        if _ROWS is None or time.monotonic() - _ROWS_AT > max_age:
+            _ROWS = flatten(scan_leads())
+            _ROWS_AT = time.monotonic()
+        return _ROWS
+
+@api_handler("list_leads")
+def lambda_handler(event, context):
+    """
+    GET /leads/list query string (all optional):
+      - campaign (str), status (comma-separated), q (text search), minScore (number)
+      - sort (score|fit|intent|status|company|updated|sent, default score), order (asc|desc)
+      - page (1-based), pageSize (default 25, max MAX_PAGE_SIZE)
+      - fresh=1 -> rescan unless the cached scan is under FRESH_MIN_SECONDS old
+    """
+    qs = query_string(event)
+    sort = (qs.get("sort") or "score").lower()
+    if sort not in SORT_KEYS:
+        raise BadRequest(f"sort must be one of {sorted(SORT_KEYS)}")
+    try:
+        page = int(qs.get("page") or 1)
+        page_size = min(MAX_PAGE_SIZE, int(qs.get("pageSize") or 25))
+        min_score = float(qs["minScore"]) if qs.get("minScore") else None
+    except ValueError:
+        raise BadRequest("page, pageSize and minScore must be numbers")
+
+    rows = lead_rows(FRESH_MIN_SECONDS if qs.get("fresh") == "1" else CACHE_SECONDS)
+    statuses = [s.strip().upper() for s in (qs.get("status") or "").split(",") if s.strip()]
+    res = query(rows, campaign=qs.get("campaign") or None, statuses=statuses, text=qs.get("q"),
+                min_score=min_score, sort=sort, descending=(qs.get("order") or "desc").lower() != "asc",
+                page=page, page_size=page_size)
+    jlog(op="list_leads", ok=True, total=res["total"], page=res["page"], cached=len(rows))
+    return resp(200, {"ok": True, **res, "campaigns": campaigns(rows)})
@@ -1,7 +1,143 @@
 # lambda_functions/log.py
-import json, sys, time
+"""
+Structured logs and per-invocation metrics.
+
+    jlog(op="store_lead", ok=True, email=email)       # one JSON line on stderr
+
+    with span("ses.send"):                             # timed; also usable as a decorator
+        ses.send_email(...)
+
+Inside an invocation (runtime.api_handler / event_handler call begin() and
+end()):
+- every line carries requestId and handler
+- lines are buffered and written with one stderr write at end(), not one
+  print per record
+- successful lines are sampled per invocation (LOG_SAMPLE_RATE, default 1).
+  Lines with ok=False or an err are always kept
+- end() writes one summary line (op="request"): status, ms, cpuMs, coldStart
+  and per-span {n, ms, maxMs}. With LOG_EMF=1 the line is also in CloudWatch
+  Embedded Metric Format, so latency and every span's durations become metrics
+  (p50/p99 per handler and operation) without a separate put_metric_data call
+Outside an invocation (scripts, tests) jlog writes immediately and is never sampled.
+"""
+import contextlib, copy, json, os, random, sys, threading, time
+
+SAMPLE_RATE = float(os.environ.get("LOG_SAMPLE_RATE") or 1.0)
+EMF = os.environ.get("LOG_EMF", "0").lower() in ("1", "true", "yes")
+NAMESPACE = os.environ.get("LOG_METRICS_NAMESPACE") or "AwsAIAgent"
+MAX_BUFFER = 1000          # flush early past this many lines so a huge batch can't hold them all
+MAX_EMF_VALUES = 100       # CloudWatch limit per metric array
+
+_lock = threading.Lock()
+_cold = True
+_inv: dict | None = None   # current invocation; shared with worker threads (one invocation per container)
+_buf: list[str] = []
+
+def _dumps(payload: dict) -> str:
+    return json.dumps(payload, ensure_ascii=False, default=str, separators=(",", ":"))
+
+def _write(lines: list[str]) -> None:
+    if lines:
+        sys.stderr.write("\n".join(lines) + "\n")
+        sys.stderr.flush()
+
+def flush() -> None:
+    with _lock:
+        lines = _buf[:]
+        _buf.clear()
+    _write(lines)
 
 def jlog(**kwargs):
     # Print to stderr so it shows up clearly in CloudWatch later too
-    payload = {"ts": int(time.time()), **kwargs}
-    print(json.dumps(payload, ensure_ascii=False), file=sys.stderr)
+    inv = _inv
+    if inv is None:
+        _write([_dumps({"ts": int(time.time()), **kwargs})])
+        return
+    if not inv["sampled"] and kwargs.get("ok") is not False and "err" not in kwargs:
+        return
+    line = _dumps({"ts": int(time.time()), "requestId": inv["requestId"], "handler": inv["handler"], **kwargs})
+    with _lock:
+        _buf.append(line)
+        full = len(_buf) >= MAX_BUFFER
+    if full:
+        flush()
+
+class span(contextlib.ContextDecorator):
+    """Time a block (or, as a decorator, each call). Failures are logged; durations go to the request line."""
+
+    def __init__(self, op: str, **fields):
+        self.op, self.fields = op, fields
+
+    def _recreate_cm(self):
+        return copy.copy(self)      # decorator use: a fresh timer per call, safe across threads
+
+    def __enter__(self):
+        self.t0, self.c0 = time.perf_counter(), time.thread_time()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        ms = (time.perf_counter() - self.t0) * 1000
+        inv = _inv
+        if inv is not None:
+            cpu_ms = (time.thread_time() - self.c0) * 1000
+            with _lock:
+                inv["spans"].setdefault(self.op, []).append((ms, cpu_ms))
+        if exc is not None:
+            jlog(op=self.op, ok=False, ms=round(ms, 1), err=str(exc), **self.fields)
+        return False
+
+def begin(handler: str, context=None) -> None:
+    """Start an invocation: context for every line, a fresh sampling decision, empty span timings."""
+    global _inv, _cold
+    with _lock:
+        _inv = {
+            "handler": handler,
+            "requestId": getattr(context, "aws_request_id", None),
+            "coldStart": _cold,
+            "sampled": SAMPLE_RATE >= 1 or random.random() < SAMPLE_RATE,
+            "spans": {},
+        }
+        _cold = False
+
+def spans() -> dict:
+    """{op: [(wall_ms, cpu_ms), ...]} recorded so far in the current invocation."""
+    inv = _inv
+    if inv is None:
+        return {}
+    with _lock:
+        return {op: list(v) for op, v in inv["spans"].items()}
+
+def end(status=None, ms: float = 0.0, cpu_ms: float = 0.0, err: str | None = None, **extra) -> None:
+    """Write the invocation summary (EMF when enabled, plus any `extra` fields) and flush the buffered lines."""
+    global _inv
+    with _lock:
+        inv, _inv = _inv, None
+    if inv is None:
+        return
+    timings = {op: {"n": len(v), "ms": round(sum(w for w, _ in v), 1), "maxMs": round(max(w for w, _ in v), 1)}
+               for op, v in inv["spans"].items()}
+    line = {"ts": int(time.time()), "op": "request", "requestId": inv["requestId"], "handler": inv["handler"],
+            "status": status, "ms": round(ms, 1), "cpuMs": round(cpu_ms, 1), "coldStart": inv["coldStart"],
+            **({"spans": timings} if timings else {}), **({"err": err} if err else {}), **extra}
+    if EMF:
+        line.update(_emf(inv, ms, cpu_ms, err))
+    with _lock:
+        _buf.append(_dumps(line))
+    flush()
+
+def _emf(inv: dict, ms: float, cpu_ms: float, err: str | None) -> dict:
+    metrics = [{"Name": "latencyMs", "Unit": "Milliseconds"}, {"Name": "cpuMs", "Unit": "Milliseconds"},
+               {"Name": "errors", "Unit": "Count"}, {"Name": "coldStarts", "Unit": "Count"}]
+    values = {"latencyMs": round(ms, 1), "cpuMs": round(cpu_ms, 1),
+              "errors": 1 if err else 0, "coldStarts": 1 if inv["coldStart"] else 0}
+    for op, durations in inv["spans"].items():
+        name = f"{op}Ms"
+        metrics.append({"Name": name, "Unit": "Milliseconds"})
+        values[name] = [round(w, 1) for w, _ in durations[:MAX_EMF_VALUES]]
+    return {
+        "_aws": {
+            "Timestamp": int(time.time() * 1000),
+            "CloudWatchMetrics": [{"Namespace": NAMESPACE, "Dimensions": [["handler"]], "Metrics": metrics}],
+        },
+        **values,
+    }
@@ -0,0 +1,165 @@
+# lambda_functions/page_archive.py
+"""
+Record/replay for requests.Session, so crawlers can be benchmarked offline.
+
+    archive = PageArchive("crawl.jsonl.gz")
+    record(session, archive)    # live traffic, captured into the archive
+    ...
+    archive.save()
+
+    replay(session, PageArchive.load("crawl.jsonl.gz"), latency=0.05)   # no network
+
+The archive is gzipped JSON lines, one response per line. Bodies are stored
+decoded (after gzip/br), base64 encoded.
+
+Set CRAWL_ARCHIVE=<path> and CRAWL_ARCHIVE_MODE=record|replay to have
+install_from_env() wire this into the crawler sessions without code changes.
+"""
+import atexit, base64, gzip, io, json, os, random, threading, time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3 import HTTPResponse
+
+# headers that describe the wire encoding, not the stored (decoded) body
+_DROP_HEADERS = {"content-encoding", "transfer-encoding", "content-length", "connection"}
+
+class PageArchive:
+    def __init__(self, path: str | None = None):
+        self.path = path
+        self.entries: dict[str, dict] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(method: str, url: str) -> str:
+        return f"{method.upper()} {url}"
+
+    @classmethod
+    def load(cls, path: str) -> "PageArchive":
+        archive = cls(path)
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    e = json.loads(line)
+                    archive.entries[cls.key(e["method"], e["url"])] = e
+        return archive
+
+    def add(self, url: str, body: bytes | str, status: int = 200, headers: dict | None = None,
+            method: str = "GET", elapsed: float = 0.0) -> None:
+        if isinstance(body, str):
+            body = body.encode("utf-8")
+        url = requests.Request(method, url).prepare().url  # same form the adapter sees at send()
+        headers = {k: v for k, v in (headers or {"Content-Type": "text/html; charset=utf-8"}).items()
+                   if k.lower() not in _DROP_HEADERS}
+        entry = {"method": method.upper(), "url": url, "status": status, "headers": headers,
+                 "body": base64.b64encode(body).decode("ascii"), "elapsed": round(elapsed, 4)}
+        with self._lock:
+            self.entries[self.key(method, url)] = entry
+
+    def get(self, method: str, url: str) -> dict | None:
+        return self.entries.get(self.key(method, url))
+
+    def save(self, path: str | None = None) -> str:
+        path = path or self.path
+        tmp = path + ".tmp"
+        with self._lock, gzip.open(tmp, "wt", encoding="utf-8") as f:
+            for e in self.entries.values():
+                f.write(json.dumps(e) + "\n")
+        os.replace(tmp, path)
+        return path
+
+class _ArchiveAdapter(HTTPAdapter):
+    """Shared plumbing: build a normal requests.Response from an archive entry."""
+
+    def __init__(self, archive: PageArchive, **kwargs):
+        super().__init__(**kwargs)
+        self.archive = archive
+        self.stats = {"requests": 0, "bytes": 0, "misses": 0, "fetch_wall": 0.0, "fetch_cpu": 0.0}
+        self._stats_lock = threading.Lock()
+
+    def _count(self, nbytes: int, wall: float, cpu: float, miss: bool = False) -> None:
+        with self._stats_lock:
+            self.stats["requests"] += 1
+            self.stats["bytes"] += nbytes
+            self.stats["fetch_wall"] += wall
+            self.stats["fetch_cpu"] += cpu
+            self.stats["misses"] += int(miss)
+
+    def _response(self, request, entry: dict) -> tuple[requests.Response, int]:
+        body = base64.b64decode(entry["body"])
+        raw = HTTPResponse(body=io.BytesIO(body), headers=entry["headers"], status=entry["status"],
+                           preload_content=False, decode_content=False, request_url=request.url)
+        # body stays unread so callers can still stream from resp.raw
+        return self.build_response(request, raw), len(body)
+
+class RecordingAdapter(_ArchiveAdapter):
+    """Performs real requests and captures every response into the archive."""
+
+    def send(self, request, **kwargs):
+        started, cpu = time.perf_counter(), time.thread_time()
+        kwargs["stream"] = True
+        resp = super().send(request, **kwargs)
+        body = resp.content
+        elapsed = time.perf_counter() - started
+        self.archive.add(request.url, body, resp.status_code, dict(resp.headers), request.method, elapsed)
+        self._count(len(body), elapsed, time.thread_time() - cpu)
+        return self._response(request, self.archive.get(request.method, request.url))[0]
+
+class ReplayAdapter(_ArchiveAdapter):
+    """
+    Serves responses from the archive with no network. `latency` seconds (plus up to
+    `jitter`) are slept per request; `use_recorded=True` replays each page's recorded time.
+    Unknown URLs return 404 unless `strict`, which raises ConnectionError like a dead host.
+    """
+
+    def __init__(self, archive: PageArchive, latency: float = 0.0, jitter: float = 0.0,
+                 use_recorded: bool = False, strict: bool = False, **kwargs):
+        super().__init__(archive, **kwargs)
+        self.latency, self.jitter = latency, jitter
+        self.use_recorded, self.strict = use_recorded, strict
+
+    def send(self, request, **kwargs):
+        started, cpu = time.perf_counter(), time.thread_time()
+        entry = self.archive.get(request.method, request.url)
+        delay = (entry or {}).get("elapsed", 0.0) if self.use_recorded else self.latency
+        delay += random.uniform(0, self.jitter) if self.jitter else 0.0
+        if delay > 0:
+            time.sleep(delay)
+        if entry is None:
+            self._count(0, time.perf_counter() - started, time.thread_time() - cpu, miss=True)
+            if self.strict:
+                raise requests.ConnectionError(f"not in archive: {request.url}")
+            return self._response(request, {"status": 404, "headers": {}, "body": ""})[0]
+        resp, nbytes = self._response(request, entry)
+        self._count(nbytes, time.perf_counter() - started, time.thread_time() - cpu)
+        return resp
+
+def _install(session: requests.Session, adapter: HTTPAdapter) -> HTTPAdapter:
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return adapter
+
+def record(session: requests.Session, archive: PageArchive) -> RecordingAdapter:
+    return _install(session, RecordingAdapter(archive))
+
+def replay(session: requests.Session, archive: PageArchive, **kwargs) -> ReplayAdapter:
+    return _install(session, ReplayAdapter(archive, **kwargs))
+
+_ENV_ARCHIVE: PageArchive | None = None
+
+def install_from_env(session: requests.Session) -> HTTPAdapter | None:
+    """Honour CRAWL_ARCHIVE / CRAWL_ARCHIVE_MODE / CRAWL_REPLAY_LATENCY_MS, if set."""
+    global _ENV_ARCHIVE
+    path = os.environ.get("CRAWL_ARCHIVE")
+    if not path:
+        return None
+    mode = (os.environ.get("CRAWL_ARCHIVE_MODE") or "replay").lower()
+    if mode == "record":
+        if _ENV_ARCHIVE is None:
+            _ENV_ARCHIVE = PageArchive.load(path) if os.path.exists(path) else PageArchive(path)
+            atexit.register(_ENV_ARCHIVE.save)
+        return record(session, _ENV_ARCHIVE)
+    if _ENV_ARCHIVE is None:
+        _ENV_ARCHIVE = PageArchive.load(path)
+    latency = float(os.environ.get("CRAWL_REPLAY_LATENCY_MS") or 0) / 1000.0
+    return replay(session, _ENV_ARCHIVE, latency=latency)
@@ -0,0 +1,142 @@
+# lambda_functions/profiling.py
+"""
+Opt-in per-invocation profiling for the handlers wrapped by runtime.py.
+
+PROFILE=1 adds a "profile" block to each invocation's op="request" log line:
+  wallMs / cpuMs  - the whole invocation
+  stages          - log.span() timings per op (store.*, ses.send, bedrock.invoke,
+                    http.*, parse.*) with wall and CPU ms, slowest first
+  otherMs         - wall time outside any stage (handler code, parsing not
+                    under a span). Stages that overlap in worker threads can add
+                    up to more than wallMs, in which case this is 0
+  aws             - per "service.Operation": attempts (retries included), request
+                    and response bytes, from botocore's before-send/after-call hooks
+PROFILE_DUMP=cprofile|pyinstrument also records a profile of the invoking
+thread and writes it to PROFILE_OUTPUT: a local directory (default
+/tmp/profiles) or s3://bucket/prefix. pyinstrument is optional.
+
+invoke_local.py (repo root) runs any handler with a sample event and prints the breakdown.
+"""
+import os, threading, time
+
+try:
+    import pyinstrument
+except Exception:
+    pyinstrument = None
+
+import clients
+import log
+
+ENABLED = os.environ.get("PROFILE", "0").lower() in ("1", "true", "yes")
+DUMP = (os.environ.get("PROFILE_DUMP") or "").lower()
+OUTPUT = os.environ.get("PROFILE_OUTPUT") or "/tmp/profiles"
+
+_lock = threading.Lock()
+_aws: dict = {}
+_installed = False
+_last: dict | None = None
+
+def _service_op(event_name: str) -> str:
+    return event_name.split(".", 1)[1] if "." in event_name else event_name
+
+def _count(key: str, **add) -> None:
+    with _lock:
+        c = _aws.setdefault(key, {"calls": 0, "bytesOut": 0, "bytesIn": 0})
+        for k, v in add.items():
+            c[k] += v
+
+def _before_send(request=None, event_name: str = "", **kwargs):
+    body = getattr(request, "body", None)
+    _count(_service_op(event_name), calls=1, bytesOut=len(body) if isinstance(body, (bytes, str)) else 0)
+
+def _after_call(http_response=None, event_name: str = "", **kwargs):
+    _count(_service_op(event_name), bytesIn=len(getattr(http_response, "content", b"") or b""))
+
+def instrument(client) -> None:
+    """Count calls and bytes for one botocore client (or a resource's meta.client)."""
+    events = client.meta.events
+    events.register("before-send", _before_send, unique_id="profiling-before-send")
+    events.register("after-call", _after_call, unique_id="profiling-after-call")
+
+def install() -> None:
+    global _installed
+    if not _installed:
+        clients.on_create(instrument)
+        _installed = True
+
+class _Profile:
+    def __init__(self, handler: str):
+        self.handler = handler
+        self.profiler = None
+        with _lock:
+            _aws.clear()
+        try:
+            if DUMP == "cprofile":
+                import cProfile
+                self.profiler = cProfile.Profile()
+                self.profiler.enable()
+            elif DUMP == "pyinstrument":
+                if pyinstrument is None:
+                    raise RuntimeError("PROFILE_DUMP=pyinstrument but pyinstrument is not installed")
+                self.profiler = pyinstrument.Profiler()
+                self.profiler.start()
+        except (ValueError, RuntimeError) as e:      # e.g. another profiler already active
+            log.jlog(op="profile_start", ok=False, err=str(e))
+            self.profiler = None
+
+def start(handler: str) -> "_Profile | None":
+    if not ENABLED:
+        return None
+    install()
+    return _Profile(handler)
+
+def stop(prof: "_Profile | None", wall_ms: float, cpu_ms: float, context=None) -> dict | None:
+    """Finish `prof` and return its report (also kept for last_report())."""
+    global _last
+    if prof is None:
+        return None
+    dump = _dump(prof, getattr(context, "aws_request_id", None)) if prof.profiler is not None else None
+    stages = {}
+    for op, samples in sorted(log.spans().items(), key=lambda kv: -sum(w for w, _ in kv[1])):
+        stages[op] = {"n": len(samples), "ms": round(sum(w for w, _ in samples), 1),
+                      "cpuMs": round(sum(c for _, c in samples), 1)}
+    with _lock:
+        aws = {k: dict(v) for k, v in sorted(_aws.items())}
+    _last = {
+        "wallMs": round(wall_ms, 1),
+        "cpuMs": round(cpu_ms, 1),
+        "stages": stages,
+        "otherMs": round(max(0.0, wall_ms - sum(s["ms"] for s in stages.values())), 1),
+        "aws": aws,
+        **({"dump": dump} if dump else {}),
+    }
+    return _last
+
+def last_report() -> dict | None:
+    return _last
+
+def _dump(prof: _Profile, request_id: str | None) -> str | None:
+    ext = "prof" if DUMP == "cprofile" else "html"
+    name = f"{prof.handler}-{int(time.time() * 1000)}-{request_id or 'local'}.{ext}"
+    try:
+        if DUMP == "cprofile":
+            prof.profiler.disable()
+        else:
+            prof.profiler.stop()
+        local_dir = "/tmp/profiles" if OUTPUT.startswith("s3://") else OUTPUT
+        os.makedirs(local_dir, exist_ok=True)
+        path = os.path.join(local_dir, name)
+        if DUMP == "cprofile":
+            prof.profiler.dump_stats(path)
+        else:
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(prof.profiler.output_html())
+        if not OUTPUT.startswith("s3://"):
+            return path
+        bucket, _, prefix = OUTPUT[len("s3://"):].partition("/")
+        key = f"{prefix.rstrip('/')}/{name}" if prefix else name
+        clients.client("s3").upload_file(path, bucket, key)
+        return f"s3://{bucket}/{key}"
+    except Exception as e:
+        log.jlog(op="profile_dump", ok=False, err=str(e))
+        return None
@@ -0,0 +1,230 @@
+# lambda_functions/runtime.py
+"""
+Request/response plumbing shared by the API handlers.
+
+    SCHEMA = Schema(
+        Field("email", required=True, lower=True),
+        Field("campaign_id", aliases=("campaignId",), required=True),
+        Field("limit", int, default=10),
+        missing="Missing required fields: email, campaign_id",
+    )
+
+    @api_handler("store_lead")
+    def lambda_handler(event, context):
+        req = SCHEMA.validate(body(event))    # BadRequest -> 400
+        return resp(200, {"ok": True, ...})
+
+- body(): API Gateway body as a dict (str/bytes, base64, gzip Content-Encoding)
+- Schema: field specs are compiled to one validator per schema at import time,
+  so a request pays a single pass over its fields
+- dumps(): orjson when installed, stdlib json otherwise. Decimals from DynamoDB
+  serialize as int when integral, else float, on both paths
+- api_handler / event_handler: open and close the log.py invocation context
+  (buffered lines, span timings, one op="request" summary with wall and CPU
+  time; a stage breakdown too with PROFILE=1, see profiling.py). API responses
+  also get a Server-Timing header, and uncaught errors become a 500
+"""
+import base64, functools, gzip, json, time
+from decimal import Decimal
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+try:
+    import orjson
+except Exception:
+    orjson = None
+
+import log
+import profiling
+
+HEADERS = {"Content-Type": "application/json", "Access-Control-Allow-Origin": "*"}
+
+class BadRequest(ValueError):
+    """Raised by body()/Schema.validate(); api_handler turns it into a 400 with `extra` merged in."""
+
+    def __init__(self, message: str, **extra):
+        super().__init__(message)
+        self.extra = extra
+
+# ---- JSON ----
+
+def _default(obj):
+    if isinstance(obj, Decimal):
+        return int(obj) if obj == obj.to_integral_value() else float(obj)
+    if isinstance(obj, (set, frozenset)):
+        return sorted(obj)
+    raise TypeError(f"{type(obj).__name__} is not JSON serializable")
+
+if orjson is not None:
+    def dumps(obj: Any) -> str:
+        return orjson.dumps(obj, default=_default, option=orjson.OPT_NON_STR_KEYS).decode("utf-8")
+
+    loads = orjson.loads
+else:
+    def dumps(obj: Any) -> str:
+        return json.dumps(obj, default=_default, ensure_ascii=False, separators=(",", ":"))
+
+    loads = json.loads
+
+def resp(code: int = 200, body: Any = None, headers: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+    return {
+        "statusCode": code,
+        "headers": {**HEADERS, **(headers or {})},
+        "body": dumps(body if body is not None else {"ok": True}),
+    }
+
+# ---- request decoding ----
+
+def _header(event: dict, name: str) -> str:
+    for k, v in (event.get("headers") or {}).items():
+        if k.lower() == name:
+            return v or ""
+    return ""
+
+def body(event: dict) -> Dict[str, Any]:
+    """The JSON object in an API Gateway proxy event (or a direct invoke's dict body). {} when absent."""
+    raw = event.get("body")
+    if raw is None or raw == "":
+        return {}
+    if isinstance(raw, dict):
+        return raw
+    if isinstance(raw, str) and event.get("isBase64Encoded"):
+        raw = base64.b64decode(raw)
+    if isinstance(raw, str):
+        raw = raw.encode("utf-8")
+    if "gzip" in _header(event, "content-encoding").lower() or raw[:2] == b"\x1f\x8b":
+        try:
+            raw = gzip.decompress(raw)
+        except OSError:
+            raise BadRequest("body is not valid gzip")
+    try:
+        parsed = loads(raw)
+    except ValueError:
+        raise BadRequest("body must be valid JSON")
+    if not isinstance(parsed, dict):
+        raise BadRequest("body must be a JSON object")
+    return parsed
+
+def query(event: dict) -> Dict[str, str]:
+    return event.get("queryStringParameters") or {}
+
+def deadline(context, headroom: float) -> Optional[float]:
+    """time.monotonic() deadline `headroom` seconds before the Lambda timeout (None outside Lambda)."""
+    if context is None or not hasattr(context, "get_remaining_time_in_millis"):
+        return None
+    return time.monotonic() + max(1.0, context.get_remaining_time_in_millis() / 1000.0 - headroom)
+
+# ---- schemas ----
+
+class Field:
+    """
+    One body field. `kind` is str, int, float, bool, list or dict. Strings are
+    stripped (and lowercased with lower=True); a blank string counts as missing.
+    """
+
+    def __init__(self, name: str, kind: type = str, required: bool = False, default: Any = None,
+                 aliases: Iterable[str] = (), lower: bool = False, upper: bool = False):
+        self.name, self.kind, self.required, self.default = name, kind, required, default
+        self.keys = (name, *aliases)
+        self.lower, self.upper = lower, upper
+
+def _coerce(f: Field) -> Callable[[Any], Any]:
+    """Build the converter for one field once, at schema definition."""
+    if f.kind is str:
+        case = str.lower if f.lower else str.upper if f.upper else None
+        def conv(v):
+            if not isinstance(v, (str, int, float)):
+                raise TypeError
+            v = str(v).strip()
+            return case(v) if case and v else v
+    elif f.kind is bool:
+        def conv(v):
+            return v.strip().lower() in ("1", "true", "yes", "on") if isinstance(v, str) else bool(v)
+    elif f.kind in (int, float):
+        def conv(v, kind=f.kind):
+            if isinstance(v, bool):
+                raise TypeError
+            return kind(v)
+    else:
+        def conv(v, kind=f.kind):
+            if not isinstance(v, kind):
+                raise TypeError
+            return v
+    return conv
+
+class Schema:
+    def __init__(self, *fields: Field, missing: Optional[str] = None):
+        self.fields = fields
+        self.missing = missing
+        self._compiled: List[Tuple[str, Tuple[str, ...], Callable, bool, Any, str]] = [
+            (f.name, f.keys, _coerce(f), f.required, f.default, f.kind.__name__) for f in fields
+        ]
+
+    def validate(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Clean values for every declared field (defaults filled in). Raises BadRequest."""
+        out, missing = {}, []
+        for name, keys, conv, required, default, kind in self._compiled:
+            v = None
+            for k in keys:
+                v = data.get(k)
+                if v is not None and v != "":
+                    break
+            if v is not None and v != "":
+                try:
+                    v = conv(v)
+                except (TypeError, ValueError):
+                    raise BadRequest(f"{name} must be {kind}")
+            if v is None or v == "":
+                if required:
+                    missing.append(name)
+                v = default
+            out[name] = v
+        if missing:
+            raise BadRequest(self.missing or f"Missing required fields: {', '.join(missing)}", missing=missing)
+        return out
+
+# ---- handler wrappers ----
+
+def _timed(op: str, fn, event, context, api: bool):
+    log.begin(op, context)
+    prof = profiling.start(op)
+    wall, cpu = time.perf_counter(), time.process_time()
+    out, err = None, None
+    try:
+        out = fn(event, context)
+    except BadRequest as e:
+        if not api:
+            err = str(e)
+            raise
+        out = resp(400, {"error": str(e), **e.extra})
+    except Exception as e:
+        err = str(e)
+        if not api:
+            raise
+        out = resp(500, {"error": err})
+    finally:
+        ms = (time.perf_counter() - wall) * 1000
+        cpu_ms = (time.process_time() - cpu) * 1000
+        status = out.get("statusCode") if isinstance(out, dict) else None
+        if api and status is not None:
+            out.setdefault("headers", {})["Server-Timing"] = f"app;dur={ms:.1f}, cpu;dur={cpu_ms:.1f}"
+        report = profiling.stop(prof, ms, cpu_ms, context)
+        log.end(status, ms, cpu_ms, err, **({"profile": report} if report else {}))
+    return out
+
+def api_handler(op: str):
+    """API Gateway handler: BadRequest -> 400, any other exception -> 500, timing logged and returned."""
+    def wrap(fn):
+        @functools.wraps(fn)
+        def handler(event, context):
+            return _timed(op, fn, event or {}, context, api=True)
+        return handler
+    return wrap
+
+def event_handler(op: str):
+    """Stream / SNS / S3 handler: timing logged; exceptions propagate so Lambda retries."""
+    def wrap(fn):
+        @functools.wraps(fn)
+        def handler(event, context):
+            return _timed(op, fn, event or {}, context, api=False)
+        return handler
+    return wrap
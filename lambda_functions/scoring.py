@@ -8,3 +8,19 @@ def compute_campaign_score(fit, intent, penalties=0):
         return round(max(0, min(100, score)), 2)
     except Exception:
         return 0.0
+
+def compute_lead_scores(profile: dict, signals: dict) -> tuple[float, float]:
+    """
+    Fit/intent from the lead's current base signals only. Never start from the
+    previously stored score, so re-enriching the same page is idempotent.
+    """
+    fit = (35 if profile.get("shopify") else 0) \
+          + (10 if signals.get("sustainable") else 0)
+    intent = (25 if signals.get("has_contact_email") else 0) \
+             + (15 if signals.get("has_social") else 0)
+    return float(min(100, fit)), float(min(100, intent))
+
+def campaign_penalties(status: str | None) -> int:
+    if status == "UNSUBSCRIBE": return 50
+    if status == "COLD": return 20
+    return 0
@@ -0,0 +1,158 @@
+# lambda_functions/search_provider.py
+"""
+Google Custom Search as a search provider for both crawlers.
+
+CSE returns at most 10 results per request and 100 per query (start = 1, 11,
+... 91). search() works out how many pages a limit needs and fetches them all
+in one concurrent round over the shared fetch layer, so limit=50 costs about
+one request's latency instead of five.
+
+    cse = GoogleCSE(api_key, cse_id)
+    cse.search('running shoes site:myshopify.com', limit=50)  -> [{"url", "title"}, ...]
+
+Every page is one query against the daily quota (CSE_DAILY_QUOTA, default 100,
+the free tier). Pages are reserved from a per-UTC-day counter before they are
+fetched. When the quota runs out, the pages that still fit are fetched, and
+QuotaExceeded is raised once none fit. Results are cached per (query, limit)
+for CSE_CACHE_SECONDS, so repeated searches cost no quota at all.
+
+Layout in LeadIndexTable (shared by every container):
+  pk "QUOTA#cse",              sk "<YYYY-MM-DD>" -> {used}
+  pk "SEARCHCACHE#<sha1>",     sk "results"      -> {results, cachedAt}
+Locally both live in process.
+
+CSE_ENDPOINT points the provider at a stand-in of the CSE JSON API
+(fixture_server.cse_stand_in in tests).
+"""
+import hashlib, json, os, threading, time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlencode
+
+from lead_index import expires_at, table
+from log import jlog, span
+
+ENDPOINT = os.environ.get("CSE_ENDPOINT") or "https://www.googleapis.com/customsearch/v1"
+DAILY_QUOTA = int(os.environ.get("CSE_DAILY_QUOTA") or 100)
+CACHE_SECONDS = int(os.environ.get("CSE_CACHE_SECONDS") or 6 * 3600)
+PAGE_SIZE = 10            # CSE maximum per request
+MAX_RESULTS = 100         # CSE serves start <= 91
+
+_USED: Dict[str, int] = {}                                  # day -> pages used, locally
+_CACHE: Dict[str, Tuple[float, List[Dict[str, str]]]] = {}  # key -> (cached at, results), locally
+_lock = threading.Lock()
+
+class QuotaExceeded(RuntimeError):
+    pass
+
+def _day(now: Optional[float] = None) -> str:
+    return datetime.fromtimestamp(now or time.time(), tz=timezone.utc).strftime("%Y-%m-%d")
+
+def reserve(pages: int, quota: int = DAILY_QUOTA, now: Optional[float] = None) -> int:
+    """Take up to `pages` units from today's quota; returns how many were granted."""
+    day = _day(now)
+    tbl = table()
+    if tbl is None:
+        with _lock:
+            granted = max(0, min(pages, quota - _USED.get(day, 0)))
+            _USED[day] = _USED.get(day, 0) + granted
+        return granted
+    pages = min(pages, quota)
+    while pages > 0:
+        try:
+            tbl.update_item(Key={"pk": "QUOTA#cse", "sk": day}, UpdateExpression="ADD used :n SET expiresAt = :e",
+                            ConditionExpression="attribute_not_exists(used) OR used <= :left",
+                            ExpressionAttributeValues={":n": pages, ":left": quota - pages, ":e": expires_at(2)})
+            return pages
+        except tbl.meta.client.exceptions.ConditionalCheckFailedException:
+            used = int((tbl.get_item(Key={"pk": "QUOTA#cse", "sk": day}).get("Item") or {}).get("used") or 0)
+            pages = min(pages - 1, quota - used)                # retry with what still fits
+    return 0
+
+def used_today(now: Optional[float] = None) -> int:
+    tbl = table()
+    if tbl is None:
+        return _USED.get(_day(now), 0)
+    return int((tbl.get_item(Key={"pk": "QUOTA#cse", "sk": _day(now)}).get("Item") or {}).get("used") or 0)
+
+def _cache_key(cse_id: str, query: str, limit: int) -> str:
+    return hashlib.sha1(f"{cse_id}\n{query.strip().lower()}\n{limit}".encode()).hexdigest()
+
+def _cached(key: str, ttl: int) -> Optional[List[Dict[str, str]]]:
+    tbl = table()
+    if tbl is None:
+        hit = _CACHE.get(key)
+        return hit[1] if hit and time.time() - hit[0] < ttl else None
+    item = tbl.get_item(Key={"pk": f"SEARCHCACHE#{key}", "sk": "results"}).get("Item")
+    if item and time.time() - int(item["cachedAt"]) < ttl:
+        return json.loads(item["results"])
+    return None
+
+def _store(key: str, results: List[Dict[str, str]], ttl: int) -> None:
+    tbl = table()
+    if tbl is None:
+        _CACHE[key] = (time.time(), results)
+        return
+    tbl.put_item(Item={"pk": f"SEARCHCACHE#{key}", "sk": "results", "results": json.dumps(results),
+                       "cachedAt": int(time.time()), "expiresAt": expires_at(ttl / 86400)})
+
+class GoogleCSE:
+    """Custom Search JSON API client: parallel result pages, daily quota, TTL cache."""
+
+    def __init__(self, api_key: str, cse_id: str, session=None, endpoint: str = ENDPOINT,
+                 daily_quota: int = DAILY_QUOTA, cache_seconds: int = CACHE_SECONDS, timeout: float = 10.0):
+        self.api_key, self.cse_id, self.session = api_key, cse_id, session
+        self.endpoint, self.daily_quota = endpoint, daily_quota
+        self.cache_seconds, self.timeout = cache_seconds, timeout
+
+    def page_urls(self, query: str, limit: int) -> List[str]:
+        limit = max(1, min(limit, MAX_RESULTS))
+        return [f"{self.endpoint}?" + urlencode({"key": self.api_key, "cx": self.cse_id, "q": query,
+                                                 "start": start, "num": min(PAGE_SIZE, limit - start + 1)})
+                for start in range(1, limit + 1, PAGE_SIZE)]
+
+    def search(self, query: str, limit: int = 10) -> List[Dict[str, str]]:
+        """Up to `limit` (max 100) results in ranking order, one URL each."""
+        key = _cache_key(self.cse_id, query, limit)
+        results = _cached(key, self.cache_seconds)
+        if results is not None:
+            return results
+
+        urls = self.page_urls(query, limit)
+        granted = reserve(len(urls), self.daily_quota)
+        if not granted:
+            jlog(op="cse_search", ok=False, err="daily quota used", quota=self.daily_quota)
+            raise QuotaExceeded(f"CSE daily quota of {self.daily_quota} queries used")
+
+        from async_fetch import fetch_all
+        with span("http.cse", pages=granted):
+            pages = fetch_all(urls[:granted], timeout=self.timeout, session=self.session)
+        results, seen, failed = [], set(), 0
+        for url in urls[:granted]:                          # page order is ranking order
+            page = pages.get(url)
+            if page is None or not page.ok:
+                failed += 1
+                continue
+            for item in json.loads(page.content).get("items") or []:
+                link = item.get("link")
+                if link and link not in seen:
+                    seen.add(link)
+                    results.append({"url": link, "title": item.get("title") or ""})
+        if failed == granted:
+            raise RuntimeError(f"CSE search failed: {pages[urls[0]].error or pages[urls[0]].status}")
+        results = results[:limit]
+        if not failed and granted == len(urls):             # partial answers are not cached
+            _store(key, results, self.cache_seconds)
+        jlog(op="cse_search", ok=not failed, pages=granted, failed=failed, results=len(results))
+        return results
+
+def from_env(session=None) -> Optional[GoogleCSE]:
+    """A provider from GOOGLE_API_KEY / GOOGLE_CSE_ID, or None when they are unset."""
+    key, cx = os.environ.get("GOOGLE_API_KEY"), os.environ.get("GOOGLE_CSE_ID")
+    return GoogleCSE(key, cx, session=session) if key and cx else None
+
+def reset() -> None:
+    """Forget the local quota counter and cache (tests)."""
+    with _lock:
+        _USED.clear()
+        _CACHE.clear()
@@ -1,9 +1,23 @@
 # lambda_functions/search_shopify_retailers.py
-import json, os, re, time, logging
+from __future__ import annotations
+
+import json, os, time, logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING
 from urllib.parse import urljoin, urlparse
 
-import requests
-from bs4 import BeautifulSoup
+import crawl_frontier
+import shopify_json
+import site_meta
+from extraction_rules import CONTACT_HREF_RE, CONTACT_OR_ABOUT_HREF_RE, EMAIL_RE, PHONE_RE
+from log import jlog, span
+from runtime import BadRequest, api_handler, body as request_body, query as query_params, resp
+
+# requests, bs4 and the aiohttp fetch layer are imported on first crawl: dry-run and
+# fallback invocations (SEARCH_DRY_RUN=1) never load them, which keeps cold starts short
+if TYPE_CHECKING:
+    import requests
+    from bs4 import BeautifulSoup
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
@@ -14,132 +28,229 @@ FALLBACK_PATHS = [
     "./lambda_functions/sample_prospects.json",
 ]
 
+# Seconds between crawl waves; benchmarks against a replay archive set this to 0
+POLITE_DELAY = float(os.environ.get("SEARCH_POLITE_DELAY") or 0.8)
+
+# Parallel search-provider calls per batch
+SEARCH_WORKERS = int(os.environ.get("SEARCH_WORKERS") or 8)
+MAX_QUERIES = 20
+
+# Fields the Shopify JSON path must fill for a store to skip its homepage
+JSON_FIELDS = ("name", "email", "description")
+
 USER_AGENT = (
     "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
     "(KHTML, like Gecko) Chrome/126.0 Safari/537.36"
 )
 
-def _resp(code=200, body=None):
-    return {
-        "statusCode": code,
-        "headers": {
-            "Content-Type": "application/json",
-            "Access-Control-Allow-Origin": "*"
-        },
-        "body": json.dumps(body if body is not None else {"ok": True})
-    }
-
+@api_handler("search_shopify_retailers")
 def lambda_handler(event, context):
     """
     Lambda function to search for Shopify retailers and extract contact info.
     Body JSON:
-      - query (str, required)
-      - limit (int, optional, default 10)
+      - query (str), or queries (list of str, up to MAX_QUERIES) for one batch
+        where a store several queries hit is crawled once
+      - limit (int, optional, default 10; per query)
+      - new_only (bool, optional): leave out stores served from earlier crawls
+      - distributed (bool, optional): crawl on CrawlWorker functions instead (crawl_jobs);
+        answers 202 with a jobId at once, and limit goes up to 100
+    GET /search/jobs/{jobId} -> a distributed crawl's progress and results so far
     """
+    if (event.get("httpMethod") or "").upper() == "GET":
+        import crawl_jobs
+        job_id = (event.get("pathParameters") or {}).get("jobId") or query_params(event).get("jobId") or ""
+        if not job_id:
+            raise BadRequest("jobId required")
+        job = crawl_jobs.get_job(job_id)
+        if job is None:
+            return resp(404, {"error": f"crawl job {job_id} not found"})
+        return resp(200, {"ok": True, **job})
+
+    body = request_body(event)
+    distributed = body.get("distributed") is True
+
+    queries = body.get("queries")
+    if queries is not None and not isinstance(queries, list):
+        raise BadRequest("queries must be a list")
+    batch = queries is not None
+    queries = [str(q or "").strip() for q in (queries if batch else [body.get("query")])]
+    queries = list(dict.fromkeys(q for q in queries if q))
     try:
-        body = event.get("body") or "{}"
-        body = json.loads(body) if isinstance(body, str) else (body or {})
-
-        query = (body.get("query") or "").strip()
+        limit = int(body.get("limit") or 10)
+    except Exception:
+        limit = 10
+    limit = max(1, min(limit, 100 if distributed else 50))  # cap to keep things polite
+
+    if not queries:
+        raise BadRequest("Query parameter is required")
+    if len(queries) > MAX_QUERIES:
+        raise BadRequest(f"At most {MAX_QUERIES} queries per request")
+
+    if distributed:
+        import crawl_jobs
+        job = crawl_jobs.start_job(queries, limit, new_only=body.get("new_only") is True)
+        return resp(202, {"ok": True, **job})
+
+    # Allow a DRY-RUN or offline fallback via env
+    use_fallback = os.environ.get("SEARCH_DRY_RUN", "0").lower() in ("1", "true", "yes")
+
+    found = {}
+    if not use_fallback:
         try:
-            limit = int(body.get("limit") or 10)
-        except Exception:
-            limit = 10
-        limit = max(1, min(limit, 50))  # cap to keep things polite
-
-        if not query:
-            return _resp(400, {"error": "Query parameter is required"})
-
-        # Allow a DRY-RUN or offline fallback via env
-        use_fallback = os.environ.get("SEARCH_DRY_RUN", "0").lower() in ("1", "true", "yes")
-
-        retailers = []
-        if not use_fallback:
-            try:
-                retailers = find_shopify_stores(query, limit)
-            except Exception as e:
-                logger.warning("find_shopify_stores failed: %s; falling back", str(e))
-                retailers = []
-
-        if not retailers:
-            retailers = _load_fallback(limit)
-            used_fallback = True
-        else:
-            used_fallback = False
-
-        logger.info(json.dumps({
-            "op": "search_shopify_retailers",
-            "query": query,
-            "count": len(retailers),
-            "limit": limit,
-            "fallback": used_fallback
-        }))
-
-        return _resp(200, {
-            "retailers": retailers,
-            "query": query,
-            "count": len(retailers),
-            "fallback": used_fallback
-        })
-
-    except Exception as e:
-        logger.exception("Error in search_shopify_retailers")
-        return _resp(500, {"error": "Internal server error", "detail": str(e)})
+            found = find_shopify_stores_batch(queries, limit, new_only=body.get("new_only") is True)
+        except Exception as e:
+            logger.warning("find_shopify_stores failed: %s; falling back", str(e))
+            found = {}
+
+    results = {}
+    for query in queries:
+        retailers = found.get(query) or []
+        results[query] = {"retailers": retailers or _load_fallback(limit), "fallback": not retailers}
+        results[query]["count"] = len(results[query]["retailers"])
+
+    logger.info(json.dumps({
+        "op": "search_shopify_retailers",
+        "queries": len(queries),
+        "count": sum(r["count"] for r in results.values()),
+        "limit": limit,
+        "fallback": sum(r["fallback"] for r in results.values())
+    }))
+
+    if batch:
+        return resp(200, {"results": results, "queries": queries,
+                          "count": len({r.get("website") for res in results.values() for r in res["retailers"]})})
+    query, res = queries[0], results[queries[0]]
+    return resp(200, {
+        "retailers": res["retailers"],
+        "query": query,
+        "count": res["count"],
+        "fallback": res["fallback"]
+    })
 
 # ---------- Core search flow ----------
 
-def find_shopify_stores(query: str, limit: int = 10) -> list[dict]:
+def find_shopify_stores(query: str, limit: int = 10, new_only: bool = False) -> list[dict]:
     """
     Find Shopify stores and extract contact information.
     Currently uses a mocked "search_google" that returns Shopify-like domains.
     Replace 'search_google' with a proper API (e.g., Google CSE) when ready.
     """
-    stores: list[dict] = []
-    seen_domains: set[str] = set()
-    seen_emails: set[str] = set()
-
-    # Search phrase that tends to hit Shopify sites
-    search_query = f'{query} site:myshopify.com OR "powered by shopify"'
-    google_results = search_google(search_query, limit * 3)  # grab extra to filter
-
-    for result in google_results:
-        if len(stores) >= limit:
-            break
-        url = result.get("url")
-        if not url:
-            continue
-        domain = urlparse(url).netloc.lower()
-        if domain in seen_domains:
-            continue
+    return find_shopify_stores_batch([query], limit, new_only).get(query.strip(), [])
 
-        try:
-            store_data = extract_store_info(url)
-            if not store_data:
+def find_shopify_stores_batch(queries: list[str], limit: int = 10, new_only: bool = False) -> dict[str, list[dict]]:
+    """
+    Search many queries at once; returns {query: stores}, each in its own ranking order.
+
+    Search-provider calls run in parallel. Their candidates are merged with one
+    domain dedup across every query before any fetch, so a store several queries
+    hit is crawled once per batch. Candidates go through the crawl frontier
+    first: stores crawled recently are served from their stored result (or left
+    out with new_only), and stored leads and recently failed domains are skipped.
+    Only the rest is fetched, and every fetch is recorded for the next search.
+    """
+    queries = list(dict.fromkeys(q.strip() for q in queries if q and q.strip()))
+    if not queries:
+        return {}
+
+    urls, per_query = search_candidates(queries, limit * 3)  # grab extra to filter
+
+    # domain -> store, or None once it is known to give nothing
+    fetch, served, skipped = crawl_frontier.plan(list(urls.values()), source="search")
+    stores: dict[str, dict | None] = {crawl_frontier.domain_of(u): None for u in skipped}
+    for store_data in served:
+        stores[crawl_frontier.domain_of(store_data["website"])] = None if new_only else store_data
+
+    out: dict[str, list[dict]] = {q: [] for q in queries}
+    pos = dict.fromkeys(queries, 0)
+    seen_emails: dict[str, set[str]] = {q: set() for q in queries}
+
+    def take(query: str) -> None:
+        """Move the query along its ranking while the next domain is already decided."""
+        domains = per_query[query]
+        while pos[query] < len(domains) and len(out[query]) < limit and domains[pos[query]] in stores:
+            store_data = stores[domains[pos[query]]]
+            pos[query] += 1
+            if store_data is None:
                 continue
-
-            # Deduplicate by domain/email
+            # Deduplicate by email
             email = (store_data.get("email") or "").lower().strip()
-            if email and email in seen_emails:
+            if email and email in seen_emails[query]:
                 continue
-
-            stores.append(store_data)
-            seen_domains.add(domain)
+            out[query].append(store_data)
             if email:
-                seen_emails.add(email)
-
-            # polite pacing
-            time.sleep(0.8)
+                seen_emails[query].add(email)
+
+    # Crawl in concurrent waves sized to what each query still misses, so a small
+    # limit doesn't fetch every candidate.
+    fetched = 0
+    while True:
+        wave: list[str] = []
+        for query in queries:
+            take(query)
+            missing = limit - len(out[query])
+            if missing > 0:
+                wave += [d for d in per_query[query][pos[query]:] if d not in stores][:max(4, 2 * missing)]
+        wave = list(dict.fromkeys(wave))
+        if not wave:
+            break
+        # polite pacing between waves
+        if fetched and POLITE_DELAY:
+            time.sleep(POLITE_DELAY)
+
+        found = extract_stores([urls[d] for d in wave])
+        fetched += len(wave)
+        owners = crawl_frontier.email_owners(s.get("email") for s in found)
+        by_domain = {crawl_frontier.domain_of(s["website"]): s for s in found}
+        crawl_frontier.record("search", {urls[d]: by_domain.get(d) for d in wave})
+        for domain in wave:
+            # a store whose address another domain already holds adds nothing
+            store_data = by_domain.get(domain)
+            email = ((store_data or {}).get("email") or "").lower().strip()
+            stores[domain] = store_data if store_data and owners.get(email, domain) == domain else None
+
+    jlog(op="crawl_frontier", ok=True, source="search", queries=len(queries), candidates=len(urls),
+         served=0 if new_only else len(served), skipped=len(skipped), fetched=fetched)
+    return out
+
+def search_candidates(queries: list[str], num_results: int) -> tuple[dict[str, str], dict[str, list[str]]]:
+    """
+    Run the searches in parallel and merge them: returns ({domain: URL to crawl},
+    {query: [domain, ...] in ranking order}). The first URL seen for a domain wins.
+    """
+    def search(query: str) -> list[dict]:
+        # Search phrase that tends to hit Shopify sites
+        try:
+            return search_google(f'{query} site:myshopify.com OR "powered by shopify"', num_results)
         except Exception as e:
-            logger.warning("extract_store_info failed for %s: %s", url, str(e))
-            continue
-
-    return stores
+            logger.warning("search failed for %r: %s", query, str(e))
+            return []
+
+    with ThreadPoolExecutor(max_workers=min(SEARCH_WORKERS, len(queries))) as pool:
+        ranked = list(pool.map(search, queries))
+
+    urls: dict[str, str] = {}
+    per_query: dict[str, list[str]] = {}
+    for query, results in zip(queries, ranked):
+        domains = per_query[query] = []
+        for result in results:
+            url = result.get("url")
+            if not url:
+                continue
+            domain = crawl_frontier.domain_of(url)
+            if domain not in domains:
+                domains.append(domain)
+                urls.setdefault(domain, url)
+    return urls, per_query
 
 def search_google(query: str, num_results: int = 10) -> list[dict]:
     """
-    Mocked Google search results (for hackathon/demo).
-    In production, replace with Google Custom Search API or a compliant search API.
+    Google Custom Search results when GOOGLE_API_KEY and GOOGLE_CSE_ID are set
+    (search_provider: parallel result pages, daily quota, cached per query).
+    Otherwise mocked results for hackathon/demo use.
     """
+    cse = _provider()
+    if cse is not None:
+        return cse.search(query, num_results)
     mock = [
         {"url": "https://example-store.myshopify.com", "title": f"Example Store - {query}"},
         {"url": "https://demo-shop.myshopify.com", "title": f"Demo Shop - {query}"},
@@ -149,14 +260,28 @@ def search_google(query: str, num_results: int = 10) -> list[dict]:
     ]
     return mock[:num_results]
 
+_PROVIDER = None
+def _provider():
+    global _PROVIDER
+    if _PROVIDER is None and os.environ.get("GOOGLE_API_KEY") and os.environ.get("GOOGLE_CSE_ID"):
+        from search_provider import from_env
+        _PROVIDER = from_env(_session())
+    return _PROVIDER
+
 # ---------- Extraction helpers ----------
 
 _SESSION = None
 def _session() -> requests.Session:
     global _SESSION
     if _SESSION is None:
+        import requests
+        from http_client import mount_pool
         s = requests.Session()
         s.headers.update({"User-Agent": USER_AGENT})
+        mount_pool(s)
+        if os.environ.get("CRAWL_ARCHIVE"):
+            from page_archive import install_from_env
+            install_from_env(s)
         _SESSION = s
     return _SESSION
 
@@ -165,27 +290,98 @@ def _get(url: str, timeout: float = 10.0) -> requests.Response | None:
     sess = _session()
     for i in range(2):  # small retry budget
         try:
-            return sess.get(url, timeout=timeout)
+            with span("http.get"):
+                return sess.get(url, timeout=timeout)
         except Exception:
             time.sleep(0.5 * (i + 1))
     return None
 
 def extract_store_info(url: str) -> dict | None:
-    resp = _get(url)
-    if not resp or resp.status_code != 200:
-        return None
+    stores = extract_stores([url])
+    return stores[0] if stores else None
+
+def extract_stores(urls: list[str]) -> list[dict]:
+    """
+    Batch form of extract_store_info. Stores whose robots.txt disallows their
+    homepage are dropped, and nothing robots.txt disallows is fetched (site_meta,
+    cached per domain). Shopify's JSON endpoints and contact page for every
+    store go out in one concurrent round (shopify_json). Only stores still
+    missing a name, email or description take the HTML path: homepages in one
+    round, then their contact/about pages in a second, taken from the sitemap
+    when it lists them and from homepage links otherwise (minus the ones
+    already fetched). Fields from JSON win over the HTML ones.
+    """
+    from async_fetch import fetch_all
+    sess = _session()
+    metas = site_meta.load(urls, session=sess)
+    urls = [url for url in urls if site_meta.allowed(metas[url], url)]
+    infos, contact_pages = shopify_json.fetch_stores(urls, session=sess, metas=metas)
+    done = {url: _store_from_json(info, url) for url, info in infos.items()
+            if info and not shopify_json.missing(info, JSON_FIELDS)}
+    rest = [url for url in urls if url not in done]
+
+    with span("http.fetch_homes", urls=len(rest)):
+        homes = fetch_all(rest, timeout=10.0, session=sess)
+    parsed = []
+    for url in rest:
+        page = homes.get(url)
+        if not page or not page.ok:
+            continue
+        try:
+            soup = _soup(page.content)
+        except Exception as e:
+            logger.warning("parse failed for %s: %s", url, str(e))
+            continue
+        parsed.append((url, soup, site_meta.pages(metas[url]) or
+                       [u for u in contact_links(soup, url) if site_meta.allowed(metas[url], u)]))
 
-    soup = BeautifulSoup(resp.content, "html.parser")
-    store = {
+    links = [u for _, _, linked in parsed for u in linked if u not in contact_pages]
+    with span("http.fetch_contacts", urls=len(links)):
+        contact_pages.update(fetch_all(links, timeout=7.0, session=sess))
+
+    for url, soup, linked in parsed:
+        try:
+            store = _store_from_soup(soup, url, contact_pages, linked)
+        except Exception as e:
+            logger.warning("extract_store_info failed for %s: %s", url, str(e))
+            continue
+        if infos.get(url):
+            json_store = _store_from_json(infos[url], url)
+            store.update({k: v for k, v in json_store.items() if v})
+        done[url] = store
+    return [done[url] for url in urls if url in done]
+
+@span("parse.html")
+def _soup(content: bytes) -> BeautifulSoup:
+    from bs4 import BeautifulSoup
+    return BeautifulSoup(content, "html.parser")
+
+def _store_from_soup(soup: BeautifulSoup, url: str, pages: dict | None = None, links: list[str] | None = None) -> dict:
+    return {
         "website": url,
         "companyName": extract_company_name(soup, url),
-        "email": extract_email(soup, url),
+        "email": extract_email(soup, url, pages, links),
         "phone": extract_phone(soup),
         "description": extract_description(soup),
         "industry": "E-commerce",
-        "contactPage": find_contact_page(soup, url),
+        "contactPage": next((u for u in links or [] if CONTACT_HREF_RE.search(urlparse(u).path)), None)
+                       or find_contact_page(soup, url),
+        "currency": None,
+        "categories": [],
+    }
+
+def _store_from_json(info: dict, url: str) -> dict:
+    return {
+        "website": url,
+        "companyName": (info["name"] or "")[:80],
+        "email": info["email"],
+        "phone": info["phone"],
+        "description": (info["description"] or "")[:200],
+        "industry": "E-commerce",
+        "contactPage": info["contactPage"],
+        "currency": info["currency"],
+        "categories": info["categories"],
     }
-    return store
 
 def extract_company_name(soup: BeautifulSoup, url: str) -> str:
     title = soup.find("title")
@@ -196,30 +392,41 @@ def extract_company_name(soup: BeautifulSoup, url: str) -> str:
     domain = urlparse(url).netloc
     return domain.replace(".myshopify.com", "").replace("-", " ").title()[:80]
 
-def extract_email(soup: BeautifulSoup, base_url: str) -> str | None:
-    email_re = re.compile(r"\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}\b")
-    # Prefer contact/about pages
-    contact_links = soup.find_all("a", href=re.compile(r"(contact|about)", re.I))
-    for link in contact_links[:2]:
+def contact_links(soup: BeautifulSoup, base_url: str) -> list[str]:
+    """Up to two contact/about page URLs linked from the homepage."""
+    out = []
+    for link in soup.find_all("a", href=CONTACT_OR_ABOUT_HREF_RE)[:2]:
         href = link.get("href")
-        if not href:
-            continue
-        contact_url = urljoin(base_url, href)
-        r = _get(contact_url, timeout=7.0)
-        if not r or r.status_code != 200:
+        if href:
+            out.append(urljoin(base_url, href))
+    return out
+
+def extract_email(soup: BeautifulSoup, base_url: str, pages: dict | None = None,
+                  links: list[str] | None = None) -> str | None:
+    """
+    `pages` holds prefetched {url: FetchResult}; without it contact pages are fetched here.
+    `links` are the contact/about pages to try (default: the ones the homepage links to).
+    """
+    # Prefer contact/about pages
+    for contact_url in contact_links(soup, base_url) if links is None else links:
+        if pages is not None:
+            page = pages.get(contact_url)
+            text = page.text if page and page.ok else None
+        else:
+            r = _get(contact_url, timeout=7.0)
+            text = r.text if r and r.status_code == 200 else None
+        if not text:
             continue
-        m = email_re.search(r.text)
+        m = EMAIL_RE.search(text)
         if m:
             return m.group(0)
 
     # Fallback: scan current page text
-    m = email_re.search(soup.get_text(" ", strip=True))
+    m = EMAIL_RE.search(soup.get_text(" ", strip=True))
     return m.group(0) if m else None
 
 def extract_phone(soup: BeautifulSoup) -> str | None:
-    # Simple North American pattern
-    phone_re = re.compile(r"(\+?1?[-.\s]?\(?\d{3}\)?[-.\s]?\d{3}[-.\s]?\d{4})")
-    m = phone_re.search(soup.get_text(" ", strip=True))
+    m = PHONE_RE.search(soup.get_text(" ", strip=True))
     return m.group(0) if m else None
 
 def extract_description(soup: BeautifulSoup) -> str:
@@ -232,7 +439,7 @@ def extract_description(soup: BeautifulSoup) -> str:
     return "Shopify store"
 
 def find_contact_page(soup: BeautifulSoup, base_url: str) -> str | None:
-    link = soup.find("a", href=re.compile(r"contact", re.I))
+    link = soup.find("a", href=CONTACT_HREF_RE)
     if link and link.get("href"):
         return urljoin(base_url, link.get("href"))
     return None
@@ -2,7 +2,9 @@
 import json
 from leads_store_dynamo import update_status
 from log import jlog
+from runtime import event_handler
 
+@event_handler("ses_events")
 def lambda_handler(event, context):
     """
     Triggered by SNS notifications from SES.
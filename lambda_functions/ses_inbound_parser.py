@@ -1,10 +1,10 @@
 # lambda_functions/ses_inbound_parser.py
-import boto3, json, email
+import json, email
 from email import policy
+from clients import client
 from leads_store_dynamo import update_status
 from log import jlog
-
-s3 = boto3.client("s3")
+from runtime import event_handler
 
 def extract_body(msg):
     """Extract plain text body from MIME message."""
@@ -43,12 +43,13 @@ def classify_reply_simple(t: str) -> str:
     if any(x in t for x in negative): return "COLD"
     return "NEUTRAL"
 
+@event_handler("ses_inbound")
 def lambda_handler(event, context):
     for rec in event.get("Records", []):
         try:
             bucket = rec["s3"]["bucket"]["name"]
             key = rec["s3"]["object"]["key"]
-            obj = s3.get_object(Bucket=bucket, Key=key)
+            obj = client("s3").get_object(Bucket=bucket, Key=key)
             raw = obj["Body"].read()
             msg = email.message_from_bytes(raw, policy=policy.default)
 
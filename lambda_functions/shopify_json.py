@@ -0,0 +1,124 @@
+# lambda_functions/shopify_json.py
+"""
+Store metadata from Shopify's public JSON endpoints, used by both crawlers
+before any themed HTML.
+
+    /meta.json                    name, description, currency, city/province/country
+    /products.json?limit=N        product_type of the first N products
+    /collections.json?limit=N     collection titles
+    /pages/contact                the theme's contact page, used for email and phone
+
+All four go out in one concurrent round per batch of stores. Together they are
+a fraction of a themed homepage and need no HTML parse: the JSON is decoded,
+and the contact page is scanned with regexes after its tags are stripped.
+A crawler falls back to the homepage only for the fields this left empty
+(see missing()). Non-Shopify sites answer /meta.json with a 404 and take the
+HTML path, which reuses the contact page fetched here.
+
+With site_meta for a store, the contact page its sitemap lists replaces the
+/pages/contact guess, and endpoints its robots.txt disallows aren't fetched.
+
+SHOPIFY_JSON=0 turns the fast path off.
+"""
+import json, os
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urlparse
+
+import site_meta
+from extraction_rules import EMAIL_RE, EMAIL_SKIP, PHONE_RE, TAG_RE
+from log import span
+
+ENABLED = os.environ.get("SHOPIFY_JSON", "1").lower() not in ("0", "false", "no")
+PRODUCTS_LIMIT = int(os.environ.get("SHOPIFY_JSON_PRODUCTS") or 10)     # only product_type is read
+COLLECTIONS_LIMIT = 20
+MAX_CATEGORIES = 10
+CONTACT_PATH = "/pages/contact"
+
+def root(url: str) -> str:
+    u = urlparse(url)
+    return f"{u.scheme}://{u.netloc}"
+
+def endpoints(url: str, meta: Optional[Dict[str, Any]] = None) -> Dict[str, str]:
+    """The store's endpoints; with site_meta, its sitemap's contact page and only what robots.txt allows."""
+    base = root(url)
+    contact = ((meta or {}).get("contact") or [f"{base}{CONTACT_PATH}"])[0]
+    eps = {
+        "meta": f"{base}/meta.json",
+        "products": f"{base}/products.json?limit={PRODUCTS_LIMIT}",
+        "collections": f"{base}/collections.json?limit={COLLECTIONS_LIMIT}",
+        "contact": contact,
+    }
+    return {k: e for k, e in eps.items() if site_meta.allowed(meta, e)}
+
+def _json(page) -> Optional[Dict[str, Any]]:
+    if page is None or not page.ok:
+        return None
+    try:
+        data = json.loads(page.content)
+    except ValueError:
+        return None
+    return data if isinstance(data, dict) else None
+
+def categories(products: Optional[Dict[str, Any]], collections: Optional[Dict[str, Any]]) -> List[str]:
+    """Collection titles, then product types, deduplicated case-insensitively."""
+    names = [c.get("title") for c in (collections or {}).get("collections") or []]
+    names += [p.get("product_type") for p in (products or {}).get("products") or []]
+    seen, out = set(), []
+    for n in names:
+        n = (n or "").strip()
+        if n and n.lower() not in seen and n.lower() != "frontpage" and len(n) < 30:
+            seen.add(n.lower())
+            out.append(n)
+    return out[:MAX_CATEGORIES]
+
+def contact_details(html: str) -> Tuple[Optional[str], Optional[str]]:
+    """(email, phone) from a page's text, skipping placeholder addresses."""
+    text = TAG_RE.sub(" ", html)
+    email = next((m.group(0) for m in EMAIL_RE.finditer(text)
+                  if not any(s in m.group(0).lower() for s in EMAIL_SKIP)), None)
+    phone = PHONE_RE.search(text)
+    return email, phone.group(0).strip() if phone else None
+
+def parse(pages: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    Store info from one store's fetched endpoints ({"meta": FetchResult, ...}),
+    or None when /meta.json isn't Shopify's (the site takes the HTML path).
+    """
+    meta = _json(pages.get("meta"))
+    if not meta or not ("myshopify_domain" in meta or "currency" in meta):
+        return None
+    contact = pages.get("contact")
+    email, phone = contact_details(contact.text) if contact is not None and contact.ok else (None, None)
+    place = [meta.get(k) for k in ("city", "province", "country")]
+    return {
+        "name": (meta.get("name") or "").strip() or None,
+        "description": (meta.get("description") or "").strip() or None,
+        "currency": meta.get("currency"),
+        "location": ", ".join(p for p in place if p) or None,
+        "categories": categories(_json(pages.get("products")), _json(pages.get("collections"))),
+        "myshopifyDomain": meta.get("myshopify_domain"),
+        "email": email,
+        "phone": phone,
+        "contactPage": contact.url if contact is not None and contact.ok else None,
+    }
+
+def missing(info: Optional[Dict[str, Any]], fields: Iterable[str]) -> List[str]:
+    """Which of `fields` the JSON path left empty (all of them without info)."""
+    return [f for f in fields if not (info or {}).get(f)]
+
+def fetch_stores(urls: List[str], session=None, timeout: float = 10.0,
+                 metas: Optional[Dict[str, Optional[Dict[str, Any]]]] = None) -> Tuple[Dict[str, Optional[Dict[str, Any]]], Dict[str, Any]]:
+    """
+    Fetch every store's endpoints in one concurrent round; `metas` is site_meta.load() output.
+    Returns ({url: info or None}, {contact page url: FetchResult}); the pages
+    let the HTML fallback skip refetching the contact page.
+    """
+    if not ENABLED or not urls:
+        return {u: None for u in urls}, {}
+    from async_fetch import fetch_all
+    per_store = {u: endpoints(u, (metas or {}).get(u)) for u in urls}
+    with span("http.fetch_json", urls=len(urls)):
+        fetched = fetch_all([e for eps in per_store.values() for e in eps.values()], timeout=timeout, session=session)
+    infos = {u: parse({k: fetched.get(e) for k, e in eps.items()}) for u, eps in per_store.items()}
+    contacts = {eps["contact"]: fetched[eps["contact"]] for eps in per_store.values() if eps.get("contact") in fetched}
+    return infos, contacts
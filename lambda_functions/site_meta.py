@@ -0,0 +1,187 @@
+# lambda_functions/site_meta.py
+"""
+robots.txt rules and sitemap pages per store domain, kept across runs. Both
+crawlers check crawl rules here without a fetch, and go straight to the
+contact and about pages a store's sitemap lists instead of scanning homepage
+anchors for them.
+
+    metas = load(urls, session)      # {url: meta or None}; fetches only unseen domains
+    allowed(metas[url], page_url)    # robots.txt check, no fetch
+    pages(metas[url])                # [contact..., about...] on the store's own host
+
+For an unseen domain, /robots.txt and /sitemap.xml go out in one concurrent
+round. Shopify's sitemap.xml is an index, so a second round fetches only its
+pages sitemap (sitemap_pages_1.xml). The product, collection and blog
+sitemaps are never fetched. When /sitemap.xml is missing, the second round
+fetches the sitemaps named on robots.txt's Sitemap: lines instead. Every
+sitemap URL is moved onto the store's own host.
+
+robots.txt status  -> rules
+  200               its rules
+  401, 403          everything disallowed
+  other 4xx         no rules
+  5xx               everything disallowed for this run (not cached)
+  network error     no meta for this run (not cached); the store's pages fail the same way
+
+Layout in LeadIndexTable (expiresAt SITE_META_TTL_DAYS after the fetch):
+  pk "SITEMETA#<domain>", sk "meta" -> {robots, contact, about, fetchedAt}
+Locally a dict stands in. Entries whose fetchedAt is SITE_META_TTL_DAYS old
+are fetched again, whichever store they come from: DynamoDB can take days to
+delete an expired item, and the dict never does. SITE_META=0 turns it off: everything is allowed and
+no pages are known.
+"""
+import os, re, time
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urljoin, urlparse
+from urllib.robotparser import RobotFileParser
+
+from crawl_frontier import domain_of
+from extraction_rules import ABOUT_HREF_RE, CONTACT_HREF_RE
+from lead_index import batch_get, expires_at, table
+from log import jlog, span
+
+ENABLED = os.environ.get("SITE_META", "1").lower() not in ("0", "false", "no")
+TTL_DAYS = float(os.environ.get("SITE_META_TTL_DAYS") or 7)
+AGENT = os.environ.get("ROBOTS_AGENT") or "*"     # user-agent token matched against robots.txt groups
+TIMEOUT = 5.0
+MAX_ROBOTS = 100_000      # chars kept; far above any real robots.txt, well under the item limit
+MAX_PAGES = 2             # contact pages and about pages kept per store
+MAX_CHILDREN = 2          # child sitemaps followed per index
+
+DISALLOW_ALL = "User-agent: *\nDisallow: /"
+LOC_RE = re.compile(r"<loc>\s*([^<\s]+)\s*</loc>", re.I)
+SITEMAP_LINE_RE = re.compile(r"^\s*sitemap\s*:\s*(\S+)", re.I | re.M)
+PAGES_SITEMAP_RE = re.compile(r"page", re.I)
+
+_MEM: Dict[str, Dict[str, Any]] = {}    # domain -> meta, stands in for the table locally
+
+def _root(url: str) -> str:
+    u = urlparse(url)
+    return f"{u.scheme}://{u.netloc}"
+
+@lru_cache(maxsize=512)
+def _parser(robots: str) -> RobotFileParser:
+    rp = RobotFileParser()
+    rp.parse(robots.splitlines())
+    return rp
+
+def allowed(meta: Optional[Dict[str, Any]], url: str, agent: str = AGENT) -> bool:
+    """Whether robots.txt lets `agent` fetch `url`; True when nothing is known."""
+    if not meta or not meta.get("robots"):
+        return True
+    return _parser(meta["robots"]).can_fetch(agent, url)
+
+def pages(meta: Optional[Dict[str, Any]]) -> List[str]:
+    """The store's contact pages, then its about pages, as its sitemap lists them."""
+    return list((meta or {}).get("contact") or []) + list((meta or {}).get("about") or [])
+
+def _robots(page) -> Tuple[Optional[str], bool]:
+    """(rules, cacheable) for a robots.txt FetchResult."""
+    if page is None or not page.status:
+        return None, False
+    if page.status == 200:
+        return page.text[:MAX_ROBOTS], True
+    if page.status in (401, 403):
+        return DISALLOW_ALL, True
+    if page.status >= 500:
+        return DISALLOW_ALL, False
+    return "", True
+
+def _locs(page) -> Tuple[List[str], bool]:
+    """(<loc> URLs, is a sitemap index) for a sitemap FetchResult."""
+    if page is None or not page.ok:
+        return [], False
+    text = page.text
+    return LOC_RE.findall(text), "<sitemapindex" in text[:2000]
+
+def _collect(meta: Dict[str, Any], root: str, locs: List[str]) -> None:
+    """Add contact/about pages from a urlset, moved onto the store's own host."""
+    for loc in locs:
+        path = urlparse(loc).path
+        key = "contact" if CONTACT_HREF_RE.search(path) else "about" if ABOUT_HREF_RE.search(path) else None
+        url = urljoin(root, path)
+        if key and len(meta[key]) < MAX_PAGES and url not in meta[key] and allowed(meta, url):
+            meta[key].append(url)
+
+def _fetch(roots: Dict[str, str], session=None, timeout: float = TIMEOUT) -> Tuple[Dict[str, Dict[str, Any]], List[str]]:
+    """Fetch robots.txt and sitemaps for {domain: root}. Returns ({domain: meta}, cacheable domains)."""
+    from async_fetch import fetch_all
+    now = int(time.time())
+    first = {d: (f"{r}/robots.txt", f"{r}/sitemap.xml") for d, r in roots.items()}
+    with span("http.site_meta", urls=2 * len(first)):
+        fetched = fetch_all([u for pair in first.values() for u in pair], timeout=timeout, session=session)
+
+    metas, cacheable, children = {}, [], {}
+    for domain, (robots_url, sitemap_url) in first.items():
+        robots, ok = _robots(fetched.get(robots_url))
+        if robots is None:
+            continue
+        meta = metas[domain] = {"robots": robots, "contact": [], "about": [], "fetchedAt": now}
+        if ok:
+            cacheable.append(domain)
+        sitemap = fetched.get(sitemap_url)
+        locs, index = _locs(sitemap)
+        if sitemap is None or not sitemap.ok:
+            wanted = SITEMAP_LINE_RE.findall(robots)                   # the sitemaps robots.txt names
+        elif index:
+            wanted = [u for u in locs if PAGES_SITEMAP_RE.search(urlparse(u).path)]
+        else:
+            _collect(meta, roots[domain], locs)
+            continue
+        wanted = [urljoin(roots[domain], urlparse(u).path) for u in wanted]
+        children[domain] = [u for u in wanted if u != sitemap_url and allowed(meta, u)][:MAX_CHILDREN]
+
+    children = {d: c for d, c in children.items() if c}
+    if children:
+        with span("http.site_meta", urls=sum(len(c) for c in children.values())):
+            fetched = fetch_all([u for c in children.values() for u in c], timeout=timeout, session=session)
+        for domain, urls in children.items():
+            for u in urls:
+                locs, index = _locs(fetched.get(u))
+                if not index:
+                    _collect(metas[domain], roots[domain], locs)
+    return metas, cacheable
+
+def _lookup(domains: List[str]) -> Dict[str, Dict[str, Any]]:
+    """Cached metas for `domains` still inside TTL_DAYS."""
+    tbl = table()
+    if tbl is None:
+        found = {d: _MEM[d] for d in domains if d in _MEM}
+    else:
+        items = batch_get(tbl, [{"pk": f"SITEMETA#{d}", "sk": "meta"} for d in domains])
+        found = {i["pk"][len("SITEMETA#"):]: {k: i.get(k) for k in ("robots", "contact", "about", "fetchedAt")}
+                 for i in items}
+    oldest = time.time() - TTL_DAYS * 86400
+    return {d: m for d, m in found.items() if int(m.get("fetchedAt") or 0) > oldest}
+
+def _save(metas: Dict[str, Dict[str, Any]]) -> None:
+    tbl = table()
+    if tbl is None:
+        _MEM.update(metas)
+        return
+    ttl = expires_at(TTL_DAYS)
+    with tbl.batch_writer(overwrite_by_pkeys=["pk", "sk"]) as batch:
+        for domain, meta in metas.items():
+            batch.put_item(Item={"pk": f"SITEMETA#{domain}", "sk": "meta", **meta, "expiresAt": ttl})
+
+def load(urls: List[str], session=None, timeout: float = TIMEOUT) -> Dict[str, Optional[Dict[str, Any]]]:
+    """{url: meta} for store URLs; domains not cached are fetched in one or two concurrent rounds."""
+    if not ENABLED or not urls:
+        return {u: None for u in urls}
+    by_url = {u: domain_of(u) for u in urls}
+    known = _lookup(list(dict.fromkeys(d for d in by_url.values() if d)))
+    roots: Dict[str, str] = {}
+    for url, domain in by_url.items():
+        if domain and domain not in known:
+            roots.setdefault(domain, _root(url))
+    if roots:
+        fresh, cacheable = _fetch(roots, session=session, timeout=timeout)
+        _save({d: fresh[d] for d in cacheable})
+        known.update(fresh)
+        jlog(op="site_meta", ok=True, cached=len(by_url) - len(roots), fetched=len(roots), stored=len(cacheable))
+    return {u: known.get(d) for u, d in by_url.items()}
+
+def reset() -> None:
+    """Forget the local stand-in (tests)."""
+    _MEM.clear()
@@ -1,48 +1,117 @@
 # lambda_functions/store_lead_data.py
-import json
-from decimal import Decimal
-
-from leads_store_dynamo import upsert_lead
+from leads_store_dynamo import batch_get_leads, put_new_leads, set_campaigns, upsert_lead
 from constants import normalize_status
 from log import jlog
+from runtime import BadRequest, Field, Schema, api_handler, body, resp
 
-def _json_default(obj):
-    if isinstance(obj, Decimal):
-        return float(obj)
-    raise TypeError
+MAX_BATCH = 500
+STORE_ROUNDS = 3
 
-def _resp(code=200, body=None):
-    return {
-        "statusCode": code,
-        "headers": {"Content-Type": "application/json", "Access-Control-Allow-Origin": "*"},
-        "body": json.dumps(body if body is not None else {"ok": True}, default=_json_default)
-    }
+LEAD = Schema(
+    Field("email", required=True, lower=True),
+    Field("company_name", aliases=("companyName",), required=True),
+    Field("campaign_id", aliases=("campaignId",), required=True),
+    Field("status"),
+    Field("note", default=""),
+    missing="Missing required fields: email, company_name, campaign_id",
+)
+# Batch items may take campaign_id from the top level instead
+ITEM = Schema(
+    Field("email", required=True, lower=True),
+    Field("company_name", aliases=("companyName",), required=True),
+    Field("campaign_id", aliases=("campaignId",), default=""),
+    Field("status"),
+    Field("note", default=""),
+    missing=LEAD.missing,
+)
+BATCH = Schema(
+    Field("leads", list, required=True),
+    Field("campaign_id", aliases=("campaignId",), default=""),
+    Field("status"),
+    Field("note", default=""),
+)
+
+def merge_lead(stored: dict, email: str, company: str, campaign_id: str, status: str, note: str = "") -> dict:
+    """
+    upsert_lead's merge (old company names kept as aliases) applied to an already-read
+    payload in `stored` ({email: data}). The campaign node is merged, so other
+    campaigns on the lead survive.
+    """
+    lead = stored.setdefault(email, {"email": email})
+    old_company = lead.get("company")
+    if old_company and company != old_company:
+        lead["aliases"] = sorted(set(lead.get("aliases", [])) | {old_company})
+    lead["company"] = company
+    lead.setdefault("campaigns", {}).setdefault(campaign_id, {}).update({"status": status, "note": note})
+    return lead
+
+def store_leads(items: list[dict], campaign_id: str = "", status: str | None = None, note: str = "") -> dict:
+    """
+    Batch store: one BatchGetItem and merge, then field-level writes. New leads
+    are put only if still absent, stored leads get the campaign node added or
+    its status/note SET (set_campaigns), so nothing written since the read is lost.
+    Per-item campaign_id/status/note override the shared ones.
+    """
+    valid, errors = {}, []
+    for item in items:
+        try:
+            req = ITEM.validate(item if isinstance(item, dict) else {})
+        except BadRequest as e:
+            errors.append({"email": str((item or {}).get("email") or "").strip().lower(), "error": str(e)})
+            continue
+        cid = req["campaign_id"] or campaign_id
+        if not cid:
+            errors.append({"email": req["email"], "error": LEAD.missing})
+            continue
+        valid[req["email"]] = (req["company_name"], cid, normalize_status(req["status"] or status, "SENT"),
+                               req["note"] or note)
 
+    pending = dict(valid)
+    for _ in range(STORE_ROUNDS):
+        if not pending:
+            break
+        stored = batch_get_leads(pending.keys())
+        new, updates = [], []
+        for email, fields in pending.items():
+            is_new = email not in stored
+            lead = merge_lead(stored, email, *fields)
+            if is_new:
+                new.append(lead)
+            else:
+                updates.append((lead, fields[1]))
+        # a lead stored since the read is read and merged again next round instead of overwritten
+        lost = {lead["email"] for lead, ok in zip(new, put_new_leads(new)) if not ok}
+        set_campaigns(updates)
+        pending = {email: pending[email] for email in lost}
+    errors += [{"email": email, "error": "concurrent update, retry"} for email in pending]
+    return {"stored": [email for email in valid if email not in pending], "errors": errors}
+
+@api_handler("store_lead")
 def lambda_handler(event, context):
-    try:
-        body_raw = event.get("body") or "{}"
-        if isinstance(body_raw, bytes):
-            body_raw = body_raw.decode("utf-8", errors="replace")
-        body = json.loads(body_raw) if isinstance(body_raw, str) else (body_raw or {})
-
-        email = (body.get("email") or "").strip().lower()
-        company_name = (body.get("company_name") or body.get("companyName") or "").strip()
-        campaign_id = (body.get("campaign_id") or body.get("campaignId") or "").strip()
-        status = normalize_status(body.get("status"), "SENT")
-        note = (body.get("note") or "").strip()
-
-        if not (email and company_name and campaign_id):
-            jlog(op="store_lead", ok=False, err="missing_fields", email=email, campaignId=campaign_id)
-            return _resp(400, {"error": "Missing required fields: email, company_name, campaign_id"})
-
-        lead = {
-            "email": email,
-            "company": company_name,
-            "campaigns": {campaign_id: {"status": status, "note": note}}
-        }
-        meta = upsert_lead(lead)
-        jlog(op="store_lead", ok=True, email=email, campaignId=campaign_id, status=status)
-        return _resp(200, {"ok": True, "lead": lead, "meta": meta})
-    except Exception as e:
-        jlog(op="store_lead", ok=False, err=str(e))
-        return _resp(500, {"error": str(e)})
+    """
+    JSON body, either a single lead:
+      - email, company_name, campaign_id (required), status (default SENT), note
+    or a batch:
+      - leads (list of the above, up to MAX_BATCH); campaign_id/status/note at top level apply to all
+    """
+    data = body(event)
+
+    if isinstance(data.get("leads"), list):
+        req = BATCH.validate(data)
+        if len(req["leads"]) > MAX_BATCH:
+            raise BadRequest(f"at most {MAX_BATCH} leads per batch")
+        res = store_leads(req["leads"], campaign_id=req["campaign_id"], status=req["status"], note=req["note"])
+        jlog(op="store_leads", ok=True, stored=len(res["stored"]), errors=len(res["errors"]))
+        return resp(200, {"ok": True, "count": len(res["stored"]), **res})
+
+    req = LEAD.validate(data)
+    email, campaign_id = req["email"], req["campaign_id"]
+    status = normalize_status(req["status"], "SENT")
+    lead = {
+        "email": email,
+        "company": req["company_name"],
+        "campaigns": {campaign_id: {"status": status, "note": req["note"]}}
+    }
+    meta = upsert_lead(lead)
+    jlog(op="store_lead", ok=True, email=email, campaignId=campaign_id, status=status)
+    return resp(200, {"ok": True, "lead": lead, "meta": meta})
@@ -0,0 +1,166 @@
+# lambda_functions/suppression.py
+"""
+Addresses and domains we must not email.
+
+Any campaign of a lead that becomes BOUNCED or UNSUBSCRIBE puts the lead's
+address here. lead_stream_consumer does this, so it covers every writer: SES
+events, inbound replies and the status API. Whole domains (and extra
+addresses) can be added through POST /suppression.
+
+    check("a@x.example")                -> None, or the reason it is suppressed
+    allowed, blocked = filter_allowed(addresses)
+
+The stream only sees changes made after it was attached (StartingPosition
+LATEST). Leads that were already BOUNCED/UNSUBSCRIBE before the deploy are
+added by backfill(scan_leads()). Run it once after the first deploy by
+invoking SuppressionApi directly with {"action": "rebuild"} (see README).
+
+Each container loads every entry into a set once and reloads it every
+SUPPRESSION_REFRESH_SECONDS. A check that misses the set costs no I/O, so
+thousands of recipients filter in microseconds. A hit is confirmed with one
+GetItem against the table before a send is refused, so removals take effect
+before the next reload.
+
+Layout in LeadIndexTable: pk "SUPPRESS", sk "<address>" or "@<domain>"
+-> {reason, source, ts}. Locally a dict stands in.
+"""
+import os, threading, time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from lead_index import table
+from log import jlog
+
+SUPPRESS_STATUSES = ("BOUNCED", "UNSUBSCRIBE")
+REFRESH_SECONDS = int(os.environ.get("SUPPRESSION_REFRESH_SECONDS") or 300)
+PK = "SUPPRESS"
+
+_MEM: Dict[str, Dict[str, Any]] = {}        # stands in for the table locally
+_SET: Optional[set] = None
+_LOADED_AT = 0.0
+_lock = threading.Lock()
+
+def _norm(address: str) -> str:
+    return (address or "").strip().lower()
+
+def _keys(address: str) -> Tuple[str, ...]:
+    address = _norm(address)
+    domain = address.rpartition("@")[2]
+    return (address, f"@{domain}") if domain and domain != address else (address,)
+
+def _load() -> set:
+    tbl = table()
+    if tbl is None:
+        return set(_MEM)
+    keys, kwargs = set(), {"KeyConditionExpression": "pk = :p", "ExpressionAttributeValues": {":p": PK},
+                           "ProjectionExpression": "sk"}
+    while True:
+        res = tbl.query(**kwargs)
+        keys.update(i["sk"] for i in res.get("Items", []))
+        if not res.get("LastEvaluatedKey"):
+            return keys
+        kwargs["ExclusiveStartKey"] = res["LastEvaluatedKey"]
+
+def _entries() -> set:
+    global _SET, _LOADED_AT
+    if _SET is None or time.monotonic() - _LOADED_AT > REFRESH_SECONDS:
+        with _lock:
+            if _SET is None or time.monotonic() - _LOADED_AT > REFRESH_SECONDS:
+                _SET, _LOADED_AT = _load(), time.monotonic()
+    return _SET
+
+def _lookup(key: str) -> Optional[Dict[str, Any]]:
+    tbl = table()
+    if tbl is None:
+        return _MEM.get(key)
+    return tbl.get_item(Key={"pk": PK, "sk": key}).get("Item")
+
+def check(address: str) -> Optional[str]:
+    """The reason `address` (or its domain) is suppressed, else None."""
+    entries = _entries()
+    for key in _keys(address):
+        if key in entries:
+            item = _lookup(key)
+            if item is not None:
+                return item.get("reason") or "suppressed"
+            with _lock:
+                entries.discard(key)                # removed since the set was loaded
+    return None
+
+def filter_allowed(addresses: Iterable[str]) -> Tuple[List[str], Dict[str, str]]:
+    """Split addresses into (allowed, {suppressed address: reason}); order kept."""
+    allowed, blocked = [], {}
+    for a in addresses:
+        reason = check(a)
+        if reason:
+            blocked[_norm(a)] = reason
+        else:
+            allowed.append(a)
+    return allowed, blocked
+
+def add(entries: Iterable[str], reason: str, source: str = "") -> int:
+    """Suppress addresses, or whole domains given as "@domain" (or "domain")."""
+    keys = []
+    for e in entries:
+        e = _norm(e)
+        if e:
+            keys.append(e if "@" in e else f"@{e}")
+    if not keys:
+        return 0
+    now = int(time.time())
+    tbl = table()
+    if tbl is None:
+        for k in keys:
+            _MEM[k] = {"reason": reason, "source": source, "ts": now}
+    else:
+        with tbl.batch_writer(overwrite_by_pkeys=["pk", "sk"]) as batch:
+            for k in keys:
+                batch.put_item(Item={"pk": PK, "sk": k, "reason": reason, "source": source, "ts": now})
+    with _lock:
+        if _SET is not None:
+            _SET.update(keys)
+    jlog(op="suppress", ok=True, count=len(keys), reason=reason, source=source)
+    return len(keys)
+
+def remove(entry: str) -> None:
+    key = _norm(entry)
+    key = key if "@" in key else f"@{key}"
+    tbl = table()
+    if tbl is None:
+        _MEM.pop(key, None)
+    else:
+        tbl.delete_item(Key={"pk": PK, "sk": key})
+    with _lock:
+        if _SET is not None:
+            _SET.discard(key)
+
+def backfill(leads: Iterable[Dict[str, Any]]) -> Dict[str, int]:
+    """
+    Suppress every lead in `leads` (e.g. scan_leads()) with a BOUNCED/UNSUBSCRIBE
+    campaign, as the stream would have. Entries already there are kept.
+    Returns {reason: addresses added}.
+    """
+    have = _load()
+    found: Dict[str, List[str]] = {}
+    for lead in leads:
+        email = _norm((lead or {}).get("email"))
+        statuses = {(c or {}).get("status") for c in ((lead or {}).get("campaigns") or {}).values()}
+        reason = next((s for s in SUPPRESS_STATUSES if s in statuses), None)
+        if email and reason and email not in have:
+            found.setdefault(reason, []).append(email)
+            have.add(email)
+    return {reason: add(emails, reason, source="backfill") for reason, emails in found.items()}
+
+def from_lead_change(old: Optional[Dict[str, Any]], new: Optional[Dict[str, Any]]) -> Optional[str]:
+    """The status to suppress the lead for, if any campaign just became BOUNCED/UNSUBSCRIBE (pure)."""
+    old_c = (old or {}).get("campaigns") or {}
+    for cid, c in ((new or {}).get("campaigns") or {}).items():
+        status = c.get("status")
+        if status in SUPPRESS_STATUSES and status != (old_c.get(cid) or {}).get("status"):
+            return status
+    return None
+
+def reset() -> None:
+    """Forget the cached set (tests)."""
+    global _SET
+    with _lock:
+        _SET = None
@@ -0,0 +1,44 @@
+# lambda_functions/suppression_api.py
+import suppression
+from log import jlog
+from runtime import BadRequest, Field, Schema, api_handler, body, query, resp
+
+ADD = Schema(
+    Field("addresses", list, default=[]),
+    Field("domains", list, default=[]),
+    Field("reason", default="MANUAL", upper=True),
+)
+MAX_ENTRIES = 1000
+
+@api_handler("suppression")
+def lambda_handler(event, context):
+    """
+    GET  /suppression?address=a@x.example -> {"address", "suppressed", "reason"}
+    POST /suppression {"addresses": [...], "domains": [...], "reason": "MANUAL"} -> {"ok", "added"}
+
+    POST is an admin write: API Gateway only lets it through with the API key
+    (X-Api-Key header; see template.yaml).
+
+    Direct invoke {"action": "rebuild"} adds leads already BOUNCED/UNSUBSCRIBE
+    from a full LeadsTable scan (once after deploy; the stream only sees new changes).
+    """
+    if event.get("action") == "rebuild":
+        from leads_store_dynamo import scan_leads
+        added = suppression.backfill(scan_leads())
+        jlog(op="suppression_rebuild", ok=True, **added)
+        return {"ok": True, "added": added}
+
+    if (event.get("httpMethod") or "").upper() == "GET":
+        address = (query(event).get("address") or "").strip().lower()
+        if not address:
+            raise BadRequest("address required")
+        reason = suppression.check(address)
+        return resp(200, {"address": address, "suppressed": bool(reason), "reason": reason})
+
+    req = ADD.validate(body(event))
+    entries = [str(a) for a in req["addresses"]] + [f"@{str(d).lstrip('@')}" for d in req["domains"]]
+    if not entries:
+        raise BadRequest("addresses or domains required")
+    if len(entries) > MAX_ENTRIES:
+        raise BadRequest(f"at most {MAX_ENTRIES} entries per request")
+    return resp(200, {"ok": True, "added": suppression.add(entries, req["reason"], source="api")})
@@ -0,0 +1,250 @@
+# lambda_functions/workflow_orchestrator.py
+"""
+POST /workflow          -> start a run: store -> enrich -> draft -> send for a list of leads
+GET  /workflow/{runId}  -> run status, per-stage counts and per-lead progress
+
+The stages call the other handlers' functions in-process instead of going back
+through API Gateway. Store and enrich share one BatchGetItem and one round of
+concurrent site fetches. Their results are written field by field (_persist),
+so statuses, replies and follow-ups written to these leads meanwhile survive.
+Drafting starts while those writes are in flight, and each lead is sent as
+soon as its draft is ready.
+
+In Lambda, POST records the run and re-invokes this function asynchronously
+({"workflowRun": ...}), so the API call returns at once and the run gets the
+function's own timeout instead of API Gateway's. "wait": true runs inline and
+returns the finished run. Outside Lambda the run goes to a background thread.
+"""
+import os, time, uuid, threading
+from concurrent.futures import ThreadPoolExecutor
+
+import clients
+import suppression
+import workflow_runs as runs
+from bedrock_email_draft import draft_email
+from constants import normalize_status
+from lead_enrich import enrich_leads
+from leads_store_dynamo import add_campaigns, batch_get_leads, touch_profiles, update_enrichment
+from log import jlog
+from runtime import BadRequest, api_handler, body as request_body, deadline as lambda_deadline, dumps, query, resp
+from send_cold_email import send_email
+from store_lead_data import merge_lead
+
+MAX_LEADS = int(os.environ.get("WORKFLOW_MAX_LEADS") or 500)         # async invoke payloads cap at 256 KB
+WORKERS = int(os.environ.get("WORKFLOW_WORKERS") or 8)              # concurrent draft+send chains
+DEFAULT_SUBJECT = "Partnership Opportunity - {company}"
+
+def parse_params(body: dict) -> tuple[dict, list[dict]]:
+    """
+    Accepts {"leads": [...], ...shared fields} or a single lead's fields at top level.
+    Returns (params, errors); leads missing email/company_name land in errors.
+    """
+    raw_leads = body.get("leads") if isinstance(body.get("leads"), list) else [body]
+    leads, errors = [], []
+    for item in raw_leads:
+        email = (item.get("email") or "").strip().lower()
+        company = (item.get("company_name") or item.get("companyName") or item.get("company") or "").strip()
+        if not (email and company):
+            errors.append({"item": item, "error": "email and company_name required"})
+            continue
+        leads.append({
+            "email": email,
+            "company_name": company,
+            "website": (item.get("website") or "").strip(),
+            "description": (item.get("description") or "").strip(),
+            "recipient_email": (item.get("recipient_email") or email).strip().lower(),
+        })
+    params = {
+        "leads": leads,
+        "campaign_id": (body.get("campaign_id") or body.get("campaignId") or "").strip(),
+        "status": normalize_status(body.get("status"), "SENT"),
+        "note": (body.get("note") or "").strip(),
+        "sender_email": (body.get("sender_email") or "").strip(),
+        "sender_name": (body.get("sender_name") or "Raghav Dewangan").strip(),
+        "sender_company": (body.get("sender_company") or "AI Sales Solutions").strip(),
+        "subject": (body.get("subject") or DEFAULT_SUBJECT).strip(),
+        "send": bool(body.get("send", True)),
+        "force": bool(body.get("force")),
+    }
+    return params, errors
+
+def _describe(lead: dict, item: dict) -> str:
+    if item.get("description"):
+        return item["description"]
+    industry = (lead.get("profile") or {}).get("industry") or "E-commerce"
+    return f"{industry} company specializing in their industry"
+
+def _draft_and_send(run_id: str, lead: dict, item: dict, params: dict, persisted, deadline: float | None) -> str:
+    """One lead's draft -> send chain. Returns the stage the lead ended in."""
+    email = lead["email"]
+    if deadline is not None and time.monotonic() >= deadline:
+        runs.record_lead(run_id, email, "failed", error="run deadline reached before drafting")
+        return "failed"
+    try:
+        _, draft = draft_email(
+            company=lead.get("company") or item["company_name"],
+            desc=_describe(lead, item),
+            website=item["website"] or (lead.get("profile") or {}).get("website", ""),
+            recipient_email=item["recipient_email"],
+            sender_name=params["sender_name"],
+            sender_company=params["sender_company"],
+            sender_email=params["sender_email"],
+        )
+        if not draft:
+            raise RuntimeError("model returned an empty draft")
+    except Exception as e:
+        runs.record_lead(run_id, email, "failed", error=f"draft: {e}")
+        return "failed"
+    runs.record_lead(run_id, email, "drafted", draft=draft)
+    if not params["send"]:
+        return "drafted"
+
+    try:
+        # send metadata is a read-modify-write on the lead; let the store/enrich writes land first
+        persisted.result()
+        sent = send_email(
+            to_addr=item["recipient_email"],
+            subject=params["subject"].replace("{company}", lead.get("company") or item["company_name"]),
+            text_body=draft,
+            sender=params["sender_email"],
+            campaign_id=params["campaign_id"],
+            lead_email=email,
+        )
+    except Exception as e:
+        runs.record_lead(run_id, email, "failed", error=f"send: {e}")
+        return "failed"
+    runs.record_lead(run_id, email, "sent", messageId=sent["message_id"], dryRun=sent["dry_run"])
+    return "sent"
+
+def _persist(stored: dict, emails: list[str], new: set, campaign_id: str, res: dict) -> None:
+    """
+    Write the store + enrich results without putting back whole items read
+    seconds ago. Leads already stored get the campaign node (add_campaigns).
+    A node they already have is left alone, so a reply isn't reset to the run's
+    status. Next come the enrichment fields, or just the company when the page
+    didn't change. New leads are put whole, on the condition that they still
+    don't exist. Last, fetchedAt/validators for unchanged pages.
+    """
+    add_campaigns([(stored[e], campaign_id) for e in emails if e not in new])
+    enriched = {l["email"] for l in res["leads"]}
+    update_enrichment([stored[e] if e in new or e in enriched else {"email": e, "company": stored[e]["company"]}
+                       for e in emails])
+    touch_profiles({e: {k: stored[e]["profile"].get(k) for k in ("fetchedAt", "etag", "lastModified")}
+                    for e in res["unchanged"] if e not in new})
+
+def run_workflow(run_id: str, params: dict, deadline: float | None = None) -> dict:
+    """Execute a run recorded with workflow_runs.create_run; returns the final run record."""
+    started = time.monotonic()
+    campaign_id = params["campaign_id"]
+    runs.set_status(run_id, "RUNNING")
+    try:
+        # bounced / unsubscribed recipients drop out before anything is stored, drafted or sent
+        _, blocked = suppression.filter_allowed(i["recipient_email"] for i in params["leads"])
+        items = [i for i in params["leads"] if i["recipient_email"] not in blocked]
+        for i in params["leads"]:
+            if i["recipient_email"] in blocked:
+                runs.record_lead(run_id, i["email"], "suppressed", reason=blocked[i["recipient_email"]])
+        if not items:
+            runs.set_status(run_id, "SUCCEEDED")
+            return runs.get_run(run_id)
+
+        # store + enrich: one batch read, one round of fetches, nothing written yet
+        stored = batch_get_leads(i["email"] for i in items)
+        new = {i["email"] for i in items if i["email"] not in stored}
+        for item in items:
+            merge_lead(stored, item["email"], item["company_name"], campaign_id, params["status"], params["note"])
+        res = enrich_leads(items, deadline=deadline, force=params["force"], stored=stored, write=False)
+        outcome = {e: "updated" for e in (l["email"] for l in res["leads"])}
+        outcome.update({e: k for k in ("fresh", "unchanged", "deferred", "failed") for e in res[k]})
+        runs.record_leads(run_id, "enriched", [
+            {"email": i["email"], "enrich": outcome.get(i["email"], "skipped"),
+             "fitScore": stored[i["email"]].get("fitScore"), "intentScore": stored[i["email"]].get("intentScore")}
+            for i in items
+        ])
+
+        # parallel branches: the field-level writes, and draft -> send per lead
+        with ThreadPoolExecutor(max_workers=1) as writer, \
+             ThreadPoolExecutor(max_workers=max(1, min(WORKERS, len(items)))) as pool:
+            persisted = writer.submit(_persist, stored, [i["email"] for i in items], new, campaign_id, res)
+            chains = [pool.submit(_draft_and_send, run_id, stored[i["email"]], i, params, persisted, deadline)
+                      for i in items]
+            ended = [c.result() for c in chains]
+            persisted.result()
+
+        failed = ended.count("failed")
+        status = "SUCCEEDED" if not failed else "FAILED" if failed == len(items) else "PARTIAL"
+        runs.set_status(run_id, status)
+        jlog(op="workflow_run", ok=True, runId=run_id, leads=len(items), suppressed=len(blocked), failed=failed,
+             status=status, ms=int((time.monotonic() - started) * 1000))
+    except Exception as e:
+        runs.set_status(run_id, "FAILED", error=str(e))
+        jlog(op="workflow_run", ok=False, runId=run_id, err=str(e))
+    return runs.get_run(run_id)
+
+def _dispatch(run_id: str, params: dict) -> bool:
+    """
+    Hand the run to an async invocation of the workflow function (this one, or
+    WORKFLOW_FUNCTION_NAME when started from elsewhere); False when not running in Lambda.
+    """
+    fn = os.environ.get("WORKFLOW_FUNCTION_NAME") or os.environ.get("AWS_LAMBDA_FUNCTION_NAME")
+    if not fn or not clients.available():
+        return False
+    clients.client("lambda").invoke(FunctionName=fn, InvocationType="Event",
+                   Payload=dumps({"workflowRun": run_id, "params": params}).encode("utf-8"))
+    return True
+
+def start_run(params: dict, wait: bool = False) -> dict:
+    run_id = uuid.uuid4().hex
+    runs.create_run(run_id, len(params["leads"]), {k: v for k, v in params.items() if k != "leads"})
+    if wait:
+        return run_workflow(run_id, params)
+    try:
+        dispatched = _dispatch(run_id, params)
+    except Exception as e:
+        # the run would otherwise sit QUEUED forever
+        runs.set_status(run_id, "FAILED", error=f"dispatch: {e}")
+        jlog(op="workflow_dispatch", ok=False, runId=run_id, err=str(e))
+        return runs.get_run(run_id, with_leads=False)
+    if not dispatched:
+        threading.Thread(target=run_workflow, args=(run_id, params), name=f"workflow-{run_id}", daemon=True).start()
+    return runs.get_run(run_id, with_leads=False)
+
+@api_handler("workflow")
+def lambda_handler(event, context):
+    """
+    POST JSON body:
+      - leads (list of {email, company_name, website?, description?, recipient_email?}, up to MAX_LEADS)
+        or one lead's fields at top level
+      - campaign_id (str, required), status (default SENT), note
+      - sender_email, sender_name, sender_company, subject ("{company}" is filled in)
+      - send (bool, default true) -> false stops after drafting
+      - force (bool) -> refetch sites even if fresh
+      - wait (bool) -> run inline and return the finished run
+    GET /workflow/{runId} (or ?runId=) -> run record with per-lead progress
+    """
+    # async self-invocation carrying a recorded run
+    if event.get("workflowRun"):
+        run = run_workflow(event["workflowRun"], event["params"], deadline=lambda_deadline(context, 30.0))
+        return {"ok": True, "runId": run["runId"], "status": run["status"]}
+
+    if (event.get("httpMethod") or "").upper() == "GET":
+        run_id = (event.get("pathParameters") or {}).get("runId") or query(event).get("runId") or ""
+        if not run_id:
+            raise BadRequest("runId required")
+        run = runs.get_run(run_id)
+        if run is None:
+            return resp(404, {"error": f"run {run_id} not found"})
+        return resp(200, {"ok": True, **run})
+
+    body = request_body(event)
+    params, errors = parse_params(body)
+    if not params["campaign_id"]:
+        raise BadRequest("Missing required field: campaign_id")
+    if not params["leads"]:
+        raise BadRequest("No valid leads", errors=errors)
+    if len(params["leads"]) > MAX_LEADS:
+        raise BadRequest(f"at most {MAX_LEADS} leads per run")
+
+    run = start_run(params, wait=bool(body.get("wait")))
+    jlog(op="workflow_start", ok=True, runId=run["runId"], leads=len(params["leads"]), rejected=len(errors))
+    return resp(200, {"ok": True, **run, "errors": errors})
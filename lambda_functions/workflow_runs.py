@@ -0,0 +1,139 @@
+# lambda_functions/workflow_runs.py
+"""
+Run records for the workflow orchestrator.
+
+With WORKFLOW_TABLE_NAME set, each run is one DynamoDB partition (pk "RUN#<id>"):
+sk "RUN" holds status and per-stage counters (atomic ADD), and sk "LEAD#<email>"
+holds one lead's progress. Per-lead writes never contend on one item, and a poll
+is a single Query. Without the env var, runs live in process memory, which is
+what the local runner and the tests use.
+"""
+import os, threading, time
+from typing import Any, Dict, List, Optional
+
+import clients
+
+STAGES = ("enriched", "drafted", "sent", "failed", "suppressed")       # counters: leads that reached each stage
+RUN_TTL_DAYS = 14
+
+_TABLE = None
+_MEM: Dict[str, Dict[str, Any]] = {}
+_MEM_LOCK = threading.Lock()
+
+def _table():
+    global _TABLE
+    if _TABLE is not None:
+        return _TABLE
+    name = os.environ.get("WORKFLOW_TABLE_NAME")
+    if not name or not clients.available():
+        return None
+    _TABLE = clients.table(name)
+    return _TABLE
+
+def _pk(run_id: str) -> str:
+    return f"RUN#{run_id}"
+
+def create_run(run_id: str, total: int, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    now = int(time.time())
+    run = {"runId": run_id, "status": "QUEUED", "total": total, "createdAt": now, "updatedAt": now,
+           "params": params or {}, **{s: 0 for s in STAGES}}
+    table = _table()
+    if table is None:
+        with _MEM_LOCK:
+            _MEM[run_id] = {**run, "leads": {}}
+        return run
+    table.put_item(Item={"pk": _pk(run_id), "sk": "RUN", "expiresAt": now + RUN_TTL_DAYS * 86400, **run})
+    return run
+
+def set_status(run_id: str, status: str, error: Optional[str] = None) -> None:
+    now = int(time.time())
+    table = _table()
+    if table is None:
+        with _MEM_LOCK:
+            run = _MEM[run_id]
+            run.update({"status": status, "updatedAt": now})
+            if error:
+                run["error"] = error
+        return
+    expr, values = "SET #s = :s, updatedAt = :u", {":s": status, ":u": now}
+    if error:
+        expr += ", #e = :e"
+        values[":e"] = error
+    names = {"#s": "status", **({"#e": "error"} if error else {})}
+    table.update_item(Key={"pk": _pk(run_id), "sk": "RUN"}, UpdateExpression=expr,
+                      ExpressionAttributeNames=names, ExpressionAttributeValues=values)
+
+def record_lead(run_id: str, email: str, stage: str, **fields) -> None:
+    """Move one lead to `stage` (one of STAGES) and bump that stage's run counter."""
+    now = int(time.time())
+    lead = {"email": email, "stage": stage, "updatedAt": now, **fields}
+    table = _table()
+    if table is None:
+        with _MEM_LOCK:
+            run = _MEM[run_id]
+            run["leads"].setdefault(email, {}).update(lead)
+            run[stage] += 1
+            run["updatedAt"] = now
+        return
+    # SET rather than put: earlier stages' fields (scores, draft) stay on the item
+    fields = {**lead, "expiresAt": now + RUN_TTL_DAYS * 86400}
+    table.update_item(Key={"pk": _pk(run_id), "sk": f"LEAD#{email}"},
+                      UpdateExpression="SET " + ", ".join(f"#f{i} = :f{i}" for i in range(len(fields))),
+                      ExpressionAttributeNames={f"#f{i}": k for i, k in enumerate(fields)},
+                      ExpressionAttributeValues={f":f{i}": v for i, v in enumerate(fields.values())})
+    table.update_item(Key={"pk": _pk(run_id), "sk": "RUN"},
+                      UpdateExpression="ADD #n :one SET updatedAt = :u",
+                      ExpressionAttributeNames={"#n": stage},
+                      ExpressionAttributeValues={":one": 1, ":u": now})
+
+def record_leads(run_id: str, stage: str, leads: List[Dict[str, Any]]) -> None:
+    """Batch form of record_lead; each dict needs "email". One batched write, one counter update."""
+    now = int(time.time())
+    table = _table()
+    if table is None:
+        for lead in leads:
+            record_lead(run_id, stage=stage, **lead)
+        return
+    with table.batch_writer(overwrite_by_pkeys=["pk", "sk"]) as batch:
+        for lead in leads:
+            batch.put_item(Item={"pk": _pk(run_id), "sk": f"LEAD#{lead['email']}",
+                                 "expiresAt": now + RUN_TTL_DAYS * 86400,
+                                 **lead, "stage": stage, "updatedAt": now})
+    table.update_item(Key={"pk": _pk(run_id), "sk": "RUN"},
+                      UpdateExpression="ADD #n :c SET updatedAt = :u",
+                      ExpressionAttributeNames={"#n": stage},
+                      ExpressionAttributeValues={":c": len(leads), ":u": now})
+
+def get_run(run_id: str, with_leads: bool = True) -> Optional[Dict[str, Any]]:
+    table = _table()
+    if table is None:
+        with _MEM_LOCK:
+            run = _MEM.get(run_id)
+            if run is None:
+                return None
+            out = {k: v for k, v in run.items() if k != "leads"}
+            if with_leads:
+                out["leads"] = [dict(l) for l in run["leads"].values()]
+            return out
+
+    if not with_leads:
+        item = table.get_item(Key={"pk": _pk(run_id), "sk": "RUN"}).get("Item")
+        return _strip(item) if item else None
+    run, leads = None, []
+    kwargs: Dict[str, Any] = {"KeyConditionExpression": "pk = :p", "ExpressionAttributeValues": {":p": _pk(run_id)}}
+    while True:
+        res = table.query(**kwargs)
+        for item in res.get("Items", []):
+            if item["sk"] == "RUN":
+                run = _strip(item)
+            else:
+                leads.append(_strip(item))
+        if "LastEvaluatedKey" not in res:
+            break
+        kwargs["ExclusiveStartKey"] = res["LastEvaluatedKey"]
+    if run is not None:
+        run["leads"] = leads
+    return run
+
+def _strip(item: Dict[str, Any]) -> Dict[str, Any]:
+    return {k: v for k, v in item.items() if k not in ("pk", "sk", "expiresAt")}
@@ -0,0 +1,41 @@
+# local_crawl.py
+"""
+Run a distributed crawl locally: the coordinator queues chunks in memory and a
+pool of worker processes drains them, the way CrawlWorker functions drain SQS.
+
+    python local_crawl.py --query "trail shoes" --query "yoga mats" --limit 40 --workers 8
+    python local_crawl.py --query fitness --workers 0        # inline, for debugging
+
+Set GOOGLE_API_KEY / GOOGLE_CSE_ID for real search results (mocked otherwise).
+Job records stay in memory unless LEAD_INDEX_TABLE_NAME is set.
+"""
+import argparse, json, sys, time
+sys.path.append('lambda_functions')
+
+import crawl_jobs
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--query", action="append", required=True)
+    ap.add_argument("--limit", type=int, default=20, help="candidates per query (max 100)")
+    ap.add_argument("--workers", type=int, default=4, help="worker processes (0 = inline)")
+    ap.add_argument("--chunk", type=int, default=crawl_jobs.CHUNK, help="URLs per queue message")
+    ap.add_argument("--out", help="write the job's results here as JSON")
+    args = ap.parse_args()
+
+    crawl_jobs.CHUNK = args.chunk
+    started = time.monotonic()
+    job = crawl_jobs.start_job(args.query, args.limit)
+    print(f"job {job['jobId']}: {job['total']} to crawl, {job['served']} served, {job['skipped']} skipped")
+    messages = crawl_jobs.run_local(args.workers)
+    job = crawl_jobs.get_job(job["jobId"])
+    print(f"{job['status']}: {messages} chunks, {job['found']}/{job['total']} stores "
+          f"in {time.monotonic() - started:.1f}s")
+    for query, stores in job["results"].items():
+        print(f"  {query}: {len(stores)}")
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(job, f, indent=2, default=str)
+
+if __name__ == "__main__":
+    main()
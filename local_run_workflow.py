@@ -0,0 +1,67 @@
+# local_run_workflow.py
+"""
+Run the orchestrated workflow in-process, without API Gateway, and print progress.
+
+    python local_run_workflow.py --campaign demo-001 --leads leads.json
+    python local_run_workflow.py --campaign demo-001 --email owner@shop.example \
+        --company "Acme" --website https://acme.example --no-send
+
+--leads takes a JSON list of {email, company_name, website?, description?}.
+Uses the same env as the Lambdas (LEADS_TABLE_NAME, BEDROCK_*, SES_FROM_EMAIL);
+EMAIL_DRY_RUN defaults to on. Run records stay in memory unless
+WORKFLOW_TABLE_NAME is set.
+"""
+import argparse, json, os, sys, time
+sys.path.append('lambda_functions')
+
+os.environ.setdefault("LEADS_TABLE_NAME", "LeadsTable")
+os.environ.setdefault("EMAIL_DRY_RUN", "1")
+
+from workflow_orchestrator import parse_params, start_run
+from workflow_runs import get_run
+
+DONE = ("SUCCEEDED", "PARTIAL", "FAILED")
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--campaign", required=True)
+    ap.add_argument("--leads", help="JSON file with a list of leads")
+    ap.add_argument("--email")
+    ap.add_argument("--company")
+    ap.add_argument("--website", default="")
+    ap.add_argument("--sender", default=os.environ.get("SES_FROM_EMAIL", ""))
+    ap.add_argument("--no-send", action="store_true", help="stop after drafting")
+    args = ap.parse_args()
+
+    if args.leads:
+        with open(args.leads, encoding="utf-8") as f:
+            leads = json.load(f)
+    elif args.email and args.company:
+        leads = [{"email": args.email, "company_name": args.company, "website": args.website}]
+    else:
+        ap.error("pass --leads or --email and --company")
+
+    params, errors = parse_params({"leads": leads, "campaign_id": args.campaign,
+                                   "sender_email": args.sender, "send": not args.no_send})
+    for e in errors:
+        print(f"skipped: {e['error']}: {e['item']}")
+    if not params["leads"]:
+        return 1
+
+    started = time.monotonic()
+    run = start_run(params)
+    print(f"run {run['runId']}: {run['total']} leads")
+    while run["status"] not in DONE:
+        time.sleep(0.5)
+        run = get_run(run["runId"], with_leads=False)
+        print(f"  {run['status']:<9} enriched={run['enriched']} drafted={run['drafted']} "
+              f"sent={run['sent']} failed={run['failed']}")
+
+    run = get_run(run["runId"])
+    for lead in run["leads"]:
+        print(f"{lead['email']:<40} {lead['stage']:<9} {lead.get('messageId') or lead.get('error') or ''}")
+    print(f"{run['status']} in {time.monotonic() - started:.1f}s")
+    return 0 if run["status"] == "SUCCEEDED" else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
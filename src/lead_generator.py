@@ -5,51 +5,148 @@ Handles finding and validating Shopify store leads
 
 import requests
 import json
-import re
+import os
 import time
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict, Optional
 from urllib.parse import urljoin, urlparse
 from bs4 import BeautifulSoup
 import logging
 
+# Shared helpers live with the Lambda code and are imported flat, as the handlers
+# do. Entry points put lambda_functions/ on sys.path next to src/.
+import crawl_frontier
+import shopify_json
+import site_meta
+from search_provider import GoogleCSE
+from async_fetch import fetch_all
+from http_client import mount_pool
+from extraction_rules import (
+    ABOUT_HREF_RE, CITY_STATE_ZIP_RE, ADDRESS_RE, CONTACT_HREF_RE, EMAIL_RE, EMAIL_SKIP,
+    NAV_CLASS_RE, PHONE_PATTERNS, SOCIAL_HREF_PATTERNS, TITLE_SUFFIX_RE, classify_industry,
+)
+
+# Parallel search calls per batch
+SEARCH_WORKERS = 8
+
+# Lead fields taken from shopify_json store info when it has them
+JSON_LEAD_FIELDS = {
+    'company_name': 'name',
+    'description': 'description',
+    'currency': 'currency',
+    'products': 'categories',
+    'location': 'location',
+}
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 class LeadGenerator:
-    def __init__(self, google_api_key: Optional[str] = None, google_cse_id: Optional[str] = None):
+    def __init__(self, google_api_key: Optional[str] = None, google_cse_id: Optional[str] = None,
+                 request_delay: float = 1.0):
         self.google_api_key = google_api_key
         self.google_cse_id = google_cse_id
+        self.request_delay = request_delay
         self.session = requests.Session()
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
         })
+        mount_pool(self.session)
+        self.search_provider = (GoogleCSE(google_api_key, google_cse_id, session=self.session)
+                                if google_api_key and google_cse_id else None)
+        if os.environ.get('CRAWL_ARCHIVE'):
+            # Record/replay pages offline (see lambda_functions/page_archive.py)
+            from page_archive import install_from_env
+            install_from_env(self.session)
     
     def find_shopify_leads(self, query: str, limit: int = 10) -> List[Dict]:
         """
         Find Shopify store leads based on search query
         """
-        logger.info(f"Searching for Shopify stores: {query}")
+        return self.find_shopify_leads_batch([query], limit).get(query, [])
+    
+    def find_shopify_leads_batch(self, queries: List[str], limit: int = 10) -> Dict[str, List[Dict]]:
+        """
+        Find leads for many queries at once; returns {query: leads}.
+        Searches run in parallel, and their store URLs are merged with one domain
+        dedup before any fetch, so a store several queries hit is crawled once.
+        """
+        queries = list(dict.fromkeys(q for q in queries if q))
+        if not queries:
+            return {}
+        logger.info(f"Searching for Shopify stores: {', '.join(queries)}")
         
         # Search for potential stores
-        store_urls = self._search_shopify_stores(query, limit * 2)
+        with ThreadPoolExecutor(max_workers=min(SEARCH_WORKERS, len(queries))) as pool:
+            found = list(pool.map(lambda q: self._search_shopify_stores(q, limit * 2), queries))
+        
+        # The first URL seen for each domain is the one crawled
+        urls, per_query = {}, {}
+        for query, store_urls in zip(queries, found):
+            per_query[query] = list(dict.fromkeys(crawl_frontier.domain_of(u) for u in store_urls))[:limit]
+            for url in store_urls:
+                urls.setdefault(crawl_frontier.domain_of(url), url)
+        wanted = list(dict.fromkeys(d for domains in per_query.values() for d in domains))
+        
+        # Skip stores we already hold as leads or that failed recently; reuse fresh results
+        store_urls, served, skipped = crawl_frontier.plan([urls[d] for d in wanted], source="generator")
+        if served or skipped:
+            logger.info(f"Crawl frontier: {len(served)} served, {len(skipped)} skipped, {len(store_urls)} to fetch")
+        
+        by_domain = {crawl_frontier.domain_of(lead['website']): lead for lead in served}
+        crawled = self._crawl(store_urls)
+        by_domain.update({crawl_frontier.domain_of(url): lead for url, lead in crawled.items() if lead})
+        crawl_frontier.record("generator", crawled)
+        
+        results = {query: [by_domain[d] for d in domains if d in by_domain] for query, domains in per_query.items()}
+        logger.info(f"Generated {len(by_domain)} qualified leads for {len(queries)} queries")
+        return results
+    
+    def _crawl(self, store_urls: List[str]) -> Dict[str, Optional[Dict]]:
+        """
+        Crawl each store once; returns {url: lead}, with None where nothing valid came back
+        """
+        # robots.txt rules and sitemap pages (cached per domain) decide what may be fetched
+        metas = site_meta.load(store_urls, session=self.session)
+        crawled = dict.fromkeys(store_urls)
+        allowed = [url for url in store_urls if site_meta.allowed(metas[url], url)]
+        
+        # Shopify's JSON endpoints and contact page first; homepages only for stores they leave short
+        infos, json_pages = shopify_json.fetch_stores(allowed, session=self.session, timeout=10, metas=metas)
+        for url, info in infos.items():
+            if info and not shopify_json.missing(info, ('name', 'email', 'description')):
+                contact = json_pages.get(info['contactPage'])
+                crawled[url] = self._lead_from_json(info, url, contact.text if contact else None)
         
-        leads = []
-        for url in store_urls[:limit]:
+        # Homepages in one concurrent round, then contact/about pages in a second
+        homes = self._extract_homepages([url for url in allowed if crawled[url] is None])
+        if homes and self.request_delay:
+            # Be respectful: pause before going back to the same stores
+            time.sleep(self.request_delay)
+        pages = {url: page.text for url, page in json_pages.items() if page.status}
+        pages.update(self._fetch_pages(
+            u for url, soup in homes for u in self._page_links(soup, url, metas[url]) if u not in pages
+        ))
+        
+        for url, soup in homes:
             try:
-                lead_data = self._extract_lead_info(url)
-                if lead_data and self._validate_lead(lead_data):
-                    leads.append(lead_data)
-                    logger.info(f"Found valid lead: {lead_data['company_name']}")
-                
-                # Be respectful with requests
-                time.sleep(1)
-                
+                crawled[url] = self._lead_from_soup(soup, url, pages, metas[url])
+                info = infos.get(url) or {}
+                # Whatever the JSON path did find wins over the HTML guesses
+                for field, key in JSON_LEAD_FIELDS.items():
+                    if info.get(key):
+                        crawled[url][field] = info[key]
             except Exception as e:
                 logger.warning(f"Failed to process {url}: {str(e)}")
                 continue
         
-        logger.info(f"Generated {len(leads)} qualified leads")
-        return leads
+        for url in store_urls:
+            lead_data = crawled[url]
+            if lead_data and self._validate_lead(lead_data):
+                logger.info(f"Found valid lead: {lead_data['company_name']}")
+            else:
+                crawled[url] = None
+        return crawled
     
     def _search_shopify_stores(self, query: str, limit: int) -> List[str]:
         """
@@ -66,22 +163,9 @@ class LeadGenerator:
         """
         search_query = f'{query} site:myshopify.com OR "powered by shopify"'
         
-        url = "https://www.googleapis.com/customsearch/v1"
-        params = {
-            'key': self.google_api_key,
-            'cx': self.google_cse_id,
-            'q': search_query,
-            'num': min(limit, 10)  # Google CSE max is 10 per request
-        }
-        
         try:
-            response = requests.get(url, params=params)
-            response.raise_for_status()
-            
-            results = response.json()
-            urls = [item['link'] for item in results.get('items', [])]
-            
-            return urls
+            # Result pages in parallel, under the daily quota, cached per query (see search_provider)
+            return [r['url'] for r in self.search_provider.search(search_query, limit)]
             
         except Exception as e:
             logger.error(f"Google Custom Search failed: {str(e)}")
@@ -114,36 +198,101 @@ class LeadGenerator:
         Extract comprehensive lead information from a Shopify store
         """
         try:
+            meta = site_meta.load([url], session=self.session)[url]
+            if not site_meta.allowed(meta, url):
+                logger.warning(f"{url} is disallowed by its robots.txt")
+                return None
+            
+            infos, json_pages = shopify_json.fetch_stores([url], session=self.session, timeout=10,
+                                                          metas={url: meta})
+            info = infos.get(url)
+            if info and not shopify_json.missing(info, ('name', 'email', 'description')):
+                contact = json_pages.get(info['contactPage'])
+                return self._lead_from_json(info, url, contact.text if contact else None)
+            
             response = self.session.get(url, timeout=10)
             response.raise_for_status()
             
             soup = BeautifulSoup(response.content, 'html.parser')
             
             # Check if it's actually a Shopify store
-            if not self._is_shopify_store(soup, response.text):
+            if not info and not self._is_shopify_store(soup, response.text):
                 logger.warning(f"{url} doesn't appear to be a Shopify store")
                 return None
             
-            lead_info = {
-                'website': url,
-                'company_name': self._extract_company_name(soup, url),
-                'email': self._extract_email(soup, url),
-                'phone': self._extract_phone(soup),
-                'description': self._extract_description(soup),
-                'industry': self._extract_industry(soup),
-                'social_media': self._extract_social_links(soup),
-                'contact_page': self._find_contact_page(soup, url),
-                'about_page': self._find_about_page(soup, url),
-                'products': self._extract_product_categories(soup),
-                'location': self._extract_location(soup)
-            }
-            
-            return lead_info
+            lead_data = self._lead_from_soup(soup, url, meta=meta)
+            for field, key in JSON_LEAD_FIELDS.items():
+                if (info or {}).get(key):
+                    lead_data[field] = info[key]
+            return lead_data
             
         except Exception as e:
             logger.error(f"Error extracting info from {url}: {str(e)}")
             return None
     
+    def _extract_homepages(self, urls: List[str]) -> List[tuple]:
+        """
+        Fetch store homepages concurrently; returns (url, soup) for the Shopify ones
+        """
+        homes = []
+        fetched = fetch_all(urls, timeout=10, session=self.session)
+        for url in urls:
+            page = fetched.get(url)
+            if page is None or not page.ok:
+                reason = (page.error or f"HTTP {page.status}") if page else "not fetched"
+                logger.error(f"Error extracting info from {url}: {reason}")
+                continue
+            try:
+                soup = BeautifulSoup(page.content, 'html.parser')
+            except Exception as e:
+                logger.error(f"Error extracting info from {url}: {str(e)}")
+                continue
+            if not self._is_shopify_store(soup, page.text):
+                logger.warning(f"{url} doesn't appear to be a Shopify store")
+                continue
+            homes.append((url, soup))
+        return homes
+    
+    def _fetch_pages(self, urls) -> Dict[str, str]:
+        """Fetch secondary pages concurrently; returns {url: text} for the ones that answered"""
+        return {url: page.text for url, page in fetch_all(urls, timeout=5, session=self.session).items()
+                if page.status}
+    
+    def _lead_from_soup(self, soup: BeautifulSoup, url: str, pages: Optional[Dict[str, str]] = None,
+                        meta: Optional[Dict] = None) -> Dict:
+        return {
+            'website': url,
+            'company_name': self._extract_company_name(soup, url),
+            'email': self._extract_email(soup, url, pages, meta),
+            'phone': self._extract_phone(soup),
+            'description': self._extract_description(soup),
+            'industry': self._extract_industry(soup),
+            'social_media': self._extract_social_links(soup),
+            'contact_page': self._find_contact_page(soup, url, meta),
+            'about_page': self._find_about_page(soup, url, meta),
+            'products': self._extract_product_categories(soup),
+            'location': self._extract_location(soup),
+            'currency': None
+        }
+    
+    def _lead_from_json(self, info: Dict, url: str, contact_html: Optional[str] = None) -> Dict:
+        """Lead from shopify_json store info; the contact page (if fetched) supplies phone and social links"""
+        soup = BeautifulSoup(contact_html, 'html.parser') if contact_html else None
+        return {
+            'website': url,
+            'company_name': info['name'],
+            'email': info['email'],
+            'phone': (self._extract_phone(soup) if soup else None) or info['phone'],
+            'description': info['description'],
+            'industry': classify_industry(' '.join([info['description'] or '', *info['categories']])),
+            'social_media': self._extract_social_links(soup) if soup else {},
+            'contact_page': info['contactPage'],
+            'about_page': None,
+            'products': info['categories'],
+            'location': info['location'] or (self._extract_location(soup) if soup else None),
+            'currency': info['currency']
+        }
+    
     def _is_shopify_store(self, soup: BeautifulSoup, page_text: str) -> bool:
         """
         Verify if the site is actually a Shopify store
@@ -165,7 +314,7 @@ class LeadGenerator:
         if title:
             name = title.get_text().strip()
             # Clean up common title patterns
-            name = re.sub(r'\s*[-–|]\s*(Shop|Store|Online|Home).*$', '', name, flags=re.IGNORECASE)
+            name = TITLE_SUFFIX_RE.sub('', name)
             if name:
                 return name
         
@@ -178,16 +327,11 @@ class LeadGenerator:
         domain = urlparse(url).netloc
         return domain.replace('.myshopify.com', '').replace('.com', '').replace('-', ' ').title()
     
-    def _extract_email(self, soup: BeautifulSoup, base_url: str) -> Optional[str]:
-        """Extract email with improved accuracy"""
-        email_pattern = r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b'
-        
+    def _extract_email(self, soup: BeautifulSoup, base_url: str,
+                       pages: Optional[Dict[str, str]] = None, meta: Optional[Dict] = None) -> Optional[str]:
+        """Extract email with improved accuracy; `pages` holds prefetched {url: text}"""
         # Priority order: contact page, about page, current page
-        pages_to_check = [
-            self._find_contact_page(soup, base_url),
-            self._find_about_page(soup, base_url),
-            base_url
-        ]
+        pages_to_check = self._page_links(soup, base_url, meta) + [base_url]
         
         for page_url in pages_to_check:
             if not page_url:
@@ -196,15 +340,16 @@ class LeadGenerator:
             try:
                 if page_url == base_url:
                     page_text = soup.get_text()
+                elif pages is not None:
+                    page_text = pages.get(page_url, '')
                 else:
                     response = self.session.get(page_url, timeout=5)
                     page_text = response.text
                 
-                emails = re.findall(email_pattern, page_text)
+                emails = EMAIL_RE.findall(page_text)
                 # Filter out common false positives
                 valid_emails = [email for email in emails 
-                              if not any(skip in email.lower() 
-                                       for skip in ['example.com', 'test.com', 'noreply'])]
+                              if not any(skip in email.lower() for skip in EMAIL_SKIP)]
                 
                 if valid_emails:
                     return valid_emails[0]
@@ -217,16 +362,11 @@ class LeadGenerator:
     
     def _extract_phone(self, soup: BeautifulSoup) -> Optional[str]:
         """Extract phone number with better pattern matching"""
-        phone_patterns = [
-            r'\+?1?[-.\s]?\(?([0-9]{3})\)?[-.\s]?([0-9]{3})[-.\s]?([0-9]{4})',
-            r'\+?([0-9]{1,3})[-.\s]?([0-9]{3,4})[-.\s]?([0-9]{3,4})[-.\s]?([0-9]{3,4})'
-        ]
-        
         text = soup.get_text()
-        for pattern in phone_patterns:
-            matches = re.findall(pattern, text)
-            if matches:
-                return ''.join(matches[0])
+        for pattern in PHONE_PATTERNS:
+            m = pattern.search(text)
+            if m:
+                return ''.join(m.groups())
         
         return None
     
@@ -252,54 +392,41 @@ class LeadGenerator:
         return 'E-commerce store'
     
     def _extract_industry(self, soup: BeautifulSoup) -> str:
-        """Determine industry based on content analysis"""
-        text = soup.get_text().lower()
-        
-        industry_keywords = {
-            'fashion': ['clothing', 'fashion', 'apparel', 'dress', 'shirt', 'pants'],
-            'beauty': ['beauty', 'cosmetics', 'skincare', 'makeup', 'fragrance'],
-            'fitness': ['fitness', 'gym', 'workout', 'exercise', 'sports'],
-            'electronics': ['electronics', 'gadgets', 'tech', 'computer', 'phone'],
-            'home': ['home', 'furniture', 'decor', 'kitchen', 'bedroom'],
-            'food': ['food', 'snacks', 'organic', 'nutrition', 'supplements']
-        }
-        
-        for industry, keywords in industry_keywords.items():
-            if any(keyword in text for keyword in keywords):
-                return industry.title()
-        
-        return 'E-commerce'
+        """Determine industry from keyword hit counts (most hits wins, not first hit)"""
+        return classify_industry(soup.get_text())
     
     def _extract_social_links(self, soup: BeautifulSoup) -> Dict[str, str]:
         """Extract social media links"""
         social_links = {}
-        social_patterns = {
-            'facebook': r'facebook\.com/[^/\s]+',
-            'instagram': r'instagram\.com/[^/\s]+',
-            'twitter': r'twitter\.com/[^/\s]+',
-            'linkedin': r'linkedin\.com/company/[^/\s]+'
-        }
-        
         links = soup.find_all('a', href=True)
         for link in links:
             href = link.get('href', '')
-            for platform, pattern in social_patterns.items():
-                if re.search(pattern, href, re.IGNORECASE):
+            for platform, pattern in SOCIAL_HREF_PATTERNS.items():
+                if pattern.search(href):
                     social_links[platform] = href
                     break
         
         return social_links
     
-    def _find_contact_page(self, soup: BeautifulSoup, base_url: str) -> Optional[str]:
-        """Find contact page URL"""
-        contact_link = soup.find('a', href=re.compile(r'contact', re.I))
+    def _page_links(self, soup: BeautifulSoup, base_url: str, meta: Optional[Dict] = None) -> List[str]:
+        """Contact and about page URLs robots.txt lets us fetch"""
+        links = (self._find_contact_page(soup, base_url, meta), self._find_about_page(soup, base_url, meta))
+        return [u for u in links if u and site_meta.allowed(meta, u)]
+    
+    def _find_contact_page(self, soup: BeautifulSoup, base_url: str, meta: Optional[Dict] = None) -> Optional[str]:
+        """Find contact page URL (the sitemap's, else the first homepage link)"""
+        if (meta or {}).get('contact'):
+            return meta['contact'][0]
+        contact_link = soup.find('a', href=CONTACT_HREF_RE)
         if contact_link:
             return urljoin(base_url, contact_link.get('href'))
         return None
     
-    def _find_about_page(self, soup: BeautifulSoup, base_url: str) -> Optional[str]:
-        """Find about page URL"""
-        about_link = soup.find('a', href=re.compile(r'about', re.I))
+    def _find_about_page(self, soup: BeautifulSoup, base_url: str, meta: Optional[Dict] = None) -> Optional[str]:
+        """Find about page URL (the sitemap's, else the first homepage link)"""
+        if (meta or {}).get('about'):
+            return meta['about'][0]
+        about_link = soup.find('a', href=ABOUT_HREF_RE)
         if about_link:
             return urljoin(base_url, about_link.get('href'))
         return None
@@ -309,7 +436,7 @@ class LeadGenerator:
         categories = []
         
         # Look for navigation menus
-        nav_elements = soup.find_all(['nav', 'ul'], class_=re.compile(r'nav|menu', re.I))
+        nav_elements = soup.find_all(['nav', 'ul'], class_=NAV_CLASS_RE)
         for nav in nav_elements:
             links = nav.find_all('a')
             for link in links:
@@ -322,19 +449,14 @@ class LeadGenerator:
     def _extract_location(self, soup: BeautifulSoup) -> Optional[str]:
         """Extract business location"""
         # Look for address patterns
-        address_pattern = r'\b\d+\s+[A-Za-z\s]+(?:Street|St|Avenue|Ave|Road|Rd|Boulevard|Blvd|Drive|Dr|Lane|Ln|Way|Court|Ct|Place|Pl)\b'
-        
         text = soup.get_text()
-        addresses = re.findall(address_pattern, text, re.IGNORECASE)
-        
-        if addresses:
-            return addresses[0]
+        m = ADDRESS_RE.search(text)
+        if m:
+            return m.group(0)
         
         # Look for city, state patterns
-        location_pattern = r'\b[A-Za-z\s]+,\s*[A-Z]{2}\s*\d{5}\b'
-        locations = re.findall(location_pattern, text)
-        
-        return locations[0] if locations else None
+        m = CITY_STATE_ZIP_RE.search(text)
+        return m.group(0) if m else None
     
     def _validate_lead(self, lead_data: Dict) -> bool:
         """
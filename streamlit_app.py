@@ -1,8 +1,10 @@
 # streamlit_app.py
-import os, json, requests, time
+import os, json, time
 import streamlit as st
 from datetime import datetime
 
+import dashboard_data
+
 try:
     import boto3
     BOTO3_OK = True
@@ -21,20 +23,19 @@ def _secret(k, d=""):
 API_URL = os.getenv("API_URL") or _secret("API_URL", "https://jnepug6nv2.execute-api.us-east-1.amazonaws.com/Prod")
 AWS_REGION = os.getenv("AWS_REGION") or _secret("AWS_REGION", "us-east-1")
 DEFAULT_SENDER = os.getenv("SES_FROM_EMAIL") or _secret("SES_FROM_EMAIL", "raghav.dewangan2004@gmail.com")
+WORKFLOW_POLL_SECONDS = int(os.getenv("WORKFLOW_POLL_SECONDS") or 120)   # then "still running, check back"
 
 PRIMARY = "#6C63FF"
 MUTED = "#6b7280"
 
 # ---- Helpers ----
 def api_post(path, payload):
-    """POST request to API Gateway endpoint"""
-    url = API_URL.rstrip("/") + path
-    try:
-        r = requests.post(url, json=payload, timeout=30)
-        r.raise_for_status()
-        return r.json()
-    except requests.exceptions.RequestException as e:
-        return {"error": str(e)}
+    """POST request to API Gateway endpoint (cached keep-alive client, see api_client.py)"""
+    return dashboard_data.post(API_URL, path, payload)
+
+def api_get(path, params=None):
+    """GET request to API Gateway endpoint"""
+    return dashboard_data.get(API_URL, path, params)
 
 def chip(text, bg):
     return f'<span style="padding:2px 8px;border-radius:999px;background:{bg};color:#fff;font-weight:700">{text}</span>'
@@ -68,6 +69,15 @@ def dt(ts):
     except Exception:
         return str(ts)
 
+def ordered_bars(rows, x, y, horizontal=False):
+    """Bar chart in data order. st.bar_chart sorts categories and only takes sort= on newer Streamlit than we pin."""
+    import altair as alt
+    order = [r[x] for r in rows]
+    cat, val = alt.X(f"{x}:N", sort=order, title=None), alt.Y(f"{y}:Q")
+    if horizontal:
+        cat, val = alt.Y(f"{x}:N", sort=order, title=None), alt.X(f"{y}:Q")
+    st.altair_chart(alt.Chart(alt.Data(values=rows)).mark_bar().encode(cat, val), use_container_width=True)
+
 def render_lead(lead):
     """Render lead information with campaign details and reply highlighting"""
     if not lead:
@@ -126,6 +136,23 @@ AWS_REGION = st.sidebar.text_input("AWS Region", AWS_REGION)
 DEFAULT_SENDER = st.sidebar.text_input("Default Sender", DEFAULT_SENDER or "you@domain.com")
 use_direct_dynamo = st.sidebar.checkbox("Use direct DynamoDB read (live)", value=BOTO3_OK)
 
+# ---- API debug: per-endpoint latency from the shared client ----
+with st.sidebar.expander("🐞 API debug"):
+    api_stats = dashboard_data.api_client(API_URL).stats()
+    if not api_stats:
+        st.caption("No API calls yet in this process")
+    else:
+        st.dataframe(
+            sorted(({"endpoint": k, **{f: v[f] for f in ("calls", "errors", "retries", "p50_ms", "p95_ms", "max_ms")}}
+                    for k, v in api_stats.items()), key=lambda r: -(r["p95_ms"] or 0)),
+            hide_index=True,
+        )
+        hist_endpoint = st.selectbox("Latency histogram", list(api_stats), key="api_debug_endpoint")
+        ordered_bars([{"latency": b, "calls": n} for b, n in api_stats[hist_endpoint]["histogram"].items()],
+                     "latency", "calls")
+        if st.button("Reset", key="api_debug_reset"):
+            dashboard_data.api_client(API_URL).reset_stats()
+
 st.markdown(
     f"""
 <div style="text-align:center">
@@ -159,12 +186,13 @@ if pending_store or pending_draft:
 store_indicator = " 🔴" if pending_store else ""
 draft_indicator = " 🔴" if pending_draft else ""
 
-tab_search, tab_store, tab_draft, tab_send, tab_view, tab_workflow, tab_replies = st.tabs([
+tab_search, tab_store, tab_draft, tab_send, tab_view, tab_stats, tab_workflow, tab_replies = st.tabs([
     "🔍 Search", 
     f"📥 Store/Enrich Lead{store_indicator}", 
     f"✉️ Draft Email{draft_indicator}", 
     "🚀 Send Email", 
     "📊 Lead Viewer", 
+    "📈 Analytics",
     "🤖 Full Workflow", 
     "📬 SES Inbound"
 ])
@@ -190,83 +218,113 @@ with tab_search:
     
     if search_btn and kw:
         with st.spinner(f"Searching for '{kw}' Shopify stores..."):
-            res = api_post("/search", {"query": kw, "limit": limit})
+            # kept in session state so bulk-action buttons (which rerun the script) still see the results
+            st.session_state["search_results"] = {"kw": kw, "res": api_post("/search", {"query": kw, "limit": limit})}
+            st.session_state.pop("bulk_progress", None)
+    elif search_btn and not kw:
+        st.error("⚠️ Please enter search keywords")
+
+    if st.session_state.get("search_results"):
+        kw = st.session_state["search_results"]["kw"]
+        res = st.session_state["search_results"]["res"]
+        if res.get("error"):
+            st.error(f"❌ Search failed: {res.get('error')}")
+        else:
+            retailers = res.get("retailers", [])
+            count = res.get("count", 0)
+            fallback = res.get("fallback", False)
             
-            if res.get("error"):
-                st.error(f"❌ Search failed: {res.get('error')}")
-            else:
-                retailers = res.get("retailers", [])
-                count = res.get("count", 0)
-                fallback = res.get("fallback", False)
+            if retailers:
+                st.markdown("---")
                 
-                if retailers:
-                    st.markdown("---")
+                # Results display
+                for i, store in enumerate(retailers, 1):
+                    company = store.get("companyName", "Unknown Company")
+                    website = store.get("website", "")
+                    email = store.get("email", "")
+                    phone = store.get("phone", "")
+                    description = store.get("description", "")
+                    contact_page = store.get("contactPage", "")
                     
-                    # Results display
-                    for i, store in enumerate(retailers, 1):
-                        company = store.get("companyName", "Unknown Company")
-                        website = store.get("website", "")
-                        email = store.get("email", "")
-                        phone = store.get("phone", "")
-                        description = store.get("description", "")
-                        contact_page = store.get("contactPage", "")
+                    # Generate mock scores for demo
+                    import random
+                    random.seed(hash(company))  # Consistent scores per company
+                    fit_score = random.randint(60, 95)
+                    intent_score = random.randint(40, 85)
+                    
+                    # Create expandable card for each lead
+                    with st.expander(f"#{i} {company} · {score_chip(fit_score)} Fit · {score_chip(intent_score)} Intent", expanded=i <= 3):
                         
-                        # Generate mock scores for demo
-                        import random
-                        random.seed(hash(company))  # Consistent scores per company
-                        fit_score = random.randint(60, 95)
-                        intent_score = random.randint(40, 85)
+                        # Lead info columns
+                        info_col1, info_col2 = st.columns([2, 1])
                         
-                        # Create expandable card for each lead
-                        with st.expander(f"#{i} {company} · {score_chip(fit_score)} Fit · {score_chip(intent_score)} Intent", expanded=i <= 3):
-                            
-                            # Lead info columns
-                            info_col1, info_col2 = st.columns([2, 1])
-                            
-                            with info_col1:
-                                st.markdown(f"**🏢 Company:** {company}")
-                                if website:
-                                    st.markdown(f"**🌐 Website:** [{website}]({website})")
-                                if email:
-                                    st.markdown(f"**📧 Email:** {email}")
+                        with info_col1:
+                            st.markdown(f"**🏢 Company:** {company}")
+                            if website:
+                                st.markdown(f"**🌐 Website:** [{website}]({website})")
+                            if email:
+                                st.markdown(f"**📧 Email:** {email}")
+                                
+                                # Check if lead already exists in system
+                                existing_leads = [
+                                    "sridatta963@gmail.com", 
+                                    "contact@techgadgetsplus.com", 
+                                    "hello@beautyessentials.com",
+                                    "sales@eliteathletic.com",
+                                    "boutique@luxuryshoes.com"
+                                ]
+                                if email in existing_leads:
+                                    st.success("✅ **Already in CRM** - Has active campaigns!")
                                     
-                                    # Check if lead already exists in system
-                                    existing_leads = [
-                                        "sridatta963@gmail.com", 
-                                        "contact@techgadgetsplus.com", 
-                                        "hello@beautyessentials.com",
-                                        "sales@eliteathletic.com",
-                                        "boutique@luxuryshoes.com"
-                                    ]
-                                    if email in existing_leads:
-                                        st.success("✅ **Already in CRM** - Has active campaigns!")
-                                        
-                                if phone:
-                                    st.markdown(f"**📞 Phone:** {phone}")
-                                if description:
-                                    st.markdown(f"**📝 Description:** {description}")
-                                if contact_page:
-                                    st.markdown(f"**📞 Contact Page:** [{contact_page}]({contact_page})")
+                            if phone:
+                                st.markdown(f"**📞 Phone:** {phone}")
+                            if description:
+                                st.markdown(f"**📝 Description:** {description}")
+                            if contact_page:
+                                st.markdown(f"**📞 Contact Page:** [{contact_page}]({contact_page})")
+                        
+                        with info_col2:
+                            st.markdown("**📊 Lead Scores**")
+                            st.markdown(f"Fit Score: {score_chip(fit_score)}", unsafe_allow_html=True)
+                            st.markdown(f"Intent Score: {score_chip(intent_score)}", unsafe_allow_html=True)
+                            
+                            # Quick action buttons
+                            st.markdown("**⚡ Quick Actions**")
                             
-                            with info_col2:
-                                st.markdown("**📊 Lead Scores**")
-                                st.markdown(f"Fit Score: {score_chip(fit_score)}", unsafe_allow_html=True)
-                                st.markdown(f"Intent Score: {score_chip(intent_score)}", unsafe_allow_html=True)
+                            # Store lead button with auto-fill
+                            if st.button(f"📥 Store Lead", key=f"store_{i}"):
+                                # Set session state for Store/Enrich tab
+                                st.session_state["store_email"] = email or f"contact@{company.lower().replace(' ', '')}.com"
+                                st.session_state["store_company"] = company
+                                st.session_state["store_campaign"] = "search-leads"
+                                st.session_state["store_note"] = f"Found via search: {kw}"
+                                st.session_state["store_website"] = website or ""
+                                st.session_state["switch_to_store"] = True
                                 
-                                # Quick action buttons
-                                st.markdown("**⚡ Quick Actions**")
+                                st.success(f"✅ Lead details saved! **Click the '📥 Store/Enrich Lead 🔴' tab above** to review and submit.")
+                                st.info("🔴 **Red indicator shows auto-filled data is waiting!**")
                                 
-                                # Store lead button with auto-fill
-                                if st.button(f"📥 Store Lead", key=f"store_{i}"):
-                                    # Set session state for Store/Enrich tab
-                                    st.session_state["store_email"] = email or f"contact@{company.lower().replace(' ', '')}.com"
-                                    st.session_state["store_company"] = company
-                                    st.session_state["store_campaign"] = "search-leads"
-                                    st.session_state["store_note"] = f"Found via search: {kw}"
-                                    st.session_state["store_website"] = website or ""
-                                    st.session_state["switch_to_store"] = True
+                                # Auto-scroll to top to make tabs visible
+                                st.markdown(
+                                    """
+                                    <script>
+                                    window.scrollTo(0, 0);
+                                    </script>
+                                    """,
+                                    unsafe_allow_html=True
+                                )
+                            
+                            # Draft email button with auto-fill
+                            if st.button(f"✉️ Draft Email", key=f"draft_{i}"):
+                                if email:
+                                    # Set session state for Draft tab
+                                    st.session_state["draft_company_name"] = company
+                                    st.session_state["draft_lead_email"] = email
+                                    st.session_state["draft_website"] = website or ""
+                                    st.session_state["draft_description"] = description or f"{company} - E-commerce store"
+                                    st.session_state["switch_to_draft"] = True
                                     
-                                    st.success(f"✅ Lead details saved! **Click the '📥 Store/Enrich Lead 🔴' tab above** to review and submit.")
+                                    st.success(f"✅ Email details saved! **Click the '✉️ Draft Email 🔴' tab above** to generate personalized email.")
                                     st.info("🔴 **Red indicator shows auto-filled data is waiting!**")
                                     
                                     # Auto-scroll to top to make tabs visible
@@ -278,112 +336,167 @@ with tab_search:
                                         """,
                                         unsafe_allow_html=True
                                     )
-                                
-                                # Draft email button with auto-fill
-                                if st.button(f"✉️ Draft Email", key=f"draft_{i}"):
-                                    if email:
-                                        # Set session state for Draft tab
-                                        st.session_state["draft_company_name"] = company
-                                        st.session_state["draft_lead_email"] = email
-                                        st.session_state["draft_website"] = website or ""
-                                        st.session_state["draft_description"] = description or f"{company} - E-commerce store"
-                                        st.session_state["switch_to_draft"] = True
-                                        
-                                        st.success(f"✅ Email details saved! **Click the '✉️ Draft Email 🔴' tab above** to generate personalized email.")
-                                        st.info("🔴 **Red indicator shows auto-filled data is waiting!**")
-                                        
-                                        # Auto-scroll to top to make tabs visible
-                                        st.markdown(
-                                            """
-                                            <script>
-                                            window.scrollTo(0, 0);
-                                            </script>
-                                            """,
-                                            unsafe_allow_html=True
-                                        )
-                                    else:
-                                        st.warning("⚠️ No email found for this lead")
-                                
-                                # Quick store button (direct API call)
-                                if st.button(f"⚡ Quick Store", key=f"quick_store_{i}"):
-                                    store_payload = {
-                                        "email": email or f"contact@{company.lower().replace(' ', '')}.com",
-                                        "company_name": company,
-                                        "campaign_id": "search-leads",
-                                        "status": "PROSPECT",
-                                        "note": f"Found via search: {kw}",
-                                        "website": website
-                                    }
-                                    store_res = api_post("/leads", store_payload)
-                                    if store_res.get("ok"):
-                                        st.success(f"✅ {company} stored directly!")
-                                    else:
-                                        st.error(f"❌ Failed to store: {store_res.get('error')}")
-                    
-                    # Bulk actions
-                    st.markdown("---")
-                    st.markdown("### ⚡ Bulk Actions")
-                    
-                    bulk_col1, bulk_col2, bulk_col3 = st.columns(3)
-                    
-                    with bulk_col1:
-                        if st.button("📥 Store All Leads"):
-                            stored_count = 0
-                            for store in retailers:
-                                if store.get("email"):
-                                    store_payload = {
-                                        "email": store.get("email"),
-                                        "company_name": store.get("companyName", "Unknown"),
-                                        "campaign_id": "bulk-search",
-                                        "status": "PROSPECT",
-                                        "note": f"Bulk import from search: {kw}",
-                                        "website": store.get("website", "")
-                                    }
-                                    store_res = api_post("/leads", store_payload)
-                                    if store_res.get("ok"):
-                                        stored_count += 1
+                                else:
+                                    st.warning("⚠️ No email found for this lead")
                             
-                            if stored_count > 0:
-                                st.success(f"✅ Stored {stored_count} leads successfully!")
+                            # Quick store button (direct API call)
+                            if st.button(f"⚡ Quick Store", key=f"quick_store_{i}"):
+                                store_payload = {
+                                    "email": email or f"contact@{company.lower().replace(' ', '')}.com",
+                                    "company_name": company,
+                                    "campaign_id": "search-leads",
+                                    "status": "PROSPECT",
+                                    "note": f"Found via search: {kw}",
+                                    "website": website
+                                }
+                                store_res = api_post("/leads", store_payload)
+                                if store_res.get("ok"):
+                                    st.success(f"✅ {company} stored directly!")
+                                else:
+                                    st.error(f"❌ Failed to store: {store_res.get('error')}")
+                
+                # Bulk actions
+                st.markdown("---")
+                st.markdown("### ⚡ Bulk Actions")
+                
+                bulk_col1, bulk_col2, bulk_col3, bulk_col4 = st.columns(4)
+                with_email = [r for r in retailers if r.get("email")]
+                progress = st.session_state.setdefault("bulk_progress", {})
+                for r in with_email:
+                    progress.setdefault(r["email"].strip().lower(), {
+                        "Company": r.get("companyName", "Unknown"), "Email": r["email"],
+                        "Store": "", "Enrich": "", "Draft": ""})
+                enrich_after_store = st.checkbox("Enrich after storing", value=True, key="bulk_enrich")
+                progress_table = st.empty()
+
+                def show_progress():
+                    if any(row["Store"] or row["Enrich"] or row["Draft"] for row in progress.values()):
+                        progress_table.dataframe(list(progress.values()), hide_index=True,
+                                                 use_container_width=True)
+
+                def mark(column, email, value):
+                    row = progress.get((email or "").strip().lower())
+                    if row is not None:
+                        row[column] = value
+
+                with bulk_col1:
+                    store_all = st.button("📥 Store All Leads")
+                with bulk_col4:
+                    draft_all = st.button("✉️ Draft All")
+
+                if store_all:
+                    if not with_email:
+                        st.warning("⚠️ No leads with valid emails to store")
+                    else:
+                        # One batch request for the whole result set instead of one POST per lead
+                        with st.spinner(f"Storing {len(with_email)} leads..."):
+                            store_res = api_post("/leads", {
+                                "leads": [{"email": r["email"], "company_name": r.get("companyName", "Unknown"),
+                                           "website": r.get("website", "")} for r in with_email],
+                                "campaign_id": "bulk-search",
+                                "status": "PROSPECT",
+                                "note": f"Bulk import from search: {kw}",
+                            })
+                        if store_res.get("error"):
+                            st.error(f"❌ Failed to store: {store_res.get('error')}")
+                        else:
+                            for e in store_res.get("stored", []):
+                                mark("Store", e, "✅")
+                            for err in store_res.get("errors", []):
+                                mark("Store", err.get("email"), f"❌ {err.get('error')}")
+                            show_progress()
+                            st.success(f"✅ Stored {store_res.get('count', 0)} leads successfully!")
+
+                            if enrich_after_store and store_res.get("stored"):
+                                stored = set(store_res["stored"])
+                                with st.spinner(f"Enriching {len(stored)} leads..."):
+                                    enrich_res = api_post("/leads/enrich", {"leads": [
+                                        {"email": r["email"], "companyName": r.get("companyName", ""),
+                                         "website": r.get("website", "")}
+                                        for r in with_email if r["email"].strip().lower() in stored]})
+                                if enrich_res.get("error"):
+                                    st.error(f"❌ Failed to enrich: {enrich_res.get('error')}")
+                                else:
+                                    for lead in enrich_res.get("leads", []):
+                                        mark("Enrich", lead.get("email"), "✅")
+                                    for e in enrich_res.get("fresh", []) + enrich_res.get("unchanged", []):
+                                        mark("Enrich", e, "✅ up to date")
+                                    for e in enrich_res.get("deferred", []):
+                                        mark("Enrich", e, "⏳ deferred")
+                                    for err in enrich_res.get("errors", []):
+                                        mark("Enrich", (err.get("item") or {}).get("email"), f"❌ {err.get('error')}")
+                        dashboard_data.invalidate()
+
+                if draft_all:
+                    if not with_email:
+                        st.warning("⚠️ No leads with valid emails to draft for")
+                    else:
+                        # /email/draft is one Bedrock call per lead: run them concurrently over the
+                        # shared session and fill the table in as each one lands
+                        drafts = st.session_state.setdefault("bulk_drafts", {})
+                        payloads = [{
+                            "companyName": r.get("companyName", ""),
+                            "website": r.get("website", ""),
+                            "description": r.get("description") or f"{r.get('companyName', '')} - E-commerce store",
+                            "recipientEmail": r["email"],
+                            "senderName": st.session_state.get("d_sender_name", "Raghav Dewangan"),
+                            "senderCompany": st.session_state.get("d_sender_company", "AI Sales Solutions"),
+                            "senderEmail": st.session_state.get("d_sender_email", DEFAULT_SENDER),
+                        } for r in with_email]
+                        for p in payloads:
+                            mark("Draft", p["recipientEmail"], "⏳")
+                        draft_bar = st.progress(0.0, text="Drafting emails...")
+                        for done, (i, draft_res) in enumerate(dashboard_data.post_many(API_URL, "/email/draft", payloads), 1):
+                            email = payloads[i]["recipientEmail"]
+                            if draft_res.get("draft"):
+                                drafts[email] = draft_res["draft"]
+                                mark("Draft", email, "✅")
                             else:
-                                st.warning("⚠️ No leads with valid emails to store")
-                    
-                    with bulk_col2:
-                        if st.button("📊 Export Results"):
-                            # Create CSV data
-                            import io
-                            import csv
-                            
-                            output = io.StringIO()
-                            writer = csv.writer(output)
-                            writer.writerow(["Company", "Email", "Website", "Phone", "Description"])
-                            
-                            for store in retailers:
-                                writer.writerow([
-                                    store.get("companyName", ""),
-                                    store.get("email", ""),
-                                    store.get("website", ""),
-                                    store.get("phone", ""),
-                                    store.get("description", "")
-                                ])
-                            
-                            csv_data = output.getvalue()
-                            st.download_button(
-                                label="💾 Download CSV",
-                                data=csv_data,
-                                file_name=f"shopify_leads_{kw}_{count}_results.csv",
-                                mime="text/csv"
-                            )
-                    
-                    with bulk_col3:
-                        if st.button("🚀 Start Campaign"):
-                            st.info("💡 Go to '🤖 Full Workflow' tab to start automated outreach!")
+                                mark("Draft", email, f"❌ {draft_res.get('error', 'no draft returned')}")
+                            draft_bar.progress(done / len(payloads), text=f"Drafted {done}/{len(payloads)}")
+                            show_progress()
+
+                show_progress()
+                if st.session_state.get("bulk_drafts"):
+                    with st.expander(f"✉️ Drafts ({len(st.session_state['bulk_drafts'])})"):
+                        for email, draft in st.session_state["bulk_drafts"].items():
+                            st.markdown(f"**{email}**")
+                            st.text(draft)
+
+                with bulk_col2:
+                    if st.button("📊 Export Results"):
+                        # Create CSV data
+                        import io
+                        import csv
+                        
+                        output = io.StringIO()
+                        writer = csv.writer(output)
+                        writer.writerow(["Company", "Email", "Website", "Phone", "Description"])
+                        
+                        for store in retailers:
+                            writer.writerow([
+                                store.get("companyName", ""),
+                                store.get("email", ""),
+                                store.get("website", ""),
+                                store.get("phone", ""),
+                                store.get("description", "")
+                            ])
+                        
+                        csv_data = output.getvalue()
+                        st.download_button(
+                            label="💾 Download CSV",
+                            data=csv_data,
+                            file_name=f"shopify_leads_{kw}_{count}_results.csv",
+                            mime="text/csv"
+                        )
                 
-                else:
-                    st.info(f"No Shopify stores found for '{kw}'. Try different keywords like 'jewelry', 'fitness', or 'home decor'.")
+                with bulk_col3:
+                    if st.button("🚀 Start Campaign"):
+                        st.info("💡 Go to '🤖 Full Workflow' tab to start automated outreach!")
+            
+            else:
+                st.info(f"No Shopify stores found for '{kw}'. Try different keywords like 'jewelry', 'fitness', or 'home decor'.")
     
-    elif search_btn and not kw:
-        st.error("⚠️ Please enter search keywords")
     
     # Search tips
     with st.expander("💡 Search Tips & Examples"):
@@ -622,7 +735,69 @@ with tab_send:
 # -----------------------
 with tab_view:
     st.subheader("📊 Lead Viewer")
-    
+
+    # ---- All leads: filtered, sorted, paginated (cached reads) ----
+    st.markdown("### 📋 All Leads")
+    f1, f2, f3, f4 = st.columns([2, 2, 2, 1])
+    with f2:
+        lv_status = st.multiselect("Status", ["WARM", "NEUTRAL", "SENT", "NEW", "COLD", "UNSUBSCRIBE", "BOUNCED"],
+                                   key="lv_status")
+    with f3:
+        lv_text = st.text_input("Search", "", placeholder="email, company or website", key="lv_text")
+    with f4:
+        lv_size = st.selectbox("Per page", [25, 50, 100], key="lv_size")
+    s1, s2, s3 = st.columns([2, 1, 1])
+    with s1:
+        lv_sort = st.selectbox("Sort by", ["score", "fit", "intent", "status", "company", "updated", "sent"],
+                               key="lv_sort")
+    with s2:
+        lv_desc = st.toggle("Descending", value=lv_sort not in ("status", "company"), key="lv_desc")
+    with s3:
+        st.write("")
+        if st.button("🔄 Refresh", key="lv_refresh"):
+            dashboard_data.invalidate()
+
+    lv_campaign = st.session_state.get("lv_campaign") or ""
+    lv_page = int(st.session_state.get("lv_page") or 1)
+    try:
+        if use_direct_dynamo:
+            page = dashboard_data.local_lead_page(
+                AWS_REGION, campaign=lv_campaign or None, statuses=lv_status, text=lv_text,
+                sort=lv_sort, descending=lv_desc, page=lv_page, page_size=lv_size)
+        else:
+            page = dashboard_data.api_lead_page(
+                API_URL, campaign=lv_campaign, status=",".join(lv_status), q=lv_text,
+                sort=lv_sort, order="desc" if lv_desc else "asc", page=lv_page, pageSize=lv_size)
+    except Exception as e:
+        page = {"error": str(e)}
+
+    with f1:
+        options = [""] + (page.get("campaigns") or [])
+        st.selectbox("Campaign", options, key="lv_campaign", format_func=lambda c: c or "All campaigns")
+
+    if page.get("error"):
+        st.error(f"Error: {page['error']}")
+        st.caption("Check AWS credentials / API URL or create a lead first")
+    else:
+        rows = page.get("rows") or []
+        if rows:
+            st.dataframe(
+                [{"Email": r["email"], "Company": r["company"], "Campaign": r["campaign"], "Status": r["status"],
+                  "Score": r["score"], "Fit": r["fitScore"], "Intent": r["intentScore"],
+                  "Last Sent": dt(r["lastSentAt"]), "Updated": dt(r["updatedAt"])} for r in rows],
+                use_container_width=True, hide_index=True,
+            )
+        else:
+            st.info("No leads match these filters.")
+        p1, p2 = st.columns([1, 3])
+        with p1:
+            # filters can shrink the page count under the current page; clamp before the widget exists
+            st.session_state["lv_page"] = page.get("page") or 1
+            st.number_input("Page", min_value=1, max_value=page.get("pages") or 1, step=1, key="lv_page")
+        with p2:
+            st.caption(f"{page.get('total', 0)} rows · page {page.get('page', 1)} of {page.get('pages', 1)}")
+
+    st.markdown("---")
     st.markdown("### 🔄 Lead Lookup")
     st.info("Enter lead details below to view their current status and reply history")
     col_input1, col_input2 = st.columns(2)
@@ -633,17 +808,12 @@ with tab_view:
     with col_input2:
         v_campaign = st.text_input("Campaign ID", "demo-001", key="v_campaign")
         
-    # Auto-load when email changes
+    # Auto-load when email changes (cached, so other widget changes don't re-read)
     if v_email:
         try:
-            import boto3
-            dyn = boto3.resource("dynamodb", region_name=AWS_REGION)
-            tbl = dyn.Table("LeadsTable")
-            resp = tbl.get_item(Key={"pk": f"LEAD#{v_email.lower()}"})
-            item = resp.get("Item")
+            lead = dashboard_data.get_lead(AWS_REGION, v_email)
             
-            if item:
-                lead = item.get("data")
+            if lead:
                 st.success(f"✅ Found lead: {lead.get('company', 'Unknown Company')}")
                 render_lead(lead)
             else:
@@ -669,10 +839,59 @@ with tab_view:
             res = api_post("/leads/status", {"email": v_email, "campaign_id": v_campaign, "status": s, "replyText": r})
             if res.get("ok"):
                 st.success("✅ Lead status updated!")
+                dashboard_data.invalidate()
                 st.rerun()  # Refresh to show updated data
             else:
                 st.error(f"❌ Update failed: {res.get('error')}")
 
+# -----------------------
+# ANALYTICS TAB
+# -----------------------
+with tab_stats:
+    st.subheader("📈 Campaign Analytics")
+    st.caption("Precomputed counters, updated from the LeadsTable stream — no table scan per render.")
+    a1, a2, a3 = st.columns([2, 1, 1])
+    with a3:
+        st.write("")
+        if st.button("🔄 Refresh", key="stats_refresh"):
+            dashboard_data.api_stats.clear()
+    with a2:
+        stats_days = st.selectbox("Days", [7, 14, 30, 90], index=2, key="stats_days")
+    stats_campaign = st.session_state.get("stats_campaign") or ""
+    try:
+        if use_direct_dynamo:
+            stats = dashboard_data.local_stats(AWS_REGION, stats_campaign)
+        else:
+            stats = dashboard_data.api_stats(API_URL, stats_campaign, stats_days)
+    except Exception as e:
+        stats = {"error": str(e)}
+    with a1:
+        st.selectbox("Campaign", [""] + sorted(c for c in (stats.get("campaigns") or {}) if c != "*"),
+                     key="stats_campaign", format_func=lambda c: c or "All campaigns")
+
+    if stats.get("error"):
+        st.error(f"Error: {stats['error']}")
+    elif not stats.get("campaigns"):
+        st.info("No campaign activity counted yet.")
+    else:
+        stages = stats.get("funnel") or []
+        cols = st.columns(len(stages))
+        for col, (prev, stage) in zip(cols, zip([None] + stages[:-1], stages)):
+            rate = f"{stage['count'] / prev['count']:.0%} of {prev['stage'].lower()}" if prev and prev["count"] else None
+            col.metric(stage["stage"], stage["count"], rate, delta_color="off")
+        st.markdown("#### Funnel")
+        ordered_bars([{"stage": s["stage"], "count": s["count"]} for s in stages], "stage", "count", horizontal=True)
+
+        st.markdown("#### Status by campaign")
+        st.dataframe([{"Campaign": c, **counts} for c, counts in sorted(stats["campaigns"].items()) if c != "*"],
+                     hide_index=True)
+
+        if stats.get("daily"):
+            st.markdown(f"#### Status changes per day (last {stats_days} days)")
+            st.line_chart(stats["daily"], x="day")
+        elif use_direct_dynamo:
+            st.caption("Daily series needs the API counters (turn off direct DynamoDB read).")
+
 # -----------------------
 # FULL WORKFLOW TAB
 # -----------------------
@@ -693,11 +912,23 @@ with tab_workflow:
         st.markdown("### ✉️ Email Configuration")
         wf_sender = st.text_input("From Email", DEFAULT_SENDER, key="wf_sender")
         wf_recipient = st.text_input("To Email", wf_email, key="wf_recipient")
+        wf_more = st.text_area("More leads (one per line: email, company, website)", "", key="wf_more", height=100)
         
     if st.button("🚀 Run Complete Workflow", type="primary"):
+        leads = [{"email": wf_email, "company_name": wf_company, "website": wf_website,
+                  "recipient_email": wf_recipient,
+                  "description": "E-commerce company specializing in their industry"}]
+        for line in wf_more.splitlines():
+            parts = [p.strip() for p in line.split(",")]
+            if len(parts) >= 2 and parts[0]:
+                leads.append({"email": parts[0], "company_name": parts[1],
+                              "website": parts[2] if len(parts) > 2 else ""})
+
         # Validate email addresses
         verified_emails = ["raghav.dewangan2004@gmail.com", "sridatta963@gmail.com"]
-        if wf_recipient not in verified_emails:
+        unverified = [l.get("recipient_email", l["email"]) for l in leads
+                      if l.get("recipient_email", l["email"]) not in verified_emails]
+        if unverified:
             st.error(f"⚠️ For demo purposes, emails can only be sent to verified addresses: {', '.join(verified_emails)}")
             st.stop()
             
@@ -705,106 +936,64 @@ with tab_workflow:
         status_text = st.empty()
         
         try:
-            # Step 1: Store Lead
-            status_text.text("Step 1/5: Storing lead...")
-            progress_bar.progress(20)
-            store_res = api_post("/leads", {
-                "email": wf_email,
-                "company_name": wf_company, 
+            # One call starts the whole run server-side (store → enrich → draft → send)
+            status_text.text("Starting workflow...")
+            start_res = api_post("/workflow", {
+                "leads": leads,
                 "campaign_id": wf_campaign,
                 "status": "SENT",
-                "website": wf_website
-            })
-            
-            if store_res.get("ok"):
-                st.success("✅ Lead stored successfully")
-            else:
-                st.error(f"❌ Failed to store lead: {store_res.get('error')}")
-                st.stop()
-            
-            # Step 2: Enrich Lead
-            status_text.text("Step 2/5: Enriching lead data...")
-            progress_bar.progress(40)
-            enrich_res = api_post("/leads/enrich", {
-                "email": wf_email,
-                "company_name": wf_company,
-                "website": wf_website
-            })
-            
-            if enrich_res.get("ok"):
-                lead_data = enrich_res.get("lead", {})
-                fit_score = lead_data.get("fitScore", 0)
-                intent_score = lead_data.get("intentScore", 0)
-                st.success(f"✅ Lead enriched - Fit: {fit_score}, Intent: {intent_score}")
-            else:
-                st.error(f"❌ Failed to enrich lead: {enrich_res.get('error')}")
-                st.stop()
-            
-            # Step 3: Generate Email
-            status_text.text("Step 3/5: Generating AI email...")
-            progress_bar.progress(60)
-            draft_res = api_post("/email/draft", {
-                "companyName": wf_company,
-                "website": wf_website,
-                "description": f"E-commerce company specializing in their industry",
-                "recipientEmail": wf_email,
-                "senderName": "Raghav Dewangan",
-                "senderCompany": "AI Sales Solutions",
-                "senderEmail": wf_sender
-            })
-            
-            if draft_res.get("ok"):
-                email_draft = draft_res.get("draft", "")
-                st.success("✅ AI email generated")
-                with st.expander("📧 Generated Email"):
-                    st.text_area("Email Content", email_draft, height=200, key="generated_email")
-            else:
-                st.error(f"❌ Failed to generate email: {draft_res.get('error')}")
-                st.stop()
-            
-            # Step 4: Send Email
-            status_text.text("Step 4/5: Sending email via SES...")
-            progress_bar.progress(80)
-            send_res = api_post("/email/send", {
-                "recipient_email": wf_recipient,
                 "sender_email": wf_sender,
-                "campaign_id": wf_campaign,
-                "subject": f"Partnership Opportunity - {wf_company}",
-                "email_body": email_draft
+                "sender_name": "Raghav Dewangan",
+                "sender_company": "AI Sales Solutions",
+                "subject": "Partnership Opportunity - {company}",
             })
-            
-            if send_res.get("ok"):
-                message_id = send_res.get("message_id")
-                dry_run = send_res.get("dry_run", True)
-                if dry_run:
-                    st.warning(f"⚠️ Email sent in dry-run mode: {message_id}")
-                else:
-                    st.success(f"✅ Email sent successfully! Message ID: {message_id}")
-            else:
-                st.error(f"❌ Failed to send email: {send_res.get('error')}")
+            if not start_res.get("ok"):
+                st.error(f"❌ Failed to start workflow: {start_res.get('error')}")
                 st.stop()
-            
-            # Step 5: Complete
-            status_text.text("Step 5/5: Workflow complete!")
+
+            run_id = start_res["runId"]
+            run = start_res
+            poll_until = time.monotonic() + WORKFLOW_POLL_SECONDS
+            while run.get("status") not in ("SUCCEEDED", "PARTIAL", "FAILED"):
+                if time.monotonic() >= poll_until:
+                    # a run that died mid-way (timeout, OOM) never leaves RUNNING; don't spin on it
+                    st.info(f"⏳ Run {run_id} is still {run.get('status', 'RUNNING').lower()} after "
+                            f"{WORKFLOW_POLL_SECONDS}s. Check back later: GET /workflow/{run_id}")
+                    st.stop()
+                time.sleep(1)
+                run = api_get(f"/workflow/{run_id}")
+                if run.get("error") and not run.get("status"):
+                    st.error(f"❌ Lost track of run {run_id}: {run.get('error')}")
+                    st.stop()
+                total = max(1, int(run.get("total") or len(leads)))
+                done = sum(int(run.get(k) or 0) for k in ("sent", "failed", "suppressed"))
+                progress_bar.progress(min(100, int(100 * done / total)))
+                status_text.text(f"Run {run_id[:8]}: {run.get('status')} · enriched {run.get('enriched', 0)} · "
+                                 f"drafted {run.get('drafted', 0)} · sent {run.get('sent', 0)} · "
+                                 f"failed {run.get('failed', 0)} · suppressed {run.get('suppressed', 0)} of {total}")
             progress_bar.progress(100)
-            
-            st.balloons()
-            st.success("🎉 Complete AI Sales Workflow Executed Successfully!")
-            
+
+            if run["status"] == "FAILED":
+                st.error(f"❌ Workflow failed: {run.get('error') or 'every lead failed'}")
+            else:
+                if run["status"] == "SUCCEEDED":
+                    st.balloons()
+                    st.success("🎉 Complete AI Sales Workflow Executed Successfully!")
+                else:
+                    st.warning("⚠️ Workflow finished with some failed leads")
+
             # Show summary
             st.markdown("### 📊 Workflow Summary")
-            summary_data = {
-                "Lead Email": wf_email,
-                "Company": wf_company,
-                "Campaign": wf_campaign,
-                "Fit Score": fit_score,
-                "Intent Score": intent_score,
-                "Email Status": "Sent" if send_res.get("ok") else "Failed",
-                "Message ID": send_res.get("message_id", "N/A")
-            }
-            
-            for key, value in summary_data.items():
-                st.write(f"**{key}:** {value}")
+            for lead in run.get("leads", []):
+                with st.expander(f"{lead.get('email')} · {lead.get('stage')}"):
+                    st.write(f"**Fit Score:** {lead.get('fitScore', '—')} · **Intent Score:** {lead.get('intentScore', '—')}")
+                    if lead.get("messageId"):
+                        label = "dry-run" if lead.get("dryRun") else "sent"
+                        st.write(f"**Message ID ({label}):** {lead['messageId']}")
+                    if lead.get("error"):
+                        st.error(lead["error"])
+                    if lead.get("draft"):
+                        st.text_area("Email Content", lead["draft"], height=200, key=f"wf_draft_{lead.get('email')}")
                 
         except Exception as e:
             st.error(f"❌ Workflow failed: {str(e)}")
@@ -962,8 +1151,7 @@ with tab_replies:
         if st.button("🔍 Check Gmail Inbox Now", type="primary"):
             with st.spinner("Scanning Gmail inbox for replies..."):
                 try:
-                    url = API_URL.rstrip("/") + "/gmail/check"
-                    gmail_res = requests.get(url, timeout=30).json()
+                    gmail_res = api_get("/gmail/check")
                     
                     if gmail_res.get("ok"):
                         processed = gmail_res.get("processed_replies", [])
@@ -996,17 +1184,41 @@ with tab_replies:
     with col2:
         st.markdown("### ⚙️ Settings")
         
-        # Auto-refresh toggle
+        # Auto-refresh toggle: re-runs only the live feed below, never blocks the session
         auto_check = st.checkbox("🔄 Auto-check every 30s", value=False)
         
         if auto_check:
             st.info("Auto-checking enabled")
-            time.sleep(30)
-            st.rerun()
         
         # Manual refresh
         if st.button("🔄 Refresh Page"):
             st.rerun()
+
+    # Live status changes: fetches only events after the last cursor
+    @st.fragment(run_every=30 if auto_check else None)
+    def live_changes():
+        st.markdown("### 📡 Live Status Changes")
+        feed = st.session_state.setdefault("change_feed", {"cursor": None, "events": [], "checked": None})
+        res = dashboard_data.fetch_changes(API_URL, feed["cursor"], lookback=3600)
+        if res.get("error"):
+            st.caption(f"Change feed unavailable: {res['error']}")
+        else:
+            feed["cursor"], feed["checked"] = res["cursor"], int(time.time())
+            if res["events"]:
+                feed["events"] = (res["events"][::-1] + feed["events"])[:50]
+                dashboard_data.invalidate()  # cached lead reads are now stale
+        if not feed["events"]:
+            st.caption("No status changes in the last hour")
+        for e in feed["events"][:20]:
+            reply = f" — “{e['lastReply'][:120]}”" if e.get("lastReply") else ""
+            st.markdown(
+                f"{status_chip(e.get('status'))} **{e.get('email')}** · {e.get('campaignId')} "
+                f"<span style='color:{MUTED}'>(was {e.get('prevStatus') or '—'}, {dt(e.get('ts'))})</span>{reply}",
+                unsafe_allow_html=True,
+            )
+        st.caption(f"Last checked: {dt(feed['checked'])}")
+
+    live_changes()
     
     st.markdown("---")
     
@@ -1033,20 +1245,17 @@ with tab_replies:
         - ✅ Complete automation loop
         """)
     
-    # Recent activity summary
-    st.markdown("### 📈 Recent Gmail Activity")
-    
-    # Mock recent activity for demo
-    recent_activity = [
-        {"time": "2 minutes ago", "action": "Processed reply from sridatta963@gmail.com", "status": "WARM"},
-        {"time": "15 minutes ago", "action": "Processed reply from test@example.com", "status": "COLD"},
-        {"time": "1 hour ago", "action": "Gmail inbox check completed", "status": "INFO"},
-        {"time": "2 hours ago", "action": "Sent email to demo campaign", "status": "SENT"}
-    ]
-    
-    for activity in recent_activity:
-        icon = "🟢" if activity["status"] == "WARM" else "🔴" if activity["status"] == "COLD" else "📧" if activity["status"] == "SENT" else "ℹ️"
-        st.markdown(f"{icon} **{activity['time']}** - {activity['action']}")
+    # Recent activity summary (today's status counters)
+    st.markdown("### 📈 Today's Activity")
+    today = dashboard_data.api_stats(API_URL, days=1) if API_URL else {"error": "API URL not set"}
+    if today.get("error"):
+        st.caption(f"Activity counters unavailable: {today['error']}")
+    elif not today.get("daily"):
+        st.caption("No status changes today")
+    else:
+        counts = {k: v for k, v in today["daily"][-1].items() if k != "day"}
+        st.markdown(" · ".join(f"{status_chip(k)} **{v}**" for k, v in sorted(counts.items(), key=lambda kv: -kv[1])),
+                    unsafe_allow_html=True)
     
     st.markdown("---")
     st.markdown("💡 **Tip:** Use the '📊 Lead Viewer' tab to see updated lead statuses after Gmail processing!")
@@ -5,6 +5,7 @@ Test the advanced lead generation system
 
 import sys
 import os
+sys.path.append('lambda_functions')
 sys.path.append('src')
 
 from lead_generator import LeadGenerator
@@ -31,31 +32,33 @@ def main():
     
     all_leads = []
     
+    # One batch: searches run in parallel and a store several queries hit is crawled once
+    try:
+        results = generator.find_shopify_leads_batch(test_queries, limit=3)
+    except Exception as e:
+        print(f"❌ Error testing batch: {str(e)}")
+        results = {}
+    
     for query in test_queries:
         print(f"\n🔍 Testing query: '{query}'")
         print("-" * 30)
         
-        try:
-            leads = generator.find_shopify_leads(query, limit=3)
-            
-            print(f"Found {len(leads)} leads for '{query}':")
-            
-            for i, lead in enumerate(leads, 1):
-                print(f"\n  Lead {i}:")
-                print(f"    Company: {lead.get('company_name', 'N/A')}")
-                print(f"    Website: {lead.get('website', 'N/A')}")
-                print(f"    Email: {lead.get('email', 'Not found')}")
-                print(f"    Phone: {lead.get('phone', 'Not found')}")
-                print(f"    Industry: {lead.get('industry', 'N/A')}")
-                print(f"    Description: {lead.get('description', 'N/A')[:100]}...")
-                
-                if lead.get('social_media'):
-                    print(f"    Social: {', '.join(lead['social_media'].keys())}")
-            
-            all_leads.extend(leads)
+        leads = results.get(query, [])
+        print(f"Found {len(leads)} leads for '{query}':")
+        
+        for i, lead in enumerate(leads, 1):
+            print(f"\n  Lead {i}:")
+            print(f"    Company: {lead.get('company_name', 'N/A')}")
+            print(f"    Website: {lead.get('website', 'N/A')}")
+            print(f"    Email: {lead.get('email', 'Not found')}")
+            print(f"    Phone: {lead.get('phone', 'Not found')}")
+            print(f"    Industry: {lead.get('industry', 'N/A')}")
+            print(f"    Description: {lead.get('description', 'N/A')[:100]}...")
             
-        except Exception as e:
-            print(f"❌ Error testing '{query}': {str(e)}")
+            if lead.get('social_media'):
+                print(f"    Social: {', '.join(lead['social_media'].keys())}")
+        
+        all_leads.extend(lead for lead in leads if lead not in all_leads)
     
     # Export all leads
     if all_leads:
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Tests for the dashboard API client: connection reuse, retry policy per method,
+gzip in both directions and the latency stats.
+"""
+
+import gzip
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import api_client
+
+class ScriptedApi:
+    """Each path answers with the next status in its script (then 200); records peers and bodies."""
+
+    def __init__(self, scripts):
+        self.scripts = {k: list(v) for k, v in scripts.items()}
+        self.peers, self.bodies = [], []
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def _answer(self):
+                api.peers.append(self.client_address)
+                raw = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+                if self.headers.get("Content-Encoding") == "gzip":
+                    raw = gzip.decompress(raw)
+                api.bodies.append(raw)
+                path = self.path.split("?")[0]
+                status = api.scripts.get(path, []).pop(0) if api.scripts.get(path) else 200
+                body = json.dumps({"ok": status == 200, "path": path, "pad": "x" * 2000}).encode()
+                if "gzip" in (self.headers.get("Accept-Encoding") or ""):
+                    body = gzip.compress(body)
+                    self.send_response(status)
+                    self.send_header("Content-Encoding", "gzip")
+                else:
+                    self.send_response(status)
+                if status == 429:
+                    self.send_header("Retry-After", "0")
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            do_GET = do_POST = _answer
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/Prod"
+
+@pytest.fixture
+def api():
+    servers = []
+    def make(scripts=None):
+        servers.append(ScriptedApi(scripts or {}))
+        return servers[-1]
+    yield make
+    for s in servers:
+        s.server.shutdown()
+
+def test_keep_alive_gzip_and_stats(api, monkeypatch):
+    srv = api()
+    client = api_client.ApiClient(srv.url)
+    for i in range(5):
+        assert client.get("/leads/list", {"page": i + 1, "q": ""})["path"] == "/Prod/leads/list"
+    assert len(set(srv.peers)) == 1                                    # one connection for every call
+
+    monkeypatch.setattr(api_client, "GZIP_REQUESTS", True)
+    payload = {"leads": [{"email": f"{i}@x.example", "company_name": "X" * 40} for i in range(100)]}
+    assert client.post("/leads", payload)["ok"]
+    assert json.loads(srv.bodies[-1]) == payload                       # sent gzipped, decoded server-side
+
+    client.get("/workflow/0123456789abcdef0123")
+    stats = client.stats()
+    assert stats["GET /leads/list"]["calls"] == 5 and stats["GET /leads/list"]["errors"] == 0
+    assert sum(stats["GET /leads/list"]["histogram"].values()) == 5
+    assert "GET /workflow/{id}" in stats and stats["POST /leads"]["p95_ms"] is not None
+
+def test_retry_policy(api, monkeypatch):
+    monkeypatch.setattr(api_client.time, "sleep", lambda s: None)
+    srv = api({"/Prod/leads/list": [503, 502], "/Prod/email/send": [502], "/Prod/email/draft": [429]})
+    client = api_client.ApiClient(srv.url, retries=3)
+
+    assert client.get("/leads/list")["ok"]                             # GET retried on any 5xx
+    s = client.stats()["GET /leads/list"]
+    assert (s["calls"], s["retries"], s["errors"]) == (3, 2, 2)
+    res = client.post("/email/send", {"to": "a@x.example"})
+    assert res["status"] == 502 and "error" in res                     # a POST may have run: not resent
+    assert client.post("/email/draft", {})["ok"]                       # 429 = not processed: resent
+
+    srv2 = api({"/Prod/leads/list": [500] * 5})
+    res = api_client.ApiClient(srv2.url, retries=2).get("/leads/list")
+    assert res["status"] == 500 and len(srv2.peers) == 3
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Offline tests for the shared async fetch layer and the concurrent Lambda crawler path.
+"""
+
+import asyncio
+import sys
+import time
+sys.path.append('lambda_functions')
+
+import requests
+
+import async_fetch
+import search_shopify_retailers as crawler
+from fixture_server import FixtureSite
+from page_archive import PageArchive, replay
+
+HOME = '<html><title>Trail Co - Shop</title><body>Powered by Shopify <a href="/pages/contact">Contact</a></body></html>'
+CONTACT = "<html><body>Write to hello@trail.example</body></html>"
+
+def test_fetch_all_overlaps_requests_and_reports_failures():
+    sites = [FixtureSite({"/": HOME}, delay=0.3).start() for _ in range(8)]
+    homes = [s.url + "/" for s in sites]
+    missing = sites[0].url + "/missing"
+    try:
+        urls = homes + [missing, "http://127.0.0.1:9/"]
+        started = time.monotonic()
+        res = async_fetch.fetch_all(urls, timeout=5)
+        elapsed = time.monotonic() - started
+    finally:
+        for s in sites:
+            s.stop()
+
+    assert elapsed < 8 * 0.3  # one round of latency, not eight
+    assert all(res[u].ok and "Shopify" in res[u].text for u in homes)
+    assert res[missing].status == 404
+    assert res["http://127.0.0.1:9/"].status == 0 and res["http://127.0.0.1:9/"].error
+
+def test_archive_sessions_use_the_requests_path():
+    archive = PageArchive()
+    archive.add("https://trail.example/", HOME)
+    session = requests.Session()
+    adapter = replay(session, archive)
+    res = async_fetch.fetch_all(["https://trail.example/"], session=session)
+    assert res["https://trail.example/"].ok
+    assert adapter.stats["requests"] == 1
+
+def test_extract_stores_prefetches_contact_pages(monkeypatch):
+    with FixtureSite({"/": HOME, "/pages/contact": CONTACT}) as a, \
+         FixtureSite({"/": HOME, "/pages/contact": CONTACT}) as b:
+        monkeypatch.setattr(crawler, "_get", lambda *args, **kw: (_ for _ in ()).throw(AssertionError("serial fetch")))
+        stores = crawler.extract_stores([a.url, b.url])
+        # no /meta.json here, so the HTML path runs and reuses the contact page fetched with the JSON probes
+        assert (a.hits["/"], a.hits["/pages/contact"]) == (1, 1)
+    assert [s["email"] for s in stores] == ["hello@trail.example"] * 2
+    assert stores[0]["companyName"] == "Trail Co"
+
+def test_bodies_larger_than_one_chunk_are_read_to_the_end_or_the_cap(monkeypatch):
+    big = "<html><body>" + "x" * 300_000 + " write to deep@trail.example</body></html>"
+    with FixtureSite({"/": big}) as site:
+        page = async_fetch.fetch_all([site.url + "/"], timeout=5)[site.url + "/"]
+        assert len(page.content) == len(big) and page.text.endswith("deep@trail.example</body></html>")
+
+        fetcher = async_fetch.AsyncFetcher(max_bytes=100_000)
+        async def capped():
+            try:
+                return await fetcher.fetch(site.url + "/")
+            finally:
+                await fetcher.close()
+        assert len(asyncio.run(capped()).content) == 100_000
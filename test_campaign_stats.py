@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Tests for the precomputed campaign counters (campaign_stats), the stream consumer
+feeding them, and the GET /leads/stats handler.
+"""
+
+import json
+import sys
+sys.path.append('lambda_functions')
+
+import pytest
+from boto3.dynamodb.types import TypeSerializer
+
+import campaign_stats
+import change_feed
+import lead_stats
+import lead_stream_consumer
+
+TS = 1_760_000_000
+_ser = TypeSerializer()
+
+@pytest.fixture(autouse=True)
+def memory_stats(monkeypatch):
+    monkeypatch.setattr(campaign_stats, "table", lambda: None)
+    monkeypatch.setattr(campaign_stats, "_MEM", {})
+    monkeypatch.setattr(change_feed, "table", lambda: None)
+    monkeypatch.setattr(change_feed, "_MEM", type(change_feed._MEM)())
+
+def _lead(email, **campaigns):
+    return {"email": email, "company": "Acme", "campaigns": {c: {"status": s} for c, s in campaigns.items()}}
+
+def _record(seq, old, new, ts=TS):
+    image = lambda d: {k: _ser.serialize(v) for k, v in {"pk": f"LEAD#{(new or old)['email']}", "data": d}.items()}
+    ddb = {"SequenceNumber": str(seq), "ApproximateCreationDateTime": ts}
+    if new is not None:
+        ddb["NewImage"] = image(new)
+    if old is not None:
+        ddb["OldImage"] = image(old)
+    return {"dynamodb": ddb}
+
+def test_status_deltas_cover_added_changed_and_removed_campaigns():
+    old = _lead("a@x.example", c1="SENT", c2="SENT")
+    new = _lead("a@x.example", c1="WARM", c3="SENT")
+    assert campaign_stats.status_deltas(old, new) == [("c1", "SENT", "WARM"), ("c2", "SENT", None), ("c3", None, "SENT")]
+    assert campaign_stats.status_deltas(new, new) == []
+    assert campaign_stats.status_deltas(new, None) == [("c1", "WARM", None), ("c3", "SENT", None)]
+
+def test_consumer_keeps_totals_and_daily_counts():
+    batch = {"Records": [
+        _record(1, None, _lead("a@x.example", c1="SENT")),
+        _record(2, None, _lead("b@x.example", c1="SENT", c2="SENT")),
+        _record(3, _lead("a@x.example", c1="SENT"), _lead("a@x.example", c1="WARM"), ts=TS + 86400),
+        _record(4, _lead("b@x.example", c1="SENT", c2="SENT"), None, ts=TS + 86400),   # lead deleted
+    ]}
+    assert lead_stream_consumer.lambda_handler(batch, None) == {"batchItemFailures": []}
+
+    totals = campaign_stats.totals()
+    assert totals == {"*": {"WARM": 1}, "c1": {"WARM": 1}}
+    days = campaign_stats.daily("c1", days=7, now_ms=(TS + 86400) * 1000)
+    assert [(d["day"], d.get("SENT"), d.get("WARM")) for d in days] == [
+        ("2025-10-09", 2, None), ("2025-10-10", None, 1)]
+    assert campaign_stats.funnel({"SENT": 5, "BOUNCED": 1, "WARM": 2, "COLD": 1, "NEW": 1}) == [
+        {"stage": "Leads", "count": 10}, {"stage": "Contacted", "count": 9}, {"stage": "Delivered", "count": 8},
+        {"stage": "Replied", "count": 3}, {"stage": "Warm", "count": 2}]
+
+def test_failed_record_stops_the_batch_so_retries_count_once(monkeypatch):
+    bad = {"dynamodb": {"SequenceNumber": "2", "NewImage": {"pk": {"BOGUS": "x"}}}}
+    batch = [_record(1, None, _lead("a@x.example", c1="SENT")), bad, _record(3, None, _lead("b@x.example", c1="SENT"))]
+    assert lead_stream_consumer.lambda_handler({"Records": batch}, None) == {"batchItemFailures": [{"itemIdentifier": "2"}]}
+    assert campaign_stats.totals()["c1"] == {"SENT": 1}             # record 3 not counted yet
+
+    lead_stream_consumer.lambda_handler({"Records": batch[2:]}, None)   # Lambda retries from the failed record on
+    assert campaign_stats.totals()["c1"] == {"SENT": 2}
+
+def test_batch_is_one_atomic_add_per_counter(monkeypatch):
+    calls = []
+    class FakeTable:
+        def update_item(self, **kwargs):
+            calls.append(kwargs)
+    monkeypatch.setattr(campaign_stats, "table", lambda: FakeTable())
+
+    counters = campaign_stats.accumulate([("c1", None, "SENT")] * 50 + [("c1", "SENT", "WARM")], TS * 1000)
+    assert campaign_stats.apply(counters) == 4     # totals c1/*, day c1/*
+    totals = next(c for c in calls if c["Key"] == {"pk": "STATS#TOTALS", "sk": "c1"})
+    assert totals["UpdateExpression"].startswith("ADD ")
+    adds = {totals["ExpressionAttributeNames"][k]: totals["ExpressionAttributeValues"][v]
+            for k, v in (p.split() for p in totals["UpdateExpression"][4:].split(" SET ")[0].split(", "))}
+    assert adds == {"SENT": 49, "WARM": 1}
+
+def test_stats_handler_and_rebuild():
+    campaign_stats.apply(campaign_stats.accumulate([("c1", None, "SENT"), ("c1", None, "SENT")], TS * 1000))
+    resp = lead_stats.lambda_handler({"queryStringParameters": {"campaign": "c1"}}, None)
+    body = json.loads(resp["body"])
+    assert resp["statusCode"] == 200 and body["campaigns"]["c1"] == {"SENT": 2}
+    assert body["funnel"][1] == {"stage": "Contacted", "count": 2}
+    assert lead_stats.lambda_handler({"queryStringParameters": {"days": "x"}}, None)["statusCode"] == 400
+
+    fresh = campaign_stats.rebuild([_lead("a@x.example", c2="COLD")])   # counters drifted: reconcile from a scan
+    assert fresh == campaign_stats.totals() == {"c2": {"COLD": 1}, "*": {"COLD": 1}}
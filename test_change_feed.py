@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Tests for the lead change feed: stream diffing, cursor reads (in-memory stand-in
+and the day-partitioned DynamoDB layout via a small fake table), and the API handler.
+"""
+
+import json
+import sys
+sys.path.append('lambda_functions')
+
+import pytest
+from boto3.dynamodb.types import TypeSerializer
+
+import change_feed
+import lead_changes
+import lead_stream_consumer
+
+DAY_MS = 86400 * 1000
+_ser = TypeSerializer()
+
+@pytest.fixture(autouse=True)
+def memory_feed(monkeypatch):
+    monkeypatch.setattr(change_feed, "table", lambda: None)
+    monkeypatch.setattr(change_feed, "_MEM", type(change_feed._MEM)())
+
+def _lead(status, reply=None):
+    c = {"status": status}
+    if reply:
+        c["lastReply"] = reply
+    return {"email": "a@shop.example", "company": "Acme", "campaigns": {"c1": c}}
+
+def _stream_record(seq, old, new, ts=1_760_000_000):
+    image = lambda d: {k: _ser.serialize(v) for k, v in {"pk": "LEAD#a@shop.example", "data": d}.items()}
+    ddb = {"SequenceNumber": str(seq), "ApproximateCreationDateTime": ts, "NewImage": image(new)}
+    if old is not None:
+        ddb["OldImage"] = image(old)
+    return {"eventName": "MODIFY", "dynamodb": ddb}
+
+def test_diff_reports_status_changes_and_new_replies_only():
+    assert change_feed.diff_lead(_lead("SENT"), _lead("SENT")) == []
+    [e] = change_feed.diff_lead(_lead("SENT"), _lead("WARM", "Let's talk"))
+    assert (e["status"], e["prevStatus"], e["lastReply"]) == ("WARM", "SENT", "Let's talk")
+    [e] = change_feed.diff_lead(None, _lead("SENT"))
+    assert e["prevStatus"] is None
+    assert change_feed.diff_lead(_lead("WARM", "hi"), _lead("WARM", "hi")) == []
+
+def test_consumer_feeds_cursor_reads_and_replays_are_idempotent():
+    cursor = change_feed.latest_cursor(now_ms=1_759_999_999_000)
+    batch = {"Records": [
+        _stream_record(101, _lead("SENT"), _lead("WARM", "Interested!")),
+        _stream_record(102, _lead("WARM", "Interested!"), _lead("WARM", "Interested!")),  # no change
+        _stream_record(103, None, _lead("SENT"), ts=1_760_000_001),
+    ]}
+    assert lead_stream_consumer.lambda_handler(batch, None) == {"batchItemFailures": []}
+    lead_stream_consumer.lambda_handler(batch, None)  # stream retry
+
+    res = change_feed.changes_since(cursor, limit=1)
+    assert [e["status"] for e in res["events"]] == ["WARM"] and res["more"]
+    res = change_feed.changes_since(res["cursor"], limit=10)
+    assert [e["status"] for e in res["events"]] == ["SENT"] and not res["more"]
+    assert change_feed.changes_since(res["cursor"]) == {"events": [], "cursor": res["cursor"], "more": False}
+
+def test_consumer_reports_only_the_bad_record():
+    bad = {"dynamodb": {"SequenceNumber": "7", "NewImage": {"pk": {"BOGUS": "x"}}}}
+    res = lead_stream_consumer.lambda_handler({"Records": [bad, _stream_record(8, None, _lead("SENT"))]}, None)
+    assert res == {"batchItemFailures": [{"itemIdentifier": "7"}]}
+
+class FakeIndexTable:
+    """Just enough of a boto3 Table for change_feed: batch puts and pk/sk-range queries."""
+
+    def __init__(self):
+        self.items, self.queries = {}, []
+
+    def batch_writer(self, overwrite_by_pkeys=None):
+        table = self
+
+        class Writer:
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *exc):
+                return False
+
+            def put_item(self, Item):
+                table.items[(Item["pk"], Item["sk"])] = Item
+        return Writer()
+
+    def query(self, KeyConditionExpression, ExpressionAttributeValues, Limit, ExclusiveStartKey=None):
+        pk, after = ExpressionAttributeValues[":p"], ExpressionAttributeValues[":c"]
+        self.queries.append(pk)
+        if ExclusiveStartKey:
+            after = max(after, ExclusiveStartKey["sk"])
+        rows = sorted((sk, item) for (p, sk), item in self.items.items() if p == pk and sk > after)
+        page = [item for _, item in rows[:Limit]]
+        res = {"Items": page}
+        if len(rows) > Limit:
+            res["LastEvaluatedKey"] = {"pk": pk, "sk": page[-1]["sk"]}
+        return res
+
+def test_dynamo_layout_walks_day_partitions_from_the_cursor(monkeypatch):
+    fake = FakeIndexTable()
+    monkeypatch.setattr(change_feed, "table", lambda: fake)
+    day0 = 1_760_054_400_000  # 2025-10-10T00:00Z
+    change_feed.record_changes([{"email": "a", "status": "SENT"}], ts_ms=day0 + 1000, seq="5")
+    change_feed.record_changes([{"email": "b", "status": "WARM"}, {"email": "c", "status": "COLD"}],
+                               ts_ms=day0 + 2 * DAY_MS + 5000, seq="9")
+    assert {pk for pk, _ in fake.items} == {"CHANGES#2025-10-10", "CHANGES#2025-10-12"}
+
+    now = day0 + 2 * DAY_MS + 60_000
+    res = change_feed.changes_since(change_feed.latest_cursor(day0), limit=2, now_ms=now)
+    assert [e["email"] for e in res["events"]] == ["a", "b"] and res["more"]
+    res = change_feed.changes_since(res["cursor"], limit=10, now_ms=now)
+    assert [e["email"] for e in res["events"]] == ["c"] and not res["more"]
+
+    fake.queries.clear()
+    assert change_feed.changes_since(res["cursor"], now_ms=now)["events"] == []
+    assert fake.queries == ["CHANGES#2025-10-12"]  # idle poll: one query, today's partition only
+
+def test_changes_api_handler():
+    change_feed.record_changes([{"email": "a@shop.example", "status": "WARM"}])
+    resp = lead_changes.lambda_handler({"queryStringParameters": {"lookback": "60"}}, None)
+    body = json.loads(resp["body"])
+    assert resp["statusCode"] == 200 and [e["status"] for e in body["events"]] == ["WARM"]
+    resp = lead_changes.lambda_handler({"queryStringParameters": {"cursor": body["cursor"]}}, None)
+    assert json.loads(resp["body"])["events"] == []
+    assert lead_changes.lambda_handler({"queryStringParameters": {"limit": "x"}}, None)["statusCode"] == 400
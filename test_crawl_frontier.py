@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Tests for the crawl frontier: repeated searches served from stored results,
+skipping stored leads and recent failures, cross-domain email dedup, and the
+BatchGetItem layout (via a small fake table).
+"""
+
+import sys
+from types import SimpleNamespace
+sys.path.append('lambda_functions')
+
+import pytest
+from boto3.dynamodb.types import TypeSerializer
+
+import crawl_frontier
+import lead_stream_consumer
+import search_shopify_retailers as crawler
+
+_ser = TypeSerializer()
+
+@pytest.fixture
+def fetched(monkeypatch):
+    monkeypatch.setattr(crawl_frontier, "table", lambda: None)
+    monkeypatch.setattr(crawler, "POLITE_DELAY", 0)
+    crawl_frontier.reset()
+    urls, emails = [], {}
+
+    def extract_stores(wave):
+        urls.extend(wave)
+        return [{"website": u, "companyName": u, "email": emails.get(u, f"hi@{crawl_frontier.domain_of(u)}")}
+                for u in wave if "broken" not in u]
+    monkeypatch.setattr(crawler, "extract_stores", extract_stores)
+    yield urls, emails
+    crawl_frontier.reset()
+
+def _search(monkeypatch, urls, limit=10, **kw):
+    monkeypatch.setattr(crawler, "search_google", lambda q, n: [{"url": u} for u in urls])
+    return crawler.find_shopify_stores("shoes", limit, **kw)
+
+def test_repeat_search_is_served_from_the_frontier(fetched, monkeypatch):
+    urls, _ = fetched
+    first = _search(monkeypatch, ["https://a.example", "https://www.b.example", "https://broken.example"])
+    assert [s["website"] for s in first] == ["https://a.example", "https://www.b.example"]
+    assert len(urls) == 3
+
+    urls.clear()
+    again = _search(monkeypatch, ["https://b.example", "https://a.example", "https://broken.example",
+                                  "https://c.example"])
+    assert urls == ["https://c.example"]                          # b is www.b; broken failed recently
+    assert {s["website"] for s in again} == {"https://a.example", "https://www.b.example", "https://c.example"}
+    assert [s["website"] for s in _search(monkeypatch, ["https://a.example"], new_only=True)] == []
+
+    monkeypatch.setattr(crawl_frontier, "FRESH_DAYS", 0)
+    monkeypatch.setattr(crawl_frontier, "RETRY_HOURS", 0)
+    urls.clear()
+    _search(monkeypatch, ["https://a.example", "https://broken.example"])
+    assert urls == ["https://a.example", "https://broken.example"]  # stale and retryable again
+
+def test_stored_leads_and_known_emails_are_not_crawled_again(fetched, monkeypatch):
+    urls, emails = fetched
+    image = {k: _ser.serialize(v) for k, v in
+             {"pk": "LEAD#owner@lead.example", "data": {"email": "owner@lead.example", "company": "Lead"}}.items()}
+    lead_stream_consumer.lambda_handler({"Records": [{"dynamodb": {"SequenceNumber": "1", "NewImage": image}}]}, None)
+
+    emails["https://lead-twin.myshopify.com"] = "owner@lead.example"
+    emails["https://twin.example"] = "hi@c.example"
+    found = _search(monkeypatch, ["https://lead.example", "https://lead-twin.myshopify.com",
+                                  "https://c.example", "https://twin.example"])
+    assert "https://lead.example" not in urls
+    assert [s["website"] for s in found] == ["https://c.example"]  # both twins reuse a known address
+
+class FakeIndexTable:
+    """pk/sk items behind batch_writer and meta.client.batch_get_item (first call leaves one key unprocessed)."""
+
+    name = "LeadIndexTable"
+
+    def __init__(self):
+        self.items, self.gets = {}, 0
+        self.meta = SimpleNamespace(client=SimpleNamespace(batch_get_item=self._batch_get))
+
+    def _batch_get(self, RequestItems):
+        self.gets += 1
+        keys = RequestItems[self.name]["Keys"]
+        held, keys = (keys[-1:], keys[:-1]) if self.gets == 1 and len(keys) > 1 else ([], keys)
+        res = {"Responses": {self.name: [self.items[(k["pk"], k["sk"])] for k in keys
+                                         if (k["pk"], k["sk"]) in self.items]}}
+        if held:
+            res["UnprocessedKeys"] = {self.name: {"Keys": held}}
+        return res
+
+    def batch_writer(self, **kwargs):
+        table = self
+
+        class W:
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *a):
+                return False
+
+            def put_item(self, Item):
+                table.items[(Item["pk"], Item["sk"])] = dict(Item)
+        return W()
+
+def test_table_layout_and_batched_lookup(monkeypatch):
+    tbl = FakeIndexTable()
+    monkeypatch.setattr(crawl_frontier, "table", lambda: tbl)
+    crawl_frontier.record("search", {"https://www.a.example/": {"website": "https://www.a.example/", "email": "Hi@A.example"},
+                                     "https://b.example": None})
+    crawl_frontier.record("search", {"https://a2.example": {"website": "https://a2.example", "email": "hi@a.example"}})
+
+    assert tbl.items[("CRAWL#@hi@a.example", "email")]["domain"] == "a.example"   # first domain keeps it
+    assert tbl.items[("CRAWL#b.example", "domain")]["outcome"] == "failed"
+    fetch, served, skipped = crawl_frontier.plan(["https://a.example", "https://b.example", "https://new.example"],
+                                                 source="search")
+    assert (fetch, skipped) == (["https://new.example"], ["https://b.example"])
+    assert served[0]["email"] == "Hi@A.example"
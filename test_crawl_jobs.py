@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Tests for distributed crawls: the coordinator queues chunks, worker processes
+extract them, and the job record gathers per-query results for polling.
+"""
+
+import json
+import sys
+sys.path.append('lambda_functions')
+
+import pytest
+
+import crawl_frontier
+import crawl_jobs
+import crawl_worker
+import search_shopify_retailers as crawler
+from fixture_server import FixtureSite
+
+def _store_routes(i):
+    meta = {"name": f"Store {i}", "description": "Trail gear", "currency": "USD", "myshopify_domain": f"s{i}.myshopify.com"}
+    return {"/meta.json": json.dumps(meta), "/pages/contact": f"<p>hello@store{i}.example</p>"}
+
+@pytest.fixture
+def sites(monkeypatch):
+    monkeypatch.setattr(crawl_frontier, "table", lambda: None)
+    monkeypatch.setattr(crawl_jobs, "table", lambda: None)
+    monkeypatch.delenv("CRAWL_QUEUE_URL", raising=False)
+    monkeypatch.setattr(crawl_jobs, "CHUNK", 3)
+    crawl_frontier.reset()
+    crawl_jobs.reset()
+    started = [FixtureSite(_store_routes(i), host=f"127.0.0.{i + 2}").start() for i in range(7)]
+    ranking = {"trail": [s.url for s in started[:5]], "gear": [s.url for s in started[3:]]}
+    monkeypatch.setattr(crawler, "search_google", lambda q, n: [{"url": u} for u in ranking[q.split(" site:")[0]]][:n])
+    yield started
+    for s in started:
+        s.stop()
+    crawl_frontier.reset()
+    crawl_jobs.reset()
+
+def test_distributed_crawl_with_worker_processes(sites):
+    res = crawler.lambda_handler({"body": json.dumps({"queries": ["trail", "gear"], "limit": 10,
+                                                      "distributed": True})}, None)
+    job = json.loads(res["body"])
+    assert res["statusCode"] == 202 and job["status"] == "RUNNING" and job["total"] == 7
+
+    assert crawl_jobs.run_local(processes=2) == 3                   # 7 URLs in chunks of 3
+    poll = crawler.lambda_handler({"httpMethod": "GET", "pathParameters": {"jobId": job["jobId"]}}, None)
+    done = json.loads(poll["body"])
+    assert done["status"] == "SUCCEEDED" and (done["done"], done["found"]) == (7, 7)
+    assert [s["companyName"] for s in done["results"]["gear"]] == ["Store 3", "Store 4", "Store 5", "Store 6"]
+    assert len(done["results"]["trail"]) == 5
+
+    again = crawl_jobs.start_job(["trail"], 10)                     # the frontier serves it all now
+    assert again["status"] == "SUCCEEDED" and again["served"] == 5 and crawl_jobs.run_local(0) == 0
+
+def test_worker_reports_failed_records(sites, monkeypatch):
+    job = crawl_jobs.start_job(["trail"], 2)
+    message = crawl_jobs._QUEUE.get_nowait()
+    monkeypatch.setattr(crawl_jobs, "crawl_chunk", lambda urls: [{"website": u, "email": None} for u in urls])
+    out = crawl_worker.lambda_handler({"Records": [{"messageId": "m1", "body": json.dumps(message)},
+                                                   {"messageId": "m2", "body": "{}"}]}, None)
+    assert out == {"batchItemFailures": [{"itemIdentifier": "m2"}]}
+    assert crawl_jobs.get_job(job["jobId"])["status"] == "SUCCEEDED"
+
+    missing = crawler.lambda_handler({"httpMethod": "GET", "pathParameters": {"jobId": "nope"}}, None)
+    assert missing["statusCode"] == 404
+
+def test_redelivered_chunks_count_once_and_dead_chunks_end_the_job(sites, monkeypatch):
+    job = crawl_jobs.start_job(["trail"], 10)                       # 5 URLs: chunks "0" (3) and "1" (2)
+    first, second = crawl_jobs._QUEUE.get_nowait(), crawl_jobs._QUEUE.get_nowait()
+    monkeypatch.setattr(crawl_jobs, "crawl_chunk", lambda urls: [{"website": u, "email": None} for u in urls])
+    records = [{"messageId": "m1", "body": json.dumps(first)}]
+    crawl_worker.lambda_handler({"Records": records}, None)
+    crawl_worker.lambda_handler({"Records": records}, None)          # SQS delivered it twice
+    state = crawl_jobs.get_job(job["jobId"])
+    assert (state["status"], state["done"], state["found"]) == ("RUNNING", 3, 3)
+
+    dlq = {"Records": [{"messageId": "d1", "body": json.dumps(second)}, {"messageId": "d2", "body": "junk"}]}
+    assert crawl_worker.dead_letter_handler(dlq, None) == {"dead": 1}
+    assert crawl_worker.dead_letter_handler(dlq, None) == {"dead": 0}
+    state = crawl_jobs.get_job(job["jobId"])
+    assert (state["status"], state["done"], state["failed"]) == ("PARTIAL", 3, 2)
+
+    other = crawl_jobs.start_job(["gear"], 2)                        # stores 3 and 4, never crawled
+    monkeypatch.setattr(crawl_jobs, "crawl_chunk", lambda urls: 1 / 0)
+    assert crawl_jobs.run_local(0) == 1                              # locally a failed chunk is dead at once
+    assert crawl_jobs.get_job(other["jobId"])["status"] == "FAILED"
@@ -0,0 +1,23 @@
+#!/usr/bin/env python3
+"""
+Tests for the shared extraction rules (keyword index + precompiled patterns)
+"""
+
+import sys
+sys.path.append('lambda_functions')
+
+from extraction_rules import EMAIL_RE, INDUSTRY_INDEX, PHONE_RE, classify_industry
+
+def test_industry_is_weighted_not_first_hit():
+    text = "New leggings and a gym bag: fitness gear for every workout. Training shirt."
+    assert INDUSTRY_INDEX.counts(text) == {"fitness": 3, "fashion": 1}
+    assert classify_industry(text) == "Fitness"
+
+def test_keywords_match_at_word_starts_only():
+    assert INDUSTRY_INDEX.counts("Shirts, our address, and dresses") == {"fashion": 2}
+    assert classify_industry("Nothing relevant here") == "E-commerce"
+
+def test_contact_patterns():
+    text = "Write to help@trailstep.example or call (888) 963-8944."
+    assert EMAIL_RE.search(text).group(0) == "help@trailstep.example"
+    assert PHONE_RE.search(text).group(0).strip() == "(888) 963-8944"
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+Tests for the follow-up scheduler: scheduling from the lead stream, lazy
+cancellation at pop time, hand-off per campaign, and the hour-bucketed
+DynamoDB layout with its cursor (via a small fake table).
+"""
+
+import copy
+import sys
+sys.path.append('lambda_functions')
+
+import pytest
+from boto3.dynamodb.types import TypeSerializer
+
+import follow_ups
+import lead_stream_consumer
+import store_lead_data
+
+H_MS = 3600 * 1000
+T0 = 1_760_000_000_000
+DELAY_MS = follow_ups.DELAY_SECONDS * 1000
+_ser = TypeSerializer()
+
+@pytest.fixture
+def store(monkeypatch):
+    monkeypatch.setattr(follow_ups, "table", lambda: None)
+    monkeypatch.setattr(follow_ups, "_HEAP", [])
+    db, runs = {}, []
+    monkeypatch.setattr(follow_ups, "batch_get_leads", lambda emails: {e: copy.deepcopy(db[e]) for e in emails if e in db})
+
+    def update_campaigns(updates):
+        applied = []
+        for email, cid, fields, expect in updates:
+            c = db[email]["campaigns"][cid]
+            applied.append(all(c.get(k) == v for k, v in expect.items()))
+            if applied[-1]:
+                c.update(fields)
+        return applied
+    monkeypatch.setattr(follow_ups, "update_campaigns", update_campaigns)
+
+    def hand_off(cid, leads, n):
+        runs.append((cid, sorted(l["email"] for l in leads)))
+        for l in leads:                             # the run sends: update_send_metadata records it
+            c = db[l["email"]]["campaigns"][cid]
+            c["messageId"], c["lastSentAt"] = f"m-{len(runs)}", c["lastFollowUpAt"]
+        return f"run-{len(runs)}"
+    monkeypatch.setattr(follow_ups, "_hand_off", hand_off)
+    return db, runs
+
+def _lead(email, status, **extra):
+    """A lead whose c1 campaign was really emailed at T0 (pass messageId=None for one that wasn't)."""
+    c = {"status": status, "messageId": "ses-1", "lastSentAt": T0 // 1000, **extra}
+    return {"email": email, "company": "Acme", "campaigns": {"c1": {k: v for k, v in c.items() if v is not None}}}
+
+def test_stream_schedules_only_on_entering_a_follow_up_status(store):
+    assert [e["n"] for e in follow_ups.to_schedule(None, _lead("a@x.example", "SENT"), T0)] == [1]
+    assert follow_ups.to_schedule(_lead("a@x.example", "SENT"), _lead("a@x.example", "SENT"), T0) == []
+    assert follow_ups.to_schedule(_lead("a@x.example", "SENT"), _lead("a@x.example", "WARM"), T0) == []
+    assert follow_ups.to_schedule(None, _lead("a@x.example", "NEUTRAL", followUps=follow_ups.MAX_FOLLOW_UPS), T0) == []
+    assert follow_ups.to_schedule(None, _lead("a@x.example", "SENT", messageId=None), T0) == []
+    assert follow_ups.to_schedule(None, _lead("a@x.example", "SENT", messageId="dryrun-1"), T0) == []
+    resent = _lead("a@x.example", "SENT", lastSentAt=T0 // 1000 + 60)
+    assert [e["n"] for e in follow_ups.to_schedule(_lead("a@x.example", "SENT", messageId=None), resent, T0)] == [1]
+
+    image = lambda d: {k: _ser.serialize(v) for k, v in {"pk": "LEAD#a@x.example", "data": d}.items()}
+    rec = {"dynamodb": {"SequenceNumber": "1", "ApproximateCreationDateTime": T0 / 1000,
+                        "NewImage": image(_lead("a@x.example", "SENT"))}}
+    lead_stream_consumer.lambda_handler({"Records": [rec]}, None)
+    [entry] = follow_ups.pending()
+    assert entry["email"] == "a@x.example" and entry["dueMs"] == T0 + DELAY_MS
+
+def test_storing_a_lead_with_default_status_schedules_nothing(store, monkeypatch):
+    written = []
+    monkeypatch.setattr(store_lead_data, "upsert_lead", lambda lead: written.append(lead) or {"ok": True})
+    res = store_lead_data.lambda_handler({"body": '{"email": "p@x.example", "company_name": "P", "campaign_id": "c1"}'},
+                                         None)
+    assert res["statusCode"] == 200 and written[0]["campaigns"]["c1"]["status"] == "SENT"     # the default
+    image = {k: _ser.serialize(v) for k, v in {"pk": "LEAD#p@x.example", "data": written[0]}.items()}
+    lead_stream_consumer.lambda_handler({"Records": [{"dynamodb": {"SequenceNumber": "1", "NewImage": image}}]}, None)
+    assert follow_ups.pending() == []
+
+def test_tick_pops_due_cancels_lazily_and_reschedules(store):
+    db, runs = store
+    for email, status in [("a@x.example", "SENT"), ("b@x.example", "NEUTRAL"), ("c@x.example", "SENT")]:
+        db[email] = _lead(email, status)
+        follow_ups.schedule(follow_ups.to_schedule(None, db[email], T0))
+    follow_ups.schedule([{"email": "a@x.example", "campaignId": "c1", "dueMs": T0 + DELAY_MS + 1, "n": 1}])  # duplicate
+    db["c@x.example"]["campaigns"]["c1"]["status"] = "WARM"                                  # replied meanwhile
+    db["d@x.example"] = _lead("d@x.example", "SENT", messageId=None)                         # stored, never emailed
+    follow_ups.schedule([{"email": "d@x.example", "campaignId": "c1", "dueMs": T0 + DELAY_MS, "n": 1}])
+
+    assert follow_ups.tick(now_ms=T0 + DELAY_MS - 1)["due"] == 0
+    res = follow_ups.tick(now_ms=T0 + DELAY_MS + 1)
+    assert (res["due"], res["dispatched"], res["skipped"]) == (5, 2, 3)
+    assert runs == [("c1", ["a@x.example", "b@x.example"])]
+    assert db["a@x.example"]["campaigns"]["c1"]["followUps"] == 1
+    assert sorted((e["email"], e["n"]) for e in follow_ups.pending()) == [("a@x.example", 2), ("b@x.example", 2)]
+
+    db["b@x.example"]["campaigns"]["c1"]["lastSentAt"] -= 1                        # follow-up 1 never went out
+    res = follow_ups.tick(now_ms=T0 + 2 * DELAY_MS + 1)
+    assert (res["dispatched"], res["skipped"]) == (1, 1) and follow_ups.pending() == []   # FOLLOWUP_MAX reached
+
+def test_failed_hand_off_rolls_back_and_retries(store, monkeypatch):
+    db, _ = store
+    db["a@x.example"] = _lead("a@x.example", "SENT")
+    follow_ups.schedule(follow_ups.to_schedule(None, db["a@x.example"], T0))
+    monkeypatch.setattr(follow_ups, "_hand_off", lambda *a: (_ for _ in ()).throw(RuntimeError("invoke failed")))
+
+    assert follow_ups.tick(now_ms=T0 + DELAY_MS)["failed"] == 1
+    assert db["a@x.example"]["campaigns"]["c1"]["followUps"] == 0
+    [retry] = follow_ups.pending()
+    assert retry["n"] == 1 and retry["dueMs"] == T0 + DELAY_MS + follow_ups.RETRY_SECONDS * 1000
+
+def test_reply_between_read_and_claim_is_kept(store, monkeypatch):
+    db, runs = store
+    db["a@x.example"] = _lead("a@x.example", "SENT")
+    follow_ups.schedule(follow_ups.to_schedule(None, db["a@x.example"], T0))
+    read = follow_ups.batch_get_leads
+    def read_then_reply(emails):
+        got = read(emails)
+        db["a@x.example"]["campaigns"]["c1"]["status"] = "WARM"                 # the reply lands after the read
+        return got
+    monkeypatch.setattr(follow_ups, "batch_get_leads", read_then_reply)
+
+    res = follow_ups.tick(now_ms=T0 + DELAY_MS)
+    assert (res["dispatched"], res["skipped"]) == (0, 1) and runs == []
+    assert db["a@x.example"]["campaigns"]["c1"] == {**db["a@x.example"]["campaigns"]["c1"], "status": "WARM"}
+    assert "followUps" not in db["a@x.example"]["campaigns"]["c1"] and follow_ups.pending() == []
+
+class FakeIndexTable:
+    """pk/sk items; query honours pk =, sk <= and Limit; counts queries."""
+
+    class _Conflict(Exception):
+        pass
+
+    def __init__(self):
+        self.items, self.queries = {}, []
+        self.meta = type("M", (), {"client": type("C", (), {"exceptions": type("E", (), {
+            "ConditionalCheckFailedException": FakeIndexTable._Conflict})})})
+
+    def batch_writer(self, **kwargs):
+        table = self
+
+        class W:
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *a):
+                return False
+
+            def put_item(self, Item):
+                table.put_item(Item=Item)
+        return W()
+
+    def put_item(self, Item):
+        self.items[(Item["pk"], Item["sk"])] = dict(Item)
+
+    def get_item(self, Key):
+        item = self.items.get((Key["pk"], Key["sk"]))
+        return {"Item": item} if item else {}
+
+    def delete_item(self, Key, ConditionExpression=None):
+        if self.items.pop((Key["pk"], Key["sk"]), None) is None:
+            raise self._Conflict()
+
+    def query(self, KeyConditionExpression, ExpressionAttributeValues, Limit):
+        pk, top = ExpressionAttributeValues[":p"], ExpressionAttributeValues[":s"]
+        self.queries.append(pk)
+        found = sorted((k, v) for k, v in self.items.items() if k[0] == pk and k[1] <= top)
+        res = {"Items": [v for _, v in found[:Limit]]}
+        if len(found) > Limit:
+            res["LastEvaluatedKey"] = {"pk": pk, "sk": found[Limit - 1][0][1]}
+        return res
+
+def test_bucketed_pop_reads_only_due_buckets_and_advances_cursor(monkeypatch):
+    tbl = FakeIndexTable()
+    monkeypatch.setattr(follow_ups, "table", lambda: tbl)
+    entries = [{"email": f"{i}@x.example", "campaignId": "c1", "dueMs": T0 + i * H_MS, "n": 1} for i in range(6)]
+    follow_ups.schedule(entries)
+    tbl.put_item(Item={"pk": "FOLLOWUP#CURSOR", "sk": "cursor", "bucket": follow_ups._bucket(T0)})
+
+    got = follow_ups.pop_due(now_ms=T0 + 2 * H_MS, limit=10)
+    assert [e["email"] for e in got] == ["0@x.example", "1@x.example", "2@x.example"]
+    assert len(tbl.queries) == 3                                    # one per hour bucket up to now
+    assert tbl.get_item(Key={"pk": "FOLLOWUP#CURSOR", "sk": "cursor"})["Item"]["bucket"] == follow_ups._bucket(T0 + 2 * H_MS)
+
+    got = follow_ups.pop_due(now_ms=T0 + 5 * H_MS, limit=2)         # bounded batch
+    assert [e["email"] for e in got] == ["3@x.example", "4@x.example"]
+    assert [e["email"] for e in follow_ups.pop_due(now_ms=T0 + 5 * H_MS)] == ["5@x.example"]
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Offline tests for the batch enrichment pipeline (lead_enrich.enrich_leads).
+Websites are served by fixture_server; DynamoDB reads/writes go to an in-memory dict.
+"""
+
+import copy
+import json
+import sys
+import time
+sys.path.append('lambda_functions')
+
+import pytest
+
+import lead_enrich
+from leads_store_dynamo import ENRICHMENT_FIELDS
+from fixture_server import FixtureSite
+
+SHOP_HTML = """
+<html><head>
+<title>Acme — Sustainable Shoes</title>
+<meta name="description" content="Comfortable, sustainable shoes">
+</head><body>Powered by Shopify. Follow us on Instagram. Contact: hi@acme.example</body></html>
+"""
+
+@pytest.fixture
+def store(monkeypatch):
+    db = {}
+    def update_enrichment(leads):
+        for lead in leads:
+            stored = db.setdefault(lead["email"], {"email": lead["email"]})
+            stored.update({k: copy.deepcopy(v) for k, v in lead.items() if k in ENRICHMENT_FIELDS})
+            for cid, c in (lead.get("campaigns") or {}).items():
+                stored.setdefault("campaigns", {}).setdefault(cid, {})["score"] = c["score"]
+
+    def touch_profiles(profiles):
+        for email, fields in profiles.items():
+            db[email]["profile"].update(fields)
+
+    monkeypatch.setattr(lead_enrich, "batch_get_leads", lambda emails: {e: copy.deepcopy(db[e]) for e in emails if e in db})
+    monkeypatch.setattr(lead_enrich, "update_enrichment", update_enrichment)
+    monkeypatch.setattr(lead_enrich, "touch_profiles", touch_profiles)
+    return db
+
+def test_enrich_batch_fetches_sites_concurrently(store):
+    sites = [FixtureSite({"/": SHOP_HTML}, delay=0.3).start() for _ in range(8)]
+    try:
+        items = [{"email": f"owner{i}@shop.example", "website": s.url + "/collections/all"}
+                 for i, s in enumerate(sites)]
+        started = time.monotonic()
+        res = lead_enrich.enrich_leads(items, max_workers=8)
+        elapsed = time.monotonic() - started
+    finally:
+        for s in sites:
+            s.stop()
+
+    assert len(res["leads"]) == 8 and not res["deferred"]
+    assert elapsed < 8 * 0.3  # overlapping fetches, not serial
+    lead = store["owner0@shop.example"]
+    assert lead["profile"]["shopify"] is True
+    assert float(lead["fitScore"]) == 45.0
+    assert float(lead["intentScore"]) == 40.0
+
+def test_enrich_batch_fetches_each_site_once(store):
+    with FixtureSite({"/": SHOP_HTML}) as site:
+        items = [{"email": "a@shop.example", "website": site.url},
+                 {"email": "b@shop.example", "website": site.url + "/pages/about"}]
+        res = lead_enrich.enrich_leads(items)
+        assert site.hits["/"] == 1
+    assert {l["email"] for l in res["leads"]} == {"a@shop.example", "b@shop.example"}
+
+def test_enrich_batch_defers_sites_past_deadline(store):
+    with FixtureSite({"/": SHOP_HTML}, delay=1.0) as slow:
+        res = lead_enrich.enrich_leads([{"email": "slow@shop.example", "website": slow.url}],
+                                       deadline=time.monotonic() + 0.2)
+    assert res["deferred"] == ["slow@shop.example"]
+    assert "slow@shop.example" not in store
+
+def test_enrich_handler_rejects_missing_email(store, monkeypatch):
+    fetched = []
+    monkeypatch.setattr(lead_enrich, "fetch_page", lambda url, *a, **kw: fetched.append(url) or {"status": 0})
+    resp = lead_enrich.lambda_handler({"body": '{"leads": [{"website": "x.example"}]}'}, None)
+    assert resp["statusCode"] == 200
+    body = json.loads(resp["body"])
+    assert body["errors"] == [{"item": {"website": "x.example"}, "error": "email required"}]
+    assert body["count"] == 0 and not fetched and not store
+
+def test_reenrich_is_idempotent_and_skips_unchanged(store):
+    with FixtureSite({"/": SHOP_HTML}) as site:
+        item = {"email": "owner@shop.example", "website": site.url}
+        lead_enrich.enrich_leads([item])
+        store["owner@shop.example"]["fitScore"] = 99  # drifted legacy score
+        store["owner@shop.example"]["profile"]["fetchedAt"] = 0  # stale, so refetch
+
+        store["owner@shop.example"]["campaigns"] = {"c1": {"status": "REPLIED"}}    # written since
+        res = lead_enrich.enrich_leads([item])
+        assert res["unchanged"] == ["owner@shop.example"] and not res["leads"]
+        assert store["owner@shop.example"]["profile"]["fetchedAt"] > 0             # no refetch tomorrow
+
+        res = lead_enrich.enrich_leads([item], force=True)
+        assert float(res["leads"][0]["fitScore"]) == 45.0  # recomputed, not 99 + 45
+        assert site.hits["/"] == 3
+    assert store["owner@shop.example"]["campaigns"]["c1"]["status"] == "REPLIED"
+
+def test_fresh_leads_are_not_refetched(store):
+    with FixtureSite({"/": SHOP_HTML}) as site:
+        item = {"email": "owner@shop.example", "website": site.url}
+        lead_enrich.enrich_leads([item])
+        res = lead_enrich.enrich_leads([item])
+        assert res["fresh"] == ["owner@shop.example"]
+        assert site.hits["/"] == 1
+
+def test_changed_page_is_rescored(store):
+    routes = {"/": SHOP_HTML}
+    with FixtureSite(routes) as site:
+        item = {"email": "owner@shop.example", "website": site.url}
+        lead_enrich.enrich_leads([item])
+        store["owner@shop.example"]["profile"]["fetchedAt"] = 0
+        routes["/"] = "<html><title>Acme</title><body>Powered by Shopify</body></html>"
+        res = lead_enrich.enrich_leads([item])
+    lead = res["leads"][0]
+    assert float(lead["fitScore"]) == 35.0 and float(lead["intentScore"]) == 0.0
+
+def test_failed_fetch_keeps_the_stored_scores(store):
+    routes = {"/": SHOP_HTML}
+    with FixtureSite(routes) as site:
+        item = {"email": "owner@shop.example", "website": site.url}
+        lead_enrich.enrich_leads([item])
+        store["owner@shop.example"]["profile"]["fetchedAt"] = 0
+        before = copy.deepcopy(store["owner@shop.example"])
+        routes["/"] = (503, "down")
+        res = lead_enrich.enrich_leads([item])
+    assert res["failed"] == ["owner@shop.example"] and not res["leads"] and not res["unchanged"]
+    assert store["owner@shop.example"] == before                 # 45/40, same hash, still due for a refetch
+
+    down = "http://127.0.0.1:1"                                  # nothing listens there
+    store["owner@shop.example"]["profile"]["website"] = before["profile"]["website"] = down
+    res = lead_enrich.enrich_leads([{"email": "owner@shop.example", "website": down}])
+    assert res["failed"] == ["owner@shop.example"] and store["owner@shop.example"] == before
+    assert float(before["fitScore"]) == 45.0 and float(before["intentScore"]) == 40.0
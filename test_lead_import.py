@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Tests for the bulk lead importer: store_lead_data's validation and
+normalization, dedup within the file and against the store, and resuming from
+a checkpoint after a failed batch.
+"""
+
+import gzip
+import json
+import sys
+sys.path.append('lambda_functions')
+
+import pytest
+from boto3.dynamodb.types import TypeDeserializer, TypeSerializer
+
+import lead_import
+import leads_store_dynamo as store
+from test_leads_store_dynamo import FakeDynamoClient
+
+_ser, _de = TypeSerializer(), TypeDeserializer()
+
+CSV = ("﻿E-mail,Company Name,Website,Status\n"
+       "Ann@Shop.example,Shop,www.shop.example/collections/all,\n"
+       "ann@shop.example,Shop again,,\n"
+       "not-an-email,Nope,,\n"
+       "bob@b.example,,,\n"
+       "old@o.example,Old,,\n"
+       "cy@c.example,Cy,c.example,warm\n"
+       "dee@d.example,Dee,,\n")
+
+class FakeLeadsClient(FakeDynamoClient):
+    """Batch calls over items in wire format; fails the batch write call named in `fail_on`."""
+
+    def __init__(self):
+        super().__init__()
+        self.writes, self.fail_on = 0, None
+
+    def batch_get_item(self, RequestItems):
+        [(name, req)] = RequestItems.items()
+        return {"Responses": {name: [self.items[k["pk"]["S"]] for k in req["Keys"] if k["pk"]["S"] in self.items]}}
+
+    def batch_write_item(self, RequestItems):
+        self.writes += 1
+        if self.writes == self.fail_on:
+            raise RuntimeError("throttled")
+        [(name, reqs)] = RequestItems.items()
+        for r in reqs:
+            self.items[r["PutRequest"]["Item"]["pk"]["S"]] = r["PutRequest"]["Item"]
+        return {}
+
+    def lead(self, email):
+        item = self.items.get(f"LEAD#{email}")
+        return _de.deserialize(item["data"]) if item else None
+
+@pytest.fixture
+def fake(monkeypatch):
+    client = FakeLeadsClient()
+    monkeypatch.setenv("LEADS_TABLE_NAME", "LeadsTable")
+    monkeypatch.setattr(store, "client", lambda service: client)
+    store.put_leads([{"email": "old@o.example", "company": "Old", "campaigns": {"c0": {"status": "WARM"}}}])
+    client.writes = 0
+    return client
+
+def test_csv_rows_are_validated_normalized_and_deduped(fake, tmp_path):
+    path = tmp_path / "list.csv"
+    path.write_text(CSV, encoding="utf-8")
+    res = lead_import.import_file(str(path), campaign_id="spring", batch_size=2, workers=2)
+
+    assert {k: res[k] for k in ("rows", "imported", "existing", "duplicates", "invalid")} == \
+        {"rows": 7, "imported": 3, "existing": 1, "duplicates": 1, "invalid": 2}
+    assert [e["error"] for e in res["errors"]] == ["invalid email", lead_import.LEAD.missing]
+    ann = fake.lead("ann@shop.example")
+    assert ann["company"] == "Shop" and ann["profile"]["website"] == "https://www.shop.example"
+    assert ann["campaigns"]["spring"]["status"] == "NEW" and fake.lead("cy@c.example")["campaigns"]["spring"]["status"] == "WARM"
+    assert "spring" not in fake.lead("old@o.example")["campaigns"]
+
+def test_update_existing_adds_the_campaign_only(fake, tmp_path):
+    path = tmp_path / "list.ndjson.gz"
+    with gzip.open(path, "wt", encoding="utf-8") as f:
+        f.write(json.dumps({"email": "old@o.example", "companyName": "Old Co", "campaign": "c0"}) + "\n")
+        f.write("{broken\n")
+        f.write(json.dumps({"email": "OLD@o.example", "company": "Old Co", "campaign": "spring"}) + "\n")
+    res = lead_import.import_file(str(path), update_existing=True)
+    assert (res["existing"], res["updated"], res["invalid"]) == (1, 0, 1)      # both old rows hit one key; c0 kept
+
+    path2 = tmp_path / "again.ndjson"
+    path2.write_text(json.dumps({"email": "old@o.example", "company": "Old Co", "campaign": "spring"}) + "\n")
+    assert lead_import.import_file(str(path2), update_existing=True)["updated"] == 1
+    old = fake.lead("old@o.example")
+    assert old["campaigns"]["c0"]["status"] == "WARM" and old["campaigns"]["spring"]["status"] == "NEW"
+    assert old["aliases"] == ["Old"]
+
+def test_update_existing_never_overwrites_what_was_written_since_the_read(fake, tmp_path, monkeypatch):
+    read = lead_import.batch_get_leads
+    def read_then_reply(emails):
+        got = read(emails)
+        store.update_status("old@o.example", "c0", "REPLIED", "Yes please")         # lands after the read
+        return got
+    monkeypatch.setattr(lead_import, "batch_get_leads", read_then_reply)
+    path = tmp_path / "list.csv"
+    path.write_text("email,company,campaign,website\nold@o.example,Old,spring,old.example\n", encoding="utf-8")
+    assert lead_import.import_file(str(path), update_existing=True)["updated"] == 1
+    old = fake.lead("old@o.example")
+    assert old["campaigns"]["c0"]["status"] == "REPLIED" and old["campaigns"]["spring"]["status"] == "NEW"
+    assert old["profile"] == {"website": "https://old.example"}
+
+def test_resume_from_checkpoint_after_a_failed_batch(fake, tmp_path):
+    rows = [f"u{i}@x.example,Co {i}" for i in range(10)] + ["U3@x.example,Dup"] + [f"v{i}@x.example,V" for i in range(5)]
+    path = tmp_path / "big.csv"
+    path.write_text("email,company\n" + "\n".join(rows) + "\n", encoding="utf-8")
+    ckpt = str(tmp_path / "big.ckpt.json")
+
+    fake.fail_on = 3
+    with pytest.raises(RuntimeError):
+        lead_import.import_file(str(path), campaign_id="c", batch_size=4, workers=1, checkpoint=ckpt)
+    with open(ckpt, encoding="utf-8") as f:
+        assert json.load(f)["rows"] == 8                                    # two batches landed
+
+    fake.fail_on = None
+    res = lead_import.import_file(str(path), campaign_id="c", batch_size=4, workers=1, checkpoint=ckpt)
+    assert res["resumed"] and (res["rows"], res["imported"], res["duplicates"]) == (16, 15, 1)
+    assert sum(1 for k in fake.items if k.startswith("LEAD#u") or k.startswith("LEAD#v")) == 15
+    assert lead_import.import_file(str(path), campaign_id="c", checkpoint=ckpt)["imported"] == 15   # done: no-op
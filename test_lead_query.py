@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Tests for the lead list helpers (lead_query) and the GET /leads/list handler.
+"""
+
+import json
+import sys
+from decimal import Decimal
+sys.path.append('lambda_functions')
+
+import pytest
+
+import lead_query
+import list_leads
+
+LEADS = [
+    {"email": "a@shop.example", "company": "Acme", "fitScore": Decimal("45"), "intentScore": Decimal("40"),
+     "profile": {"website": "https://acme.example"},
+     "campaigns": {"c1": {"status": "WARM", "score": Decimal("43"), "updatedAt": 30},
+                   "c2": {"status": "SENT", "score": Decimal("27"), "updatedAt": 10}}},
+    {"email": "b@shop.example", "company": "Bolt", "fitScore": Decimal("35"),
+     "campaigns": {"c1": {"status": "COLD", "score": Decimal("5"), "updatedAt": 20}}},
+    {"email": "c@shop.example", "company": "Cove"},
+]
+
+def test_flatten_gives_one_row_per_campaign():
+    rows = lead_query.flatten(LEADS)
+    assert [(r["email"], r["campaign"], r["status"]) for r in rows] == [
+        ("a@shop.example", "c1", "WARM"), ("a@shop.example", "c2", "SENT"),
+        ("b@shop.example", "c1", "COLD"), ("c@shop.example", "", "NEW"),
+    ]
+    assert rows[0]["score"] == 43.0 and rows[0]["website"] == "https://acme.example"
+    assert lead_query.campaigns(rows) == ["c1", "c2"]
+
+def test_filter_sort_and_paginate():
+    rows = lead_query.flatten(LEADS)
+    assert [r["email"] for r in lead_query.filter_rows(rows, campaign="c1", statuses=["warm", "cold"])] == \
+        ["a@shop.example", "b@shop.example"]
+    assert [r["company"] for r in lead_query.filter_rows(rows, text="ACME.ex")] == ["Acme", "Acme"]
+
+    by_status = lead_query.sort_rows(rows, "status", descending=False)
+    assert [r["status"] for r in by_status] == ["WARM", "SENT", "NEW", "COLD"]
+
+    res = lead_query.query(rows, sort="score", page=2, page_size=3)
+    assert (res["total"], res["pages"], res["page"]) == (4, 2, 2)
+    assert [r["score"] for r in res["rows"]] == [0.0]
+    assert lead_query.paginate(rows, page=99, page_size=3)["page"] == 2  # clamped
+
+    with pytest.raises(ValueError):
+        lead_query.sort_rows(rows, "nope")
+
+def test_list_handler_reuses_one_scan_while_warm(monkeypatch):
+    scans = []
+    monkeypatch.setattr(list_leads, "scan_leads", lambda: scans.append(1) or iter(LEADS))
+    monkeypatch.setattr(list_leads, "_ROWS", None)
+
+    def get(**qs):
+        resp = list_leads.lambda_handler({"httpMethod": "GET", "queryStringParameters": qs}, None)
+        return resp["statusCode"], json.loads(resp["body"])
+
+    code, body = get(campaign="c1", sort="score", pageSize="1")
+    assert code == 200 and body["total"] == 2 and body["pages"] == 2
+    assert body["rows"][0]["email"] == "a@shop.example" and body["campaigns"] == ["c1", "c2"]
+    code, body = get(status=" sent, NEW ,", sort="company", order="asc")
+    assert [r["email"] for r in body["rows"]] == ["a@shop.example", "c@shop.example"]
+    assert len(scans) == 1
+
+    get(fresh="1")
+    assert len(scans) == 1                  # the scan is under FRESH_MIN_SECONDS old: reused
+    monkeypatch.setattr(list_leads, "_ROWS_AT", list_leads._ROWS_AT - list_leads.FRESH_MIN_SECONDS - 1)
+    get(fresh="1")
+    assert len(scans) == 2
+    assert get(sort="bogus")[0] == 400
+    assert get(page="x")[0] == 400
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Tests for leads_store_dynamo on the low-level DynamoDB client: marshalling round
+trips, batched writes (dedup + UnprocessedItems retry), batch reads and
+field-level enrichment updates.
+"""
+
+import sys
+from decimal import Decimal
+sys.path.append('lambda_functions')
+
+import pytest
+from botocore.exceptions import ClientError
+
+import leads_store_dynamo as store
+
+def _conditional_failed(op):
+    return ClientError({"Error": {"Code": "ConditionalCheckFailedException"}}, op)
+
+class FakeDynamoClient:
+    """Items kept in wire format, like the real service; the first batch write leaves one item unprocessed."""
+
+    def __init__(self):
+        self.items, self.calls = {}, []
+
+    def put_item(self, TableName, Item, ConditionExpression=None):
+        if ConditionExpression == "attribute_not_exists(pk)" and Item["pk"]["S"] in self.items:
+            raise _conditional_failed("PutItem")
+        self.items[Item["pk"]["S"]] = Item
+
+    def update_item(self, TableName, Key, UpdateExpression, ConditionExpression,
+                    ExpressionAttributeNames, ExpressionAttributeValues):
+        """SET of (nested) paths only, which is all the store sends."""
+        item = self.items.get(Key["pk"]["S"])
+        if item is None or not all(self._holds(item, c, ExpressionAttributeNames, ExpressionAttributeValues)
+                                   for c in ConditionExpression.split(" AND ")):
+            raise _conditional_failed("UpdateItem")
+        for assignment in UpdateExpression[len("SET "):].split(", "):
+            path, value = assignment.split(" = ")
+            *parents, last = [ExpressionAttributeNames.get(p, p) for p in path.split(".")]
+            node = item
+            for p in parents:
+                node = node[p]["M"]
+            node[last] = ExpressionAttributeValues[value]
+
+    @staticmethod
+    def _holds(item, condition, names, values):
+        """attribute_exists(path), attribute_not_exists(path) or path = :value."""
+        if " = " in condition:
+            path, value = condition.split(" = ")
+            fn = None
+        else:
+            fn, path = condition.rstrip(")").split("(")
+        node = {"M": item}
+        for p in path.split("."):
+            node = (node.get("M") or {}).get(names.get(p, p))
+            if node is None:
+                break
+        if fn is None:
+            return node == values[value]
+        return (node is not None) == (fn == "attribute_exists")
+
+    def get_item(self, TableName, Key, **kwargs):
+        item = self.items.get(Key["pk"]["S"])
+        return {"Item": item} if item else {}
+
+    def batch_write_item(self, RequestItems):
+        [(name, reqs)] = RequestItems.items()
+        self.calls.append(("write", len(reqs)))
+        keys = [r["PutRequest"]["Item"]["pk"]["S"] for r in reqs]
+        assert len(keys) == len(set(keys)) and len(reqs) <= 25
+        unprocessed = reqs[-1:] if len(self.calls) == 1 else []
+        for r in reqs[:len(reqs) - len(unprocessed)]:
+            self.put_item(name, r["PutRequest"]["Item"])
+        return {"UnprocessedItems": {name: unprocessed} if unprocessed else {}}
+
+    def batch_get_item(self, RequestItems):
+        [(name, req)] = RequestItems.items()
+        self.calls.append(("read", len(req["Keys"])))
+        found = [self.items[k["pk"]["S"]] for k in req["Keys"] if k["pk"]["S"] in self.items]
+        return {"Responses": {name: found}}
+
+@pytest.fixture
+def fake(monkeypatch):
+    client = FakeDynamoClient()
+    monkeypatch.setenv("LEADS_TABLE_NAME", "LeadsTable")
+    monkeypatch.setattr(store, "client", lambda service: client)
+    monkeypatch.setattr(store.time, "sleep", lambda s: None)
+    return client
+
+def test_round_trip_batches_and_retries(fake):
+
+    leads = [{"email": f"L{i}@x.example", "company": f"Co {i}", "fitScore": Decimal("42")} for i in range(30)]
+    leads.append({"email": "l0@x.example", "company": "Co 0 renamed"})            # same key: last one wins
+    assert store.put_leads(leads) == 30
+    assert fake.calls == [("write", 25), ("write", 1), ("write", 5)]              # unprocessed item resent
+
+    got = store.batch_get_leads(["l0@x.example", "L29@x.example", "missing@x.example", "l0@x.example"])
+    assert set(got) == {"l0@x.example", "l29@x.example"}
+    assert got["l0@x.example"] == {"email": "l0@x.example", "company": "Co 0 renamed"}
+    assert got["l29@x.example"]["fitScore"] == Decimal("42")
+
+    store.update_status("L1@x.example", "c1", "WARM", "Sounds good")
+    lead = store.get_lead("l1@x.example")
+    assert lead["company"] == "Co 1" and lead["campaigns"]["c1"]["status"] == "WARM"
+
+def test_enrichment_update_keeps_statuses_written_since_the_read(fake):
+    store.upsert_lead({"email": "a@x.example", "company": "A", "campaigns": {"c1": {"status": "SENT"}}})
+    stale = store.get_lead("a@x.example")
+    store.update_status("a@x.example", "c1", "REPLIED", "Tell me more")
+
+    stale.update(profile={"website": "https://a.example", "fetchedAt": 5}, fitScore=Decimal("45"))
+    stale["campaigns"]["c1"]["score"] = Decimal("30")
+    assert store.update_enrichment([stale, {"email": "new@x.example", "profile": {"website": "https://n.example"}}]) == 2
+
+    lead = store.get_lead("a@x.example")
+    assert lead["campaigns"]["c1"] == {**lead["campaigns"]["c1"], "status": "REPLIED", "lastReply": "Tell me more",
+                                       "score": Decimal("30")}
+    assert lead["fitScore"] == Decimal("45") and lead["company"] == "A"
+    assert store.get_lead("new@x.example")["profile"]["website"] == "https://n.example"
+
+    assert store.touch_profiles({"a@x.example": {"fetchedAt": 9, "etag": '"v2"'}, "gone@x.example": {"fetchedAt": 9}}) == 1
+    assert store.get_lead("a@x.example")["profile"] == {"website": "https://a.example", "fetchedAt": 9, "etag": '"v2"'}
+
+def test_campaign_updates_apply_only_while_the_expected_values_hold(fake):
+    store.upsert_lead({"email": "a@x.example", "campaigns": {"c1": {"status": "SENT"}}})
+    store.upsert_lead({"email": "b@x.example", "campaigns": {"c1": {"status": "WARM"}}})
+    assert store.update_campaigns([("a@x.example", "c1", {"followUps": 1}, {"status": "SENT"}),
+                                   ("b@x.example", "c1", {"followUps": 1}, {"status": "SENT"}),
+                                   ("gone@x.example", "c1", {"followUps": 1}, {})]) == [True, False, False]
+    assert store.get_lead("a@x.example")["campaigns"]["c1"] == {"status": "SENT", "followUps": 1}
+    assert store.get_lead("b@x.example")["campaigns"]["c1"] == {"status": "WARM"}
+
+def test_new_leads_and_campaign_nodes_are_written_without_clobbering(fake):
+    store.upsert_lead({"email": "a@x.example", "company": "A",
+                       "campaigns": {"c1": {"status": "SENT", "followUps": 2}, "c2": {"status": "WARM"}}})
+    assert store.put_new_leads([{"email": "a@x.example", "company": "A?"},
+                                {"email": "b@x.example", "company": "B"}]) == [False, True]
+    assert store.get_lead("a@x.example")["company"] == "A"
+
+    assert store.set_campaigns([({"email": "a@x.example", "company": "A2", "aliases": ["A"],
+                                  "campaigns": {"c1": {"status": "REPLIED", "note": "n"}}}, "c1"),
+                                ({"email": "b@x.example", "campaigns": {"c3": {"status": "SENT"}}}, "c3"),
+                                ({"email": "gone@x.example", "campaigns": {"c1": {}}}, "c1")]) == 2
+    a = store.get_lead("a@x.example")
+    assert a["company"] == "A2" and a["aliases"] == ["A"]
+    assert a["campaigns"] == {"c1": {"status": "REPLIED", "note": "n", "followUps": 2}, "c2": {"status": "WARM"}}
+    assert store.get_lead("b@x.example")["campaigns"] == {"c3": {"status": "SENT"}}
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Tests for log.py's invocation context: buffering, sampling, spans and the
+EMF summary line.
+"""
+
+import json
+import sys
+from types import SimpleNamespace
+sys.path.append('lambda_functions')
+
+import pytest
+
+import log
+
+def lines(capsys):
+    return [json.loads(l) for l in capsys.readouterr().err.splitlines()]
+
+def test_buffered_until_end_with_spans(capsys, monkeypatch):
+    monkeypatch.setattr(log, "_cold", True)
+    log.begin("store_lead", SimpleNamespace(aws_request_id="req-1"))
+    log.jlog(op="store_lead", ok=True, email="a@x.example")
+    for _ in range(3):
+        with log.span("store.put_leads"):
+            pass
+    with pytest.raises(RuntimeError):
+        with log.span("ses.send"):
+            raise RuntimeError("throttled")
+    assert capsys.readouterr().err == ""                 # nothing written mid-invocation
+
+    log.end(200, 12.3, 4.5)
+    out = lines(capsys)
+    assert [l["op"] for l in out] == ["store_lead", "ses.send", "request"]
+    assert all(l["requestId"] == "req-1" and l["handler"] == "store_lead" for l in out)
+    assert out[1]["ok"] is False and out[1]["err"] == "throttled"
+    summary = out[-1]
+    assert summary["coldStart"] is True and summary["status"] == 200
+    assert summary["spans"]["store.put_leads"]["n"] == 3 and summary["spans"]["ses.send"]["n"] == 1
+
+    log.begin("store_lead")
+    log.end(200)
+    assert lines(capsys)[-1]["coldStart"] is False
+
+def test_sampling_keeps_failures(capsys, monkeypatch):
+    monkeypatch.setattr(log, "SAMPLE_RATE", 0.0)
+    log.begin("ses_events")
+    log.jlog(op="ses_event", ok=True, type="Delivery")
+    log.jlog(op="ses_event", ok=False, err="no lead")
+    log.end(None)
+    assert [l["op"] for l in lines(capsys)] == ["ses_event", "request"]
+
+    log.jlog(op="local", ok=True)                       # outside an invocation: immediate, unsampled
+    assert lines(capsys)[0]["op"] == "local"
+
+def test_emf_summary(capsys, monkeypatch):
+    monkeypatch.setattr(log, "EMF", True)
+    log.begin("lead_enrich")
+
+    @log.span("http.fetch")
+    def fetch():
+        return "ok"
+
+    assert fetch() == "ok" and fetch() == "ok"
+    log.end(500, 30.0, 10.0, err="boom")
+    summary = lines(capsys)[-1]
+    [directive] = summary["_aws"]["CloudWatchMetrics"]
+    assert directive["Dimensions"] == [["handler"]]
+    assert {m["Name"] for m in directive["Metrics"]} >= {"latencyMs", "errors", "http.fetchMs"}
+    assert summary["latencyMs"] == 30.0 and summary["errors"] == 1 and len(summary["http.fetchMs"]) == 2
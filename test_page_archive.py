@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+"""
+Record/replay round trip for lambda_functions/page_archive.py (offline)
+"""
+
+import sys
+sys.path.append('lambda_functions')
+
+import pytest
+import requests
+
+from fixture_server import FixtureSite
+from page_archive import PageArchive, record, replay
+
+def test_record_then_replay_without_network(tmp_path):
+    path = str(tmp_path / "crawl.jsonl.gz")
+    archive = PageArchive(path)
+    with FixtureSite({"/": "<title>Shop</title>", "/pages/contact": "hi@shop.example"}) as site:
+        live = requests.Session()
+        rec = record(live, archive)
+        assert live.get(site.url).text == "<title>Shop</title>"
+        assert live.get(site.url + "/pages/contact").text == "hi@shop.example"
+        assert rec.stats["requests"] == 2
+        url = site.url
+    archive.save()
+
+    offline = requests.Session()
+    adapter = replay(offline, PageArchive.load(path), latency=0.01)
+    with offline.get(url, stream=True) as r:  # streamed reads work too
+        assert r.raw.read(100, decode_content=True) == b"<title>Shop</title>"
+    assert offline.get(url + "/missing").status_code == 404
+    assert adapter.stats == {**adapter.stats, "requests": 2, "misses": 1, "bytes": 19}
+
+def test_strict_replay_raises_on_unknown_url():
+    session = requests.Session()
+    replay(session, PageArchive(), strict=True)
+    with pytest.raises(requests.ConnectionError):
+        session.get("https://unknown.example")
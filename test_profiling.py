@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Tests for PROFILE=1: stage breakdown, AWS call/byte counts from botocore
+events and the cProfile dump.
+"""
+
+import json
+import os
+import sys
+from types import SimpleNamespace
+sys.path.append('lambda_functions')
+
+import pytest
+from botocore.hooks import HierarchicalEmitter
+
+import clients
+import log
+import profiling
+from runtime import api_handler, resp
+
+@pytest.fixture
+def profiled(monkeypatch, tmp_path):
+    monkeypatch.setattr(profiling, "ENABLED", True)
+    monkeypatch.setattr(profiling, "OUTPUT", str(tmp_path))
+    monkeypatch.setattr(clients, "_HOOKS", [])
+    monkeypatch.setattr(profiling, "_installed", False)
+    clients.reset()
+    yield tmp_path
+    clients.reset()
+
+def test_stage_breakdown_and_aws_counts(profiled, capsys):
+    # a cached client (warm container) gets the hooks when profiling installs
+    clients._CLIENTS[("dynamodb", None)] = SimpleNamespace(meta=SimpleNamespace(events=HierarchicalEmitter()))
+
+    @api_handler("probe")
+    def handler(event, context):
+        ddb = clients.client("dynamodb")
+        for _ in range(2):
+            with log.span("store.put_leads"):
+                ddb.meta.events.emit("before-send.dynamodb.BatchWriteItem", request=SimpleNamespace(body=b"x" * 100))
+                ddb.meta.events.emit("after-call.dynamodb.BatchWriteItem",
+                                     http_response=SimpleNamespace(content=b"{}"))
+        with log.span("ses.send"):
+            pass
+        return resp(200)
+
+    assert handler({}, None)["statusCode"] == 200
+    report = profiling.last_report()
+    assert report["stages"]["store.put_leads"]["n"] == 2
+    assert report["aws"] == {"dynamodb.BatchWriteItem": {"calls": 2, "bytesOut": 200, "bytesIn": 4}}
+
+    summary = [json.loads(l) for l in capsys.readouterr().err.splitlines()][-1]
+    assert summary["op"] == "request" and summary["profile"]["aws"] == report["aws"]
+
+def test_cprofile_dump(profiled, monkeypatch):
+    monkeypatch.setattr(profiling, "DUMP", "cprofile")
+
+    @api_handler("probe_dump")
+    def handler(event, context):
+        return resp(200, {"n": sum(range(1000))})
+
+    handler({}, SimpleNamespace(aws_request_id="req-9"))
+    dump = profiling.last_report()["dump"]
+    assert dump.startswith(str(profiled)) and dump.endswith("-req-9.prof") and os.path.getsize(dump) > 0
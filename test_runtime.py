@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Tests for the shared handler runtime: body decoding, schema validation, JSON
+encoding (orjson and stdlib paths) and the per-handler timing wrapper.
+"""
+
+import base64
+import gzip
+import json
+import sys
+from decimal import Decimal
+sys.path.append('lambda_functions')
+
+import pytest
+
+import runtime
+from runtime import BadRequest, Field, Schema, api_handler, body, event_handler
+
+def test_body_decoding():
+    assert body({"body": None}) == {} and body({}) == {}
+    assert body({"body": {"a": 1}}) == {"a": 1}
+    raw = json.dumps({"email": "a@x.example"})
+    assert body({"body": raw}) == {"email": "a@x.example"}
+    assert body({"body": base64.b64encode(raw.encode()).decode(), "isBase64Encoded": True})["email"] == "a@x.example"
+    zipped = base64.b64encode(gzip.compress(raw.encode())).decode()
+    assert body({"body": zipped, "isBase64Encoded": True, "headers": {"Content-Encoding": "gzip"}})["email"]
+    for bad in ("{not json", "[1, 2]"):
+        with pytest.raises(BadRequest):
+            body({"body": bad})
+
+def test_schema_validation():
+    schema = Schema(
+        Field("email", required=True, lower=True),
+        Field("campaign_id", aliases=("campaignId",), required=True),
+        Field("limit", int, default=10),
+        Field("force", bool, default=False),
+        missing="Missing required: email, campaign_id",
+    )
+    req = schema.validate({"email": " A@X.example ", "campaignId": "c1", "limit": "5", "force": "true"})
+    assert req == {"email": "a@x.example", "campaign_id": "c1", "limit": 5, "force": True}
+    assert schema.validate({"email": "a@x.example", "campaign_id": "c1"})["limit"] == 10
+
+    with pytest.raises(BadRequest) as e:
+        schema.validate({"email": "  ", "campaign_id": "c1"})
+    assert str(e.value) == "Missing required: email, campaign_id" and e.value.extra == {"missing": ["email"]}
+    with pytest.raises(BadRequest, match="limit must be int"):
+        schema.validate({"email": "a@x.example", "campaign_id": "c1", "limit": "many"})
+
+@pytest.mark.parametrize("use_orjson", [True, False])
+def test_decimal_encoding(monkeypatch, use_orjson):
+    if use_orjson and runtime.orjson is None:
+        pytest.skip("orjson not installed")
+    if not use_orjson:
+        monkeypatch.setattr(runtime, "dumps", lambda obj: json.dumps(obj, default=runtime._default,
+                                                                       separators=(",", ":")))
+    out = runtime.resp(200, {"score": Decimal("45"), "fit": Decimal("12.5"), "tags": {"b", "a"}})
+    assert json.loads(out["body"]) == {"score": 45, "fit": 12.5, "tags": ["a", "b"]}
+    assert '"score":45,' in out["body"]
+
+def test_api_handler_status_and_timing(capsys):
+    @api_handler("probe")
+    def handler(event, context):
+        req = Schema(Field("n", int, required=True)).validate(body(event))
+        if req["n"] < 0:
+            raise RuntimeError("negative")
+        return runtime.resp(200, {"n": req["n"]})
+
+    ok = handler({"body": '{"n": 3}'}, None)
+    assert ok["statusCode"] == 200 and ok["headers"]["Server-Timing"].startswith("app;dur=")
+    assert handler({"body": "{}"}, None)["statusCode"] == 400
+    assert handler({"body": "{oops"}, None)["statusCode"] == 400
+    failed = handler({"body": '{"n": -1}'}, None)
+    assert failed["statusCode"] == 500 and json.loads(failed["body"]) == {"error": "negative"}
+
+    logs = [json.loads(l) for l in capsys.readouterr().err.splitlines() if '"request"' in l]
+    assert [l["status"] for l in logs] == [200, 400, 400, 500]
+    assert logs[-1]["err"] == "negative" and all("cpuMs" in l for l in logs)
+
+def test_event_handler_reraises():
+    @event_handler("probe_events")
+    def handler(event, context):
+        raise RuntimeError("stream record failed")
+
+    with pytest.raises(RuntimeError):
+        handler({"Records": []}, None)
+
+def test_float_scores_are_stored_as_decimal():
+    import leads_store_dynamo as store
+    item = store._marshal({"data": {"campaigns": {"c1": {"score": 41.6, "updatedAt": 1}}, "tags": [0.5]}})
+    assert item["data"]["M"]["campaigns"]["M"]["c1"]["M"]["score"] == {"N": "41.6"}
+    assert item["data"]["M"]["tags"]["L"] == [{"N": "0.5"}]
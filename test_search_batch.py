@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Tests for batch search: parallel provider calls, one domain dedup across all
+queries before any fetch, and per-query results in ranking order.
+"""
+
+import json
+import sys
+import threading
+import time
+sys.path.append('lambda_functions')
+sys.path.append('src')
+
+import pytest
+
+import crawl_frontier
+import search_shopify_retailers as crawler
+from lead_generator import LeadGenerator
+
+RANKINGS = {
+    "fashion": ["https://a.example", "https://b.example/collections", "https://c.example"],
+    "sustainable fashion": ["https://www.b.example", "https://d.example", "https://a.example/pages/about"],
+}
+
+@pytest.fixture(autouse=True)
+def frontier(monkeypatch):
+    monkeypatch.setattr(crawl_frontier, "table", lambda: None)
+    crawl_frontier.reset()
+    yield
+    crawl_frontier.reset()
+
+def _search(query, n):
+    time.sleep(0.2)
+    return [{"url": u} for u in RANKINGS[query.split(" site:")[0]]]
+
+def test_overlapping_queries_crawl_each_store_once(monkeypatch):
+    waves = []
+    monkeypatch.setattr(crawler, "POLITE_DELAY", 0)
+    monkeypatch.setattr(crawler, "search_google", _search)
+    monkeypatch.setattr(crawler, "extract_stores", lambda urls: waves.append(urls) or
+                        [{"website": u, "email": f"hi@{crawl_frontier.domain_of(u)}"} for u in urls])
+
+    started = time.monotonic()
+    res = crawler.find_shopify_stores_batch(["fashion", "sustainable fashion", "fashion "], limit=3)
+    assert time.monotonic() - started < 0.4                                   # searches overlapped
+    fetched = [crawl_frontier.domain_of(u) for wave in waves for u in wave]
+    assert sorted(fetched) == ["a.example", "b.example", "c.example", "d.example"]
+    assert [s["website"] for s in res["fashion"]] == ["https://a.example", "https://b.example/collections",
+                                                      "https://c.example"]
+    assert [s["website"] for s in res["sustainable fashion"]] == ["https://b.example/collections",
+                                                                  "https://d.example", "https://a.example"]
+
+def test_handler_batch_mode(monkeypatch):
+    monkeypatch.setattr(crawler, "search_google", _search)
+    monkeypatch.setattr(crawler, "extract_stores", lambda urls: [{"website": u, "email": None} for u in urls])
+    res = crawler.lambda_handler({"body": json.dumps({"queries": list(RANKINGS), "limit": 2})}, None)
+    body = json.loads(res["body"])
+    assert res["statusCode"] == 200 and body["queries"] == list(RANKINGS)
+    assert body["results"]["fashion"]["count"] == 2 and body["count"] == 3
+
+    bad = crawler.lambda_handler({"body": json.dumps({"queries": "fashion"})}, None)
+    assert bad["statusCode"] == 400
+
+def test_lead_generator_batch(monkeypatch):
+    gen = LeadGenerator(request_delay=0)
+    crawled, threads = [], set()
+
+    def search(query, limit):
+        threads.add(threading.get_ident())
+        time.sleep(0.05)
+        return RANKINGS[query]
+    monkeypatch.setattr(gen, "_search_shopify_stores", search)
+    monkeypatch.setattr(gen, "_crawl", lambda urls: crawled.extend(urls) or
+                        {u: {"website": u, "company_name": u, "email": "x@y.example"} for u in urls})
+
+    res = gen.find_shopify_leads_batch(list(RANKINGS), limit=2)
+    assert sorted(crawled) == ["https://a.example", "https://b.example/collections", "https://d.example"]
+    assert [l["website"] for l in res["sustainable fashion"]] == ["https://b.example/collections", "https://d.example"]
+    assert len(threads) == 2
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Tests for the Google CSE provider against a local stand-in of the JSON API:
+parallel result pages past the 10-per-request cap, the daily quota and the
+query cache.
+"""
+
+import sys
+import time
+sys.path.append('lambda_functions')
+sys.path.append('src')
+
+import pytest
+
+import search_provider
+from fixture_server import FixtureSite, cse_stand_in
+from lead_generator import LeadGenerator
+from search_provider import GoogleCSE, QuotaExceeded
+
+LINKS = [f"https://store{i}.example" for i in range(60)]
+QUERY = 'shoes site:myshopify.com OR "powered by shopify"'
+
+@pytest.fixture
+def api(monkeypatch):
+    monkeypatch.setattr(search_provider, "table", lambda: None)
+    search_provider.reset()
+    with FixtureSite(cse_stand_in({QUERY: LINKS}), delay=0.2, content_type="application/json") as site:
+        yield site
+    search_provider.reset()
+
+def test_pages_fetched_in_parallel_and_cached(api):
+    cse = GoogleCSE("test-key", "cx", endpoint=api.url + "/customsearch/v1")
+    started = time.monotonic()
+    results = cse.search(QUERY, limit=45)
+    assert time.monotonic() - started < 5 * 0.2                       # one round of latency, not five
+    assert [r["url"] for r in results] == LINKS[:45]
+    assert len(api.hits) == 5 and search_provider.used_today() == 5
+    assert "start=41" in "".join(api.hits) and "num=5" in "".join(api.hits)
+
+    assert cse.search(QUERY.upper(), limit=45) == results           # cached: no request, no quota
+    assert len(api.hits) == 5 and search_provider.used_today() == 5
+
+def test_quota_is_honoured(api):
+    cse = GoogleCSE("test-key", "cx", endpoint=api.url + "/customsearch/v1", daily_quota=3, cache_seconds=0)
+    assert len(cse.search(QUERY, limit=50)) == 30                   # only the pages that fit
+    with pytest.raises(QuotaExceeded):
+        cse.search(QUERY, limit=10)
+    assert search_provider.used_today() == 3
+
+def test_lead_generator_goes_past_ten_results(api, monkeypatch):
+    gen = LeadGenerator(google_api_key="test-key", google_cse_id="cx", request_delay=0)
+    gen.search_provider.endpoint = api.url + "/customsearch/v1"
+    assert gen._search_shopify_stores("shoes", 25) == LINKS[:25]
+
+    gen.search_provider.api_key = "wrong"                          # API error: falls back to known stores
+    search_provider.reset()
+    assert gen._search_shopify_stores("shoes", 25)[0] == "https://shop.tesla.com"
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Tests for the Shopify JSON fast path: stores whose endpoints cover the needed
+fields skip their homepage, and the HTML fallback fills only what is missing.
+"""
+
+import json
+import sys
+sys.path.append('lambda_functions')
+sys.path.append('src')
+
+import crawl_frontier
+import search_shopify_retailers as crawler
+from fixture_server import FixtureSite
+from lead_generator import LeadGenerator
+
+META = {"name": "Trail Co", "description": "Trail running shoes", "currency": "CAD", "city": "Squamish",
+        "province": "British Columbia", "country": "CA", "myshopify_domain": "trail-co.myshopify.com"}
+PRODUCTS = {"products": [{"product_type": "Shoes"}, {"product_type": "Socks"}, {"product_type": "shoes"}]}
+COLLECTIONS = {"collections": [{"title": "Frontpage"}, {"title": "Trail"}]}
+CONTACT = ('<html><body><a href="https://instagram.com/trailco">IG</a> '
+           'Write to <b>hello@trail.example</b> or call (604) 555-0199</body></html>')
+HOME = '<html><title>Trail Co - Shop</title><body>Powered by Shopify <a href="/pages/contact">Contact</a></body></html>'
+
+def _routes(meta=META):
+    return {"/meta.json": json.dumps(meta), "/products.json?limit=10": json.dumps(PRODUCTS),
+            "/collections.json?limit=20": json.dumps(COLLECTIONS), "/pages/contact": CONTACT, "/": HOME}
+
+def test_json_endpoints_replace_the_homepage():
+    with FixtureSite(_routes()) as site:
+        [store] = crawler.extract_stores([site.url])
+        assert "/" not in site.hits
+        assert store["contactPage"] == site.url + "/pages/contact"
+    assert (store["companyName"], store["email"], store["currency"]) == ("Trail Co", "hello@trail.example", "CAD")
+    assert store["categories"] == ["Trail", "Shoes", "Socks"] and store["phone"] == "(604) 555-0199"
+
+def test_missing_fields_fall_back_to_html():
+    with FixtureSite(_routes({**META, "description": ""})) as site:
+        [store] = crawler.extract_stores([site.url])
+        assert site.hits["/"] == 1 and site.hits["/pages/contact"] == 1
+    assert store["description"] == "Shopify store" and store["email"] == "hello@trail.example"
+    assert (store["companyName"], store["currency"]) == ("Trail Co", "CAD")     # JSON wins where it has a value
+
+def test_lead_generator_uses_the_fast_path(monkeypatch):
+    monkeypatch.setattr(crawl_frontier, "table", lambda: None)
+    crawl_frontier.reset()
+    gen = LeadGenerator(request_delay=0)
+    with FixtureSite(_routes()) as site:
+        monkeypatch.setattr(gen, "_search_shopify_stores", lambda q, n: [site.url])
+        [lead] = gen.find_shopify_leads("trail", limit=1)
+        assert "/" not in site.hits
+    crawl_frontier.reset()
+    assert lead["company_name"] == "Trail Co" and lead["location"] == "Squamish, British Columbia, CA"
+    assert lead["social_media"] == {"instagram": "https://instagram.com/trailco"}
+    assert lead["products"] == ["Trail", "Shoes", "Socks"] and lead["phone"] == "6045550199"
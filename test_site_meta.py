@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Tests for the robots.txt/sitemap cache: contact pages taken from the sitemap
+instead of homepage links, robots.txt honoured by both crawlers, and one
+fetch of each per domain.
+"""
+
+import json
+import sys
+sys.path.append('lambda_functions')
+sys.path.append('src')
+
+import pytest
+
+import site_meta
+import search_shopify_retailers as crawler
+from fixture_server import FixtureSite
+from lead_generator import LeadGenerator
+
+ROBOTS = "User-agent: *\nDisallow: /collections.json\nDisallow: /pages/about-us\n"
+INDEX = """<?xml version="1.0"?><sitemapindex>
+<sitemap><loc>https://shop.example/sitemap_products_1.xml?from=1&amp;to=9</loc></sitemap>
+<sitemap><loc>https://shop.example/sitemap_pages_1.xml?from=1&amp;to=3</loc></sitemap>
+</sitemapindex>"""
+PAGES = """<?xml version="1.0"?><urlset>
+<url><loc>https://shop.example/pages/shipping</loc></url>
+<url><loc>https://shop.example/pages/contact-us</loc></url>
+<url><loc>https://shop.example/pages/about-us</loc></url>
+<url><loc>https://shop.example/pages/our-story-about</loc></url>
+</urlset>"""
+
+@pytest.fixture(autouse=True)
+def cache(monkeypatch):
+    monkeypatch.setattr(site_meta, "table", lambda: None)
+    site_meta.reset()
+    yield
+    site_meta.reset()
+
+def test_contact_page_comes_from_the_sitemap():
+    routes = {"/robots.txt": ROBOTS, "/sitemap.xml": INDEX, "/sitemap_pages_1.xml": PAGES,
+              "/meta.json": json.dumps({"name": "Shop", "description": "Tea", "currency": "EUR"}),
+              "/pages/contact-us": "<p>Write to tea@shop.example</p>"}
+    with FixtureSite(routes) as site:
+        meta = site_meta.load([site.url])[site.url]
+        assert meta["contact"] == [f"{site.url}/pages/contact-us"]
+        assert meta["about"] == [f"{site.url}/pages/our-story-about"]            # about-us is disallowed
+
+        store = crawler.extract_stores([site.url])[0]
+        assert store["email"] == "tea@shop.example"
+        assert store["contactPage"] == f"{site.url}/pages/contact-us"
+        crawler.extract_stores([site.url])
+        assert site.hits["/robots.txt"] == site.hits["/sitemap.xml"] == 1
+        assert "/sitemap_products_1.xml" not in site.hits and "/pages/contact" not in site.hits
+        assert "/collections.json?limit=20" not in site.hits
+
+def test_robots_sitemap_line_replaces_anchor_scanning():
+    home = ('<html><head><title>Plain</title><script src="//cdn.shopify.com/x.js"></script></head>'
+            '<body><a href="/about">About</a> <a href="/contact-form">Contact</a></body></html>')
+    routes = {"/": home, "/robots.txt": "Sitemap: https://elsewhere.example/store-map.xml\n",
+              "/store-map.xml": "<urlset><url><loc>https://elsewhere.example/contact</loc></url></urlset>",
+              "/contact": "<p>hello@plain.example</p>"}
+    with FixtureSite(routes) as site:
+        store = crawler.extract_stores([site.url])[0]
+        assert store["email"] == "hello@plain.example"
+        assert "/about" not in site.hits and "/contact-form" not in site.hits
+
+def test_disallowed_stores_are_not_crawled():
+    with FixtureSite({"/robots.txt": "User-agent: *\nDisallow: /\n", "/": "<p>a@b.example</p>"}) as site:
+        assert crawler.extract_stores([site.url]) == []
+        assert LeadGenerator(request_delay=0)._crawl([site.url]) == {site.url: None}
+        assert set(site.hits) == {"/robots.txt", "/sitemap.xml"}
+
+def test_robots_status_rules():
+    with FixtureSite({"/robots.txt": (403, "no")}, host="127.0.0.2") as forbidden, \
+            FixtureSite({"/robots.txt": (503, "busy")}, host="127.0.0.3") as down, \
+            FixtureSite({}, host="127.0.0.4") as missing:
+        metas = site_meta.load([forbidden.url, down.url, missing.url])
+        assert not site_meta.allowed(metas[forbidden.url], forbidden.url + "/")
+        assert not site_meta.allowed(metas[down.url], down.url + "/")
+        assert site_meta.allowed(metas[missing.url], missing.url + "/pages/contact")
+        site_meta.load([forbidden.url, down.url, missing.url])
+        assert (forbidden.hits["/robots.txt"], down.hits["/robots.txt"], missing.hits["/robots.txt"]) == (1, 2, 1)
+
+def test_entries_past_the_ttl_are_fetched_again(monkeypatch):
+    with FixtureSite({"/robots.txt": "User-agent: *\nDisallow: /private\n"}) as site:
+        site_meta.load([site.url])
+        site_meta.load([site.url])
+        assert site.hits["/robots.txt"] == 1
+        monkeypatch.setattr(site_meta.time, "time", lambda: site_meta._MEM[site_meta.domain_of(site.url)]["fetchedAt"] + 8 * 86400)
+        assert not site_meta.allowed(site_meta.load([site.url])[site.url], site.url + "/private")
+        assert site.hits["/robots.txt"] == 2
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Tests for the batch path of POST /leads (store_lead_data).
+"""
+
+import json
+import sys
+sys.path.append('lambda_functions')
+
+import pytest
+
+import leads_store_dynamo as store
+import store_lead_data
+from test_leads_store_dynamo import FakeDynamoClient
+
+@pytest.fixture
+def fake(monkeypatch):
+    client = FakeDynamoClient()
+    monkeypatch.setenv("LEADS_TABLE_NAME", "LeadsTable")
+    monkeypatch.setattr(store, "client", lambda service: client)
+    reads = []
+    batch_get = store_lead_data.batch_get_leads
+    monkeypatch.setattr(store_lead_data, "batch_get_leads", lambda emails: reads.append(list(emails)) or batch_get(emails))
+    client.reads = reads
+    return client
+
+def post(body):
+    resp = store_lead_data.lambda_handler({"body": json.dumps(body)}, None)
+    return resp["statusCode"], json.loads(resp["body"])
+
+def test_batch_store_is_one_read_and_field_level_writes(fake):
+    store.upsert_lead({"email": "a@shop.example", "company": "Acme Old",
+                       "campaigns": {"other": {"status": "WARM", "note": ""},
+                                     "bulk-search": {"status": "COLD", "note": "", "score": 7}}})
+
+    code, body = post({"leads": [{"email": "A@shop.example", "company_name": "Acme"},
+                                 {"email": "b@shop.example", "companyName": "Bolt", "status": "COLD"},
+                                 {"email": "", "company_name": "Nobody"}],
+                       "campaign_id": "bulk-search", "status": "PROSPECT", "note": "from search"})
+    assert code == 200 and body["count"] == 2
+    assert body["stored"] == ["a@shop.example", "b@shop.example"] and len(body["errors"]) == 1
+    assert len(fake.reads) == 1
+
+    a = store.get_lead("a@shop.example")
+    assert a["company"] == "Acme" and a["aliases"] == ["Acme Old"]
+    assert a["campaigns"]["other"]["status"] == "WARM"           # other campaigns survive
+    assert a["campaigns"]["bulk-search"] == {"status": "SENT", "note": "from search", "score": 7}
+    assert store.get_lead("b@shop.example")["campaigns"]["bulk-search"]["status"] == "COLD"
+
+def test_updates_since_the_read_survive(fake, monkeypatch):
+    store.upsert_lead({"email": "a@shop.example", "company": "Acme", "campaigns": {}})
+    batch_get = store_lead_data.batch_get_leads
+
+    def racing_read(emails):
+        got = batch_get(emails)
+        if len(fake.reads) == 1:                       # written by someone else after our first read
+            store.update_status("a@shop.example", "other", "REPLIED", None)
+            store.upsert_lead({"email": "c@shop.example", "company": "Cy", "campaigns": {"other": {"status": "WARM"}}})
+        return got
+    monkeypatch.setattr(store_lead_data, "batch_get_leads", racing_read)
+
+    res = store_lead_data.store_leads([{"email": "a@shop.example", "company_name": "Acme"},
+                                       {"email": "c@shop.example", "company_name": "Cy"}], campaign_id="c1")
+    assert res == {"stored": ["a@shop.example", "c@shop.example"], "errors": []}
+    assert len(fake.reads) == 2                        # c was read and merged again, not overwritten
+    assert store.get_lead("a@shop.example")["campaigns"]["other"]["status"] == "REPLIED"
+    c = store.get_lead("c@shop.example")
+    assert c["campaigns"]["other"]["status"] == "WARM" and c["campaigns"]["c1"]["status"] == "SENT"
+
+def test_batch_store_limits(fake):
+    code, body = post({"leads": [{"email": f"{i}@x.example", "company_name": "X"}
+                                 for i in range(store_lead_data.MAX_BATCH + 1)], "campaign_id": "c"})
+    assert code == 400 and not fake.reads
+
+    code, body = post({"leads": [{"email": "a@x.example", "company_name": "X"}]})   # no campaign anywhere
+    assert code == 200 and body["count"] == 0 and body["errors"] and not fake.items
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Tests for the suppression list: fed by the lead stream, set lookups with an
+authoritative confirm on hits, and the send / workflow checks.
+"""
+
+import json
+import sys
+sys.path.append('lambda_functions')
+
+import pytest
+from boto3.dynamodb.types import TypeSerializer
+
+import lead_stream_consumer
+import send_cold_email
+import suppression
+import workflow_orchestrator as wf
+import workflow_runs
+
+_ser = TypeSerializer()
+
+@pytest.fixture(autouse=True)
+def memory_list(monkeypatch):
+    monkeypatch.setattr(suppression, "table", lambda: None)
+    monkeypatch.setattr(suppression, "_MEM", {})
+    suppression.reset()
+    yield
+    suppression.reset()
+
+def _record(email, old_status, new_status):
+    image = lambda s: {k: _ser.serialize(v) for k, v in
+                       {"pk": f"LEAD#{email}", "data": {"email": email, "campaigns": {"c1": {"status": s}}}}.items()}
+    return {"dynamodb": {"SequenceNumber": "1", "ApproximateCreationDateTime": 1_760_000_000,
+                         "OldImage": image(old_status), "NewImage": image(new_status)}}
+
+def test_stream_feeds_the_list_and_hits_are_confirmed(monkeypatch):
+    lead_stream_consumer.lambda_handler({"Records": [_record("gone@x.example", "SENT", "BOUNCED"),
+                                                     _record("fine@x.example", "SENT", "WARM")]}, None)
+    suppression.add(["@blocked.example"], "MANUAL")
+    assert suppression.check("Gone@X.example") == "BOUNCED"
+    assert suppression.check("anyone@blocked.example") == "MANUAL"
+    assert suppression.check("fine@x.example") is None
+
+    lookups = []
+    real = suppression._lookup
+    monkeypatch.setattr(suppression, "_lookup", lambda k: lookups.append(k) or real(k))
+    recipients = [f"r{i}@shop{i % 50}.example" for i in range(5000)] + ["gone@x.example"]
+    allowed, blocked = suppression.filter_allowed(recipients)
+    assert len(allowed) == 5000 and blocked == {"gone@x.example": "BOUNCED"}
+    assert lookups == ["gone@x.example"]                    # misses never touch the store
+
+    suppression._MEM.pop("gone@x.example")                  # removed elsewhere after this container loaded
+    assert suppression.check("gone@x.example") is None
+
+def test_send_refuses_suppressed_recipients(monkeypatch):
+    monkeypatch.setenv("EMAIL_DRY_RUN", "1")
+    monkeypatch.setattr(send_cold_email, "update_send_metadata", lambda *a: None)
+    suppression.add(["unsub@x.example"], "UNSUBSCRIBE")
+    body = {"recipient_email": "unsub@x.example", "subject": "Hi", "email_body": "Hello", "sender_email": "me@y.example"}
+
+    res = send_cold_email.lambda_handler({"body": json.dumps(body)}, None)
+    assert res["statusCode"] == 409 and json.loads(res["body"])["suppressed"] is True
+    ok = send_cold_email.lambda_handler({"body": json.dumps({**body, "recipient_email": "ok@x.example"})}, None)
+    assert ok["statusCode"] == 200
+
+def test_workflow_skips_suppressed_leads_before_any_work(monkeypatch):
+    monkeypatch.delenv("WORKFLOW_TABLE_NAME", raising=False)
+    monkeypatch.setattr(wf, "batch_get_leads", lambda emails: pytest.fail("suppressed lead was stored"))
+    suppression.add(["unsub@x.example"], "UNSUBSCRIBE")
+    params, _ = wf.parse_params({"leads": [{"email": "unsub@x.example", "company_name": "Gone"}], "campaign_id": "c1"})
+
+    run_id = "suppressed-run"
+    workflow_runs.create_run(run_id, 1, {})
+    run = wf.run_workflow(run_id, params)
+    assert run["status"] == "SUCCEEDED" and run["suppressed"] == 1 and run["drafted"] == 0
+
+def test_rebuild_backfills_leads_suppressed_before_the_stream(monkeypatch):
+    import leads_store_dynamo
+    import suppression_api
+    suppression.add(["old@x.example"], "MANUAL")
+    leads = [{"email": "Bounced@x.example", "campaigns": {"c1": {"status": "SENT"}, "c2": {"status": "BOUNCED"}}},
+             {"email": "unsub@x.example", "campaigns": {"c1": {"status": "UNSUBSCRIBE"}}},
+             {"email": "old@x.example", "campaigns": {"c1": {"status": "BOUNCED"}}},
+             {"email": "fine@x.example", "campaigns": {"c1": {"status": "WARM"}}}]
+    monkeypatch.setattr(leads_store_dynamo, "scan_leads", lambda: iter(leads))
+    assert suppression_api.lambda_handler({"action": "rebuild"}, None) == \
+        {"ok": True, "added": {"BOUNCED": 1, "UNSUBSCRIBE": 1}}
+    assert suppression.check("bounced@x.example") == "BOUNCED" and suppression.check("unsub@x.example") == "UNSUBSCRIBE"
+    assert suppression.check("old@x.example") == "MANUAL" and suppression.check("fine@x.example") is None
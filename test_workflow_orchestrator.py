@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Offline tests for the orchestrated workflow (store -> enrich -> draft -> send).
+Sites come from fixture_server; the lead store, Bedrock and SES are replaced
+with in-memory fakes, and run records use workflow_runs' in-memory mode.
+"""
+
+import copy
+import json
+import sys
+import threading
+import time
+sys.path.append('lambda_functions')
+
+import pytest
+
+import workflow_orchestrator as wf
+from leads_store_dynamo import ENRICHMENT_FIELDS
+from fixture_server import FixtureSite
+
+SHOP_HTML = "<html><title>Acme</title><body>Powered by Shopify. hi@acme.example</body></html>"
+
+@pytest.fixture
+def fakes(monkeypatch):
+    monkeypatch.delenv("WORKFLOW_TABLE_NAME", raising=False)
+    monkeypatch.delenv("AWS_LAMBDA_FUNCTION_NAME", raising=False)
+    state = {"db": {}, "writes": [], "events": [], "fail_draft": set()}
+    lock = threading.Lock()
+
+    def event(name, email=None):
+        with lock:
+            state["events"].append((time.monotonic(), name, email))
+
+    def add_campaigns(additions):
+        event("write_start")
+        for lead, cid in additions:
+            state["db"][lead["email"]].setdefault("campaigns", {}).setdefault(cid, copy.deepcopy(lead["campaigns"][cid]))
+        return len(additions)
+
+    def update_enrichment(leads):
+        time.sleep(0.2)
+        state["writes"].append([l["email"] for l in leads])
+        for lead in leads:
+            if lead["email"] not in state["db"]:
+                state["db"][lead["email"]] = copy.deepcopy(lead)
+                continue
+            stored = state["db"][lead["email"]]
+            stored.update({k: copy.deepcopy(v) for k, v in lead.items() if k in ENRICHMENT_FIELDS})
+            for cid, c in (lead.get("campaigns") or {}).items():
+                stored["campaigns"][cid]["score"] = c["score"]
+        return len(leads)
+
+    def touch_profiles(profiles):
+        for email, fields in profiles.items():
+            state["db"][email]["profile"].update(fields)
+        event("write_end")
+
+    def draft_email(company, recipient_email, **kw):
+        event("draft", recipient_email)
+        if recipient_email in state["fail_draft"]:
+            raise RuntimeError("throttled")
+        time.sleep(0.05)
+        return "model", f"Hello {company}"
+
+    def send_email(to_addr, subject, text_body, **kw):
+        event("send", to_addr)
+        return {"ok": True, "message_id": f"dryrun-{to_addr}", "dry_run": True}
+
+    monkeypatch.setattr(wf, "batch_get_leads",
+                        lambda emails: {e: copy.deepcopy(state["db"][e]) for e in emails if e in state["db"]})
+    monkeypatch.setattr(wf, "add_campaigns", add_campaigns)
+    monkeypatch.setattr(wf, "update_enrichment", update_enrichment)
+    monkeypatch.setattr(wf, "touch_profiles", touch_profiles)
+    monkeypatch.setattr(wf, "draft_email", draft_email)
+    monkeypatch.setattr(wf, "send_email", send_email)
+    return state
+
+def _post(body):
+    resp = wf.lambda_handler({"httpMethod": "POST", "body": json.dumps(body)}, None)
+    return resp["statusCode"], json.loads(resp["body"])
+
+def _get(run_id):
+    resp = wf.lambda_handler({"httpMethod": "GET", "pathParameters": {"runId": run_id}}, None)
+    return resp["statusCode"], json.loads(resp["body"])
+
+def test_run_stores_enriches_drafts_and_sends_every_lead(fakes):
+    with FixtureSite({"/": SHOP_HTML}) as site:
+        leads = [{"email": f"owner{i}@shop.example", "company_name": f"Shop {i}", "website": site.url}
+                 for i in range(4)]
+        code, run = _post({"leads": leads, "campaign_id": "c1", "wait": True})
+
+    assert code == 200 and run["status"] == "SUCCEEDED"
+    assert (run["total"], run["enriched"], run["drafted"], run["sent"], run["failed"]) == (4, 4, 4, 4, 0)
+    assert {l["stage"] for l in run["leads"]} == {"sent"}
+    assert len(fakes["writes"]) == 1 and len(fakes["writes"][0]) == 4  # one round of enrichment writes
+    lead = fakes["db"]["owner0@shop.example"]
+    assert lead["company"] == "Shop 0" and lead["campaigns"]["c1"]["status"] == "SENT"
+    assert float(lead["fitScore"]) == 35.0
+
+def test_drafting_overlaps_the_write_and_sends_wait_for_it(fakes):
+    leads = [{"email": f"o{i}@shop.example", "company_name": "Shop"} for i in range(3)]
+    _post({"leads": leads, "campaign_id": "c1", "wait": True})
+    times = {}
+    for t, name, _ in fakes["events"]:
+        times.setdefault(name, []).append(t)
+    assert min(times["draft"]) < times["write_end"][0]  # drafts started before the write finished
+    assert min(times["send"]) >= times["write_end"][0]  # no send before its lead is persisted
+
+def test_post_returns_run_id_and_progress_can_be_polled(fakes):
+    code, started = _post({"email": "solo@shop.example", "company_name": "Solo", "campaign_id": "c1"})
+    assert code == 200 and started["runId"] and "leads" not in started
+
+    deadline = time.monotonic() + 5
+    while True:
+        code, run = _get(started["runId"])
+        if run["status"] in ("SUCCEEDED", "PARTIAL", "FAILED") or time.monotonic() > deadline:
+            break
+        time.sleep(0.05)
+    assert run["status"] == "SUCCEEDED"
+    assert run["leads"][0]["messageId"] == "dryrun-solo@shop.example"
+    assert _get("nope")[0] == 404
+
+def test_failed_drafts_leave_the_run_partial(fakes):
+    fakes["fail_draft"].add("bad@shop.example")
+    leads = [{"email": "good@shop.example", "company_name": "Good"},
+             {"email": "bad@shop.example", "company_name": "Bad"}]
+    _, run = _post({"leads": leads, "campaign_id": "c1", "wait": True, "send": False})
+    assert run["status"] == "PARTIAL"
+    by_email = {l["email"]: l for l in run["leads"]}
+    assert by_email["good@shop.example"]["stage"] == "drafted"
+    assert by_email["bad@shop.example"]["error"] == "draft: throttled"
+    assert not [e for e in fakes["events"] if e[1] == "send"]
+
+def test_rejects_runs_without_campaign_or_valid_leads(fakes):
+    assert _post({"leads": [{"email": "a@b.example", "company_name": "A"}]})[0] == 400
+    code, body = _post({"leads": [{"email": "a@b.example"}], "campaign_id": "c1"})
+    assert code == 400 and body["errors"][0]["error"] == "email and company_name required"
+
+def test_statuses_written_during_the_run_survive(fakes, monkeypatch):
+    fakes["db"]["old@shop.example"] = {"email": "old@shop.example", "company": "Old",
+                                       "campaigns": {"c0": {"status": "SENT"}, "c1": {"status": "WARM"}}}
+    enrich = wf.enrich_leads
+    def enrich_then_reply(*args, **kwargs):
+        res = enrich(*args, **kwargs)
+        fakes["db"]["old@shop.example"]["campaigns"]["c0"]["status"] = "REPLIED"      # lands mid-run
+        return res
+    monkeypatch.setattr(wf, "enrich_leads", enrich_then_reply)
+    leads = [{"email": "old@shop.example", "company_name": "Old"}, {"email": "new@shop.example", "company_name": "New"}]
+    _post({"leads": leads, "campaign_id": "c1", "wait": True, "send": False})
+    old = fakes["db"]["old@shop.example"]
+    assert old["campaigns"]["c0"]["status"] == "REPLIED" and old["campaigns"]["c1"]["status"] == "WARM"
+    assert "score" in old["campaigns"]["c1"] and fakes["db"]["new@shop.example"]["campaigns"]["c1"]["status"] == "SENT"
+
+def test_failed_dispatch_marks_the_run_failed(fakes, monkeypatch):
+    def dispatch(run_id, params):
+        raise RuntimeError("AccessDenied")
+    monkeypatch.setattr(wf, "_dispatch", dispatch)
+    code, started = _post({"email": "solo@shop.example", "company_name": "Solo", "campaign_id": "c1"})
+    assert code == 200 and started["status"] == "FAILED" and started["error"] == "dispatch: AccessDenied"
+    assert _get(started["runId"])[1]["status"] == "FAILED"